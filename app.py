@@ -1,4 +1,5 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, make_response
+from werkzeug.http import is_resource_modified
 import json
 import os
 from datetime import datetime
@@ -9,12 +10,39 @@ import logging
 # Essential imports for basic functionality
 from core.error_handler import error_handler, ValidationError, AuthenticationError, UserDataError
 from core.validators import validator
-from core.security import rate_limit, csrf_protection
+from core.security import rate_limit, rate_limiter, csrf_protection
 from core.database_manager import db_manager
 from core.performance import disk_cache, performance_monitor, cleanup_caches
 from core.memory_manager import memory_monitor, get_memory_usage, optimize_memory
-from core.adaptive_learning import learning_analytics, UserPerformance, DifficultyLevel, LearningStyle, learning_path_generator
+from core.adaptive_learning import learning_analytics, UserPerformance, DifficultyLevel, LearningStyle, learning_path_generator, spaced_repetition
+from core.review_queue import review_queue
 from core.social_learning import social_manager
+from core.user_store import user_store
+from core.sandbox import sandbox_pool, check_code_safety
+from core.result_cache import result_cache, suite_version
+from core.content_catalog import content_catalog
+from core.leaderboard import LeaderboardIndex
+from core.write_behind import CounterAggregator
+from core.job_queue import job_queue, fingerprint, PrecomputeTrigger
+from core.analytics_engine import analytics_engine, AnalyticsEngine, SKILL_AREAS, ENGAGEMENT_WEIGHTS
+from core.collab_sync import OperationError, StaleRevisionError
+from collaboration_system import collaboration_hub
+from core.fragment_cache import FragmentCache, FragmentCacheExtension, PageValidators, make_key
+
+# Try to import Flask-SocketIO; without it live collaboration falls back to HTTP polling
+try:
+    from flask_socketio import SocketIO, emit, join_room, leave_room
+    HAS_SOCKETIO = True
+except ImportError:
+    HAS_SOCKETIO = False
+
+# Try to import Flask-SQLAlchemy; without it learning history is only kept in user profiles
+try:
+    from models import db
+    from core.progress_repository import progress_repository
+    HAS_SQLALCHEMY = True
+except ImportError:
+    HAS_SQLALCHEMY = False
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)
@@ -30,6 +58,19 @@ APP_VERSION = "2.0.0"
 APP_NAME = "Python Learning Platform"
 APP_DESCRIPTION = "Comprehensive Python learning platform with interactive lessons, challenges, and gamification"
 
+# Legacy user data file, imported once into the user store at startup
+# (python app.py) or with `flask --app app migrate-users`
+USER_DATA_FILE = os.environ.get("LEGACY_USER_DATA_FILE", "data/user_progress.json")
+
+def migrate_legacy_users() -> int:
+    """Import the legacy JSON user file into the user store (only the first time)"""
+    return user_store.migrate_from_json(USER_DATA_FILE)
+
+@app.cli.command("migrate-users")
+def migrate_users_command():
+    """Import the legacy JSON user file into the user store"""
+    print(f"Migrated {migrate_legacy_users()} users from {USER_DATA_FILE}")
+
 # Configure Flask logging to work with our error handler
 app.logger.addHandler(error_handler.logger.handlers[0])
 app.logger.setLevel(logging.INFO)
@@ -62,32 +103,120 @@ def validate_session():
     return 'user' in session
 
 def load_user_data():
-    """Simplified user data loading"""
+    """Load every user profile keyed by email (full scan, prefer load_user_profile)"""
     try:
-        file_path = "data/user_progress.json"
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        return {}
+        return user_store.all_users()
     except Exception as e:
         print(f"Error loading user data: {e}")
         return {}
 
 def save_user_data(data):
-    """Simplified user data saving"""
+    """Replace every user profile (full rewrite, prefer save_user_profile)"""
     try:
-        file_path = "data/user_progress.json"
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-        return True
+        return user_store.save_all(data)
     except Exception as e:
         print(f"Error saving user data: {e}")
         return False
 
+def load_user_profile(user_email):
+    """Load a single user's profile from the user store, including unflushed counters"""
+    if not user_email:
+        return {}
+    try:
+        return counters.overlay(user_email, user_store.get_user(user_email) or {})
+    except Exception as e:
+        print(f"Error loading user profile: {e}")
+        return {}
+
+def save_user_profile(user_email, profile):
+    """Save a single user's profile to the user store"""
+    try:
+        return user_store.save_user(user_email, profile)
+    except Exception as e:
+        print(f"Error saving user profile: {e}")
+        return False
+
+def increment_user_fields(user_email, deltas, set_fields=None):
+    """Atomically add deltas to numeric fields of a user's profile"""
+    try:
+        return user_store.increment(user_email, deltas, set_fields)
+    except Exception as e:
+        print(f"Error incrementing user fields: {e}")
+        return None
+
+def modify_user_profile(user_email, updater):
+    """Apply updater to a user's profile in one store transaction; returns the profile or None"""
+    try:
+        return user_store.update_user(user_email, updater, create=True)
+    except Exception as e:
+        print(f"Error updating user profile: {e}")
+        return None
+
+def derive_quiz_average(profile):
+    """Recompute the average quiz score from the quiz attempt counters"""
+    if profile.get('quizzes_taken'):
+        profile['average_quiz_score'] = profile.get('total_quiz_score', 0) / profile['quizzes_taken']
+
+# Hot counters (playground uses, quiz attempts, activity timestamps, streak
+# touches) are coalesced in memory and written to the user store in batches
+counters = CounterAggregator(lambda user_email, updater: user_store.update_user(user_email, updater),
+                             derive=derive_quiz_average)
+
+# Rendered page caching: {% cache %} fragments and whole pages keyed by the
+# content version plus the user state they show, with ETag/Last-Modified
+fragment_cache = FragmentCache()
+page_validators = PageValidators()
+_code_fingerprint = None
+
+def code_fingerprint():
+    """Fingerprint of the templates and this module (recomputed per call in debug mode)"""
+    global _code_fingerprint
+    if _code_fingerprint is None or app.debug:
+        paths = [__file__] + sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(os.path.join(app.root_path, app.template_folder))
+            for name in names)
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                pass
+        _code_fingerprint = make_key(signature)
+    return _code_fingerprint
+
+def render_version():
+    """Version of everything a page renders besides user state"""
+    return f"{content_catalog.version()}:{code_fingerprint()}:{APP_VERSION}"
+
+app.jinja_env.add_extension(FragmentCacheExtension)
+app.jinja_env.fragment_cache = fragment_cache
+app.jinja_env.fragment_cache_version = render_version
+
+def render_cached_page(template, state, **context):
+    """Render a per-user page, answering 304 without rendering when the client's copy is current.
+
+    state is the user state the page shows (content comes with the render version);
+    it must change whenever the rendered page would.
+    """
+    user_email = session.get('user')
+    etag = make_key(template, render_version(), user_email, state)
+    last_modified = page_validators.last_modified((request.path, user_email), etag)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response('', 304)
+    else:
+        response = make_response(fragment_cache.get_or_render(
+            make_key('page', etag), lambda: render_template(template, **context)))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
 def get_progress_stats(user_email):
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
+    user = load_user_profile(user_email)
 
     lessons_completed = user.get('lessons_completed', 0)
     points = user.get('points', 0)
@@ -571,10 +700,9 @@ def register():
             }), 400
 
         # Check if user already exists
-        user_data = load_user_data()
         email = sanitized_data['email'].lower()
 
-        if email in user_data:
+        if load_user_profile(email):
             error_handler.logger.info(f"Registration attempt with existing email: {email}")
             return jsonify({
                 "success": False,
@@ -614,8 +742,7 @@ def register():
         }
 
         # Save user data
-        user_data[email] = user_profile
-        save_success = save_user_data(user_data)
+        save_success = save_user_profile(email, user_profile)
 
         if not save_success:
             return jsonify({
@@ -654,8 +781,7 @@ def welcome_user():
     if 'user' not in session:
         return redirect(url_for('index'))
     
-    user_data = load_user_data()
-    user_profile = user_data.get(session['user'], {})
+    user_profile = load_user_profile(session['user'])
     session['show_dashboard_tour'] = True
     return render_template('welcome_user.html', user_profile=user_profile)
 
@@ -696,17 +822,14 @@ def login():
             }), 400
 
         # Load user data and check credentials
-        user_data = load_user_data()
-        user = user_data.get(email)
+        user = load_user_profile(email)
 
         if not user:
             error_handler.logger.warning(f"Login attempt with non-existent email: {email}")
-            # For debugging, show available users
-            available_users = list(user_data.keys())[:3]  # Show first 3 users
             return jsonify({
                 "success": False,
                 "error": "Invalid email or password",
-                "debug_info": f"User not found. Available users: {available_users}"
+                "debug_info": "User not found"
             }), 401
 
         # Verify password (in production, use proper password hashing)
@@ -719,10 +842,8 @@ def login():
             }), 401
 
         # Update last login time
-        user['last_login'] = datetime.now().isoformat()
-        user['last_activity'] = datetime.now().isoformat()
-        user_data[email] = user
-        save_user_data(user_data)
+        now = datetime.now().isoformat()
+        counters.add(email, latest={'last_login': now, 'last_activity': now})
 
         # Set session using helper
         set_user_session(email)
@@ -754,19 +875,20 @@ def dashboard():
     if 'user' not in session:
         return redirect(url_for('index'))
     
-    user_data = load_user_data()
-    user_profile = user_data.get(session['user'], {})
+    user_profile = load_user_profile(session['user'])
     stats = get_progress_stats(session['user'])
     show_tour = session.pop('show_dashboard_tour', False)
     
     if not show_tour and (stats.get('lessons_completed', 0) == 0):
         show_tour = True
     
-    return render_template('dashboard.html', 
-                         user=user_profile.get('name', 'User'),
-                         stats=stats, 
-                         profile=user_profile,
-                         show_tour=show_tour)
+    context = {
+        'user': user_profile.get('name', 'User'),
+        'stats': stats,
+        'profile': user_profile,
+        'show_tour': show_tour
+    }
+    return render_cached_page('dashboard.html', context, **context)
 
 @app.route('/logout')
 def logout():
@@ -780,11 +902,11 @@ def debug_session():
 
 @app.route('/api/reset-rate-limit')
 def reset_rate_limit():
-    """Reset rate limits for development (remove in production)"""
+    """Reset the caller's rate limits while developing (debug mode only)"""
     try:
-        # Clear rate limit cache
-        if hasattr(rate_limit, 'cache'):
-            rate_limit.cache.clear()
+        if not app.debug:
+            return jsonify({"success": False, "error": "Only available in debug mode"}), 403
+        rate_limiter.reset(rate_limiter.get_client_identifier())
         return jsonify({"success": True, "message": "Rate limits reset"})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
@@ -794,13 +916,13 @@ def lessons():
     if 'user' not in session:
         return redirect(url_for('index'))
     
-    lessons_data = get_comprehensive_lessons_data()
+    lessons_data = content_catalog.lessons()
     
-    user_data = load_user_data()
-    user = user_data.get(session['user'], {})
+    user = load_user_profile(session['user'])
     completed_lessons = user.get('completed_lessons', [])
     
-    return render_template('lessons.html', lessons=lessons_data, completed_lessons=completed_lessons)
+    return render_cached_page('lessons.html', completed_lessons,
+                              lessons=lessons_data, completed_lessons=completed_lessons)
 
 @app.route('/lesson/<lesson_id>')
 def lesson_detail(lesson_id):
@@ -808,15 +930,13 @@ def lesson_detail(lesson_id):
         return redirect(url_for('index'))
 
     # Get lesson data
-    lessons_data = get_comprehensive_lessons_data()
-    lesson = next((l for l in lessons_data if l['id'] == lesson_id), None)
+    lesson = content_catalog.get_lesson(lesson_id)
 
     if not lesson:
         return redirect(url_for('lessons'))
 
     # Get user progress for this lesson
-    user_data = load_user_data()
-    user = user_data.get(session['user'], {})
+    user = load_user_profile(session['user'])
     completed_lessons = user.get('completed_lesson_ids', [])
 
     # Create lesson progress object
@@ -824,10 +944,10 @@ def lesson_detail(lesson_id):
         'status': 'completed' if lesson_id in completed_lessons else 'not_started'
     }
 
-    # Add content to lesson object
-    lesson['content'] = get_lesson_content(lesson_id)
+    # Add content to a per-request copy of the shared lesson object
+    lesson = dict(lesson, content=content_catalog.lesson_content(lesson_id))
 
-    return render_template('lesson_detail.html', lesson=lesson, progress=progress)
+    return render_cached_page('lesson_detail.html', [lesson_id, progress], lesson=lesson, progress=progress)
 
 @app.route('/api/complete_lesson', methods=['POST'])
 def complete_lesson():
@@ -843,44 +963,45 @@ def complete_lesson():
             return jsonify({"success": False, "error": "Lesson ID required"}), 400
 
         # Verify lesson exists
-        lessons_data = get_comprehensive_lessons_data()
-        lesson = next((l for l in lessons_data if l['id'] == lesson_id), None)
+        lesson = content_catalog.get_lesson(lesson_id)
 
         if not lesson:
             return jsonify({"success": False, "error": "Lesson not found"}), 404
 
-        # Update user progress
-        user_data = load_user_data()
-        user = user_data.get(session['user'], {})
+        points_earned = lesson.get('points', 10)
+        newly_completed = []
+
+        def apply_lesson_completion(user):
+            # Initialize completed lessons list if it doesn't exist
+            if 'completed_lesson_ids' not in user:
+                user['completed_lesson_ids'] = []
 
-        # Initialize completed lessons list if it doesn't exist
-        if 'completed_lesson_ids' not in user:
-            user['completed_lesson_ids'] = []
+            # Nothing to write if the lesson was already completed
+            if lesson_id in user['completed_lesson_ids']:
+                return False
 
-        # Add lesson to completed list if not already there
-        if lesson_id not in user['completed_lesson_ids']:
             user['completed_lesson_ids'].append(lesson_id)
 
             # Update lesson completion count
             user['lessons_completed'] = len(user['completed_lesson_ids'])
 
-            # Award points
-            points_earned = lesson.get('points', 10)
+            # Award points and update level
             user['points'] = user.get('points', 0) + points_earned
-
-            # Update level based on points
             user['level'] = (user['points'] // 100) + 1
 
             # Update last activity
             user['last_activity'] = datetime.now().isoformat()
+            newly_completed.append(lesson_id)
 
-            # Save updated user data
-            user_data[session['user']] = user
-            save_success = save_user_data(user_data)
+        # Update user progress in a single store transaction
+        user = modify_user_profile(session['user'], apply_lesson_completion)
 
-            if not save_success:
-                return jsonify({"success": False, "error": "Failed to save progress"}), 500
+        if user is None:
+            return jsonify({"success": False, "error": "Failed to save progress"}), 500
 
+        if newly_completed:
+            record_history('record_lesson_completion', session['user'], lesson_id)
+            schedule_concept_review(session['user'], user, lesson_id, 1.0)
             return jsonify({
                 "success": True,
                 "message": f"Lesson completed! +{points_earned} points",
@@ -901,19 +1022,10 @@ def next_lesson(current_lesson_id):
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    lessons_data = get_comprehensive_lessons_data()
-
-    # Find current lesson index
-    current_index = None
-    for i, lesson in enumerate(lessons_data):
-        if lesson['id'] == current_lesson_id:
-            current_index = i
-            break
-
-    # Get next lesson
-    if current_index is not None and current_index < len(lessons_data) - 1:
-        next_lesson = lessons_data[current_index + 1]
-        return redirect(url_for('lesson_detail', lesson_id=next_lesson['id']))
+    # Get next lesson from the precomputed links
+    next_lesson_id = content_catalog.next_lesson_id(current_lesson_id)
+    if next_lesson_id:
+        return redirect(url_for('lesson_detail', lesson_id=next_lesson_id))
     else:
         # No next lesson, redirect to lessons page
         return redirect(url_for('lessons'))
@@ -924,19 +1036,10 @@ def prev_lesson(current_lesson_id):
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    lessons_data = get_comprehensive_lessons_data()
-
-    # Find current lesson index
-    current_index = None
-    for i, lesson in enumerate(lessons_data):
-        if lesson['id'] == current_lesson_id:
-            current_index = i
-            break
-
-    # Get previous lesson
-    if current_index is not None and current_index > 0:
-        prev_lesson = lessons_data[current_index - 1]
-        return redirect(url_for('lesson_detail', lesson_id=prev_lesson['id']))
+    # Get previous lesson from the precomputed links
+    prev_lesson_id = content_catalog.prev_lesson_id(current_lesson_id)
+    if prev_lesson_id:
+        return redirect(url_for('lesson_detail', lesson_id=prev_lesson_id))
     else:
         # No previous lesson, redirect to lessons page
         return redirect(url_for('lessons'))
@@ -1132,9 +1235,8 @@ def challenges():
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    challenges_data = get_comprehensive_challenges_data()
-    user_data = load_user_data()
-    user = user_data.get(session['user'], {})
+    challenges_data = content_catalog.challenges()
+    user = load_user_profile(session['user'])
     completed_challenges = user.get('completed_challenges', [])
 
     return render_template('challenges.html',
@@ -1146,19 +1248,17 @@ def challenge_detail(challenge_id):
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    challenges_data = get_comprehensive_challenges_data()
-    challenge = next((c for c in challenges_data if c['id'] == challenge_id), None)
+    challenge = content_catalog.get_challenge(challenge_id)
 
     if not challenge:
         return redirect(url_for('challenges'))
 
-    user_data = load_user_data()
-    user = user_data.get(session['user'], {})
+    user = load_user_profile(session['user'])
     completed_challenges = user.get('completed_challenge_ids', [])
     is_completed = challenge_id in completed_challenges
 
-    # Add challenge content
-    challenge['content'] = get_challenge_content(challenge_id)
+    # Add challenge content to a per-request copy of the shared challenge object
+    challenge = dict(challenge, content=content_catalog.challenge_content(challenge_id))
 
     # Add progress tracking
     progress = {
@@ -1239,76 +1339,70 @@ def submit_challenge():
             return jsonify({"success": False, "error": "Challenge ID required"}), 400
 
         # Get challenge data
-        challenges_data = get_comprehensive_challenges_data()
-        challenge = next((c for c in challenges_data if c['id'] == challenge_id), None)
+        challenge = content_catalog.get_challenge(challenge_id)
 
         if not challenge:
             return jsonify({"success": False, "error": "Challenge not found"}), 404
 
         # Get challenge content with test cases
-        content = get_challenge_content(challenge_id)
+        content = content_catalog.challenge_content(challenge_id)
         test_cases = content.get('test_cases', [])
 
-        # Simple code validation (in production, use sandboxed execution)
-        passed_tests = 0
+        # Grade the submission in the sandbox (cached for identical submissions)
+        test_results = execute_test_cases(user_code, test_cases, challenge_id=challenge_id)
+        passed_tests = sum(1 for result in test_results if result['passed'])
         total_tests = len(test_cases)
-        test_results = []
-
-        # Basic validation - check if code contains required function
-        if challenge_id == 'challenge_1' and 'def factorial(' in user_code:
-            passed_tests = total_tests  # Simplified for demo
-        elif challenge_id == 'challenge_2' and 'def is_palindrome(' in user_code:
-            passed_tests = total_tests  # Simplified for demo
 
         success = passed_tests == total_tests
 
-        # Update user progress
-        user_data = load_user_data()
-        user = user_data.get(session['user'], {})
+        points_earned = challenge.get('points', 25)
+        newly_completed = []
 
-        # Track attempts
-        if 'challenge_attempts' not in user:
-            user['challenge_attempts'] = {}
-        user['challenge_attempts'][challenge_id] = user['challenge_attempts'].get(challenge_id, 0) + 1
+        def apply_challenge_attempt(user):
+            # Track attempts
+            if 'challenge_attempts' not in user:
+                user['challenge_attempts'] = {}
+            user['challenge_attempts'][challenge_id] = user['challenge_attempts'].get(challenge_id, 0) + 1
 
-        # If successful, mark as completed
-        if success:
-            if 'completed_challenge_ids' not in user:
-                user['completed_challenge_ids'] = []
+            # If successful, mark as completed
+            if success:
+                if 'completed_challenge_ids' not in user:
+                    user['completed_challenge_ids'] = []
 
-            if challenge_id not in user['completed_challenge_ids']:
-                user['completed_challenge_ids'].append(challenge_id)
+                if challenge_id not in user['completed_challenge_ids']:
+                    user['completed_challenge_ids'].append(challenge_id)
 
-                # Update completion count
-                user['challenges_completed'] = len(user['completed_challenge_ids'])
+                    # Update completion count
+                    user['challenges_completed'] = len(user['completed_challenge_ids'])
 
-                # Award points
-                points_earned = challenge.get('points', 25)
-                user['points'] = user.get('points', 0) + points_earned
+                    # Award points and update level
+                    user['points'] = user.get('points', 0) + points_earned
+                    user['level'] = (user['points'] // 100) + 1
 
-                # Update level
-                user['level'] = (user['points'] // 100) + 1
+                    # Update last activity
+                    user['last_activity'] = datetime.now().isoformat()
+                    newly_completed.append(challenge_id)
 
-                # Update last activity
-                user['last_activity'] = datetime.now().isoformat()
+        # Update user progress (attempt data is saved even if not successful)
+        user = modify_user_profile(session['user'], apply_challenge_attempt)
 
-                # Save user data
-                user_data[session['user']] = user
-                save_user_data(user_data)
+        if user is None:
+            return jsonify({"success": False, "error": "Failed to save progress"}), 500
 
-                return jsonify({
-                    "success": True,
-                    "message": f"Challenge completed! +{points_earned} points",
-                    "points_earned": points_earned,
-                    "total_points": user['points'],
-                    "level": user['level'],
-                    "passed_tests": passed_tests,
-                    "total_tests": total_tests
-                })
+        record_history('record_challenge_submission', session['user'], challenge_id, user_code, success,
+                       score=(passed_tests / total_tests * 100) if total_tests else 0.0,
+                       test_results=test_results)
 
-        # Save attempt data even if not successful
-        user_data[session['user']] = user
-        save_user_data(user_data)
+        if newly_completed:
+            return jsonify({
+                "success": True,
+                "message": f"Challenge completed! +{points_earned} points",
+                "points_earned": points_earned,
+                "total_points": user['points'],
+                "level": user['level'],
+                "passed_tests": passed_tests,
+                "total_tests": total_tests
+            })
 
         return jsonify({
             "success": success,
@@ -1322,6 +1416,42 @@ def submit_challenge():
         print(f"Error submitting challenge: {e}")
         return jsonify({"success": False, "error": "An error occurred"}), 500
 
+def challenge_board_entries(email, user):
+    """Per-challenge leaderboard entries: fewer attempts first, then more points"""
+    attempts = user.get('challenge_attempts', {})
+    points = user.get('points', 0)
+    row = {
+        'name': user.get('name', 'Anonymous'),
+        'points': points,
+        'completion_date': user.get('last_activity', '')
+    }
+    return {
+        challenge_id: ((attempts.get(challenge_id, 1), -points),
+                       dict(row, attempts=attempts.get(challenge_id, 1)))
+        for challenge_id in user.get('completed_challenge_ids', [])
+    }
+
+def xp_board_entry(email, user):
+    """XP leaderboard entry, highest XP first; users without XP are not ranked"""
+    xp = user.get('xp', 0)
+    if xp <= 0:
+        return None
+    return (-xp,), {
+        'name': user.get('name', 'Anonymous'),
+        'xp': xp,
+        'level': calculate_xp_level(xp)
+    }
+
+# Leaderboards updated incrementally on every user store write
+leaderboards = LeaderboardIndex(user_store)
+leaderboards.define('xp', xp_board_entry)
+leaderboards.define_family('challenge', challenge_board_entries)
+
+def leaderboard_response(name, board_key=None):
+    """Top 10 of a board plus the current user's rank and neighbours"""
+    summary = leaderboards.summary(name, get_current_user(), limit=10, radius=2, board_key=board_key)
+    return jsonify(dict(summary, success=True))
+
 @app.route('/api/challenge_leaderboard/<challenge_id>')
 def challenge_leaderboard(challenge_id):
     """Get leaderboard for a specific challenge"""
@@ -1329,27 +1459,7 @@ def challenge_leaderboard(challenge_id):
         return jsonify({"success": False, "error": "Not logged in"}), 401
 
     try:
-        user_data = load_user_data()
-        leaderboard = []
-
-        for email, user in user_data.items():
-            completed_challenges = user.get('completed_challenge_ids', [])
-            if challenge_id in completed_challenges:
-                attempts = user.get('challenge_attempts', {}).get(challenge_id, 1)
-                leaderboard.append({
-                    'name': user.get('name', 'Anonymous'),
-                    'attempts': attempts,
-                    'points': user.get('points', 0),
-                    'completion_date': user.get('last_activity', '')
-                })
-
-        # Sort by attempts (fewer is better), then by points (more is better)
-        leaderboard.sort(key=lambda x: (x['attempts'], -x['points']))
-
-        return jsonify({
-            "success": True,
-            "leaderboard": leaderboard[:10]  # Top 10
-        })
+        return leaderboard_response('challenge', challenge_id)
 
     except Exception as e:
         print(f"Error getting leaderboard: {e}")
@@ -1357,8 +1467,7 @@ def challenge_leaderboard(challenge_id):
 
 def check_and_award_achievements(user_email):
     """Check if user has earned new achievements"""
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
+    user = load_user_profile(user_email)
 
     current_achievements = set(user.get('achievements', []))
     new_achievements = []
@@ -1389,44 +1498,19 @@ def check_and_award_achievements(user_email):
 
     # Update user achievements if new ones were earned
     if new_achievements:
-        user['achievements'] = list(current_achievements)
-        user_data[user_email] = user
-        save_user_data(user_data)
+        def add_achievements(profile):
+            earned = profile.get('achievements', [])
+            profile['achievements'] = earned + [a for a in new_achievements if a not in earned]
+
+        modify_user_profile(user_email, add_achievements)
+        record_history('record_achievements', user_email, new_achievements)
 
     return new_achievements
 
 def update_learning_streak(user_email):
-    """Update user's learning streak"""
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
-
-    today = datetime.now().date()
-    last_activity = user.get('last_activity', '')
-
-    try:
-        last_activity_date = datetime.fromisoformat(last_activity.replace('Z', '+00:00')).date()
-        days_diff = (today - last_activity_date).days
-
-        if days_diff == 0:
-            # Same day, no change to streak
-            pass
-        elif days_diff == 1:
-            # Consecutive day, increment streak
-            user['streak'] = user.get('streak', 0) + 1
-        else:
-            # Streak broken, reset to 1
-            user['streak'] = 1
-
-    except:
-        # Invalid date or first activity, start streak
-        user['streak'] = 1
-
-    # Update last activity
-    user['last_activity'] = datetime.now().isoformat()
-    user_data[user_email] = user
-    save_user_data(user_data)
-
-    return user.get('streak', 1)
+    """Count today towards the user's learning streak; returns the resulting streak"""
+    counters.add(user_email, latest={'last_activity': datetime.now().isoformat()}, touch_streak=True)
+    return load_user_profile(user_email).get('streak', 1)
 
 @app.route('/api/share_code', methods=['POST'])
 def share_code():
@@ -1508,8 +1592,7 @@ def get_shared_codes():
 
 def get_user_name(email):
     """Get user's display name"""
-    user_data = load_user_data()
-    user = user_data.get(email, {})
+    user = load_user_profile(email)
     return user.get('name', 'Anonymous')
 
 def paginate_items(items, page=1, per_page=10):
@@ -1971,14 +2054,65 @@ def get_comprehensive_quizzes_data():
         }
     ]
 
+# Build the content catalog once at startup; admin edits call content_catalog.reload()
+content_catalog.register_builtin(
+    lessons=get_comprehensive_lessons_data,
+    lesson_content=get_lesson_content,
+    quizzes=get_comprehensive_quizzes_data,
+    challenges=get_comprehensive_challenges_data,
+    challenge_content=get_challenge_content
+)
+content_catalog.reload()
+
+# Relational learning history (models.py): lesson completions, quiz attempts,
+# challenge submissions and achievements, imported once from the user profiles
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', 'sqlite:///' + os.path.abspath('data/learning.db'))
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+if HAS_SQLALCHEMY:
+    db.init_app(app)
+    with app.app_context():
+        try:
+            progress_repository.create_schema()
+            if not progress_repository.stats()['user']:
+                progress_repository.import_profiles(user_store.iter_users())
+        except Exception as e:
+            error_handler.handle_error(e, context={"operation": "init_progress_repository"})
+
+def record_history(operation, *args, **kwargs):
+    """Write learning history to SQL; failures are logged, the profile stays authoritative"""
+    if not HAS_SQLALCHEMY:
+        return
+    try:
+        getattr(progress_repository, operation)(*args, **kwargs)
+    except Exception as e:
+        db.session.rollback()
+        error_handler.handle_error(e, context={"operation": operation})
+
+def schedule_concept_review(user_email, user, item_id, score):
+    """Schedule the next spaced repetition review of a lesson or quiz from a 0-1 score"""
+    try:
+        reviews = user.get('spaced_repetition', {}).get(item_id, {}).get('reviews', 0)
+        performance = UserPerformance(
+            item_id=item_id,
+            attempts=reviews + 1,
+            success_rate=score,
+            average_time=0.0,
+            last_attempt=datetime.now(),
+            mastery_level=score
+        )
+        spaced_repetition.schedule_review(user_email, performance, quality=round(score * 5))
+    except Exception as e:
+        error_handler.handle_error(e, context={"operation": "schedule_review", "item_id": item_id})
+
 @app.route('/quizzes')
 def quizzes():
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    quizzes_data = get_comprehensive_quizzes_data()
-    user_data = load_user_data()
-    user = user_data.get(session['user'], {})
+    quizzes_data = content_catalog.quizzes()
+    user = load_user_profile(session['user'])
     completed_quizzes = user.get('completed_quizzes', [])
 
     return render_template('quizzes.html',
@@ -1990,14 +2124,12 @@ def quiz_detail(quiz_id):
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    quizzes_data = get_comprehensive_quizzes_data()
-    quiz = next((q for q in quizzes_data if q['id'] == quiz_id), None)
+    quiz = content_catalog.get_quiz(quiz_id)
 
     if not quiz:
         return redirect(url_for('quizzes'))
 
-    user_data = load_user_data()
-    user = user_data.get(session['user'], {})
+    user = load_user_profile(session['user'])
     completed_quizzes = user.get('completed_quizzes', [])
     is_completed = quiz_id in completed_quizzes
 
@@ -2048,8 +2180,7 @@ def submit_quiz():
 
         # Get quiz data
         try:
-            quizzes_data = get_comprehensive_quizzes_data()
-            quiz = next((q for q in quizzes_data if q['id'] == quiz_id), None)
+            quiz = content_catalog.get_quiz(quiz_id)
         except Exception as e:
             error_handler.handle_error(e, context={"operation": "load_quiz_data", "quiz_id": quiz_id})
             return jsonify({
@@ -2097,9 +2228,29 @@ def submit_quiz():
         percentage = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
         points_earned = int((percentage / 100) * quiz.get('points', 25))
 
-        # Update user progress
-        user_data = load_user_data()
-        user = user_data.get(session['user'], {})
+        def apply_quiz_result(user):
+            if not user:
+                return False
+
+            # Update quiz completion
+            completed_quizzes = user.get('completed_quizzes', [])
+            if quiz_id not in completed_quizzes:
+                completed_quizzes.append(quiz_id)
+                user['completed_quizzes'] = completed_quizzes
+
+            # Update points and stats
+            user['points'] = user.get('points', 0) + points_earned
+            user['quizzes_completed'] = len(completed_quizzes)
+
+        # Update user progress in a single store transaction
+        user = modify_user_profile(session['user'], apply_quiz_result)
+
+        if user is None:
+            error_handler.logger.error(f"Failed to save quiz results for user: {session['user']}")
+            return jsonify({
+                "success": False,
+                "error": "Failed to save quiz results"
+            }), 500
 
         if not user:
             return jsonify({
@@ -2107,40 +2258,18 @@ def submit_quiz():
                 "error": "User data not found"
             }), 404
 
-        # Update quiz completion
-        completed_quizzes = user.get('completed_quizzes', [])
-        if quiz_id not in completed_quizzes:
-            completed_quizzes.append(quiz_id)
-            user['completed_quizzes'] = completed_quizzes
-
-        # Update points and stats
-        user['points'] = user.get('points', 0) + points_earned
-        user['quizzes_completed'] = len(completed_quizzes)
-        user['quizzes_taken'] = user.get('quizzes_taken', 0) + 1
+        # Attempt count, score total (and so the average) and activity go through the counters
+        counters.add(session['user'], {'quizzes_taken': 1, 'total_quiz_score': percentage},
+                     {'last_activity': datetime.now().isoformat()})
 
-        # Update average quiz score
-        total_quiz_score = user.get('total_quiz_score', 0) + percentage
-        user['total_quiz_score'] = total_quiz_score
-        user['average_quiz_score'] = total_quiz_score / user['quizzes_taken']
-
-        # Update last activity
-        user['last_activity'] = datetime.now().isoformat()
+        record_history('record_quiz_attempt', session['user'], quiz_id, correct_answers, total_questions,
+                       answers=user_answers)
+        schedule_concept_review(session['user'], user, quiz_id, percentage / 100)
 
         # Update session activity to prevent timeout
         session['last_activity'] = datetime.now().isoformat()
         session.permanent = True  # Ensure session remains permanent
 
-        # Save updated user data
-        user_data[session['user']] = user
-        save_success = save_user_data(user_data)
-
-        if not save_success:
-            error_handler.logger.error(f"Failed to save quiz results for user: {session['user']}")
-            return jsonify({
-                "success": False,
-                "error": "Failed to save quiz results"
-            }), 500
-
         error_handler.logger.info(f"Quiz completed: {session['user']} scored {percentage:.1f}% on {quiz_id}")
 
         # Determine performance feedback
@@ -2197,7 +2326,7 @@ def code_editor():
 
 @app.route('/api/execute_code', methods=['POST'])
 def execute_code():
-    """Execute Python code safely (simulated for now)"""
+    """Execute Python code in the sandbox pool"""
     if 'user' not in session:
         return jsonify({"success": False, "error": "Not logged in"}), 401
 
@@ -2209,69 +2338,30 @@ def execute_code():
             return jsonify({"success": False, "error": "No code provided"}), 400
 
         # Update user's playground usage
-        user_data = load_user_data()
-        user = user_data.get(session['user'], {})
-        user['playground_uses'] = user.get('playground_uses', 0) + 1
-        user['last_activity'] = datetime.now().isoformat()
-        user_data[session['user']] = user
-        save_user_data(user_data)
+        counters.add(session['user'], {'playground_uses': 1},
+                     {'last_activity': datetime.now().isoformat()})
+
+        is_safe, safety_message = check_code_safety(code)
+        if not is_safe:
+            return jsonify({"success": False, "error": f"Security violation: {safety_message}"}), 400
 
-        # Simulate code execution (in production, use sandboxed execution)
-        output = simulate_python_execution(code)
+        # Run in an isolated sandbox worker with CPU, memory and time limits,
+        # reusing the result of an identical earlier run when there is one
+        result = result_cache.get_or_run(code, lambda: sandbox_pool.run(code))
 
         return jsonify({
-            "success": True,
-            "output": output,
-            "execution_time": "0.05s"
+            "success": result["success"],
+            "output": result["output"],
+            "error": result.get("error"),
+            "traceback": result.get("traceback"),
+            "truncated": result.get("truncated", False),
+            "execution_time": f"{result['execution_time']:.2f}s"
         })
 
     except Exception as e:
         print(f"Error executing code: {e}")
         return jsonify({"success": False, "error": "Execution failed"}), 500
 
-def simulate_python_execution(code):
-    """Simulate Python code execution for demonstration"""
-    import re
-
-    output_lines = []
-
-    # Extract print statements
-    print_pattern = r'print\s*\(\s*([^)]+)\s*\)'
-    print_matches = re.findall(print_pattern, code)
-
-    for match in print_matches:
-        # Basic evaluation of simple expressions
-        try:
-            # Remove quotes if it's a string literal
-            if (match.startswith('"') and match.endswith('"')) or (match.startswith("'") and match.endswith("'")):
-                output_lines.append(match[1:-1])
-            elif match.startswith('f"') or match.startswith("f'"):
-                # Simple f-string handling
-                output_lines.append(match[2:-1])
-            else:
-                # Try to evaluate simple expressions
-                if match.isdigit():
-                    output_lines.append(match)
-                else:
-                    output_lines.append(str(match))
-        except:
-            output_lines.append(str(match))
-
-    # Check for variable assignments and simple operations
-    if 'def ' in code:
-        output_lines.append("Function defined successfully")
-
-    if 'for ' in code or 'while ' in code:
-        output_lines.append("Loop executed")
-
-    if 'if ' in code:
-        output_lines.append("Conditional statement processed")
-
-    if not output_lines:
-        output_lines.append("Code executed successfully (no output)")
-
-    return '\n'.join(output_lines)
-
 @app.route('/analytics')
 def analytics_dashboard():
     """Advanced learning analytics dashboard"""
@@ -2287,8 +2377,7 @@ def analytics_dashboard():
 
 def generate_advanced_analytics(user_email):
     """Generate comprehensive learning analytics"""
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
+    user = load_user_profile(user_email)
 
     # Calculate learning metrics
     total_time_spent = calculate_total_learning_time(user)
@@ -2349,20 +2438,10 @@ def calculate_learning_efficiency(user):
 
 def calculate_skill_progression(user):
     """Calculate progression in different skill areas"""
-    lessons_completed = user.get('completed_lesson_ids', [])
-
-    # Categorize lessons by skill area
-    skill_areas = {
-        'basics': ['lesson_1', 'lesson_2', 'lesson_3', 'lesson_4', 'lesson_5'],
-        'data_structures': ['lesson_6', 'lesson_7', 'lesson_8', 'lesson_9', 'lesson_10'],
-        'control_flow': ['lesson_11', 'lesson_12', 'lesson_13', 'lesson_14', 'lesson_15'],
-        'functions': ['lesson_16', 'lesson_17', 'lesson_18', 'lesson_19', 'lesson_20'],
-        'oop': ['lesson_21', 'lesson_22', 'lesson_23', 'lesson_24', 'lesson_25'],
-        'advanced': ['lesson_26', 'lesson_27', 'lesson_28', 'lesson_29', 'lesson_30']
-    }
+    lessons_completed = set(user.get('completed_lesson_ids', []))
 
     progression = {}
-    for area, lesson_ids in skill_areas.items():
+    for area, lesson_ids in SKILL_AREAS.items():
         completed_in_area = len([lid for lid in lesson_ids if lid in lessons_completed])
         total_in_area = len(lesson_ids)
         progression[area] = {
@@ -2407,8 +2486,7 @@ def get_efficiency_rating(score):
 
 def generate_learning_recommendations(user_email):
     """Generate personalized learning recommendations"""
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
+    user = load_user_profile(user_email)
 
     recommendations = []
 
@@ -2500,15 +2578,7 @@ def calculate_detailed_velocity(user):
 
 def calculate_engagement_score(user):
     """Calculate user engagement score"""
-    factors = [
-        user.get('streak', 0) * 2,  # Streak is important
-        user.get('lessons_completed', 0),
-        user.get('quizzes_completed', 0) * 2,  # Quizzes show engagement
-        user.get('challenges_completed', 0) * 3,  # Challenges show high engagement
-        user.get('playground_uses', 0)
-    ]
-
-    raw_score = sum(factors)
+    raw_score = sum(user.get(field, 0) * weight for field, weight in ENGAGEMENT_WEIGHTS.items())
     normalized_score = min(raw_score / 2, 100)  # Normalize to 0-100
 
     return round(normalized_score, 1)
@@ -2545,14 +2615,12 @@ def skill_tree():
     user_skills = calculate_skill_tree_progress(session['user'])
     daily_challenge = get_daily_challenge()
 
-    return render_template('skill_tree.html',
-                         skills=user_skills,
-                         daily_challenge=daily_challenge)
+    return render_cached_page('skill_tree.html', [user_skills, daily_challenge],
+                              skills=user_skills, daily_challenge=daily_challenge)
 
 def calculate_skill_tree_progress(user_email):
     """Calculate progress in skill tree"""
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
+    user = load_user_profile(user_email)
 
     # Define skill tree structure
     skill_tree = {
@@ -2710,33 +2778,34 @@ def complete_daily_challenge():
         if not challenge_code:
             return jsonify({"success": False, "error": "No code provided"}), 400
 
-        # Award XP for daily challenge
-        user_data = load_user_data()
-        user = user_data.get(session['user'], {})
-
-        # Check if already completed today
         today = datetime.now().date().isoformat()
-        last_daily = user.get('last_daily_challenge', '')
-
-        if last_daily == today:
-            return jsonify({"success": False, "error": "Daily challenge already completed"}), 400
-
-        # Award XP
         daily_challenge = get_daily_challenge()
         xp_earned = daily_challenge['xp_reward']
+        awarded = []
+
+        def apply_daily_challenge(user):
+            # Check if already completed today
+            if user.get('last_daily_challenge', '') == today:
+                return False
+
+            # Award XP for daily challenge
+            user['xp'] = user.get('xp', 0) + xp_earned
+            user['last_daily_challenge'] = today
+            user['daily_challenges_completed'] = user.get('daily_challenges_completed', 0) + 1
+            user['last_activity'] = datetime.now().isoformat()
+            awarded.append(xp_earned)
+
+        user = modify_user_profile(session['user'], apply_daily_challenge)
 
-        user['xp'] = user.get('xp', 0) + xp_earned
-        user['last_daily_challenge'] = today
-        user['daily_challenges_completed'] = user.get('daily_challenges_completed', 0) + 1
-        user['last_activity'] = datetime.now().isoformat()
+        if user is None:
+            return jsonify({"success": False, "error": "Failed to save progress"}), 500
+
+        if not awarded:
+            return jsonify({"success": False, "error": "Daily challenge already completed"}), 400
 
         # Check for new achievements
         new_achievements = check_and_award_achievements(session['user'])
 
-        # Save user data
-        user_data[session['user']] = user
-        save_user_data(user_data)
-
         return jsonify({
             "success": True,
             "xp_earned": xp_earned,
@@ -2754,25 +2823,7 @@ def complete_daily_challenge():
 def xp_leaderboard():
     """Get XP leaderboard"""
     try:
-        user_data = load_user_data()
-        leaderboard = []
-
-        for email, user in user_data.items():
-            xp = user.get('xp', 0)
-            if xp > 0:  # Only include users with XP
-                leaderboard.append({
-                    'name': user.get('name', 'Anonymous'),
-                    'xp': xp,
-                    'level': calculate_xp_level(xp)
-                })
-
-        # Sort by XP (highest first)
-        leaderboard.sort(key=lambda x: x['xp'], reverse=True)
-
-        return jsonify({
-            "success": True,
-            "leaderboard": leaderboard[:10]  # Top 10
-        })
+        return leaderboard_response('xp')
 
     except Exception as e:
         print(f"Error getting XP leaderboard: {e}")
@@ -2846,7 +2897,7 @@ def lesson_editor():
     if 'user' not in session or not is_admin_user(session['user']):
         return redirect(url_for('index'))
 
-    lessons = get_comprehensive_lessons_data()
+    lessons = content_catalog.lessons()
     return render_template('lesson_editor.html', lessons=lessons)
 
 @app.route('/api/admin/save_lesson', methods=['POST'])
@@ -2892,6 +2943,8 @@ def save_lesson():
         with open(lessons_file, 'w') as f:
             json.dump(lessons, f, indent=2)
 
+        content_catalog.reload()
+
         return jsonify({
             "success": True,
             "message": "Lesson saved successfully"
@@ -2907,7 +2960,7 @@ def quiz_builder():
     if 'user' not in session or not is_admin_user(session['user']):
         return redirect(url_for('index'))
 
-    quizzes = get_comprehensive_quizzes_data()
+    quizzes = content_catalog.quizzes()
     return render_template('quiz_builder.html', quizzes=quizzes)
 
 @app.route('/api/admin/save_quiz', methods=['POST'])
@@ -3180,12 +3233,13 @@ def run_tests():
         data = request.get_json()
         code = data.get('code', '').strip()
         test_cases = data.get('test_cases', [])
+        stop_on_failure = bool(data.get('stop_on_failure', False))
 
         if not code:
             return jsonify({"success": False, "error": "No code provided"}), 400
 
         # Run tests
-        test_results = execute_test_cases(code, test_cases)
+        test_results = execute_test_cases(code, test_cases, stop_on_failure)
 
         # Calculate grade
         grade = calculate_automated_grade(test_results)
@@ -3200,59 +3254,60 @@ def run_tests():
         print(f"Error running tests: {e}")
         return jsonify({"success": False, "error": "Test execution failed"}), 500
 
-def execute_test_cases(code, test_cases):
-    """Execute test cases against user code (simplified)"""
-    results = []
-
-    for i, test_case in enumerate(test_cases):
-        result = {
-            'test_id': i + 1,
-            'input': test_case.get('input'),
-            'expected': test_case.get('expected'),
-            'actual': None,
-            'passed': False,
-            'error': None
-        }
-
-        try:
-            # Simulate test execution (in production, use sandboxed environment)
-            if 'def ' in code:
-                # Extract function name (simplified)
-                func_name = extract_function_name(code)
-                if func_name:
-                    # Simulate function call
-                    result['actual'] = simulate_function_call(func_name, test_case.get('input'))
-                    result['passed'] = result['actual'] == test_case.get('expected')
-            else:
-                result['error'] = 'No function found in code'
-
-        except Exception as e:
-            result['error'] = str(e)
+def execute_test_cases(code, test_cases, stop_on_failure=False, challenge_id=''):
+    """Execute all test cases against user code in one sandbox invocation"""
+    results = [{
+        'test_id': i + 1,
+        'input': test_case.get('input'),
+        'expected': test_case.get('expected'),
+        'actual': None,
+        'passed': False,
+        'error': None,
+        'execution_time': 0
+    } for i, test_case in enumerate(test_cases)]
+
+    if not results:
+        return results
+
+    func_name = extract_function_name(code)
+    is_safe, safety_message = check_code_safety(code)
+    if not func_name or not is_safe:
+        error = 'No function found in code' if not func_name else f"Security violation: {safety_message}"
+        for result in results:
+            result['error'] = error
+        return results
+
+    cases = [{'args': get_test_case_args(test_case), 'expected': test_case.get('expected')}
+             for test_case in test_cases]
+    # Identical submissions against the same test suite reuse the cached grading
+    outcome = result_cache.get_or_run(
+        code,
+        lambda: sandbox_pool.run_tests(code, func_name, cases, stop_on_failure=stop_on_failure),
+        challenge_id=challenge_id, version=suite_version([cases, stop_on_failure]), kind='tests'
+    )
 
-        results.append(result)
+    for result, case in zip(results, outcome['cases']):
+        result['actual'] = case['actual']
+        result['passed'] = case['passed']
+        result['error'] = case['error']
+        result['execution_time'] = case['execution_time']
 
     return results
 
+def get_test_case_args(test_case):
+    """Positional arguments for a test case: 'args' list, else 'input' as a single argument"""
+    if 'args' in test_case:
+        return list(test_case['args'])
+    if 'input' in test_case:
+        return [test_case['input']]
+    return []
+
 def extract_function_name(code):
     """Extract function name from code (simplified)"""
     import re
     match = re.search(r'def\s+(\w+)\s*\(', code)
     return match.group(1) if match else None
 
-def simulate_function_call(func_name, input_value):
-    """Simulate function call (simplified)"""
-    # This is a very basic simulation
-    # In production, use proper sandboxed execution
-    if func_name == 'factorial':
-        if input_value == 5:
-            return 120
-        elif input_value == 0:
-            return 1
-        elif input_value == 3:
-            return 6
-
-    return None
-
 def calculate_automated_grade(test_results):
     """Calculate automated grade based on test results"""
     if not test_results:
@@ -3353,23 +3408,61 @@ def progress():
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    user_data = load_user_data()
-    user_profile = user_data.get(session['user'], {})
+    user_profile = load_user_profile(session['user'])
     stats = get_progress_stats(session['user'])
+    stats.update(progress_totals(session['user'], user_profile, stats))
 
     return render_template('progress.html',
                          user=user_profile.get('name', 'User'),
                          stats=stats,
                          profile=user_profile)
 
+def progress_totals(user_email, user_profile, stats):
+    """Completed and total counts per content type; completions come from the SQL history
+    (one aggregate query) when available, otherwise from the profile counters"""
+    summary = None
+    if HAS_SQLALCHEMY:
+        try:
+            summary = progress_repository.progress_summary(user_email)
+        except Exception as e:
+            error_handler.handle_error(e, context={"operation": "progress_summary"})
+    summary = summary or stats
+    return {
+        'completed_lessons': summary['lessons_completed'],
+        'completed_quizzes': summary['quizzes_completed'],
+        'completed_challenges': summary['challenges_completed'],
+        'total_lessons': len(content_catalog.lessons()),
+        'total_quizzes': len(content_catalog.quizzes()),
+        'total_challenges': len(content_catalog.challenges()),
+        'achievements': user_profile.get('achievements', [])
+    }
+
+@app.route('/api/progress/history')
+def progress_history():
+    """Latest lesson completions, quiz attempts and challenge submissions"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Not logged in"}), 401
+    if not HAS_SQLALCHEMY:
+        return jsonify({"success": True, "activity": []})
+
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be a number"}), 400
+    try:
+        activity = progress_repository.recent_activity(session['user'], limit)
+        return jsonify({"success": True, "activity": activity})
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "progress_history"})
+        return jsonify({"success": False, "error": "Failed to load history"}), 500
+
 @app.route('/profile')
 def profile():
     """User profile page"""
     if 'user' not in session:
         return redirect(url_for('index'))
 
-    user_data = load_user_data()
-    user_profile = user_data.get(session['user'], {})
+    user_profile = load_user_profile(session['user'])
     stats = get_progress_stats(session['user'])
 
     # Get recent activity
@@ -3403,20 +3496,17 @@ def update_profile():
             return jsonify({"success": False, "error": "Name is required"}), 400
 
         # Update user data
-        user_data = load_user_data()
-        user = user_data.get(session['user'], {})
-
-        user['name'] = name
-        user['learning_goals'] = learning_goals
-        user['notifications_enabled'] = notifications_enabled
-        user['theme'] = theme
-        user['last_activity'] = datetime.now().isoformat()
+        profile_updates = {
+            'name': name,
+            'learning_goals': learning_goals,
+            'notifications_enabled': notifications_enabled,
+            'theme': theme,
+            'last_activity': datetime.now().isoformat()
+        }
 
-        # Save updated data
-        user_data[session['user']] = user
-        save_success = save_user_data(user_data)
+        user = modify_user_profile(session['user'], lambda user: user.update(profile_updates))
 
-        if not save_success:
+        if user is None:
             return jsonify({"success": False, "error": "Failed to save profile"}), 500
 
         return jsonify({
@@ -3430,8 +3520,7 @@ def update_profile():
 
 def get_recent_activity(user_email):
     """Get recent activity for a user"""
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
+    user = load_user_profile(user_email)
 
     activities = []
 
@@ -3470,8 +3559,7 @@ def get_recent_activity(user_email):
 
 def get_user_achievements(user_email):
     """Get user achievements"""
-    user_data = load_user_data()
-    user = user_data.get(user_email, {})
+    user = load_user_profile(user_email)
 
     achievements = []
 
@@ -3543,13 +3631,12 @@ def dashboard_stats():
     stats = get_progress_stats(session['user'])
 
     # Get detailed progress information
-    lessons_data = get_comprehensive_lessons_data()
-    quizzes_data = get_comprehensive_quizzes_data()
-    challenges_data = get_comprehensive_challenges_data()
+    lessons_data = content_catalog.lessons()
+    quizzes_data = content_catalog.quizzes()
+    challenges_data = content_catalog.challenges()
 
     # Calculate category-wise progress
-    user_data = load_user_data()
-    user = user_data.get(session['user'], {})
+    user = load_user_profile(session['user'])
     completed_lessons = user.get('completed_lessons', [])
     completed_quizzes = user.get('completed_quizzes', [])
     completed_challenges = user.get('completed_challenges', [])
@@ -3643,7 +3730,7 @@ def get_backup_info():
             }), 401
 
         # Get backup information
-        user_data_backups = db_manager.get_backup_info("data/user_progress.json")
+        user_data_backups = db_manager.get_backup_info(user_store.storage_path)
 
         return jsonify({
             "success": True,
@@ -3677,7 +3764,7 @@ def create_manual_backup():
             }), 401
 
         # Create manual backup
-        backup_path = db_manager.create_backup("data/user_progress.json", force=True)
+        backup_path = db_manager.create_store_backup(user_store)
 
         if backup_path:
             return jsonify({
@@ -3712,6 +3799,22 @@ def get_performance_stats():
 
         # Get performance statistics
         stats = performance_monitor()
+        stats["user_store"] = user_store.stats()
+        stats["sandbox"] = sandbox_pool.stats()
+        stats["result_cache"] = result_cache.stats()
+        stats["content_catalog"] = content_catalog.stats()
+        stats["fragment_cache"] = fragment_cache.stats()
+        if HAS_SQLALCHEMY:
+            stats["progress_repository"] = progress_repository.stats()
+        stats["leaderboards"] = leaderboards.stats()
+        stats["rate_limiter"] = rate_limiter.backend.stats()
+        stats["counters"] = counters.stats()
+        stats["job_queue"] = job_queue.stats()
+        if analytics_engine is not None:
+            stats["analytics_engine"] = analytics_engine.stats()
+        stats["social_store"] = social_manager.store.stats()
+        stats["friend_graph"] = social_manager.friend_graph.stats()
+        stats["review_queue"] = review_queue.stats()
 
         return jsonify({
             "success": True,
@@ -3726,6 +3829,57 @@ def get_performance_stats():
             "error": "Failed to get performance statistics"
         }), 500
 
+@app.route('/api/admin/analytics')
+def get_admin_analytics():
+    """Analytics for every user in one batch, with cohort percentiles"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+    if not is_admin_user(session['user']):
+        return jsonify({"success": False, "error": "Admin access required"}), 403
+    if analytics_engine is None:
+        return jsonify({"success": False, "error": "Batch analytics need numpy"}), 503
+
+    try:
+        profiles, performance = cohort_analytics()
+        return jsonify({
+            "success": True,
+            "profiles": profiles,
+            "performance": performance,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "admin_analytics"})
+        return jsonify({
+            "success": False,
+            "error": "Failed to compute analytics"
+        }), 500
+
+@app.route('/api/admin/review-digest')
+def get_review_digest():
+    """Reviews due for every user, for the daily digest"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+    if not is_admin_user(session['user']):
+        return jsonify({"success": False, "error": "Admin access required"}), 403
+
+    try:
+        per_user = request.args.get('per_user', type=int)
+        digest = review_queue.digest(per_user=per_user)
+        return jsonify({
+            "success": True,
+            "digest": digest,
+            "users": len(digest),
+            "timestamp": datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "review_digest"})
+        return jsonify({
+            "success": False,
+            "error": "Failed to build review digest"
+        }), 500
+
 @app.route('/api/admin/cache/clear', methods=['POST'])
 @rate_limit(requests_per_minute=5, requests_per_hour=20)
 def clear_caches():
@@ -3740,6 +3894,8 @@ def clear_caches():
 
         # Clear caches
         cleanup_caches()
+        user_store.invalidate()
+        result_cache.clear()
 
         return jsonify({
             "success": True,
@@ -3753,6 +3909,26 @@ def clear_caches():
             "error": "Failed to clear caches"
         }), 500
 
+@app.route('/api/admin/content/reload', methods=['POST'])
+@rate_limit(requests_per_minute=5, requests_per_hour=20)
+def reload_content():
+    """Rebuild the content catalog after editing lesson, quiz or challenge files"""
+    if 'user' not in session or not is_admin_user(session['user']):
+        return jsonify({"success": False, "error": "Unauthorized"}), 403
+
+    try:
+        return jsonify({
+            "success": True,
+            "catalog": content_catalog.reload()
+        })
+
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "reload_content"})
+        return jsonify({
+            "success": False,
+            "error": "Failed to reload content"
+        }), 500
+
 @app.route('/offline.html')
 def offline_page():
     """Offline page for service worker"""
@@ -3856,8 +4032,96 @@ def optimize_memory_usage():
 
 
 
+def lesson_performances(user):
+    """Performance records for a user's completed lessons"""
+    performances = []
+    for lesson_id in user.get('completed_lesson_ids', []):
+        performances.append(UserPerformance(
+            item_id=lesson_id,
+            attempts=1,  # Simplified
+            success_rate=0.8,  # Simplified
+            average_time=30.0,  # Simplified
+            last_attempt=datetime.now(),
+            mastery_level=0.8  # Simplified
+        ))
+    return performances
+
+def cohort_analytics():
+    """Profile metrics and performance analytics for every stored user, from one store scan"""
+    profiles = dict(user_store.iter_users())
+    # A fresh engine: the shared one only holds users analyzed by this process
+    engine = AnalyticsEngine()
+    for user_email, user in profiles.items():
+        engine.load(user_email, lesson_performances(user))
+    return analytics_engine.profile_metrics(profiles), engine.batch_analytics()
+
+def analytics_version(user):
+    """Fingerprint of the profile fields analytics are computed from"""
+    return fingerprint(sorted(user.get('completed_lesson_ids', [])))
+
+def learning_path_version(user):
+    """Fingerprint of the profile fields learning paths are computed from"""
+    return fingerprint({
+        'goals': user.get('learning_goals', ['general_programming']),
+        'completed': sorted(user.get('completed_lesson_ids', []))
+    })
+
+def compute_user_analytics(user_email, payload):
+    """Background job: learning analytics for a user"""
+    user = user_store.get_user(user_email) or {}
+    return analytics_version(user), learning_analytics.generate_user_analytics(user_email, lesson_performances(user))
+
+def compute_learning_path(user_email, payload):
+    """Background job: full personalized learning path for a user"""
+    user = user_store.get_user(user_email) or {}
+    learning_path = learning_path_generator.generate_learning_path(
+        user_email, user.get('learning_goals', ['general_programming']),
+        lesson_performances(user), LearningStyle.VISUAL  # Default, could be from user preferences
+    )
+    return learning_path_version(user), learning_path
+
+# Analytics and learning paths are computed by background workers when the
+# inputs they depend on change, and served from the job queue's result table
+job_queue.register('analytics', compute_user_analytics)
+job_queue.register('learning_path', compute_learning_path)
+precompute_trigger = PrecomputeTrigger(job_queue, {
+    'analytics': analytics_version,
+    'learning_path': learning_path_version
+})
+user_store.subscribe(precompute_trigger)
+
+def precomputed_result(kind, user_email, version, wait=2.0):
+    """
+    Cached job result for a user plus its freshness
+
+    Queues a recompute when the result is missing or stale. Only a missing
+    result is waited for (up to wait seconds); a stale one is served at once.
+    Returns (result or None, response metadata).
+    """
+    cached = job_queue.get_result(kind, user_email)
+    job = job_queue.job_status(kind, user_email)
+
+    if cached is None or cached['version'] != version:
+        if job is None or job['status'] not in ('queued', 'running'):
+            job = {'id': job_queue.enqueue(kind, user_email)}
+        if cached is None:
+            job_queue.wait(job['id'], wait)
+            cached = job_queue.get_result(kind, user_email)
+        job = job_queue.job_status(kind, user_email)
+
+    meta = {
+        "stale": cached is None or cached['version'] != version,
+        "computed_at": datetime.fromtimestamp(cached['computed_at']).isoformat() if cached else None,
+        "job": {key: job[key] for key in ('id', 'status', 'attempts', 'error')} if job else None
+    }
+    return (cached['result'] if cached else None), meta
+
+def pending_response(meta):
+    """202 response for a result that is still being computed"""
+    return jsonify(dict(meta, success=False, pending=True, error="Still being computed, retry shortly")), 202
+
 @app.route('/api/analytics')
-@rate_limit(requests_per_minute=30, requests_per_hour=200)
+@rate_limit()
 def get_user_analytics():
     """Get learning analytics for current user"""
     try:
@@ -3868,29 +4132,14 @@ def get_user_analytics():
             }), 401
 
         user_email = session['user']
-        user_data = load_user_data()
-        user = user_data.get(user_email, {})
-
-        # Convert user data to performance objects
-        performances = []
-
-        # Create performance data from user progress
-        if 'completed_lesson_ids' in user:
-            for lesson_id in user['completed_lesson_ids']:
-                perf = UserPerformance(
-                    item_id=lesson_id,
-                    attempts=1,  # Simplified
-                    success_rate=0.8,  # Simplified
-                    average_time=30.0,  # Simplified
-                    last_attempt=datetime.now(),
-                    mastery_level=0.8  # Simplified
-                )
-                performances.append(perf)
+        user = load_user_profile(user_email)
 
-        # Generate analytics
-        analytics = learning_analytics.generate_user_analytics(user_email, performances)
+        analytics, meta = precomputed_result('analytics', user_email, analytics_version(user))
+        if analytics is None:
+            return pending_response(meta)
 
-        # Add user-specific data
+        # Add user-specific data (cheap, so always current)
+        analytics = dict(analytics)
         analytics.update({
             "total_points": user.get('points', 0),
             "current_level": user.get('level', 1),
@@ -3901,10 +4150,7 @@ def get_user_analytics():
             "achievements": user.get('achievements', [])
         })
 
-        return jsonify({
-            "success": True,
-            "analytics": analytics
-        })
+        return jsonify(dict(meta, success=True, analytics=analytics))
 
     except Exception as e:
         error_handler.handle_error(e, context={"route": "analytics", "user": session.get('user')})
@@ -3914,7 +4160,7 @@ def get_user_analytics():
         }), 500
 
 @app.route('/api/learning-path')
-@rate_limit(requests_per_minute=10, requests_per_hour=50)
+@rate_limit()
 def get_personalized_learning_path():
     """Get personalized learning path for current user"""
     try:
@@ -3925,39 +4171,16 @@ def get_personalized_learning_path():
             }), 401
 
         user_email = session['user']
-        user_data = load_user_data()
-        user = user_data.get(user_email, {})
-
-        # Get user preferences
-        user_goals = user.get('learning_goals', ['general_programming'])
-        learning_style = LearningStyle.VISUAL  # Default, could be from user preferences
-
-        # Create performance data
-        performances = []
-        completed_lessons = user.get('completed_lesson_ids', [])
-
-        for lesson_id in completed_lessons:
-            perf = UserPerformance(
-                item_id=lesson_id,
-                attempts=1,
-                success_rate=0.8,
-                average_time=30.0,
-                last_attempt=datetime.now(),
-                mastery_level=0.8
-            )
-            performances.append(perf)
-
-        # Generate learning path
-        learning_path = learning_path_generator.generate_learning_path(
-            user_email, user_goals, performances, learning_style
-        )
+        user = load_user_profile(user_email)
+
+        learning_path, meta = precomputed_result('learning_path', user_email, learning_path_version(user))
+        if learning_path is None:
+            return pending_response(meta)
 
         # Get lesson details for the path
-        lessons_data = get_comprehensive_lessons_data()
         path_details = []
-
         for lesson_id in learning_path[:10]:  # Limit to next 10 items
-            lesson = next((l for l in lessons_data if l['id'] == lesson_id), None)
+            lesson = content_catalog.get_lesson(lesson_id)
             if lesson:
                 path_details.append({
                     'id': lesson['id'],
@@ -3968,17 +4191,35 @@ def get_personalized_learning_path():
                     'points': lesson.get('points', 10)
                 })
 
+        return jsonify(dict(meta, success=True, learning_path=path_details, total_items=len(learning_path)))
+
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "learning_path", "user": session.get('user')})
+        return jsonify({
+            "success": False,
+            "error": "Failed to generate learning path"
+        }), 500
+
+@app.route('/api/reviews/due')
+def get_due_reviews():
+    """Get the current user's spaced repetition reviews that are due"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        next_due = review_queue.next_due(session['user'])
         return jsonify({
             "success": True,
-            "learning_path": path_details,
-            "total_items": len(learning_path)
+            "reviews": review_queue.due(session['user'], limit=limit),
+            "next_due": next_due.isoformat() if next_due else None
         })
 
     except Exception as e:
-        error_handler.handle_error(e, context={"route": "learning_path", "user": session.get('user')})
+        error_handler.handle_error(e, context={"route": "due_reviews", "user": session.get('user')})
         return jsonify({
             "success": False,
-            "error": "Failed to generate learning path"
+            "error": "Failed to load reviews"
         }), 500
 
 # Social Learning Routes
@@ -4005,8 +4246,7 @@ def user_profile():
             profile = social_manager.get_user_profile(user_email)
             if not profile:
                 # Create profile if it doesn't exist
-                user_data = load_user_data()
-                user = user_data.get(user_email, {})
+                user = load_user_profile(user_email)
                 profile = social_manager.create_user_profile(
                     user_email,
                     user.get('name', 'Anonymous'),
@@ -4049,13 +4289,32 @@ def get_friends():
         return jsonify({
             "success": True,
             "friends": [friend.__dict__ if hasattr(friend, '__dict__') else friend for friend in friends],
-            "friend_requests": friend_requests
+            "friend_requests": friend_requests,
+            "suggestions": social_manager.suggest_friends(user_email, limit=5)
         })
 
     except Exception as e:
         error_handler.handle_error(e, context={"route": "get_friends", "user": session.get('user')})
         return jsonify({"success": False, "error": "Failed to get friends"}), 500
 
+@app.route('/api/friends/suggestions', methods=['GET'])
+@rate_limit(requests_per_minute=30, requests_per_hour=200)
+def get_friend_suggestions():
+    """Friends of friends ranked by mutual friends"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        return jsonify({
+            "success": True,
+            "suggestions": social_manager.suggest_friends(session['user'], limit=limit)
+        })
+
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "get_friend_suggestions", "user": session.get('user')})
+        return jsonify({"success": False, "error": "Failed to get friend suggestions"}), 500
+
 @app.route('/api/friends/request', methods=['POST'])
 @rate_limit(requests_per_minute=10, requests_per_hour=50)
 def send_friend_request():
@@ -4109,6 +4368,236 @@ def respond_friend_request():
         error_handler.handle_error(e, context={"route": "respond_friend_request", "user": session.get('user')})
         return jsonify({"success": False, "error": "Failed to respond to friend request"}), 500
 
+def feed_tags():
+    """Tags from ?tags=a,b (a post matches any of them)"""
+    return [tag.strip() for tag in request.args.get('tags', '').split(',') if tag.strip()]
+
+@app.route('/api/discussions', methods=['GET'])
+@rate_limit()
+def get_discussions():
+    """One page of community discussions (next page via ?cursor=), or search results for ?q="""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+        query = request.args.get('q', '').strip()
+        if query:
+            posts = social_manager.search_discussions(query, limit=limit)
+            return jsonify({"success": True, "posts": posts, "next_cursor": None})
+
+        page = social_manager.discussion_feed(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            tags=feed_tags(),
+            post_type=request.args.get('type') or None,
+            order=request.args.get('order', 'recent')
+        )
+        return jsonify({"success": True, "posts": page['items'], "next_cursor": page['next_cursor']})
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "get_discussions", "user": session.get('user')})
+        return jsonify({"success": False, "error": "Failed to load discussions"}), 500
+
+@app.route('/api/code-shares', methods=['GET'])
+@rate_limit()
+def get_code_shares():
+    """One page of public code shares (next page via ?cursor=), or search results for ?q="""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+        query = request.args.get('q', '').strip()
+        if query:
+            shares = social_manager.search_code_shares(query, language=request.args.get('language') or None,
+                                                       limit=limit)
+            return jsonify({"success": True, "code_shares": shares, "next_cursor": None})
+
+        page = social_manager.code_share_feed(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            language=request.args.get('language') or None,
+            tags=feed_tags(),
+            order=request.args.get('order', 'top')
+        )
+        return jsonify({"success": True, "code_shares": page['items'], "next_cursor": page['next_cursor']})
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "get_code_shares", "user": session.get('user')})
+        return jsonify({"success": False, "error": "Failed to load code shares"}), 500
+
+# Idle sessions, unanswered mentor requests and their study groups expire on
+# the hub's own ticker, with or without Socket.IO
+collaboration_hub.start_expiry()
+
+# Live coding sessions: created or matched over HTTP, edited over Socket.IO
+@app.route('/collab')
+@app.route('/collab/<session_id>')
+def collab_page(session_id=None):
+    """Live coding page; joins session_id when given"""
+    if 'user' not in session:
+        return redirect(url_for('login'))
+
+    collab_session = collaboration_hub.get_session_data(session_id) if session_id else None
+    if session_id and not (collab_session and collab_session['is_active']):
+        return redirect(url_for('collab_page'))
+    return render_template('collab.html', session_id=session_id, live=HAS_SOCKETIO)
+
+@app.route('/api/collab/sessions', methods=['POST'])
+@rate_limit(requests_per_minute=10, requests_per_hour=60)
+def create_collab_session():
+    """Start a public live coding session; it is offered to partner matching"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+
+    try:
+        data = request.get_json(silent=True) or {}
+        # Sessions are open to anyone with the link; there is no invite list to make them private
+        session_id = collaboration_hub.create_coding_session(session['user'], 'public',
+                                                             data.get('skill_level'))
+        return jsonify({"success": True, "session_id": session_id,
+                        "url": url_for('collab_page', session_id=session_id)})
+
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "create_collab_session", "user": session.get('user')})
+        return jsonify({"success": False, "error": "Failed to create session"}), 500
+
+@app.route('/api/collab/match', methods=['POST'])
+@rate_limit(requests_per_minute=10, requests_per_hour=60)
+def match_collab_partner():
+    """Join the longest-waiting public session at a skill level, or open a new one"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+
+    try:
+        data = request.get_json(silent=True) or {}
+        user_email = session['user']
+        session_id = collaboration_hub.find_coding_partner(user_email, data.get('skill_level', 'beginner'))
+        collaboration_hub.join_session(session_id, user_email)
+        matched = collaboration_hub.get_session_data(session_id)['creator'] != user_email
+        return jsonify({"success": True, "session_id": session_id, "matched": matched,
+                        "url": url_for('collab_page', session_id=session_id)})
+
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "match_collab_partner", "user": session.get('user')})
+        return jsonify({"success": False, "error": "Failed to find a partner"}), 500
+
+@app.route('/api/collab/study-groups', methods=['POST'])
+@rate_limit(requests_per_minute=5, requests_per_hour=30)
+def create_collab_study_group():
+    """Create a study group with its own live coding session"""
+    if 'user' not in session:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+
+    try:
+        data = request.get_json(silent=True) or {}
+        topic = str(data.get('topic', '')).strip()
+        if not topic:
+            return jsonify({"success": False, "error": "Topic required"}), 400
+        max_participants = min(max(int(data.get('max_participants', 5)), 2), 20)
+
+        group_id = collaboration_hub.create_study_group(session['user'], topic, max_participants)
+        session_id = collaboration_hub.study_groups[group_id]['session_id']
+        return jsonify({"success": True, "group_id": group_id, "session_id": session_id,
+                        "url": url_for('collab_page', session_id=session_id)})
+
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "max_participants must be a number"}), 400
+    except Exception as e:
+        error_handler.handle_error(e, context={"route": "create_collab_study_group", "user": session.get('user')})
+        return jsonify({"success": False, "error": "Failed to create study group"}), 500
+
+# Real-time Collaboration (Socket.IO)
+# Clients exchange small OT operations tagged with the revision they were made against;
+# replies go through Socket.IO acknowledgements, everything else is broadcast to the room.
+socketio = SocketIO(app) if HAS_SOCKETIO else None
+CURSOR_FLUSH_INTERVAL = 0.05
+
+def collab_room(session_id):
+    """Socket.IO room for a live coding session"""
+    return f"collab:{session_id}"
+
+if HAS_SOCKETIO:
+    cursor_flusher = None
+
+    def flush_cursor_batches():
+        """Broadcast coalesced cursor moves, at most one batch per session per interval"""
+        while True:
+            socketio.sleep(CURSOR_FLUSH_INTERVAL)
+            try:
+                for session_id, batch in collaboration_hub.pending_cursor_batches().items():
+                    socketio.emit('collab_cursors', dict(batch, session_id=session_id), to=collab_room(session_id))
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "flush_cursor_batches"})
+
+    @socketio.on('connect')
+    def socket_connect():
+        """Accept Socket.IO connections from logged-in users only"""
+        if 'user' not in session:
+            return False
+        emit('connected', {"user": session['user']})
+
+    @socketio.on('collab_join')
+    def collab_join(data):
+        """Join a session; replies with a snapshot plus the operations after it
+        (only the missed operations when since_revision is still in the history)"""
+        global cursor_flusher
+        user_email = session.get('user')
+        data = data or {}
+        session_id = data.get('session_id')
+        if not user_email:
+            return {"success": False, "error": "Authentication required"}
+        if not collaboration_hub.join_session(session_id, user_email):
+            return {"success": False, "error": "Session not found"}
+
+        join_room(collab_room(session_id))
+        if cursor_flusher is None:
+            cursor_flusher = socketio.start_background_task(flush_cursor_batches)
+        return dict(collaboration_hub.sync_session(session_id, data.get('since_revision')), success=True)
+
+    @socketio.on('collab_leave')
+    def collab_leave(data):
+        """Leave a session"""
+        session_id = (data or {}).get('session_id')
+        leave_room(collab_room(session_id))
+        collaboration_hub.leave_session(session_id, session.get('user'))
+        return {"success": True}
+
+    @socketio.on('collab_op')
+    def collab_op(data):
+        """Apply an edit; the sender gets the new revision, the room gets the transformed edit"""
+        data = data or {}
+        session_id = data.get('session_id')
+        try:
+            applied = collaboration_hub.apply_operation(session_id, session.get('user'),
+                                                        int(data.get('revision', -1)), data.get('operation'))
+        except StaleRevisionError as e:
+            return {"success": False, "error": str(e), "resync": True}
+        except (OperationError, TypeError, ValueError) as e:
+            return {"success": False, "error": str(e)}
+        if applied is None:
+            return {"success": False, "error": "Not a participant of this session"}
+
+        emit('collab_op', dict(applied, session_id=session_id), to=collab_room(session_id), include_self=False)
+        return {"success": True, "revision": applied['revision']}
+
+    @socketio.on('collab_cursor')
+    def collab_cursor(data):
+        """Record a cursor move; it goes out with the next cursor batch"""
+        data = data or {}
+        try:
+            collaboration_hub.update_cursor(data.get('session_id'), session.get('user'),
+                                            int(data.get('revision', -1)), int(data.get('position', 0)),
+                                            data.get('selection_end'))
+        except (StaleRevisionError, TypeError, ValueError):
+            # A newer cursor position will follow once the client has caught up
+            pass
+
 if __name__ == '__main__':
     print("🚀 Starting Python Learning Platform...")
     print("📍 Visit: http://localhost:5000")
@@ -4116,11 +4605,25 @@ if __name__ == '__main__':
     print(f"📊 Error handling and logging active")
     print(f"🧠 Memory monitoring enabled")
 
+    # Import legacy user data on first start
+    migrate_legacy_users()
+
     # Start memory monitoring
     memory_monitor.start_monitoring()
 
+    # Warm up the code execution sandbox
+    sandbox_pool.start()
+
     try:
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        if HAS_SOCKETIO:
+            socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+        else:
+            app.run(debug=True, host='0.0.0.0', port=5000)
     finally:
         # Stop memory monitoring on shutdown
         memory_monitor.stop_monitoring()
+        sandbox_pool.shutdown()
+        collaboration_hub.stop_expiry()
+        counters.flush()
+        precompute_trigger.shutdown()
+        job_queue.shutdown()
@@ -4,11 +4,67 @@
 Revolutionary features for collaborative learning and coding
 """
 
+import heapq
 import json
+import threading
 import time
 import uuid
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from core.collab_sync import CollabDocument, CursorBatcher
+from core.error_handler import error_handler
+from core.search_index import SearchIndex
+from core.timer_wheel import TimerWheel
+
+SESSION_IDLE_TIMEOUT = 2 * 60 * 60
+MENTOR_REQUEST_TIMEOUT = 30 * 60
+EXPIRY_INTERVAL = 1.0
+
+class MatchmakingIndex:
+    """Public sessions waiting for a partner, bucketed by skill level, oldest first"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # skill level (None: any level) -> {session_id: creator}, in insertion order
+        self._waiting: Dict[Optional[str], Dict[str, str]] = {}
+        self._levels: Dict[str, Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    def add(self, session_id: str, creator_id: str, skill_level: str = None):
+        """Offer a session to partners of a skill level"""
+        with self._lock:
+            self._remove(session_id)
+            self._waiting.setdefault(skill_level, {})[session_id] = creator_id
+            self._levels[session_id] = skill_level
+
+    def remove(self, session_id: str):
+        """Stop offering a session"""
+        with self._lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id: str):
+        if session_id in self._levels:
+            bucket = self._waiting[self._levels.pop(session_id)]
+            del bucket[session_id]
+
+    def take(self, user_id: str, skill_level: str = None) -> Optional[str]:
+        """Claim the longest-waiting session at the user's level (then one open to any level)"""
+        with self._lock:
+            for level in dict.fromkeys((skill_level, None)):
+                # Only the user's own waiting sessions are skipped
+                for session_id, creator_id in self._waiting.get(level, {}).items():
+                    if creator_id != user_id:
+                        self._remove(session_id)
+                        return session_id
+            return None
+
+    def stats(self) -> Dict[Optional[str], int]:
+        """Waiting sessions per skill level"""
+        with self._lock:
+            return {level: len(bucket) for level, bucket in self._waiting.items() if bucket}
 
 class CollaborationHub:
     """
@@ -29,8 +85,17 @@ class CollaborationHub:
         self.code_rooms = {}
         self.mentors_online = {}
         self.study_groups = {}
+        # session_id -> live document; session['code'] is refreshed from it on read
+        self.documents: Dict[str, CollabDocument] = {}
+        self.cursor_batcher = CursorBatcher()
+        # Expiry of idle sessions ('session', id) and unanswered mentor requests ('mentor_request', id)
+        self.timers = TimerWheel()
+        self.matchmaking = MatchmakingIndex()
+        self._expiry_stop = threading.Event()
+        self._expiry_thread = None
         
-    def create_coding_session(self, creator_id: str, session_type: str = "public") -> str:
+    def create_coding_session(self, creator_id: str, session_type: str = "public",
+                              skill_level: str = None) -> str:
         """Create a new collaborative coding session"""
         session_id = str(uuid.uuid4())[:8]
         
@@ -44,40 +109,112 @@ class CollaborationHub:
             'created_at': datetime.now().isoformat(),
             'last_activity': datetime.now().isoformat(),
             'cursor_positions': {},
+            'skill_level': skill_level,
             'is_active': True
         }
+        self.documents[session_id] = CollabDocument(self.active_sessions[session_id]['code'])
+        self.timers.schedule(('session', session_id), SESSION_IDLE_TIMEOUT)
+        if session_type == 'public':
+            self.matchmaking.add(session_id, creator_id, skill_level)
         
         return session_id
     
+    def _live_session(self, session_id: str) -> Optional[Dict]:
+        """The session if it exists and has not expired"""
+        session = self.active_sessions.get(session_id)
+        return session if session and session['is_active'] else None
+    
     def join_session(self, session_id: str, user_id: str) -> bool:
         """Join an existing coding session"""
-        if session_id not in self.active_sessions:
+        session = self._live_session(session_id)
+        if not session:
             return False
         
-        session = self.active_sessions[session_id]
         if user_id not in session['participants']:
             session['participants'].append(user_id)
-            session['last_activity'] = datetime.now().isoformat()
+            self._mark_active(session_id)
+            if len(session['participants']) > 1:
+                self.matchmaking.remove(session_id)
             
             # Add welcome message
             self.add_chat_message(session_id, 'system', f"🎉 {user_id} joined the session!")
         
         return True
     
-    def update_code(self, session_id: str, user_id: str, code: str, cursor_pos: int = 0):
-        """Update code in real-time"""
-        if session_id not in self.active_sessions:
+    def leave_session(self, session_id: str, user_id: str) -> bool:
+        """Leave a coding session"""
+        session = self._live_session(session_id)
+        if not session or user_id not in session['participants']:
             return False
         
-        session = self.active_sessions[session_id]
-        if user_id in session['participants']:
-            session['code'] = code
-            session['cursor_positions'][user_id] = cursor_pos
-            session['last_activity'] = datetime.now().isoformat()
+        session['participants'].remove(user_id)
+        self.documents[session_id].remove_cursor(user_id)
+        self.cursor_batcher.touch(session_id, user_id)
+        self._mark_active(session_id)
+        if session['type'] == 'public' and len(session['participants']) == 1:
+            # Back to waiting for a partner
+            self.matchmaking.add(session_id, session['participants'][0], session.get('skill_level'))
+        elif not session['participants']:
+            self.matchmaking.remove(session_id)
+        return True
+    
+    def _mark_active(self, session_id: str):
+        """Record activity, pushing back the session's idle expiry"""
+        self.active_sessions[session_id]['last_activity'] = datetime.now().isoformat()
+        self.timers.touch(('session', session_id), SESSION_IDLE_TIMEOUT)
+    
+    def update_code(self, session_id: str, user_id: str, code: str, cursor_pos: int = 0):
+        """Update code in real-time (whole-text clients; sent on as the changed span only)"""
+        session = self._live_session(session_id)
+        if session and user_id in session['participants']:
+            document = self.documents[session_id]
+            revision, _ = document.replace(user_id, code)
+            document.set_cursor(user_id, revision, cursor_pos)
+            self.cursor_batcher.touch(session_id, user_id)
+            self._mark_active(session_id)
             return True
         
         return False
     
+    def apply_operation(self, session_id: str, user_id: str, revision: int,
+                        operation: List) -> Optional[Dict[str, Any]]:
+        """Apply a participant's edit made against revision; returns the new revision and
+        the transformed operation to broadcast, or None if the user is not in the session"""
+        session = self._live_session(session_id)
+        if not session or user_id not in session['participants']:
+            return None
+        
+        revision, operation = self.documents[session_id].receive(user_id, revision, operation)
+        self._mark_active(session_id)
+        return {'revision': revision, 'operation': operation, 'user': user_id}
+    
+    def update_cursor(self, session_id: str, user_id: str, revision: int,
+                      position: int, selection_end: int = None) -> bool:
+        """Record a participant's cursor; it is broadcast with the next cursor batch"""
+        session = self._live_session(session_id)
+        if not session or user_id not in session['participants']:
+            return False
+        
+        self.documents[session_id].set_cursor(user_id, revision, position, selection_end)
+        self.cursor_batcher.touch(session_id, user_id)
+        return True
+    
+    def sync_session(self, session_id: str, since_revision: int = None) -> Optional[Dict[str, Any]]:
+        """Snapshot-plus-tail state for a joining client (just the tail when it can catch up)"""
+        document = self.documents.get(session_id)
+        return document.sync(since_revision) if document else None
+    
+    def pending_cursor_batches(self) -> Dict[str, Dict[str, Any]]:
+        """Cursor moves since the last call, one batch per session"""
+        batches = {}
+        for session_id, users in self.cursor_batcher.drain().items():
+            document = self.documents.get(session_id)
+            if document:
+                # None tells clients the user left
+                cursors = {user: document.cursors.get(user) for user in users}
+                batches[session_id] = {'revision': document.revision, 'cursors': cursors}
+        return batches
+    
     def add_chat_message(self, session_id: str, user_id: str, message: str):
         """Add chat message to session"""
         if session_id not in self.active_sessions:
@@ -99,19 +236,23 @@ class CollaborationHub:
     
     def get_session_data(self, session_id: str) -> Optional[Dict]:
         """Get complete session data"""
-        return self.active_sessions.get(session_id)
+        session = self.active_sessions.get(session_id)
+        document = self.documents.get(session_id)
+        if document:
+            session['code'] = document.text()
+            session['revision'] = document.revision
+            session['cursor_positions'] = {user: cursor['position'] for user, cursor in document.cursors.items()}
+        return session
     
     def find_coding_partner(self, user_id: str, skill_level: str = "beginner") -> Optional[str]:
         """Find a coding partner for pair programming"""
-        # Look for public sessions with similar skill level
-        for session_id, session in self.active_sessions.items():
-            if (session['type'] == 'public' and 
-                len(session['participants']) == 1 and 
-                session['participants'][0] != user_id):
-                return session_id
+        # Longest-waiting public session at the same skill level (or open to any level)
+        session_id = self.matchmaking.take(user_id, skill_level)
+        if session_id:
+            return session_id
         
         # Create new session if no match found
-        return self.create_coding_session(user_id, "public")
+        return self.create_coding_session(user_id, "public", skill_level)
     
     def request_mentor_help(self, user_id: str, topic: str, code: str = "") -> str:
         """Request help from available mentors"""
@@ -127,6 +268,7 @@ class CollaborationHub:
             'status': 'waiting',
             'requested_at': datetime.now().isoformat()
         }
+        self.timers.schedule(('mentor_request', session_id), MENTOR_REQUEST_TIMEOUT)
         
         # Notify available mentors (in real implementation, this would use WebSocket)
         self.notify_mentors(mentor_request_id, topic, user_id)
@@ -141,6 +283,8 @@ class CollaborationHub:
     def create_study_group(self, creator_id: str, topic: str, max_participants: int = 5) -> str:
         """Create a study group session"""
         group_id = str(uuid.uuid4())[:8]
+        session_id = self.create_coding_session(creator_id, "study_group")
+        self.active_sessions[session_id]['study_group_id'] = group_id
         
         self.study_groups[group_id] = {
             'id': group_id,
@@ -149,7 +293,7 @@ class CollaborationHub:
             'participants': [creator_id],
             'max_participants': max_participants,
             'created_at': datetime.now().isoformat(),
-            'session_id': self.create_coding_session(creator_id, "study_group"),
+            'session_id': session_id,
             'study_materials': [],
             'shared_notes': "",
             'is_active': True
@@ -221,6 +365,7 @@ class CollaborationHub:
             'total_participants': total_participants,
             'mentors_online': len(self.mentors_online),
             'study_groups': len(self.study_groups),
+            'waiting_for_partner': len(self.matchmaking),
             'recent_activity': self.get_recent_activity()
         }
     
@@ -243,16 +388,59 @@ class CollaborationHub:
     
     def cleanup_inactive_sessions(self):
         """Clean up inactive sessions"""
-        cutoff_time = datetime.now() - timedelta(hours=2)
-        
-        inactive_sessions = []
-        for session_id, session in self.active_sessions.items():
-            last_activity = datetime.fromisoformat(session['last_activity'])
-            if last_activity < cutoff_time:
-                inactive_sessions.append(session_id)
-        
-        for session_id in inactive_sessions:
-            self.active_sessions[session_id]['is_active'] = False
+        return self.expire_idle()
+    
+    def expire_idle(self, now: float = None) -> Dict[str, int]:
+        """Expire sessions idle for SESSION_IDLE_TIMEOUT and mentor requests unanswered for
+        MENTOR_REQUEST_TIMEOUT; cost depends on what expired, not on how many sessions exist"""
+        expired = {'sessions': 0, 'mentor_requests': 0}
+        for kind, session_id in self.timers.advance(now):
+            session = self.active_sessions.get(session_id)
+            if not session:
+                continue
+            request = session.get('mentor_request')
+            if kind == 'session':
+                session['is_active'] = False
+                # Keep the final code with the session record; the live document goes
+                document = self.documents.pop(session_id, None)
+                if document:
+                    session['code'] = document.text()
+                    session['revision'] = document.revision
+                session['cursor_positions'] = {}
+                self.cursor_batcher.discard(session_id)
+                self.matchmaking.remove(session_id)
+                self.timers.cancel(('mentor_request', session_id))
+                group = self.study_groups.get(session.get('study_group_id'))
+                if group:
+                    group['is_active'] = False
+                expired['sessions'] += 1
+            if request and request['status'] == 'waiting':
+                request['status'] = 'expired'
+                expired['mentor_requests'] += 1
+        return expired
+
+    def start_expiry(self, interval: float = EXPIRY_INTERVAL):
+        """Run expire_idle every interval seconds in a background thread"""
+        if self._expiry_thread is not None:
+            return
+        self._expiry_stop.clear()
+        self._expiry_thread = threading.Thread(target=self._expiry_loop, args=(interval,),
+                                               name="collab-expiry", daemon=True)
+        self._expiry_thread.start()
+
+    def stop_expiry(self):
+        """Stop the expiry thread"""
+        self._expiry_stop.set()
+        if self._expiry_thread:
+            self._expiry_thread.join(timeout=5)
+        self._expiry_thread = None
+
+    def _expiry_loop(self, interval: float):
+        while not self._expiry_stop.wait(interval):
+            try:
+                self.expire_idle()
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "expire_collaboration"})
 
 class CodeSharingPlatform:
     """
@@ -263,6 +451,9 @@ class CodeSharingPlatform:
         self.snippets = {}
         self.user_profiles = {}
         self.trending_snippets = []
+        # Public snippets by text, ranked with BM25
+        self.search_index = SearchIndex({'title': 3.0, 'tags': 2.0, 'description': 2.0, 'code': 1.0})
+        self.snippets_by_tag = {}
     
     def publish_snippet(self, user_id: str, code: str, title: str, 
                        description: str = "", tags: List[str] = None) -> str:
@@ -285,9 +476,39 @@ class CodeSharingPlatform:
             'is_public': True,
             'difficulty': self.analyze_code_difficulty(code)
         }
+        self.index_snippet(self.snippets[snippet_id])
         
         return snippet_id
     
+    def fork_snippet(self, snippet_id: str, user_id: str) -> Optional[str]:
+        """Publish a copy of a snippet under another user"""
+        original = self.snippets.get(snippet_id)
+        if not original:
+            return None
+        
+        fork_id = self.publish_snippet(user_id, original['code'], original['title'],
+                                       original['description'], list(original['tags']))
+        self.snippets[fork_id]['forked_from'] = snippet_id
+        original['forks'] += 1
+        return fork_id
+    
+    def index_snippet(self, snippet: Dict):
+        """Add or refresh a snippet in the search indexes (private snippets are removed)"""
+        self.unindex_snippet(snippet['id'])
+        if not snippet['is_public']:
+            return
+        self.search_index.add(snippet['id'], snippet)
+        for tag in snippet['tags']:
+            self.snippets_by_tag.setdefault(tag, set()).add(snippet['id'])
+    
+    def unindex_snippet(self, snippet_id: str):
+        """Remove a snippet from the search indexes"""
+        self.search_index.remove(snippet_id)
+        for tag in self.snippets.get(snippet_id, {}).get('tags', []):
+            tagged = self.snippets_by_tag.get(tag)
+            if tagged:
+                tagged.discard(snippet_id)
+    
     def analyze_code_difficulty(self, code: str) -> str:
         """Analyze code complexity to determine difficulty"""
         lines = len(code.split('\n'))
@@ -301,39 +522,36 @@ class CodeSharingPlatform:
             return 'beginner'
     
     def search_snippets(self, query: str, tags: List[str] = None, 
-                       difficulty: str = None) -> List[Dict]:
+                       difficulty: str = None, limit: int = 20) -> List[Dict]:
         """Search for code snippets"""
-        results = []
+        def accept(snippet_id):
+            return not difficulty or self.snippets[snippet_id]['difficulty'] == difficulty
         
-        for snippet in self.snippets.values():
-            if not snippet['is_public']:
-                continue
-            
-            # Text search
-            if query.lower() in snippet['title'].lower() or query.lower() in snippet['description'].lower():
-                score = 1
-            elif query.lower() in snippet['code'].lower():
-                score = 0.5
-            else:
-                score = 0
-            
-            # Tag matching
-            if tags:
-                tag_matches = len(set(tags) & set(snippet['tags']))
-                score += tag_matches * 0.3
-            
-            # Difficulty filter
-            if difficulty and snippet['difficulty'] != difficulty:
-                continue
-            
-            if score > 0:
-                snippet_copy = snippet.copy()
-                snippet_copy['relevance_score'] = score
-                results.append(snippet_copy)
+        # Text relevance from the index (title, tags and description weigh more than code)
+        scores = dict(self.search_index.search(query, limit=limit * 2, accept=accept))
+        
+        # Tag matching
+        for tag in set(tags or []):
+            for snippet_id in self.snippets_by_tag.get(tag, ()):
+                if accept(snippet_id):
+                    scores[snippet_id] = scores.get(snippet_id, 0) + 0.3
+        
+        if not scores and not query.strip() and not tags:
+            # Browsing without a query: most liked public snippets
+            return [snippet.copy() for snippet in heapq.nlargest(
+                limit, (snippet for snippet in self.snippets.values()
+                        if snippet['is_public'] and accept(snippet['id'])),
+                key=lambda snippet: snippet['likes'])]
         
         # Sort by relevance and popularity
-        results.sort(key=lambda x: (x['relevance_score'], x['likes']), reverse=True)
-        return results[:20]
+        ranked = heapq.nlargest(limit, scores.items(),
+                                key=lambda item: (item[1], self.snippets[item[0]]['likes']))
+        results = []
+        for snippet_id, score in ranked:
+            snippet_copy = self.snippets[snippet_id].copy()
+            snippet_copy['relevance_score'] = score
+            results.append(snippet_copy)
+        return results
 
 # Global collaboration instances
 collaboration_hub = CollaborationHub()
@@ -4,14 +4,19 @@ Adaptive Learning System
 Implements personalized learning paths, difficulty adjustment, and spaced repetition
 """
 
+import heapq
 import math
 import random
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
 from .error_handler import error_handler
+from .analytics_engine import analytics_engine
+from .review_queue import review_queue
 
 class DifficultyLevel(Enum):
     """Difficulty levels for adaptive learning"""
@@ -117,7 +122,9 @@ class AdaptiveDifficultyEngine:
 class SpacedRepetitionEngine:
     """Implements spaced repetition algorithm for optimal review timing"""
     
-    def __init__(self):
+    def __init__(self, due_queue=None):
+        # Persistent per-user due-queue the next review dates are recorded in
+        self.due_queue = due_queue
         self.initial_interval = 1  # days
         self.ease_factor = 2.5
         self.min_ease_factor = 1.3
@@ -149,6 +156,19 @@ class SpacedRepetitionEngine:
         
         return datetime.now() + timedelta(days=interval)
     
+    def schedule_review(self, user_id: str, performance: UserPerformance, quality: int) -> datetime:
+        """Calculate an item's next review and record it in the due-queue"""
+        next_review = self.calculate_next_review(performance, quality)
+        if self.due_queue is not None:
+            self.due_queue.schedule(user_id, performance.item_id, next_review, performance.mastery_level)
+        return next_review
+
+    def due_reviews(self, user_id: str, limit: int = None) -> List[Dict[str, Any]]:
+        """Items due for review now, highest priority first"""
+        if self.due_queue is None:
+            return []
+        return self.due_queue.due(user_id, limit=limit)
+
     def _get_previous_interval(self, performance: UserPerformance) -> float:
         """Get the previous review interval"""
         # Simplified - in practice, this would be stored
@@ -160,156 +180,263 @@ class SpacedRepetitionEngine:
         new_ease = self.ease_factor + ease_adjustment
         return max(self.min_ease_factor, min(self.max_ease_factor, new_ease))
 
+class PrerequisiteGraph:
+    """
+    Compiled prerequisite DAG over a set of learning items
+
+    Items are numbered once; each keeps its direct prerequisites and
+    dependents as index lists and its transitive prerequisites as a bitset
+    (an int with bit n set for item n). Prerequisites that are not
+    registered items are kept per item as external requirements.
+    Items on a prerequisite cycle can never be unlocked.
+    """
+
+    def __init__(self, items: Dict[str, LearningItem]):
+        self.ids = list(items)
+        self.position = {item_id: n for n, item_id in enumerate(self.ids)}
+        self.items = [items[item_id] for item_id in self.ids]
+        self.prerequisites = [sorted({self.position[p] for p in item.prerequisites if p in self.position})
+                              for item in self.items]
+        self.external = [[p for p in item.prerequisites if p not in self.position] for item in self.items]
+        self.dependents = [[] for _ in self.ids]
+        for n, prereqs in enumerate(self.prerequisites):
+            for p in prereqs:
+                self.dependents[p].append(n)
+
+        # Kahn's algorithm gives a topological order; what it never reaches is cyclic
+        indegree = [len(prereqs) for prereqs in self.prerequisites]
+        order = [n for n, count in enumerate(indegree) if count == 0]
+        for n in order:
+            for d in self.dependents[n]:
+                indegree[d] -= 1
+                if indegree[d] == 0:
+                    order.append(d)
+        self.order = order
+        self.cyclic = {self.ids[n] for n, count in enumerate(indegree) if count > 0}
+
+        self.closures = [0] * len(self.ids)
+        for n in order:
+            mask = 0
+            for p in self.prerequisites[n]:
+                mask |= self.closures[p] | (1 << p)
+            self.closures[n] = mask
+
+    def mask(self, item_ids) -> int:
+        """Bitset of the registered items among item_ids"""
+        mask = 0
+        for item_id in item_ids:
+            n = self.position.get(item_id)
+            if n is not None:
+                mask |= 1 << n
+        return mask
+
+    def ids_of(self, mask: int) -> List[str]:
+        """Item ids of a bitset, in registration order"""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self.ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def all_prerequisites(self, item_id: str) -> List[str]:
+        """Transitive prerequisites of an item"""
+        return self.ids_of(self.closures[self.position[item_id]])
+
+    def missing_prerequisites(self, item_id: str, completed: set) -> List[str]:
+        """Transitive prerequisites of an item that are not completed yet"""
+        return self.ids_of(self.closures[self.position[item_id]] & ~self.mask(completed))
+
+class LearningPlan:
+    """
+    One user's position in a prerequisite graph
+
+    Tracks how many prerequisites of each item are still incomplete and a
+    heap of unlocked items ordered by priority, so completing an item only
+    touches its dependents.
+    """
+
+    def __init__(self, graph: PrerequisiteGraph, completed: set, priority: List[Tuple]):
+        self.graph = graph
+        self.priority = priority
+        self.completed = set(completed)
+        self._done = [item_id in self.completed for item_id in graph.ids]
+        self._waiting = [
+            sum(1 for p in prereqs if not self._done[p]) +
+            sum(1 for external in graph.external[n] if external not in self.completed)
+            for n, prereqs in enumerate(graph.prerequisites)
+        ]
+        self._available = [(priority[n], n) for n in range(len(graph.ids))
+                           if not self._done[n] and self._waiting[n] == 0]
+        heapq.heapify(self._available)
+
+    def complete(self, item_id: str) -> List[str]:
+        """Mark an item completed; returns the items it unlocked"""
+        self.completed.add(item_id)
+        n = self.graph.position.get(item_id)
+        if n is None or self._done[n]:
+            return []
+        self._done[n] = True
+
+        unlocked = []
+        for d in self.graph.dependents[n]:
+            self._waiting[d] -= 1
+            if self._waiting[d] == 0 and not self._done[d]:
+                heapq.heappush(self._available, (self.priority[d], d))
+                unlocked.append(self.graph.ids[d])
+        return unlocked
+
+    def available(self) -> List[str]:
+        """Unlocked, uncompleted items, best first"""
+        return [self.graph.ids[n] for _, n in sorted(self._available) if not self._done[n]]
+
+    def sequence(self, limit: int = None) -> List[str]:
+        """Remaining items in prerequisite order, always taking the best unlocked item next"""
+        waiting = list(self._waiting)
+        heap = [entry for entry in self._available if not self._done[entry[1]]]
+        heapq.heapify(heap)
+        sequence = []
+
+        while heap and (limit is None or len(sequence) < limit):
+            _, n = heapq.heappop(heap)
+            sequence.append(self.graph.ids[n])
+            for d in self.graph.dependents[n]:
+                waiting[d] -= 1
+                if waiting[d] == 0 and not self._done[d]:
+                    heapq.heappush(heap, (self.priority[d], d))
+
+        return sequence
+
 class PersonalizedLearningPath:
     """Creates personalized learning paths for users"""
-    
-    def __init__(self):
+
+    def __init__(self, max_cached_plans: int = 1024):
         self.learning_items = {}
         self.prerequisite_graph = {}
-        
+        self.max_cached_plans = max_cached_plans
+        self._graph: Optional[PrerequisiteGraph] = None
+        self._plans: "OrderedDict[str, Tuple[Any, LearningPlan]]" = OrderedDict()
+        self._lock = threading.RLock()
+
     def add_learning_item(self, item: LearningItem):
         """Add a learning item to the system"""
-        self.learning_items[item.id] = item
-        self._update_prerequisite_graph(item)
-    
+        with self._lock:
+            self._update_prerequisite_graph(item)
+            self.learning_items[item.id] = item
+            # Recompiled on the next path request
+            self._graph = None
+            self._plans.clear()
+
     def _update_prerequisite_graph(self, item: LearningItem):
         """Update the prerequisite dependency graph"""
-        if item.id not in self.prerequisite_graph:
-            self.prerequisite_graph[item.id] = {
-                'prerequisites': item.prerequisites,
-                'dependents': []
-            }
-        
-        # Update dependents for prerequisites
+        previous = self.learning_items.get(item.id)
+        if previous is not None:
+            for prereq_id in previous.prerequisites:
+                dependents = self.prerequisite_graph[prereq_id]['dependents']
+                if item.id in dependents:
+                    dependents.remove(item.id)
+
+        # Entries for prerequisites not registered yet are created now so
+        # their dependents are not lost
+        entry = self.prerequisite_graph.setdefault(item.id, {'prerequisites': [], 'dependents': []})
+        entry['prerequisites'] = list(item.prerequisites)
         for prereq_id in item.prerequisites:
-            if prereq_id in self.prerequisite_graph:
-                self.prerequisite_graph[prereq_id]['dependents'].append(item.id)
-    
+            self.prerequisite_graph.setdefault(prereq_id, {'prerequisites': [], 'dependents': []})
+            self.prerequisite_graph[prereq_id]['dependents'].append(item.id)
+
+    def compiled_graph(self) -> PrerequisiteGraph:
+        """Compiled prerequisite graph of the registered items"""
+        with self._lock:
+            if self._graph is None:
+                self._graph = PrerequisiteGraph(self.learning_items)
+            return self._graph
+
     def generate_learning_path(self, user_id: str, user_goals: List[str], 
                              user_performances: List[UserPerformance],
                              learning_style: LearningStyle) -> List[str]:
         """Generate personalized learning path"""
         # Get user's current skill level
         skill_level = self._calculate_overall_skill_level(user_performances)
-        
+
         # Find completed items
         completed_items = {perf.item_id for perf in user_performances 
                           if perf.mastery_level >= 0.8}
-        
-        # Find available items (prerequisites met)
-        available_items = self._get_available_items(completed_items)
-        
-        # Filter by learning style preference
-        style_filtered = self._filter_by_learning_style(available_items, learning_style)
-        
-        # Sort by relevance to goals and difficulty
-        sorted_items = self._sort_by_relevance(style_filtered, user_goals, skill_level)
-        
-        # Create optimal sequence
-        learning_path = self._create_optimal_sequence(sorted_items, user_goals)
-        
-        return learning_path
-    
+
+        with self._lock:
+            plan = self._plan_for(user_id, user_goals, completed_items, learning_style, skill_level)
+            return plan.sequence()
+
+    def _plan_for(self, user_id: str, user_goals: List[str], completed_items: set,
+                  learning_style: LearningStyle, skill_level: float) -> LearningPlan:
+        """User's plan, advanced incrementally when they only completed more items"""
+        with self._lock:
+            graph = self.compiled_graph()
+            # Difficulty fit is only meaningful to about a tenth of a level
+            params = (id(graph), tuple(user_goals), learning_style, round(skill_level, 1))
+            cached = self._plans.get(user_id)
+
+            if cached is not None and cached[0] == params and cached[1].completed <= completed_items:
+                plan = cached[1]
+                for item_id in completed_items - plan.completed:
+                    plan.complete(item_id)
+                self._plans.move_to_end(user_id)
+                return plan
+
+            priority = self._priorities(graph, user_goals, learning_style, params[3])
+            plan = LearningPlan(graph, completed_items, priority)
+            self._plans[user_id] = (params, plan)
+            self._plans.move_to_end(user_id)
+            while len(self._plans) > self.max_cached_plans:
+                self._plans.popitem(last=False)
+            return plan
+
+    def _priorities(self, graph: PrerequisiteGraph, user_goals: List[str],
+                    learning_style: LearningStyle, skill_level: float) -> List[Tuple]:
+        """Heap key per item: preferred style first, then goal relevance and difficulty fit"""
+        goals = set(user_goals)
+        relevance = [len(set(item.concepts) & goals) / max(len(user_goals), 1) for item in graph.items]
+
+        # Prerequisites of goal-relevant items inherit half of their relevance
+        for n in reversed(graph.order):
+            for d in graph.dependents[n]:
+                relevance[n] = max(relevance[n], 0.5 * relevance[d])
+
+        priority = []
+        for n, item in enumerate(graph.items):
+            difficulty_score = 1.0 - abs(item.difficulty.value / 5.0 - skill_level)
+            score = 0.7 * relevance[n] + 0.3 * difficulty_score
+            priority.append((learning_style not in item.learning_styles, -score, item.difficulty.value, n))
+        return priority
+
     def _calculate_overall_skill_level(self, performances: List[UserPerformance]) -> float:
         """Calculate user's overall skill level"""
         if not performances:
             return 0.0
-        
+
         return sum(perf.mastery_level for perf in performances) / len(performances)
-    
+
     def _get_available_items(self, completed_items: set) -> List[str]:
         """Get items that are available (prerequisites met)"""
-        available = []
-        
-        for item_id, item in self.learning_items.items():
-            if item_id in completed_items:
-                continue
-            
-            # Check if all prerequisites are completed
-            if all(prereq in completed_items for prereq in item.prerequisites):
-                available.append(item_id)
-        
-        return available
-    
-    def _filter_by_learning_style(self, item_ids: List[str], 
-                                 learning_style: LearningStyle) -> List[str]:
-        """Filter items by learning style preference"""
-        filtered = []
-        
-        for item_id in item_ids:
-            item = self.learning_items[item_id]
-            if learning_style in item.learning_styles:
-                filtered.append(item_id)
-        
-        # If no items match the preferred style, return all items
-        return filtered if filtered else item_ids
-    
-    def _sort_by_relevance(self, item_ids: List[str], user_goals: List[str], 
-                          skill_level: float) -> List[str]:
-        """Sort items by relevance to user goals and appropriate difficulty"""
-        def relevance_score(item_id: str) -> float:
-            item = self.learning_items[item_id]
-            
-            # Goal relevance (how many concepts match user goals)
-            goal_relevance = len(set(item.concepts) & set(user_goals)) / max(len(user_goals), 1)
-            
-            # Difficulty appropriateness
-            difficulty_diff = abs(item.difficulty.value / 5.0 - skill_level)
-            difficulty_score = 1.0 - difficulty_diff
-            
-            # Combine scores
-            return 0.7 * goal_relevance + 0.3 * difficulty_score
-        
-        return sorted(item_ids, key=relevance_score, reverse=True)
-    
-    def _create_optimal_sequence(self, sorted_items: List[str], 
-                               user_goals: List[str]) -> List[str]:
-        """Create optimal learning sequence"""
-        # Simple greedy approach - in practice, use more sophisticated algorithms
-        sequence = []
-        remaining_items = set(sorted_items)
-        
-        while remaining_items:
-            # Find the best next item
-            best_item = None
-            best_score = -1
-            
-            for item_id in remaining_items:
-                item = self.learning_items[item_id]
-                
-                # Check if prerequisites are in sequence
-                prereqs_met = all(prereq in sequence for prereq in item.prerequisites)
-                
-                if prereqs_met:
-                    # Calculate priority score
-                    goal_match = len(set(item.concepts) & set(user_goals))
-                    priority_score = goal_match + (1 / (item.difficulty.value + 1))
-                    
-                    if priority_score > best_score:
-                        best_score = priority_score
-                        best_item = item_id
-            
-            if best_item:
-                sequence.append(best_item)
-                remaining_items.remove(best_item)
-            else:
-                # No valid next item - add any remaining item
-                sequence.extend(list(remaining_items))
-                break
-        
-        return sequence
+        graph = self.compiled_graph()
+        return LearningPlan(graph, completed_items, [(n,) for n in range(len(graph.ids))]).available()
 
 class LearningAnalytics:
     """Provides learning analytics and insights"""
     
-    def __init__(self):
+    def __init__(self, engine=analytics_engine):
         self.analytics_cache = {}
+        # Columnar NumPy engine; None falls back to the pure-Python methods below
+        self.engine = engine
     
     def generate_user_analytics(self, user_id: str, 
                                performances: List[UserPerformance]) -> Dict[str, Any]:
         """Generate comprehensive learning analytics for user"""
         if not performances:
             return {"error": "No performance data available"}
+
+        if self.engine is not None:
+            self.engine.load(user_id, performances)
+            return self.engine.user_analytics(user_id)
         
         # Learning velocity
         velocity = self._calculate_learning_velocity(performances)
@@ -475,8 +602,14 @@ class LearningAnalytics:
         
         return recommendations
 
+    def batch_analytics(self) -> Dict[str, Any]:
+        """Summary analytics and cohort percentiles for every user analyzed so far"""
+        if self.engine is None:
+            return {"error": "Batch analytics need numpy"}
+        return self.engine.batch_analytics()
+
 # Global instances
 adaptive_engine = AdaptiveDifficultyEngine()
-spaced_repetition = SpacedRepetitionEngine()
+spaced_repetition = SpacedRepetitionEngine(review_queue)
 learning_path_generator = PersonalizedLearningPath()
 learning_analytics = LearningAnalytics()
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Columnar Analytics Engine
+Learner analytics computed with NumPy over per-user typed arrays:
+- Performance history stored column-wise (item codes, attempts, success
+  rate, time, last attempt, mastery) instead of lists of dataclasses
+- Velocity, strengths, trends, retention and cohort percentiles per user
+- Batch API computing every user's summary in one vectorized pass
+"""
+
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Iterable
+
+# NumPy is optional; without it LearningAnalytics uses its pure-Python path
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+SECONDS_PER_DAY = 86400.0
+
+# Upper edges (days since last attempt) of the retention curve buckets
+RETENTION_BUCKETS = (1, 7, 30, 90, math.inf)
+
+# Lessons per skill area for skill progression
+SKILL_AREAS = {
+    'basics': ['lesson_1', 'lesson_2', 'lesson_3', 'lesson_4', 'lesson_5'],
+    'data_structures': ['lesson_6', 'lesson_7', 'lesson_8', 'lesson_9', 'lesson_10'],
+    'control_flow': ['lesson_11', 'lesson_12', 'lesson_13', 'lesson_14', 'lesson_15'],
+    'functions': ['lesson_16', 'lesson_17', 'lesson_18', 'lesson_19', 'lesson_20'],
+    'oop': ['lesson_21', 'lesson_22', 'lesson_23', 'lesson_24', 'lesson_25'],
+    'advanced': ['lesson_26', 'lesson_27', 'lesson_28', 'lesson_29', 'lesson_30']
+}
+
+# Profile counter weights for the engagement score (normalized to 0-100 after halving)
+ENGAGEMENT_WEIGHTS = {
+    'streak': 2,  # Streak is important
+    'lessons_completed': 1,
+    'quizzes_completed': 2,  # Quizzes show engagement
+    'challenges_completed': 3,  # Challenges show high engagement
+    'playground_uses': 1
+}
+
+COHORT_PERCENTILES = (25, 50, 75, 90)
+
+def _timestamp(value) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+class PerformanceHistory:
+    """Typed column arrays holding one user's latest performance per item"""
+
+    COLUMNS = (('items', 'int32'), ('attempts', 'int32'), ('success_rate', 'float64'),
+               ('average_time', 'float64'), ('last_attempt', 'float64'), ('mastery', 'float64'))
+
+    def __init__(self, capacity: int = 16):
+        self.size = 0
+        self.rows: Dict[int, int] = {}
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def _grow(self, needed: int):
+        capacity = len(self.items)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, _ in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def put(self, code: int, attempts: int, success_rate: float, average_time: float,
+            last_attempt: float, mastery: float):
+        """Insert or replace the record for an item"""
+        row = self.rows.get(code)
+        if row is None:
+            self._grow(self.size + 1)
+            row = self.size
+            self.rows[code] = row
+            self.size += 1
+        self.items[row] = code
+        self.attempts[row] = attempts
+        self.success_rate[row] = success_rate
+        self.average_time[row] = average_time
+        self.last_attempt[row] = last_attempt
+        self.mastery[row] = mastery
+
+    def column(self, name: str):
+        """Filled part of a column (a view, not a copy)"""
+        return getattr(self, name)[:self.size]
+
+class AnalyticsEngine:
+    """Vectorized learner analytics over columnar performance histories"""
+
+    def __init__(self, cohort_ttl: float = 60.0):
+        if not HAS_NUMPY:
+            raise ImportError("The analytics engine needs numpy")
+        self._histories: Dict[str, PerformanceHistory] = {}
+        self._item_codes: Dict[str, int] = {}
+        self._item_ids: List[str] = []
+        self._concept_codes: Dict[str, int] = {}
+        self._concept_names: List[str] = []
+        self._item_concepts = np.zeros(64, dtype=np.int32)
+        # Cohort distributions are rebuilt at most every cohort_ttl seconds
+        self.cohort_ttl = cohort_ttl
+        self._cohort = None
+        self._cohort_at = 0.0
+        self._lock = threading.RLock()
+
+    # Recording
+
+    def _code(self, item_id: str) -> int:
+        code = self._item_codes.get(item_id)
+        if code is None:
+            code = len(self._item_ids)
+            self._item_codes[item_id] = code
+            self._item_ids.append(item_id)
+
+            # In practice, map items to concepts
+            concept = item_id.split('_')[0]  # Simplified concept extraction
+            if concept not in self._concept_codes:
+                self._concept_codes[concept] = len(self._concept_names)
+                self._concept_names.append(concept)
+            if code >= len(self._item_concepts):
+                self._item_concepts = np.concatenate([self._item_concepts, np.zeros_like(self._item_concepts)])
+            self._item_concepts[code] = self._concept_codes[concept]
+        return code
+
+    def record(self, user_id: str, performance):
+        """Add or update one UserPerformance in a user's history"""
+        with self._lock:
+            history = self._histories.setdefault(user_id, PerformanceHistory())
+            history.put(self._code(performance.item_id), performance.attempts, performance.success_rate,
+                        performance.average_time, _timestamp(performance.last_attempt), performance.mastery_level)
+
+    def load(self, user_id: str, performances: Iterable):
+        """Replace a user's history with the given UserPerformance records"""
+        with self._lock:
+            history = PerformanceHistory()
+            for performance in performances:
+                history.put(self._code(performance.item_id), performance.attempts, performance.success_rate,
+                            performance.average_time, _timestamp(performance.last_attempt),
+                            performance.mastery_level)
+            self._histories[user_id] = history
+
+    def forget(self, user_id: str):
+        """Drop a user's history"""
+        with self._lock:
+            self._histories.pop(user_id, None)
+
+    # Per-user analytics
+
+    def user_analytics(self, user_id: str, now: float = None) -> Dict[str, Any]:
+        """LearningAnalytics.generate_user_analytics output for a stored history"""
+        now = time.time() if now is None else now
+        with self._lock:
+            history = self._histories.get(user_id)
+            if history is None or history.size == 0:
+                return {"error": "No performance data available"}
+
+            items = history.column('items').copy()
+            last_attempt = history.column('last_attempt').copy()
+            mastery = history.column('mastery').copy()
+            concepts = self._item_concepts[items]
+            cohort = self._cohort_table()
+
+        age_days = np.floor((now - last_attempt) / SECONDS_PER_DAY)
+        velocity = self._velocity(last_attempt, mastery)
+        strengths, weaknesses = self._strengths_weaknesses(concepts, mastery)
+
+        return {
+            "user_id": user_id,
+            "learning_velocity": velocity,
+            "strengths": strengths,
+            "weaknesses": weaknesses,
+            "trends": self._trends(last_attempt, mastery),
+            "retention": self._retention(items, age_days, mastery),
+            "retention_curve": self._retention_curve(age_days, mastery),
+            "cohort": self._percentile_ranks(cohort, velocity),
+            "recommendations": self._recommendations(age_days, mastery),
+            "generated_at": datetime.fromtimestamp(now).isoformat()
+        }
+
+    def _velocity(self, last_attempt, mastery) -> Dict[str, float]:
+        if len(mastery) < 2:
+            return {"items_per_day": 0.0, "mastery_rate": 0.0}
+        time_span = math.floor((last_attempt.max() - last_attempt.min()) / SECONDS_PER_DAY) or 1
+        return {
+            "items_per_day": len(mastery) / time_span,
+            "mastery_rate": float(mastery.mean())
+        }
+
+    def _strengths_weaknesses(self, concepts, mastery):
+        codes, first_seen, inverse = np.unique(concepts, return_index=True, return_inverse=True)
+        averages = np.bincount(inverse, weights=mastery) / np.bincount(inverse)
+
+        # Concepts in order of first appearance, then best average first (stable)
+        appearance = np.argsort(first_seen, kind='stable')
+        ranked = appearance[np.argsort(-averages[appearance], kind='stable')]
+
+        count = max(1, len(ranked) // 3)
+        names = [self._concept_names[code] for code in codes[ranked]]
+        return names[:count], names[-count:]
+
+    def _trends(self, last_attempt, mastery) -> Dict[str, Any]:
+        if len(mastery) < 3:
+            return {"trend": "insufficient_data"}
+
+        ordered = mastery[np.argsort(last_attempt, kind='stable')]
+        window_size = min(5, len(ordered))
+        moving_averages = np.lib.stride_tricks.sliding_window_view(ordered, window_size).mean(axis=1)
+
+        if len(moving_averages) >= 2:
+            trend_slope = float(moving_averages[-1] - moving_averages[0])
+            if trend_slope > 0.1:
+                trend = "improving"
+            elif trend_slope < -0.1:
+                trend = "declining"
+            else:
+                trend = "stable"
+        else:
+            trend_slope = 0.0
+            trend = "insufficient_data"
+
+        return {
+            "trend": trend,
+            "current_level": float(moving_averages[-1]),
+            "improvement_rate": trend_slope
+        }
+
+    def _retention(self, items, age_days, mastery) -> Dict[str, Any]:
+        recent = age_days <= 30
+        recent_count = int(recent.sum())
+        if recent_count == 0:
+            return {"retention_rate": 0.0, "items_at_risk": []}
+
+        # Items that need review (low recent performance)
+        at_risk = recent & (mastery < 0.6)
+        items_at_risk = [self._item_ids[code] for code in items[at_risk]]
+        return {
+            "retention_rate": 1.0 - len(items_at_risk) / recent_count,
+            "items_at_risk": items_at_risk,
+            "review_recommended": len(items_at_risk) > 0
+        }
+
+    def _retention_curve(self, age_days, mastery) -> List[Dict[str, Any]]:
+        """Mean mastery by days since last attempt"""
+        edges = np.array(RETENTION_BUCKETS[:-1], dtype=np.float64)
+        buckets = np.searchsorted(edges, age_days, side='left')
+        counts = np.bincount(buckets, minlength=len(RETENTION_BUCKETS))
+        sums = np.bincount(buckets, weights=mastery, minlength=len(RETENTION_BUCKETS))
+
+        curve = []
+        for bucket, max_days in enumerate(RETENTION_BUCKETS):
+            count = int(counts[bucket])
+            curve.append({
+                "max_days": None if math.isinf(max_days) else max_days,
+                "items": count,
+                "mean_mastery": float(sums[bucket] / count) if count else None
+            })
+        return curve
+
+    def _recommendations(self, age_days, mastery) -> List[str]:
+        recommendations = []
+        avg_mastery = float(mastery.mean())
+
+        if avg_mastery < 0.5:
+            recommendations.append("Focus on fundamentals - consider reviewing basic concepts")
+        elif avg_mastery > 0.8:
+            recommendations.append("Great progress! Ready for more challenging content")
+
+        # Check for consistency
+        if float(((mastery - avg_mastery) ** 2).mean()) > 0.2:
+            recommendations.append("Consider focusing on weaker areas for more consistent progress")
+
+        # Check recent activity
+        if int((age_days <= 7).sum()) < 3:
+            recommendations.append("Try to maintain regular study sessions for better retention")
+
+        return recommendations
+
+    # Cohorts and batches
+
+    def _columns(self):
+        """Every history concatenated, with a user index column; grouped by user"""
+        users = [user_id for user_id, history in self._histories.items() if history.size]
+        sizes = np.array([self._histories[user_id].size for user_id in users], dtype=np.int64)
+        owner = np.repeat(np.arange(len(users)), sizes)
+        columns = {
+            name: np.concatenate([self._histories[user_id].column(name) for user_id in users])
+            if users else np.zeros(0, dtype=dtype)
+            for name, dtype in PerformanceHistory.COLUMNS
+        }
+        return users, sizes, owner, columns
+
+    def _summaries(self, now: float) -> Dict[str, Any]:
+        users, sizes, owner, columns = self._columns()
+        user_count = len(users)
+        if not user_count:
+            return {"users": [], "count": sizes}
+
+        mastery = columns['mastery']
+        last_attempt = columns['last_attempt']
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        ends = starts + sizes
+
+        mastery_rate = np.bincount(owner, weights=mastery, minlength=user_count) / sizes
+        span = np.floor((np.maximum.reduceat(last_attempt, starts) -
+                         np.minimum.reduceat(last_attempt, starts)) / SECONDS_PER_DAY)
+        span[span == 0] = 1
+        items_per_day = np.where(sizes >= 2, sizes / span, 0.0)
+        mastery_rate_shown = np.where(sizes >= 2, mastery_rate, 0.0)
+
+        # Moving-average trend: first and last window of each user's time-ordered mastery
+        order = np.lexsort((last_attempt, owner))
+        cumulative = np.concatenate([[0.0], np.cumsum(mastery[order])])
+        window = np.minimum(sizes, 5)
+        first_window = (cumulative[starts + window] - cumulative[starts]) / window
+        last_window = (cumulative[ends] - cumulative[ends - window]) / window
+        improvement = np.where(sizes - window + 1 >= 2, last_window - first_window, 0.0)
+
+        age_days = np.floor((now - last_attempt) / SECONDS_PER_DAY)
+        recent = age_days <= 30
+        recent_count = np.bincount(owner, weights=recent, minlength=user_count)
+        at_risk = np.bincount(owner, weights=recent & (mastery < 0.6), minlength=user_count)
+        retention_rate = np.where(recent_count > 0, 1.0 - at_risk / np.maximum(recent_count, 1), 0.0)
+
+        return {
+            "users": users,
+            "count": sizes,
+            "mastery_rate": mastery_rate_shown,
+            "items_per_day": items_per_day,
+            "improvement_rate": improvement,
+            "retention_rate": retention_rate,
+            "items_at_risk": at_risk
+        }
+
+    def _cohort_table(self) -> Dict[str, Any]:
+        now = time.time()
+        if self._cohort is None or now - self._cohort_at > self.cohort_ttl:
+            summaries = self._summaries(now)
+            self._cohort = {
+                "size": len(summaries["users"]),
+                "sorted": {metric: np.sort(summaries[metric])
+                           for metric in ("mastery_rate", "items_per_day") if metric in summaries}
+            }
+            self._cohort_at = now
+        return self._cohort
+
+    def _percentile_ranks(self, cohort: Dict[str, Any], velocity: Dict[str, float]) -> Dict[str, Any]:
+        """Share of the cohort (percent) at or below these velocity figures"""
+        if not cohort["size"]:
+            return {}
+        ranks = {"cohort_size": cohort["size"]}
+        for metric, ordered in cohort["sorted"].items():
+            below = np.searchsorted(ordered, velocity[metric], side='right')
+            ranks[f"{metric}_percentile"] = round(100.0 * float(below) / len(ordered), 1)
+        return ranks
+
+    def cohort_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """Cohort distribution of mastery rate and velocity"""
+        with self._lock:
+            cohort = self._cohort_table()
+            return {
+                metric: {f"p{p}": float(np.percentile(ordered, p)) for p in COHORT_PERCENTILES}
+                for metric, ordered in cohort["sorted"].items()
+            }
+
+    def batch_analytics(self, now: float = None) -> Dict[str, Any]:
+        """Summary analytics for every stored user in one pass"""
+        now = time.time() if now is None else now
+        with self._lock:
+            summaries = self._summaries(now)
+        users = summaries["users"]
+        if not users:
+            return {"users": {}, "cohort": {}, "generated_at": datetime.fromtimestamp(now).isoformat()}
+
+        sizes = summaries["count"]
+        trend = np.full(len(users), "insufficient_data", dtype=object)
+        has_trend = sizes >= 6
+        trend[has_trend & (summaries["improvement_rate"] > 0.1)] = "improving"
+        trend[has_trend & (summaries["improvement_rate"] < -0.1)] = "declining"
+        trend[has_trend & (np.abs(summaries["improvement_rate"]) <= 0.1)] = "stable"
+
+        percentiles = {}
+        for metric in ("mastery_rate", "items_per_day"):
+            values = summaries[metric]
+            ordered = np.sort(values)
+            percentiles[metric] = (
+                {f"p{p}": float(np.percentile(values, p)) for p in COHORT_PERCENTILES},
+                100.0 * np.searchsorted(ordered, values, side='right') / len(values)
+            )
+
+        results = {}
+        for index, user_id in enumerate(users):
+            results[user_id] = {
+                "items": int(sizes[index]),
+                "mastery_rate": float(summaries["mastery_rate"][index]),
+                "items_per_day": float(summaries["items_per_day"][index]),
+                "trend": trend[index],
+                "improvement_rate": float(summaries["improvement_rate"][index]),
+                "retention_rate": float(summaries["retention_rate"][index]),
+                "items_at_risk": int(summaries["items_at_risk"][index]),
+                "mastery_rate_percentile": round(float(percentiles["mastery_rate"][1][index]), 1),
+                "items_per_day_percentile": round(float(percentiles["items_per_day"][1][index]), 1)
+            }
+
+        return {
+            "users": results,
+            "cohort": {metric: values[0] for metric, values in percentiles.items()},
+            "generated_at": datetime.fromtimestamp(now).isoformat()
+        }
+
+    def profile_metrics(self, profiles: Dict[str, Dict]) -> Dict[str, Any]:
+        """Engagement, velocity and skill progression for many user profiles at once"""
+        emails = list(profiles)
+        if not emails:
+            return {"users": {}, "cohort": {}}
+
+        def counter(field):
+            return np.fromiter((profiles[email].get(field, 0) or 0 for email in emails),
+                               dtype=np.float64, count=len(emails))
+
+        engagement = sum(counter(field) * weight for field, weight in ENGAGEMENT_WEIGHTS.items())
+        engagement = np.minimum(engagement / 2, 100)  # Normalize to 0-100
+
+        completed = counter('lessons_completed') + counter('quizzes_completed') + counter('challenges_completed')
+        items_per_day = completed / np.maximum(counter('days_since_start'), 1)
+
+        # Users x lessons completion matrix times lessons x areas membership matrix
+        lessons = [lesson_id for lesson_ids in SKILL_AREAS.values() for lesson_id in lesson_ids]
+        lesson_column = {lesson_id: n for n, lesson_id in enumerate(lessons)}
+        done = np.zeros((len(emails), len(lessons)), dtype=np.float64)
+        for row, email in enumerate(emails):
+            columns = [lesson_column[lesson_id] for lesson_id in profiles[email].get('completed_lesson_ids', [])
+                       if lesson_id in lesson_column]
+            done[row, columns] = 1
+        membership = np.zeros((len(lessons), len(SKILL_AREAS)), dtype=np.float64)
+        totals = []
+        for area, lesson_ids in enumerate(SKILL_AREAS.values()):
+            membership[[lesson_column[lesson_id] for lesson_id in lesson_ids], area] = 1
+            totals.append(len(lesson_ids))
+        area_counts = done @ membership
+        area_percentages = np.round(area_counts / np.array(totals) * 100, 1)
+
+        results = {}
+        for row, email in enumerate(emails):
+            results[email] = {
+                "engagement_score": round(float(engagement[row]), 1),
+                "items_per_day": round(float(items_per_day[row]), 2),
+                "skill_progression": {
+                    area: float(area_percentages[row, column])
+                    for column, area in enumerate(SKILL_AREAS)
+                }
+            }
+
+        return {
+            "users": results,
+            "cohort": {
+                "engagement_score": {f"p{p}": float(np.percentile(engagement, p)) for p in COHORT_PERCENTILES},
+                "items_per_day": {f"p{p}": float(np.percentile(items_per_day, p)) for p in COHORT_PERCENTILES}
+            }
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Engine statistics"""
+        with self._lock:
+            return {
+                "users": len(self._histories),
+                "records": sum(history.size for history in self._histories.values()),
+                "items": len(self._item_ids)
+            }
+
+# Global analytics engine instance (None without numpy)
+analytics_engine = AnalyticsEngine() if HAS_NUMPY else None
@@ -0,0 +1,176 @@
+"""
+Challenge Index Module
+Id -> file index over data/challenges/<difficulty>/<category>/<id>.json:
+- Built by one scandir walk of the tree; loading a challenge is a dict
+  lookup and a single file read
+- Listing summaries (title, difficulty, points, ...) are kept in the index,
+  so listing challenges reads no challenge files
+- Kept fresh by polling: at most once per poll interval the tree is walked
+  again and only files whose mtime or size changed are re-parsed
+- Persisted as a compact JSON file, so a restart re-parses nothing that did
+  not change
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+from .error_handler import error_handler
+
+INDEX_FORMAT = 1
+INDEX_FILENAME = ".index.json"
+
+class ChallengeIndex:
+    """Challenge files indexed by id, with listing summaries"""
+
+    def __init__(self, root: str, index_file: Optional[str] = None, poll_interval: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.root = root
+        self.index_file = index_file or os.path.join(root, INDEX_FILENAME)
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._lock = threading.RLock()
+        # id -> [relative path, mtime_ns, size, summary]
+        self._entries: Dict[str, list] = {}
+        self._next_poll = None
+        self._scans = 0
+        self._parsed = 0
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == INDEX_FORMAT:
+                self._entries = {challenge_id: list(entry) for challenge_id, entry in data['entries'].items()}
+        except (OSError, ValueError, KeyError, AttributeError, TypeError):
+            self._entries = {}
+
+    def _save_index(self):
+        temp_file = f"{self.index_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'format': INDEX_FORMAT, 'entries': self._entries}, f, separators=(',', ':'))
+            os.replace(temp_file, self.index_file)
+        except OSError as e:
+            error_handler.handle_error(e, context={"operation": "save_challenge_index"})
+
+    @staticmethod
+    def summarize(challenge: Dict, difficulty: str, category: str) -> Dict[str, Any]:
+        """Listing fields of a challenge; difficulty and category dirs are kept for filtering"""
+        description = challenge.get("description", "")
+        return {
+            "id": challenge["id"],
+            "title": challenge["title"],
+            "difficulty": challenge["difficulty"],
+            "category": challenge["category"],
+            "points": challenge.get("points", 0),
+            "description": description[:100] + "..." if len(description) > 100 else description,
+            "dir_difficulty": difficulty,
+            "dir_category": category
+        }
+
+    def _scan(self) -> Tuple[bool, Dict[str, list]]:
+        """One walk over <difficulty>/<category>/*.json, re-parsing changed files only"""
+        entries, changed = {}, False
+        try:
+            difficulties = sorted(entry.name for entry in os.scandir(self.root) if entry.is_dir())
+        except OSError:
+            difficulties = []
+        for difficulty in difficulties:
+            try:
+                categories = sorted(entry.name for entry in os.scandir(os.path.join(self.root, difficulty))
+                                    if entry.is_dir())
+            except OSError:
+                continue
+            for category in categories:
+                try:
+                    files = sorted((entry for entry in os.scandir(os.path.join(self.root, difficulty, category))
+                                    if entry.name.endswith('.json') and entry.is_file()),
+                                   key=lambda entry: entry.name)
+                except OSError:
+                    continue
+                for entry in files:
+                    challenge_id = entry.name[:-5]
+                    if challenge_id in entries:
+                        # Same id in two folders: the first in sorted order wins
+                        continue
+                    relative = f"{difficulty}/{category}/{entry.name}"
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    previous = self._entries.get(challenge_id)
+                    if previous and previous[:3] == [relative, stat.st_mtime_ns, stat.st_size]:
+                        entries[challenge_id] = previous
+                        continue
+                    summary = None
+                    try:
+                        with open(entry.path, 'r', encoding='utf-8') as f:
+                            summary = self.summarize(json.load(f), difficulty, category)
+                    except Exception:
+                        # Unreadable files stay indexed without a summary and are skipped in listings
+                        pass
+                    self._parsed += 1
+                    entries[challenge_id] = [relative, stat.st_mtime_ns, stat.st_size, summary]
+                    changed = True
+        return changed or entries.keys() != self._entries.keys(), entries
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-walk the tree if the poll interval has passed; True if the index changed"""
+        with self._lock:
+            now = self.clock()
+            if not force and self._next_poll is not None and now < self._next_poll:
+                return False
+            self._next_poll = now + self.poll_interval
+            changed, entries = self._scan()
+            self._scans += 1
+            self._entries = entries
+            if changed:
+                self._save_index()
+            return changed
+
+    def path(self, challenge_id: str) -> Optional[str]:
+        """Absolute path of a challenge file, or None"""
+        self.refresh()
+        entry = self._entries.get(challenge_id)
+        if entry is None:
+            return None
+        return os.path.join(self.root, *entry[0].split('/'))
+
+    def load(self, challenge_id: str) -> Optional[Dict]:
+        """Full challenge document: one lookup and one read"""
+        path = self.path(challenge_id)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # Removed since the last poll
+            self.refresh(force=True)
+            return None
+
+    def summaries(self, difficulty: str = None, category: str = None) -> List[Dict[str, Any]]:
+        """Listing summaries, optionally limited to one difficulty or category folder"""
+        self.refresh()
+        return [
+            {key: value for key, value in summary.items() if not key.startswith("dir_")}
+            for _, _, _, summary in self._entries.values()
+            if summary is not None
+            and (difficulty is None or summary["dir_difficulty"] == difficulty)
+            and (category is None or summary["dir_category"] == category)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, challenge_id: str) -> bool:
+        self.refresh()
+        return challenge_id in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        """Index statistics"""
+        return {"challenges": len(self._entries), "scans": self._scans, "files_parsed": self._parsed}
@@ -10,20 +10,26 @@ Inspired by coding challenge platforms like HackerRank, LeetCode, and Codewars:
 
 import json
 import os
-import time
 import ast
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import colorama
 from colorama import Fore, Style
+from .sandbox import sandbox_pool, SandboxPool
+from .result_cache import result_cache, suite_version, ExecutionResultCache
+from .challenge_index import ChallengeIndex
 
 class ChallengeSystem:
     """Interactive coding challenge system"""
     
-    def __init__(self, challenges_dir: str = "data/challenges"):
+    def __init__(self, challenges_dir: str = "data/challenges", sandbox: Optional[SandboxPool] = None,
+                 cache: Optional[ExecutionResultCache] = None):
         self.challenges_dir = challenges_dir
+        self.sandbox = sandbox or sandbox_pool
+        self.result_cache = cache or result_cache
         self.current_challenge = None
         self.ensure_challenge_structure()
+        self.index = ChallengeIndex(challenges_dir)
         self.create_sample_challenges()
     
     def ensure_challenge_structure(self):
@@ -172,56 +178,22 @@ class ChallengeSystem:
         if not os.path.exists(challenge_file):
             with open(challenge_file, 'w') as f:
                 json.dump(challenge, f, indent=2)
+            self.index.refresh(force=True)
     
     def load_challenge(self, challenge_id: str) -> Optional[Dict]:
         """Load a challenge by ID"""
-        # Search through all difficulty and category folders
-        for difficulty in ["easy", "medium", "hard", "expert"]:
-            for category in ["basics", "algorithms", "data_structures", "math", "strings", "lists"]:
-                challenge_file = os.path.join(
-                    self.challenges_dir, difficulty, category, f"{challenge_id}.json"
-                )
-                
-                if os.path.exists(challenge_file):
-                    try:
-                        with open(challenge_file, 'r') as f:
-                            challenge = json.load(f)
-                            self.current_challenge = challenge
-                            return challenge
-                    except Exception as e:
-                        print(f"Error loading challenge: {e}")
-        
-        return None
+        try:
+            challenge = self.index.load(challenge_id)
+        except Exception as e:
+            print(f"Error loading challenge: {e}")
+            return None
+        if challenge is not None:
+            self.current_challenge = challenge
+        return challenge
     
     def get_available_challenges(self, difficulty: str = None, category: str = None) -> List[Dict]:
         """Get list of available challenges"""
-        challenges = []
-        
-        difficulties = [difficulty] if difficulty else ["easy", "medium", "hard", "expert"]
-        categories = [category] if category else ["basics", "algorithms", "data_structures", "math", "strings", "lists"]
-        
-        for diff in difficulties:
-            for cat in categories:
-                challenge_dir = os.path.join(self.challenges_dir, diff, cat)
-                
-                if os.path.exists(challenge_dir):
-                    for filename in os.listdir(challenge_dir):
-                        if filename.endswith('.json'):
-                            challenge_file = os.path.join(challenge_dir, filename)
-                            try:
-                                with open(challenge_file, 'r') as f:
-                                    challenge = json.load(f)
-                                    challenges.append({
-                                        "id": challenge["id"],
-                                        "title": challenge["title"],
-                                        "difficulty": challenge["difficulty"],
-                                        "category": challenge["category"],
-                                        "points": challenge.get("points", 0),
-                                        "description": challenge["description"][:100] + "..." if len(challenge["description"]) > 100 else challenge["description"]
-                                    })
-                            except Exception:
-                                continue
-        
+        challenges = self.index.summaries(difficulty, category)
         return sorted(challenges, key=lambda x: (x["difficulty"], x["points"]))
     
     def display_challenge(self, challenge: Dict):
@@ -304,7 +276,8 @@ class ChallengeSystem:
         # Test the solution
         return self.test_solution(challenge, user_code, hints_used)
     
-    def test_solution(self, challenge: Dict, user_code: str, hints_used: int) -> Dict:
+    def test_solution(self, challenge: Dict, user_code: str, hints_used: int,
+                      stop_on_failure: bool = False) -> Dict:
         """Test user's solution against test cases"""
         print(f"\n{Fore.YELLOW}🧪 Testing your solution...{Style.RESET_ALL}")
         
@@ -328,70 +301,65 @@ class ChallengeSystem:
                     "score": 0
                 }
             
-            # Execute the code
-            exec_globals = {}
-            exec(user_code, exec_globals)
+            # Compile once and run every test case in a single sandbox invocation
+            test_cases = challenge.get("test_cases", [])
+            cases = [{"args": test_case["input"], "expected": test_case["expected"]} for test_case in test_cases]
+            version = suite_version([cases, challenge.get("time_limit"), stop_on_failure])
+            outcome = self.result_cache.get_or_run(
+                user_code,
+                lambda: self.sandbox.run_tests(user_code, function_name, cases,
+                                               stop_on_failure=stop_on_failure,
+                                               time_limit=challenge.get("time_limit")),
+                challenge_id=challenge["id"], version=version, kind="tests"
+            )
             
-            user_function = exec_globals.get(function_name)
-            if not user_function:
+            if not outcome["success"] and outcome["cases_run"] == 0:
                 return {
                     "success": False,
-                    "error": f"Function '{function_name}' not accessible",
+                    "error": f"Execution error: {outcome['error']}",
                     "score": 0
                 }
             
-            # Run test cases
-            test_cases = challenge.get("test_cases", [])
             passed_tests = 0
             failed_tests = []
             
-            for i, test_case in enumerate(test_cases):
-                try:
-                    start_time = time.time()
-                    result = user_function(*test_case["input"])
-                    execution_time = time.time() - start_time
-                    
-                    # Check time limit
-                    time_limit = challenge.get("time_limit", float('inf'))
-                    if execution_time > time_limit:
-                        failed_tests.append({
-                            "test_case": i + 1,
-                            "error": f"Time limit exceeded ({execution_time:.2f}s > {time_limit}s)",
-                            "input": test_case["input"],
-                            "hidden": test_case.get("hidden", False)
-                        })
-                        continue
-                    
-                    # Check result
-                    if result == test_case["expected"]:
-                        passed_tests += 1
-                        if not test_case.get("hidden", False):
-                            print(f"{Fore.GREEN}✅ Test {i + 1}: Passed{Style.RESET_ALL}")
-                    else:
-                        failed_tests.append({
-                            "test_case": i + 1,
-                            "error": f"Expected {test_case['expected']}, got {result}",
-                            "input": test_case["input"],
-                            "expected": test_case["expected"],
-                            "actual": result,
-                            "hidden": test_case.get("hidden", False)
-                        })
-                        if not test_case.get("hidden", False):
-                            print(f"{Fore.RED}❌ Test {i + 1}: Failed{Style.RESET_ALL}")
-                            print(f"   Input: {test_case['input']}")
-                            print(f"   Expected: {test_case['expected']}")
-                            print(f"   Got: {result}")
+            for i, (test_case, case) in enumerate(zip(test_cases, outcome["cases"])):
+                hidden = test_case.get("hidden", False)
                 
-                except Exception as e:
+                if case["passed"]:
+                    passed_tests += 1
+                    if not hidden:
+                        print(f"{Fore.GREEN}✅ Test {i + 1}: Passed ({case['execution_time'] * 1000:.2f}ms){Style.RESET_ALL}")
+                    continue
+                
+                if case["error"] is None:
+                    failed_tests.append({
+                        "test_case": i + 1,
+                        "error": f"Expected {test_case['expected']}, got {case['actual']}",
+                        "input": test_case["input"],
+                        "expected": test_case["expected"],
+                        "actual": case["actual"],
+                        "execution_time": case["execution_time"],
+                        "hidden": hidden
+                    })
+                    if not hidden:
+                        print(f"{Fore.RED}❌ Test {i + 1}: Failed{Style.RESET_ALL}")
+                        print(f"   Input: {test_case['input']}")
+                        print(f"   Expected: {test_case['expected']}")
+                        print(f"   Got: {case['actual']}")
+                else:
+                    error = case["error"]
+                    if not case["skipped"] and not error.startswith("Time limit exceeded"):
+                        error = f"Runtime error: {error}"
                     failed_tests.append({
                         "test_case": i + 1,
-                        "error": f"Runtime error: {str(e)}",
+                        "error": error,
                         "input": test_case["input"],
-                        "hidden": test_case.get("hidden", False)
+                        "execution_time": case["execution_time"],
+                        "hidden": hidden
                     })
-                    if not test_case.get("hidden", False):
-                        print(f"{Fore.RED}❌ Test {i + 1}: Runtime Error{Style.RESET_ALL}")
-                        print(f"   Error: {str(e)}")
+                    if not hidden:
+                        print(f"{Fore.RED}❌ Test {i + 1}: {error}{Style.RESET_ALL}")
             
             # Calculate score
             total_tests = len(test_cases)
@@ -7,41 +7,33 @@ Inspired by interactive coding platforms and online IDEs:
 - Code sharing and saving features
 """
 
-import sys
-import io
-import contextlib
-import traceback
-import ast
 import os
 import json
-import time
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 import colorama
 from colorama import Fore, Style
+from .sandbox import sandbox_pool, check_code_safety, SandboxPool, ALLOWED_MODULES, BLOCKED_FUNCTIONS
+from .result_cache import result_cache, ExecutionResultCache
 
 class CodeRunner:
     """Safe Python code execution environment"""
     
-    def __init__(self, playground_dir: str = "data/playground"):
+    def __init__(self, playground_dir: str = "data/playground", sandbox: Optional[SandboxPool] = None,
+                 cache: Optional[ExecutionResultCache] = None):
         self.playground_dir = playground_dir
+        self.sandbox = sandbox or sandbox_pool
+        self.result_cache = cache or result_cache
         self.execution_history = []
         self.saved_snippets = {}
         self.ensure_playground_dir()
         self.load_saved_snippets()
         
-        # Restricted imports for safety
-        self.allowed_modules = {
-            'math', 'random', 'datetime', 'json', 'os', 'sys',
-            'collections', 'itertools', 'functools', 're',
-            'string', 'time', 'calendar', 'decimal', 'fractions'
-        }
+        # Restricted imports for safety (the sandbox enforces the same set at runtime)
+        self.allowed_modules = set(ALLOWED_MODULES)
         
         # Dangerous functions to block
-        self.blocked_functions = {
-            'exec', 'eval', 'compile', '__import__', 'open',
-            'input', 'raw_input', 'file', 'execfile', 'reload'
-        }
+        self.blocked_functions = set(BLOCKED_FUNCTIONS)
     
     def ensure_playground_dir(self):
         """Create playground directory structure"""
@@ -70,41 +62,10 @@ class CodeRunner:
     
     def is_safe_code(self, code: str) -> Tuple[bool, str]:
         """Check if code is safe to execute"""
-        try:
-            # Parse the code to check for dangerous constructs
-            tree = ast.parse(code)
-            
-            for node in ast.walk(tree):
-                # Check for dangerous function calls
-                if isinstance(node, ast.Call):
-                    if isinstance(node.func, ast.Name):
-                        if node.func.id in self.blocked_functions:
-                            return False, f"Blocked function: {node.func.id}"
-                
-                # Check for dangerous imports
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        if alias.name not in self.allowed_modules:
-                            return False, f"Import not allowed: {alias.name}"
-                
-                if isinstance(node, ast.ImportFrom):
-                    if node.module and node.module not in self.allowed_modules:
-                        return False, f"Import not allowed: {node.module}"
-                
-                # Check for file operations
-                if isinstance(node, ast.Attribute):
-                    if node.attr in ['open', 'read', 'write', 'remove', 'rmdir']:
-                        return False, f"File operation not allowed: {node.attr}"
-            
-            return True, "Code is safe"
-            
-        except SyntaxError as e:
-            return False, f"Syntax error: {e}"
-        except Exception as e:
-            return False, f"Code analysis error: {e}"
+        return check_code_safety(code, self.allowed_modules, self.blocked_functions)
     
     def execute_code(self, code: str, timeout: int = 5) -> Dict[str, Any]:
-        """Execute Python code safely and return results"""
+        """Execute Python code in the sandbox pool and return results"""
         # Check if code is safe
         is_safe, safety_message = self.is_safe_code(code)
         if not is_safe:
@@ -115,108 +76,14 @@ class CodeRunner:
                 "execution_time": 0
             }
         
-        # Capture stdout and stderr
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
+        # Run in an isolated worker process with CPU, memory and time limits,
+        # reusing the result of an identical earlier run when there is one
+        result = self.result_cache.get_or_run(code, lambda: self.sandbox.run(code, timeout=timeout))
         
-        stdout_capture = io.StringIO()
-        stderr_capture = io.StringIO()
+        # Add to execution history
+        self.add_to_history(code, result)
         
-        start_time = time.time()
-        
-        try:
-            # Redirect output
-            sys.stdout = stdout_capture
-            sys.stderr = stderr_capture
-            
-            # Create a restricted execution environment
-            exec_globals = {
-                '__builtins__': {
-                    'print': print,
-                    'len': len,
-                    'range': range,
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'bool': bool,
-                    'list': list,
-                    'dict': dict,
-                    'tuple': tuple,
-                    'set': set,
-                    'abs': abs,
-                    'max': max,
-                    'min': min,
-                    'sum': sum,
-                    'sorted': sorted,
-                    'reversed': reversed,
-                    'enumerate': enumerate,
-                    'zip': zip,
-                    'type': type,
-                    'isinstance': isinstance,
-                    'hasattr': hasattr,
-                    'getattr': getattr,
-                    'setattr': setattr,
-                    'round': round,
-                    'pow': pow,
-                    'divmod': divmod,
-                    'chr': chr,
-                    'ord': ord,
-                    'hex': hex,
-                    'oct': oct,
-                    'bin': bin,
-                    'format': format,
-                    'repr': repr,
-                    'ascii': ascii,
-                    'all': all,
-                    'any': any,
-                    'filter': filter,
-                    'map': map,
-                }
-            }
-            
-            exec_locals = {}
-            
-            # Execute the code
-            exec(code, exec_globals, exec_locals)
-            
-            execution_time = time.time() - start_time
-            
-            # Get output
-            output = stdout_capture.getvalue()
-            error_output = stderr_capture.getvalue()
-            
-            result = {
-                "success": True,
-                "output": output,
-                "error": error_output if error_output else None,
-                "execution_time": execution_time,
-                "variables": {k: str(v) for k, v in exec_locals.items() if not k.startswith('_')}
-            }
-            
-            # Add to execution history
-            self.add_to_history(code, result)
-            
-            return result
-            
-        except Exception as e:
-            execution_time = time.time() - start_time
-            error_message = f"{type(e).__name__}: {str(e)}"
-            
-            result = {
-                "success": False,
-                "output": stdout_capture.getvalue(),
-                "error": error_message,
-                "execution_time": execution_time,
-                "traceback": traceback.format_exc()
-            }
-            
-            self.add_to_history(code, result)
-            return result
-            
-        finally:
-            # Restore stdout and stderr
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
+        return result
     
     def add_to_history(self, code: str, result: Dict[str, Any]):
         """Add execution to history"""
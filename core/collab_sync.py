@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Collaborative Code Sync
+Server side of operational-transform editing for live coding sessions:
+- Edits travel as small operations, not whole documents: a list of
+  components where an int > 0 retains, an int < 0 deletes and a str
+  inserts (the ot.js wire format)
+- The server orders operations by revision and transforms a late
+  operation against the ones it missed, so cost per edit depends on the
+  edit and the missed history, not on the document size
+- Text is held in a chunked rope, so applying an edit is O(log n + chunk)
+- Late joiners get a periodic snapshot plus the operations after it
+- Cursors are kept in document coordinates (moved by every edit) and
+  broadcast in coalesced batches
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Any, Tuple, Union
+
+Component = Union[int, str]
+Operation = List[Component]
+
+class OperationError(ValueError):
+    """Operation does not fit the document or is malformed"""
+
+class StaleRevisionError(OperationError):
+    """Operation is based on a revision older than the kept history; the client must resync"""
+
+# Operations
+
+def _push(op: Operation, component: Component):
+    """Append a component, merging with the previous one of the same kind"""
+    if isinstance(component, str):
+        if not component:
+            return
+        if op and isinstance(op[-1], str):
+            op[-1] += component
+        elif op and isinstance(op[-1], int) and op[-1] < 0:
+            # Keep inserts before deletes so equal operations have one form
+            if len(op) > 1 and isinstance(op[-2], str):
+                op[-2] += component
+            else:
+                op.insert(len(op) - 1, component)
+        else:
+            op.append(component)
+    elif component:
+        if op and isinstance(op[-1], int) and (op[-1] > 0) == (component > 0):
+            op[-1] += component
+        else:
+            op.append(component)
+
+def validate(op: Any) -> Operation:
+    """Check an operation received from a client and return it normalized"""
+    if not isinstance(op, list):
+        raise OperationError("Operation must be a list")
+    normalized: Operation = []
+    for component in op:
+        if isinstance(component, bool) or not isinstance(component, (int, str)):
+            raise OperationError("Operation components must be ints or strings")
+        _push(normalized, component)
+    if normalized and isinstance(normalized[-1], int) and normalized[-1] > 0:
+        normalized.pop()
+    return normalized
+
+def base_length(op: Operation) -> int:
+    """Document length the operation applies to (trailing retain may be omitted)"""
+    return sum(abs(c) for c in op if isinstance(c, int))
+
+def transform(a: Operation, b: Operation) -> Tuple[Operation, Operation]:
+    """(a', b') such that applying a then b' equals applying b then a'; a's inserts go first"""
+    a_prime: Operation = []
+    b_prime: Operation = []
+    a_items, b_items = list(a), list(b)
+    # Omitted trailing retains: pad the shorter operation
+    gap = base_length(a) - base_length(b)
+    if gap > 0:
+        b_items.append(gap)
+    elif gap < 0:
+        a_items.append(-gap)
+
+    i = j = 0
+    op1 = a_items[0] if a_items else None
+    op2 = b_items[0] if b_items else None
+    while op1 is not None or op2 is not None:
+        if isinstance(op1, str):
+            _push(a_prime, op1)
+            _push(b_prime, len(op1))
+            i += 1
+            op1 = a_items[i] if i < len(a_items) else None
+            continue
+        if isinstance(op2, str):
+            _push(a_prime, len(op2))
+            _push(b_prime, op2)
+            j += 1
+            op2 = b_items[j] if j < len(b_items) else None
+            continue
+        if op1 is None or op2 is None:
+            raise OperationError("Operations do not apply to the same document")
+
+        length = min(abs(op1), abs(op2))
+        if op1 > 0 and op2 > 0:
+            _push(a_prime, length)
+            _push(b_prime, length)
+        elif op1 < 0 and op2 > 0:
+            _push(a_prime, -length)
+        elif op1 > 0 and op2 < 0:
+            _push(b_prime, -length)
+        # Both delete the same text: nothing left to do for either
+
+        op1 = op1 - length if op1 > 0 else op1 + length
+        op2 = op2 - length if op2 > 0 else op2 + length
+        if op1 == 0:
+            i += 1
+            op1 = a_items[i] if i < len(a_items) else None
+        if op2 == 0:
+            j += 1
+            op2 = b_items[j] if j < len(b_items) else None
+    return a_prime, b_prime
+
+def transform_index(op: Operation, index: int) -> int:
+    """Where a cursor at index ends up after op"""
+    new_index = index
+    for component in op:
+        if isinstance(component, str):
+            new_index += len(component)
+        elif component > 0:
+            index -= component
+        else:
+            new_index -= min(index, -component)
+            index += component
+        if index < 0:
+            break
+    return new_index
+
+# Text storage
+
+class Rope:
+    """Text as chunks with a Fenwick tree of chunk lengths; an edit costs O(log n + chunk size)"""
+
+    CHUNK = 512
+
+    def __init__(self, text: str = ""):
+        self._chunks = [text[i:i + self.CHUNK] for i in range(0, len(text), self.CHUNK)]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._chunks = [chunk for chunk in self._chunks if chunk] or [""]
+        self._empty = 0
+        self._length = 0
+        self._tree = [0] * (len(self._chunks) + 1)
+        for n, chunk in enumerate(self._chunks, 1):
+            self._tree[n] += len(chunk)
+            parent = n + (n & -n)
+            if parent <= len(self._chunks):
+                self._tree[parent] += self._tree[n]
+            self._length += len(chunk)
+        self._top = 1 << (len(self._chunks).bit_length() - 1)
+
+    def _add(self, index: int, delta: int):
+        n = index + 1
+        while n < len(self._tree):
+            self._tree[n] += delta
+            n += n & -n
+        self._length += delta
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """Chunk index and offset of a position (the end of the text maps to the last chunk)"""
+        if position >= self._length:
+            return len(self._chunks) - 1, len(self._chunks[-1])
+        index, remaining, bit = 0, position, self._top
+        while bit:
+            following = index + bit
+            if following < len(self._tree) and self._tree[following] <= remaining:
+                index = following
+                remaining -= self._tree[following]
+            bit >>= 1
+        return index, remaining
+
+    def __len__(self) -> int:
+        return self._length
+
+    def insert(self, position: int, text: str):
+        index, offset = self._locate(position)
+        chunk = self._chunks[index]
+        updated = chunk[:offset] + text + chunk[offset:]
+        if len(updated) > 2 * self.CHUNK:
+            self._chunks[index:index + 1] = [updated[i:i + self.CHUNK]
+                                             for i in range(0, len(updated), self.CHUNK)]
+            self._rebuild()
+        else:
+            self._chunks[index] = updated
+            self._add(index, len(text))
+
+    def delete(self, position: int, count: int):
+        while count > 0:
+            index, offset = self._locate(position)
+            chunk = self._chunks[index]
+            taken = min(count, len(chunk) - offset)
+            self._chunks[index] = chunk[:offset] + chunk[offset + taken:]
+            self._add(index, -taken)
+            if not self._chunks[index]:
+                self._empty += 1
+            count -= taken
+        if self._empty > len(self._chunks) // 2:
+            self._rebuild()
+
+    def __str__(self) -> str:
+        return "".join(self._chunks)
+
+# Sessions
+
+class CollabDocument:
+    """Revisioned document for one live coding session"""
+
+    def __init__(self, text: str = "", history_limit: int = 1000, snapshot_every: int = 200):
+        self._lock = threading.RLock()
+        self._rope = Rope(text)
+        self.revision = 0
+        # Operation that produced revision r is at position r - (revision - len(history)) - 1
+        self._history: deque = deque(maxlen=history_limit)
+        self.snapshot_every = min(snapshot_every, history_limit)
+        self._snapshot = (0, text)
+        # user -> {"position", "selection_end"} in current document coordinates
+        self.cursors: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rope)
+
+    def text(self) -> str:
+        with self._lock:
+            return str(self._rope)
+
+    def _since(self, revision: int) -> List[Tuple[int, str, Operation]]:
+        oldest = self.revision - len(self._history)
+        if revision < oldest or revision > self.revision:
+            raise StaleRevisionError(f"Revision {revision} is outside {oldest}..{self.revision}")
+        return list(self._history)[revision - oldest:]
+
+    def _apply(self, op: Operation):
+        if base_length(op) > len(self._rope):
+            raise OperationError("Operation is longer than the document")
+        position = 0
+        for component in op:
+            if isinstance(component, str):
+                self._rope.insert(position, component)
+                position += len(component)
+            elif component > 0:
+                position += component
+            else:
+                self._rope.delete(position, -component)
+
+    def receive(self, user_id: str, revision: int, op: Any) -> Tuple[int, Operation]:
+        """Apply a client operation made against revision; returns the new revision and
+        the operation as applied (to broadcast)"""
+        op = validate(op)
+        with self._lock:
+            for _, _, concurrent in self._since(revision):
+                op, _ = transform(op, concurrent)
+            self._apply(op)
+            self.revision += 1
+            self._history.append((self.revision, user_id, op))
+            for cursor in self.cursors.values():
+                for key in ("position", "selection_end"):
+                    cursor[key] = transform_index(op, cursor[key])
+            return self.revision, op
+
+    def replace(self, user_id: str, text: str) -> Tuple[int, Operation]:
+        """Apply a whole-text replacement as the single edit spanning the changed middle"""
+        with self._lock:
+            current = str(self._rope)
+            prefix = 0
+            limit = min(len(current), len(text))
+            while prefix < limit and current[prefix] == text[prefix]:
+                prefix += 1
+            suffix = 0
+            while (suffix < limit - prefix and
+                   current[len(current) - 1 - suffix] == text[len(text) - 1 - suffix]):
+                suffix += 1
+            op: Operation = []
+            _push(op, prefix)
+            _push(op, text[prefix:len(text) - suffix])
+            _push(op, -(len(current) - prefix - suffix))
+            _push(op, suffix)
+            return self.receive(user_id, self.revision, op)
+
+    def set_cursor(self, user_id: str, revision: int, position: int, selection_end: int = None):
+        """Record a cursor given in the coordinates of revision"""
+        with self._lock:
+            selection_end = position if selection_end is None else selection_end
+            for _, _, op in self._since(revision):
+                position = transform_index(op, position)
+                selection_end = transform_index(op, selection_end)
+            length = len(self._rope)
+            self.cursors[user_id] = {"position": max(0, min(position, length)),
+                                     "selection_end": max(0, min(selection_end, length))}
+
+    def remove_cursor(self, user_id: str):
+        with self._lock:
+            self.cursors.pop(user_id, None)
+
+    def sync(self, since_revision: int = None) -> Dict[str, Any]:
+        """State for a (re)joining client: only the missed operations when they are still
+        kept, otherwise the latest snapshot plus the operations after it"""
+        with self._lock:
+            if since_revision is not None:
+                try:
+                    missed = self._since(since_revision)
+                    return {"revision": self.revision, "base_revision": since_revision,
+                            "ops": [op for _, _, op in missed], "cursors": dict(self.cursors)}
+                except StaleRevisionError:
+                    pass
+            snapshot_revision, snapshot = self._snapshot
+            if (self.revision - snapshot_revision >= self.snapshot_every
+                    or snapshot_revision < self.revision - len(self._history)):
+                self._snapshot = snapshot_revision, snapshot = self.revision, str(self._rope)
+            return {"revision": self.revision, "base_revision": snapshot_revision, "snapshot": snapshot,
+                    "ops": [op for _, _, op in self._since(snapshot_revision)],
+                    "cursors": dict(self.cursors)}
+
+class CursorBatcher:
+    """Coalesces cursor moves so each session broadcasts at most once per interval"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._dirty: Dict[str, set] = {}
+
+    def touch(self, session_id: str, user_id: str):
+        """Mark a user's cursor as changed"""
+        with self._lock:
+            self._dirty.setdefault(session_id, set()).add(user_id)
+
+    def discard(self, session_id: str):
+        """Forget pending cursor moves of a closed session"""
+        with self._lock:
+            self._dirty.pop(session_id, None)
+
+    def drain(self) -> Dict[str, set]:
+        """Sessions with changed cursors since the last drain, and which users moved"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            return dirty
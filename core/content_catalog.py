@@ -0,0 +1,345 @@
+"""
+Content Catalog Module
+Read-only index of lessons, quizzes and challenges:
+- Built once from the built-in curriculum and the data directories
+- O(1) lookups by id and precomputed next/prev lesson links
+- Frozen objects shared safely between requests
+- reload() rebuilds the whole catalog and swaps it in atomically
+- version() is a hash of the content, for cache keys and ETags
+- Content files are read through data/content.pack when it has been built
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+from .error_handler import error_handler
+from .content_pack import PackedContent
+
+class FrozenDict(dict):
+    """dict that refuses modification; still serializes and renders like a dict"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Catalog content is read-only; copy it with dict() before changing it")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to FrozenDict and lists to tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value: Any) -> Any:
+    """Mutable deep copy of frozen content"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+EMPTY_LESSON_CONTENT = freeze({
+    'introduction': 'This lesson content is being developed. Check back soon!',
+    'concepts': []
+})
+
+EMPTY_CHALLENGE_CONTENT = freeze({
+    'description': 'This challenge is being developed. Check back soon!',
+    'instructions': [],
+    'starter_code': '# Challenge content coming soon',
+    'test_cases': [],
+    'hints': []
+})
+
+class _Snapshot:
+    """One immutable build of the catalog"""
+
+    def __init__(self):
+        self.lessons = ()
+        self.quizzes = ()
+        self.challenges = ()
+        self.lesson_index = {}
+        self.quiz_index = {}
+        self.challenge_index = {}
+        self.lesson_content = {}
+        self.challenge_content = {}
+        self.lesson_links = {}  # lesson id -> (prev id, next id)
+        self.version = ""
+        self.built_at = None
+
+class ContentCatalog:
+    """Shared, read-only catalog of learning content"""
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
+        self.content = PackedContent(data_dir)
+        self._sources = {}
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._reloads = 0
+
+    def register_builtin(self, lessons: Callable[[], List[Dict]] = None,
+                         lesson_content: Callable[[str], Dict] = None,
+                         quizzes: Callable[[], List[Dict]] = None,
+                         challenges: Callable[[], List[Dict]] = None,
+                         challenge_content: Callable[[str], Dict] = None):
+        """Register loaders for the built-in curriculum; they are called on each reload"""
+        for name, loader in (('lessons', lessons), ('lesson_content', lesson_content),
+                             ('quizzes', quizzes), ('challenges', challenges),
+                             ('challenge_content', challenge_content)):
+            if loader is not None:
+                self._sources[name] = loader
+
+    def reload(self) -> Dict[str, int]:
+        """Rebuild the catalog from its sources and swap it in"""
+        with self._lock:
+            self.content.refresh()
+            snapshot = self._build()
+            self._snapshot = snapshot
+            self._reloads += 1
+        return self.stats()
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build()
+                    self._reloads += 1
+                snapshot = self._snapshot
+        return snapshot
+
+    # Building
+
+    def _build(self) -> _Snapshot:
+        """Load every source into a fresh snapshot"""
+        lessons, lesson_content, sequences = self._load_lessons()
+        quizzes = self._merge(self._call('quizzes'), self._load_file_quizzes())
+        challenges, challenge_content = self._load_challenges()
+
+        snapshot = _Snapshot()
+        # Same content gives the same version in every worker and after restarts
+        canonical = json.dumps([lessons, quizzes, challenges, lesson_content, challenge_content],
+                               sort_keys=True, default=str)
+        snapshot.version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        snapshot.lessons = freeze(lessons)
+        snapshot.quizzes = freeze(quizzes)
+        snapshot.challenges = freeze(challenges)
+        snapshot.lesson_index = {lesson['id']: lesson for lesson in snapshot.lessons}
+        snapshot.quiz_index = {quiz['id']: quiz for quiz in snapshot.quizzes}
+        snapshot.challenge_index = {challenge['id']: challenge for challenge in snapshot.challenges}
+        snapshot.lesson_content = {key: freeze(value) for key, value in lesson_content.items()}
+        snapshot.challenge_content = {key: freeze(value) for key, value in challenge_content.items()}
+
+        # Links run within a sequence: the built-in curriculum or one file track
+        for sequence in sequences:
+            ids = [lesson_id for lesson_id in sequence if lesson_id in snapshot.lesson_index]
+            for position, lesson_id in enumerate(ids):
+                previous_id = ids[position - 1] if position > 0 else None
+                next_id = ids[position + 1] if position < len(ids) - 1 else None
+                snapshot.lesson_links[lesson_id] = (previous_id, next_id)
+
+        snapshot.built_at = datetime.now().isoformat()
+        return snapshot
+
+    def _call(self, source: str, *args) -> Any:
+        loader = self._sources.get(source)
+        if loader is None:
+            return [] if not args else None
+        try:
+            return loader(*args)
+        except Exception as e:
+            error_handler.handle_error(e, context={"operation": "load_catalog_source", "source": source})
+            return [] if not args else None
+
+    def _merge(self, *groups: List[Dict]) -> List[Dict]:
+        """Concatenate item lists, later items replacing earlier ones with the same id"""
+        merged = {}
+        for group in groups:
+            for item in group or []:
+                if isinstance(item, dict) and item.get('id'):
+                    merged[item['id']] = item
+        return list(merged.values())
+
+    def _read_json(self, path: str) -> Optional[Any]:
+        try:
+            return self.content.read_json(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            error_handler.handle_error(e, context={"operation": "load_catalog_file", "path": path})
+            return None
+
+    def _load_lessons(self) -> Tuple[List[Dict], Dict[str, Dict], List[List[str]]]:
+        builtin = self._call('lessons') or []
+        content = {}
+        sequences = [[lesson['id'] for lesson in builtin if isinstance(lesson, dict) and lesson.get('id')]]
+
+        if 'lesson_content' in self._sources:
+            for lesson_id in sequences[0]:
+                lesson_content = self._call('lesson_content', lesson_id)
+                if lesson_content:
+                    content[lesson_id] = lesson_content
+
+        # Lesson tracks from data/lessons/lesson_index.json with per-lesson content files
+        file_lessons = []
+        lessons_dir = os.path.join(self.data_dir, "lessons")
+        index = self._read_json(os.path.join(lessons_dir, "lesson_index.json")) or {}
+        for track, track_data in index.items():
+            sequence = []
+            for lesson in track_data.get('lessons', []):
+                if not lesson.get('id'):
+                    continue
+                lesson = dict(lesson)
+                lesson.setdefault('difficulty', track)
+                lesson.setdefault('category', track)
+                lesson.setdefault('points', 10)
+                lesson.setdefault('prerequisites', [sequence[-1]] if sequence else [])
+                lesson['track'] = track
+                file_lessons.append(lesson)
+                sequence.append(lesson['id'])
+
+                lesson_file = self._read_json(os.path.join(lessons_dir, track, f"{lesson['id']}.json"))
+                if lesson_file and isinstance(lesson_file.get('content'), dict):
+                    content[lesson['id']] = lesson_file['content']
+            sequences.append(sequence)
+
+        # Admin edits from /api/admin/save_lesson override or extend the curriculum
+        custom_lessons = []
+        custom = self._read_json(os.path.join(self.data_dir, "custom_lessons.json")) or {}
+        base = {lesson['id']: lesson for lesson in builtin + file_lessons if isinstance(lesson, dict) and lesson.get('id')}
+        for lesson_id, edit in custom.items():
+            lesson = dict(base.get(lesson_id, {}))
+            edit = dict(edit)
+            text = edit.pop('content', None)
+            lesson.update(edit)
+            lesson['id'] = lesson_id
+            custom_lessons.append(lesson)
+            if text:
+                content[lesson_id] = {'introduction': text, 'concepts': []}
+            if lesson_id not in base:
+                sequences[0].append(lesson_id)
+
+        return self._merge(builtin, file_lessons, custom_lessons), content, sequences
+
+    def _load_file_quizzes(self) -> List[Dict]:
+        """Quizzes from data/quizzes/<quiz_id>.json"""
+        quizzes = []
+        for path in self.content.glob(os.path.join(self.data_dir, "quizzes", "*.json")):
+            data = self._read_json(path)
+            if not isinstance(data, dict):
+                continue
+            quiz_id = os.path.splitext(os.path.basename(path))[0]
+            questions = data.get('questions', [])
+            quizzes.append({
+                'id': quiz_id,
+                'title': data.get('title', quiz_id.replace('_', ' ').title()),
+                'description': data.get('description', ''),
+                'difficulty': data.get('difficulty', 'beginner'),
+                'time_limit': data.get('time_limit', 300),
+                'points': data.get('points', 20),
+                'category': data.get('category', quiz_id),
+                'questions': len(questions),
+                'questions_data': questions
+            })
+        return quizzes
+
+    def _load_challenges(self) -> Tuple[List[Dict], Dict[str, Dict]]:
+        builtin = self._call('challenges') or []
+        content = {}
+        if 'challenge_content' in self._sources:
+            for challenge in builtin:
+                challenge_content = self._call('challenge_content', challenge.get('id'))
+                if challenge_content:
+                    content[challenge['id']] = challenge_content
+
+        # Function challenges from data/challenges/<difficulty>/<category>/<id>.json
+        file_challenges = []
+        pattern = os.path.join(self.data_dir, "challenges", "*", "*", "*.json")
+        for path in self.content.glob(pattern):
+            data = self._read_json(path)
+            if not isinstance(data, dict) or not data.get('id'):
+                continue
+            file_challenges.append(data)
+
+            params = ", ".join(param.split(':')[0].strip() for param in data.get('parameters', []))
+            content[data['id']] = {
+                'description': data.get('description', ''),
+                'instructions': [f"Create a function named `{data.get('function_name')}`"],
+                'starter_code': f"def {data.get('function_name')}({params}):\n    # Your code here\n    pass",
+                'test_cases': [
+                    {'input': case.get('input'), 'args': case.get('input', []),
+                     'expected': case.get('expected'), 'hidden': case.get('hidden', False)}
+                    for case in data.get('test_cases', [])
+                ],
+                'hints': data.get('hints', [])
+            }
+
+        return self._merge(builtin, file_challenges), content
+
+    # Lookups
+
+    def lessons(self) -> Tuple[FrozenDict, ...]:
+        return self._current().lessons
+
+    def quizzes(self) -> Tuple[FrozenDict, ...]:
+        return self._current().quizzes
+
+    def challenges(self) -> Tuple[FrozenDict, ...]:
+        return self._current().challenges
+
+    def get_lesson(self, lesson_id: str) -> Optional[FrozenDict]:
+        return self._current().lesson_index.get(lesson_id)
+
+    def get_quiz(self, quiz_id: str) -> Optional[FrozenDict]:
+        return self._current().quiz_index.get(quiz_id)
+
+    def get_challenge(self, challenge_id: str) -> Optional[FrozenDict]:
+        return self._current().challenge_index.get(challenge_id)
+
+    def lesson_content(self, lesson_id: str) -> FrozenDict:
+        return self._current().lesson_content.get(lesson_id, EMPTY_LESSON_CONTENT)
+
+    def challenge_content(self, challenge_id: str) -> FrozenDict:
+        return self._current().challenge_content.get(challenge_id, EMPTY_CHALLENGE_CONTENT)
+
+    def next_lesson_id(self, lesson_id: str) -> Optional[str]:
+        return self._current().lesson_links.get(lesson_id, (None, None))[1]
+
+    def prev_lesson_id(self, lesson_id: str) -> Optional[str]:
+        return self._current().lesson_links.get(lesson_id, (None, None))[0]
+
+    def version(self) -> str:
+        """Hash of the current content; changes whenever any content changes"""
+        return self._current().version
+
+    def stats(self) -> Dict[str, Any]:
+        """Catalog statistics"""
+        snapshot = self._current()
+        return {
+            "version": snapshot.version,
+            "lessons": len(snapshot.lessons),
+            "quizzes": len(snapshot.quizzes),
+            "challenges": len(snapshot.challenges),
+            "reloads": self._reloads,
+            "built_at": snapshot.built_at,
+            "content_pack": self.content.stats()
+        }
+
+# Global content catalog instance
+content_catalog = ContentCatalog()
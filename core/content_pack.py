@@ -0,0 +1,264 @@
+"""
+Content Pack Module
+Single-file, memory-mapped form of the JSON content under data/:
+- build_pack() packs data/lessons, data/quizzes and data/challenges into
+  data/content.pack: zlib-compressed JSON records plus a sorted offset table
+- ContentPack mmaps the file; opening it reads only the header, lookups
+  binary-search the table and decode just the requested record, and every
+  worker shares the same pages through the OS cache
+- PackedContent reads content paths through the pack when one is present
+  and from the files otherwise, so readers work the same either way
+
+The pack is a build artifact: rebuild it after editing content files with
+    python -m core.content_pack [data_dir] [output]
+"""
+
+import fnmatch
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+from .error_handler import error_handler
+
+PACK_FILENAME = "content.pack"
+PACKED_SECTIONS = ("lessons", "quizzes", "challenges")
+
+MAGIC = b"LPYPACK\x01"
+# magic, record count, keys offset, table offset
+HEADER = struct.Struct("<8sIQQ")
+# record offset, record length, key offset (in the keys blob), key length, crc32 of the record
+ENTRY = struct.Struct("<QIIHI")
+
+class ContentPackError(Exception):
+    """Malformed or corrupted content pack"""
+    pass
+
+def build_pack(data_dir: str = "data", output: Optional[str] = None,
+               sections: Tuple[str, ...] = PACKED_SECTIONS) -> Dict[str, Any]:
+    """Pack every JSON file under the given sections of data_dir.
+
+    Keys are paths relative to data_dir with forward slashes
+    ("lessons/beginner/day_01.json"). Files that do not parse are skipped.
+    The pack is written to a temporary file and renamed into place, so
+    processes with the old pack mapped keep reading it undisturbed.
+    """
+    output = output or os.path.join(data_dir, PACK_FILENAME)
+    records = {}
+    skipped = []
+    for section in sections:
+        for directory, dirnames, filenames in os.walk(os.path.join(data_dir, section)):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.startswith('.') or not filename.endswith('.json'):
+                    continue
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, data_dir).replace(os.sep, '/')
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        document = json.load(f)
+                except (OSError, ValueError) as e:
+                    skipped.append(key)
+                    error_handler.handle_error(e, context={"operation": "build_content_pack", "path": path})
+                    continue
+                records[key.encode('utf-8')] = zlib.compress(
+                    json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), 9)
+
+    keys = sorted(records)
+    table, keys_blob = [], bytearray()
+    offset = HEADER.size
+    for key in keys:
+        record = records[key]
+        table.append(ENTRY.pack(offset, len(record), len(keys_blob), len(key), zlib.crc32(record)))
+        keys_blob += key
+        offset += len(record)
+
+    temp_file = f"{output}.tmp"
+    with open(temp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(keys), offset, offset + len(keys_blob)))
+        for key in keys:
+            f.write(records[key])
+        f.write(keys_blob)
+        f.write(b"".join(table))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, output)
+
+    return {"records": len(keys), "bytes": offset + len(keys_blob) + len(table) * ENTRY.size,
+            "skipped": skipped, "path": output}
+
+class ContentPack:
+    """Read-only view of a content pack file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if stat.st_size < HEADER.size:
+                raise ContentPackError(f"{path} is too short to be a content pack")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._keys_offset, self._table_offset = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or self._table_offset + self._count * ENTRY.size != stat.st_size:
+            self._map.close()
+            raise ContentPackError(f"{path} is not a content pack of this version")
+        self._decoded = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key.encode('utf-8')) is not None
+
+    def _entry(self, position: int) -> Tuple[int, int, int, int, int]:
+        return ENTRY.unpack_from(self._map, self._table_offset + position * ENTRY.size)
+
+    def _key(self, position: int) -> bytes:
+        _, _, key_offset, key_length, _ = self._entry(position)
+        start = self._keys_offset + key_offset
+        return self._map[start:start + key_length]
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, key: bytes) -> Optional[int]:
+        position = self._lower_bound(key)
+        if position < self._count and self._key(position) == key:
+            return position
+        return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Decoded JSON document for a key; a fresh object on every call"""
+        position = self._find(key.encode('utf-8'))
+        if position is None:
+            return None
+        offset, length, _, _, checksum = self._entry(position)
+        record = self._map[offset:offset + length]
+        if zlib.crc32(record) != checksum:
+            raise ContentPackError(f"Corrupted record {key} in {self.path}")
+        self._decoded += 1
+        return json.loads(zlib.decompress(record).decode('utf-8'))
+
+    def keys(self, prefix: str = "") -> Iterator[str]:
+        """Keys starting with prefix, in sorted order"""
+        encoded = prefix.encode('utf-8')
+        for position in range(self._lower_bound(encoded), self._count):
+            key = self._key(position)
+            if not key.startswith(encoded):
+                break
+            yield key.decode('utf-8')
+
+    def glob(self, pattern: str) -> List[str]:
+        """Keys matching a glob pattern segment by segment ('*' does not cross '/')"""
+        parts = pattern.split('/')
+        literal = []
+        for part in parts:
+            if any(char in part for char in '*?['):
+                break
+            literal.append(part)
+        prefix = '/'.join(literal)
+        if literal and len(literal) < len(parts):
+            prefix += '/'
+        return [key for key in self.keys(prefix)
+                if len(key.split('/')) == len(parts)
+                and all(fnmatch.fnmatchcase(name, part) for name, part in zip(key.split('/'), parts))]
+
+    def close(self):
+        self._map.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pack statistics"""
+        return {"path": self.path, "records": self._count, "bytes": self.identity[2], "decoded": self._decoded}
+
+class PackedContent:
+    """JSON content under a data directory, read through its content pack when present"""
+
+    def __init__(self, data_dir: str = "data", pack_file: Optional[str] = None,
+                 sections: Tuple[str, ...] = PACKED_SECTIONS):
+        self.data_dir = data_dir
+        self.pack_file = pack_file or os.path.join(data_dir, PACK_FILENAME)
+        self.sections = sections
+        self.pack = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Map the pack file if it appeared or was rebuilt; True if the mapping changed"""
+        with self._lock:
+            try:
+                stat = os.stat(self.pack_file)
+                identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                identity = None
+            current = self.pack.identity if self.pack else None
+            if identity == current:
+                return False
+            pack = None
+            if identity is not None:
+                try:
+                    pack = ContentPack(self.pack_file)
+                except (OSError, ValueError, ContentPackError) as e:
+                    error_handler.handle_error(e, context={"operation": "open_content_pack",
+                                                           "path": self.pack_file})
+            # The old mapping is left to the garbage collector: readers may still hold it
+            self.pack = pack
+            return True
+
+    def _key(self, path: str) -> Optional[str]:
+        """Pack key for a path, or None when the pack does not cover it"""
+        if self.pack is None:
+            return None
+        relative = os.path.relpath(path, self.data_dir).replace(os.sep, '/')
+        if relative.split('/', 1)[0] not in self.sections:
+            return None
+        return relative
+
+    def read_json(self, path: str) -> Any:
+        """Parsed JSON for a content path; FileNotFoundError when it does not exist"""
+        pack = self.pack
+        key = self._key(path)
+        if key is None:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        document = pack.get(key)
+        if document is None:
+            raise FileNotFoundError(path)
+        return document
+
+    def exists(self, path: str) -> bool:
+        key = self._key(path)
+        return os.path.exists(path) if key is None else key in self.pack
+
+    def glob(self, pattern: str) -> List[str]:
+        """Paths matching a glob pattern, sorted"""
+        key = self._key(pattern)
+        if key is None:
+            return sorted(glob.glob(pattern))
+        return [os.path.join(self.data_dir, *match.split('/')) for match in self.pack.glob(key)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Where content is read from"""
+        return self.pack.stats() if self.pack else {"path": None}
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the content pack from data/ JSON files")
+    parser.add_argument('data_dir', nargs='?', default="data")
+    parser.add_argument('output', nargs='?', default=None)
+    arguments = parser.parse_args()
+    result = build_pack(arguments.data_dir, arguments.output)
+    print(f"Packed {result['records']} records ({result['bytes']} bytes) into {result['path']}")
+    for key in result['skipped']:
+        print(f"Skipped unreadable file {key}")
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """
 Database Manager
-Provides safe data operations, backup mechanisms, and data integrity
+Provides safe data operations, backup mechanisms, and data integrity:
+- Atomic writes: compact JSON streamed with a CRC32 trailer, fsynced and
+  renamed into place; reads verify the checksum
+- Incremental backups: hard links where the contents can no longer
+  change, copies only for contents not backed up yet
 """
 
 import json
@@ -11,9 +15,10 @@ import hashlib
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 import threading
 import tempfile
+import zlib
 
 # Try to import fcntl for Unix systems, use alternative for Windows
 try:
@@ -24,6 +29,13 @@ except ImportError:
 
 from .error_handler import error_handler, UserDataError, FileOperationError
 from .validators import validator
+from .schema_compiler import CompiledSchema, compile_schema, format_errors
+
+# Property validators cached by _validate_property before the cache is reset
+MAX_PROPERTY_VALIDATORS = 256
+
+# Last line of files written by safe_write: CHECKSUM_MARKER + 8 hex digits of the CRC32 of the body
+CHECKSUM_MARKER = b"#crc32:"
 
 class DatabaseManager:
     """Safe database operations with backup and recovery"""
@@ -46,6 +58,9 @@ class DatabaseManager:
         self.max_backups = 50
         self.backup_interval = 3600  # 1 hour
         self.last_backup = {}
+        # file path -> (identity of the file when last backed up, that backup)
+        self._backup_sources = {}
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
         
         # Data validation schemas
         self.schemas = {
@@ -54,6 +69,11 @@ class DatabaseManager:
             "quizzes": self._get_quiz_schema(),
             "challenges": self._get_challenge_schema()
         }
+        # Compiled once; validation runs the closures without re-reading the schemas
+        self.validators = {name: compile_schema(schema) for name, schema in self.schemas.items()}
+        # id(property schema) -> compiled validator; each entry keeps its schema
+        # alive, so an id is not reused while it is cached
+        self._property_validators: Dict[int, CompiledSchema] = {}
     
     def _get_file_lock(self, file_path: str) -> threading.Lock:
         """Get or create a lock for a specific file"""
@@ -115,87 +135,202 @@ class DatabaseManager:
             }
         }
     
+    def _validator(self, schema_name: str) -> Optional[CompiledSchema]:
+        """Compiled validator for a schema, recompiled only if the schema was replaced"""
+        schema = self.schemas.get(schema_name)
+        if not schema:
+            return None
+        compiled = self.validators.get(schema_name)
+        if compiled is None or compiled.schema is not schema:
+            compiled = self.validators[schema_name] = compile_schema(schema)
+        return compiled
+    
     def validate_data(self, data: Any, schema_name: str) -> tuple[bool, str]:
-        """Validate data against schema"""
+        """Validate data against schema; the message lists every problem found"""
         try:
-            schema = self.schemas.get(schema_name)
-            if not schema:
+            compiled = self._validator(schema_name)
+            if compiled is None:
                 return False, f"Unknown schema: {schema_name}"
             
-            # Basic validation (simplified - in production use jsonschema library)
-            if schema["type"] == "object":
-                if not isinstance(data, dict):
-                    return False, "Data must be an object"
-                
-                # Check required fields
-                for field in schema.get("required", []):
-                    if field not in data:
-                        return False, f"Missing required field: {field}"
-                
-                # Validate properties
-                for field, value in data.items():
-                    if field in schema.get("properties", {}):
-                        prop_schema = schema["properties"][field]
-                        if not self._validate_property(value, prop_schema):
-                            return False, f"Invalid value for field: {field}"
-            
-            return True, ""
+            errors = compiled.errors(data)
+            return not errors, format_errors(errors)
             
         except Exception as e:
             return False, f"Validation error: {e}"
     
+    def validation_errors(self, data: Any, schema_name: str) -> List[Dict[str, str]]:
+        """Every problem in data as {"location", "message"} entries"""
+        compiled = self._validator(schema_name)
+        if compiled is None:
+            return [{"location": "", "message": f"Unknown schema: {schema_name}"}]
+        return [{"location": location, "message": message} for location, message in compiled.errors(data)]
+    
+    def validate_batch(self, records: Dict[str, Any], schema_name: str) -> Dict[str, List[Dict[str, str]]]:
+        """Validate many records (e.g. every profile in a user file) against one schema.
+
+        Returns the problems per record key; valid records are left out.
+        """
+        compiled = self._validator(schema_name)
+        if compiled is None:
+            raise UserDataError(f"Unknown schema: {schema_name}")
+        return {key: [{"location": location, "message": message} for location, message in errors]
+                for key, errors in compiled.validate_many(records.items()).items()}
+    
     def _validate_property(self, value: Any, prop_schema: Dict) -> bool:
-        """Validate a single property"""
-        prop_type = prop_schema.get("type")
-        
-        if prop_type == "string":
-            if not isinstance(value, str):
-                return False
-            min_len = prop_schema.get("minLength", 0)
-            max_len = prop_schema.get("maxLength", float('inf'))
-            return min_len <= len(value) <= max_len
-        
-        elif prop_type == "integer":
-            if not isinstance(value, int):
-                return False
-            minimum = prop_schema.get("minimum", float('-inf'))
-            maximum = prop_schema.get("maximum", float('inf'))
-            return minimum <= value <= maximum
-        
-        elif prop_type == "array":
-            return isinstance(value, list)
-        
-        return True
+        """Validate a single property (compiled on first use of each schema dict)"""
+        compiled = self._property_validators.get(id(prop_schema))
+        if compiled is None or compiled.schema is not prop_schema:
+            if len(self._property_validators) >= MAX_PROPERTY_VALIDATORS:
+                self._property_validators.clear()
+            compiled = self._property_validators[id(prop_schema)] = compile_schema(prop_schema)
+        return compiled.is_valid(value)
     
+    def _encode(self, data: Any):
+        """Chunks of the file body: compact JSON for dicts and lists, text otherwise"""
+        if isinstance(data, (dict, list)):
+            for chunk in self._encoder.iterencode(data):
+                yield chunk.encode('utf-8')
+        else:
+            yield str(data).encode('utf-8')
+
+    @staticmethod
+    def _decode(raw: bytes) -> Tuple[bytes, bool]:
+        """File body without its checksum trailer, and whether a trailer was present.
+
+        Files written before checksums were added have no trailer and are
+        returned as they are; a trailer that does not match raises
+        UserDataError.
+        """
+        size = len(CHECKSUM_MARKER) + 10  # newline, marker, 8 hex digits, newline
+        trailer = raw[-size:]
+        if len(raw) < size or not trailer.startswith(b"\n" + CHECKSUM_MARKER) or not trailer.endswith(b"\n"):
+            return raw, False
+        body = raw[:-size]
+        if f"{zlib.crc32(body):08x}".encode('ascii') != trailer[-9:-1]:
+            raise UserDataError("Checksum mismatch: the file is damaged or was partially written")
+        return body, True
+
+    def _load(self, path: Path) -> Any:
+        """Read and verify a file written by safe_write (or a plain legacy file)"""
+        with open(path, 'rb') as f:
+            body, _ = self._decode(f.read())
+        text = body.decode('utf-8')
+        return json.loads(text) if path.suffix.lower() == '.json' else text
+
+    @staticmethod
+    def _fsync_directory(directory: Path):
+        """Make a rename in this directory durable (not supported on Windows)"""
+        if os.name == 'nt':
+            return
+        fd = os.open(str(directory), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _write_atomic(self, file_path: Path, chunks) -> int:
+        """Stream chunks plus a checksum trailer into a temp file next to file_path,
+        fsync it and rename it into place; returns the CRC32 of the body"""
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=str(file_path.parent), prefix=f".{file_path.name}.", suffix=".tmp")
+        try:
+            checksum = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    checksum = zlib.crc32(chunk, checksum)
+                    f.write(chunk)
+                f.write(b"\n" + CHECKSUM_MARKER + f"{checksum:08x}".encode('ascii') + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, str(file_path))
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.unlink(temp_name)
+            raise
+        self._fsync_directory(file_path.parent)
+        return checksum
+
+    def _backup_path(self, file_path: Path) -> Path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return self.backup_dir / f"{file_path.stem}_backup_{timestamp}{file_path.suffix}"
+
+    @staticmethod
+    def _identity(stat: os.stat_result) -> Tuple[int, int, int]:
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _link_or_copy(self, source: Path, target: Path, link: bool) -> bool:
+        """Hard link source to target where possible, else copy; True if linked"""
+        if link:
+            try:
+                os.link(str(source), str(target))
+                return True
+            except OSError:
+                # Different filesystem, or links not supported
+                pass
+        shutil.copy2(str(source), str(target))
+        return False
+
     def create_backup(self, file_path: str, force: bool = False) -> Optional[str]:
         """Create backup of a file"""
+        return self._create_backup(file_path, force)
+
+    def create_store_backup(self, store) -> Optional[str]:
+        """Back up a user store (its own consistent snapshot) next to the file backups;
+        list them with get_backup_info(store.storage_path)"""
+        try:
+            store_path = Path(store.storage_path)
+            backup_path = self._backup_path(store_path)
+            store.backup(str(backup_path))
+            self._cleanup_old_backups(store_path.stem)
+            error_handler.logger.info(f"Created backup: {backup_path}")
+            return str(backup_path)
+        except Exception as e:
+            error_handler.handle_error(
+                FileOperationError(f"Failed to back up user store: {e}"),
+                context={"store": getattr(store, "backend_name", None)}
+            )
+            return None
+
+    def _create_backup(self, file_path: str, force: bool = False, replacing: bool = False) -> Optional[str]:
+        """Backups are incremental: nothing is copied for a file unchanged since
+        its last backup (the new backup is a hard link to the previous one), and
+        a file about to be replaced by safe_write is hard linked rather than
+        copied, since its old contents are never written to again"""
         try:
             file_path = Path(file_path)
+            key = str(file_path)
             
             # Check if backup is needed
             if not force:
-                last_backup_time = self.last_backup.get(str(file_path), 0)
+                last_backup_time = self.last_backup.get(key, 0)
                 if time.time() - last_backup_time < self.backup_interval:
                     return None
             
             if not file_path.exists():
                 return None
             
-            # Create backup filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"{file_path.stem}_backup_{timestamp}{file_path.suffix}"
-            backup_path = self.backup_dir / backup_name
+            identity = self._identity(file_path.stat())
+            previous = self._backup_sources.get(key)
+            unchanged = previous is not None and previous[0] == identity and previous[1].exists()
+            if unchanged and not force:
+                # Nothing new to keep
+                self.last_backup[key] = time.time()
+                return None
             
-            # Copy file to backup
-            shutil.copy2(file_path, backup_path)
+            backup_path = self._backup_path(file_path)
+            if unchanged:
+                linked = self._link_or_copy(previous[1], backup_path, link=True)
+            else:
+                linked = self._link_or_copy(file_path, backup_path, link=replacing)
             
             # Update last backup time
-            self.last_backup[str(file_path)] = time.time()
+            self.last_backup[key] = time.time()
+            self._backup_sources[key] = (identity, backup_path)
             
             # Clean old backups
             self._cleanup_old_backups(file_path.stem)
             
-            error_handler.logger.info(f"Created backup: {backup_path}")
+            error_handler.logger.info(f"Created backup: {backup_path}{' (linked)' if linked else ''}")
             return str(backup_path)
             
         except Exception as e:
@@ -205,17 +340,15 @@ class DatabaseManager:
             )
             return None
     
+    def _backups(self, file_stem: str, suffix: str = "") -> List[Path]:
+        """Backups of a file, newest first (timestamps in the names sort chronologically)"""
+        return sorted(self.backup_dir.glob(f"{file_stem}_backup_*{suffix}"), key=lambda x: x.name, reverse=True)
+    
     def _cleanup_old_backups(self, file_stem: str):
         """Remove old backup files"""
         try:
-            backup_pattern = f"{file_stem}_backup_*"
-            backup_files = list(self.backup_dir.glob(backup_pattern))
-            
-            # Sort by modification time (newest first)
-            backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-            
             # Remove excess backups
-            for old_backup in backup_files[self.max_backups:]:
+            for old_backup in self._backups(file_stem)[self.max_backups:]:
                 old_backup.unlink()
                 error_handler.logger.debug(f"Removed old backup: {old_backup}")
                 
@@ -223,11 +356,17 @@ class DatabaseManager:
             error_handler.logger.warning(f"Failed to cleanup old backups: {e}")
     
     def safe_write(self, file_path: str, data: Any, schema_name: str = None) -> bool:
-        """Safely write data to file with validation and backup"""
+        """Safely write data to file with validation and backup.
+
+        The data is streamed as compact JSON with a CRC32 trailer into a temp
+        file in the target directory, fsynced, and renamed over the target, so
+        readers see either the old or the new file, never a partial one.
+        """
         file_path = Path(file_path)
         lock = self._get_file_lock(str(file_path))
         
         with lock:
+            backup_path = None
             try:
                 # Validate data if schema provided
                 if schema_name:
@@ -235,39 +374,20 @@ class DatabaseManager:
                     if not is_valid:
                         raise UserDataError(f"Data validation failed: {error_msg}")
                 
-                # Create backup of existing file
+                # Keep the current contents: the file is replaced below, so linking it is enough
                 if file_path.exists():
-                    self.create_backup(str(file_path))
-                
-                # Write to temporary file first
-                temp_file = self.temp_dir / f"{file_path.name}.tmp"
-                
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    if isinstance(data, (dict, list)):
-                        json.dump(data, f, indent=2, ensure_ascii=False)
-                    else:
-                        f.write(str(data))
+                    backup_path = self._create_backup(str(file_path), replacing=True)
                 
-                # Verify the written data
-                if isinstance(data, (dict, list)):
-                    with open(temp_file, 'r', encoding='utf-8') as f:
-                        verification_data = json.load(f)
-                    
-                    if verification_data != data:
-                        raise UserDataError("Data verification failed after write")
-                
-                # Atomic move to final location
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                shutil.move(str(temp_file), str(file_path))
+                self._write_atomic(file_path, self._encode(data))
                 
                 error_handler.logger.debug(f"Successfully wrote data to: {file_path}")
                 return True
                 
             except Exception as e:
-                # Clean up temp file if it exists
-                temp_file = self.temp_dir / f"{file_path.name}.tmp"
-                if temp_file.exists():
-                    temp_file.unlink()
+                if backup_path and os.path.exists(backup_path):
+                    # The file was not replaced, so a linked backup would change along with it
+                    os.unlink(backup_path)
+                    self._backup_sources.pop(str(file_path), None)
                 
                 error_handler.handle_error(
                     UserDataError(f"Failed to write data: {e}"),
@@ -276,7 +396,7 @@ class DatabaseManager:
                 return False
     
     def safe_read(self, file_path: str, schema_name: str = None) -> Optional[Any]:
-        """Safely read data from file with validation"""
+        """Safely read data from file with checksum and schema validation"""
         file_path = Path(file_path)
         lock = self._get_file_lock(str(file_path))
         
@@ -285,11 +405,7 @@ class DatabaseManager:
                 if not file_path.exists():
                     return None
                 
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    if file_path.suffix.lower() == '.json':
-                        data = json.load(f)
-                    else:
-                        data = f.read()
+                data = self._load(file_path)
                 
                 # Validate data if schema provided
                 if schema_name and isinstance(data, (dict, list)):
@@ -301,9 +417,9 @@ class DatabaseManager:
                 
                 return data
                 
-            except json.JSONDecodeError as e:
+            except (json.JSONDecodeError, UnicodeDecodeError, UserDataError) as e:
                 error_handler.handle_error(
-                    UserDataError(f"Invalid JSON in file: {e}"),
+                    UserDataError(f"Invalid data in file: {e}"),
                     context={"file_path": str(file_path)}
                 )
                 # Try to restore from backup
@@ -317,54 +433,60 @@ class DatabaseManager:
                 return None
     
     def _restore_from_backup(self, file_path: str) -> Optional[Any]:
-        """Restore data from the most recent backup"""
+        """Restore data from the most recent intact backup"""
         try:
             file_path = Path(file_path)
-            backup_pattern = f"{file_path.stem}_backup_*{file_path.suffix}"
-            backup_files = list(self.backup_dir.glob(backup_pattern))
+            backup_files = self._backups(file_path.stem, file_path.suffix)
             
             if not backup_files:
                 error_handler.logger.error(f"No backups found for {file_path}")
                 return None
             
-            # Get most recent backup
-            latest_backup = max(backup_files, key=lambda x: x.stat().st_mtime)
-            
-            # Read backup data
-            with open(latest_backup, 'r', encoding='utf-8') as f:
-                if latest_backup.suffix.lower() == '.json':
-                    data = json.load(f)
-                else:
-                    data = f.read()
-            
-            # Restore the file
-            shutil.copy2(latest_backup, file_path)
+            for backup in backup_files:
+                try:
+                    data = self._load(backup)
+                except (ValueError, UserDataError) as e:
+                    error_handler.logger.warning(f"Skipping damaged backup {backup}: {e}")
+                    continue
+                
+                # Restore the file; replaced rather than overwritten, since backups may be links
+                with open(backup, 'rb') as f:
+                    raw = f.read()
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                fd, temp_name = tempfile.mkstemp(dir=str(file_path.parent), prefix=f".{file_path.name}.",
+                                                 suffix=".tmp")
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(raw)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_name, str(file_path))
+                self._fsync_directory(file_path.parent)
+                
+                error_handler.logger.info(f"Restored {file_path} from backup: {backup}")
+                return data
             
-            error_handler.logger.info(f"Restored {file_path} from backup: {latest_backup}")
-            return data
+            error_handler.logger.error(f"No intact backups found for {file_path}")
+            return None
             
         except Exception as e:
             error_handler.logger.error(f"Failed to restore from backup: {e}")
             return None
     
     def get_backup_info(self, file_path: str) -> List[Dict]:
-        """Get information about available backups"""
+        """Get information about available backups (newest first)"""
         try:
             file_path = Path(file_path)
-            backup_pattern = f"{file_path.stem}_backup_*{file_path.suffix}"
-            backup_files = list(self.backup_dir.glob(backup_pattern))
             
             backup_info = []
-            for backup_file in backup_files:
+            for backup_file in self._backups(file_path.stem, file_path.suffix):
                 stat = backup_file.stat()
                 backup_info.append({
                     "file": str(backup_file),
                     "created": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    "size": stat.st_size
+                    "size": stat.st_size,
+                    "linked": stat.st_nlink > 1
                 })
             
-            # Sort by creation time (newest first)
-            backup_info.sort(key=lambda x: x["created"], reverse=True)
             return backup_info
             
         except Exception as e:
@@ -0,0 +1,146 @@
+"""
+Fragment Cache Module
+Rendered-HTML cache for Jinja pages:
+- {% cache "name", parts... %}...{% endcache %} stores a rendered template
+  fragment keyed by its name, the content version and the given parts (the
+  slice of user state the fragment shows)
+- Whole pages are cached under their ETag, so repeat renders of the same
+  representation are a lookup
+- Per-page validators: Last-Modified only moves forward, so
+  If-Modified-Since stays correct even when a page changes twice a second
+- LRU eviction bounded by entry count and total size
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Any, Callable, Hashable
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+def make_key(*parts: Any) -> str:
+    """Stable digest of JSON-serializable key parts"""
+    canonical = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+class FragmentCache:
+    """LRU cache of rendered HTML strings"""
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> rendered text
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached text for a key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        """Store rendered text (values larger than the whole cache are not kept)"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def get_or_render(self, key: str, render: Callable[[], str]) -> str:
+        """Cached text, rendering and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0
+            }
+
+class FragmentCacheExtension(Extension):
+    """{% cache "name", parts... %} body {% endcache %}
+
+    The body is rendered once per content version and key parts. Set
+    environment.fragment_cache and environment.fragment_cache_version
+    (a callable returning the current content version).
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache(), fragment_cache_version=lambda: "")
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render_fragment', [nodes.Const(parser.name), nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, template_name: str, parts: list, caller) -> Markup:
+        environment = self.environment
+        key = make_key('fragment', template_name, environment.fragment_cache_version(), parts)
+        return Markup(environment.fragment_cache.get_or_render(key, caller))
+
+class PageValidators:
+    """ETag and Last-Modified per page, remembered for the most recent pages"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # page key -> (etag, last modified)
+        self._lock = threading.Lock()
+
+    def last_modified(self, page: Hashable, etag: str) -> datetime:
+        """When the representation with this ETag appeared (whole seconds, UTC)"""
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            previous = self._entries.get(page)
+            if previous is not None and previous[0] == etag:
+                self._entries.move_to_end(page)
+                return previous[1]
+            modified = now if previous is None else max(now, previous[1] + timedelta(seconds=1))
+            self._entries[page] = (etag, modified)
+            self._entries.move_to_end(page)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return modified
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Background Job Queue
+Durable SQLite-backed queue with a local pool of worker threads:
+- Jobs survive restarts; jobs left running by a dead process are retried
+- Queued jobs for the same (kind, key) are coalesced into one
+- Results are kept per (kind, key) with the input version they were built
+  from, so callers can serve them immediately and report staleness
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+from .error_handler import error_handler
+
+# handler(key, payload) -> (input version, JSON-serializable result)
+JobHandler = Callable[[str, Dict], Tuple[str, Any]]
+
+def fingerprint(value: Any) -> str:
+    """Stable short hash of JSON-serializable job inputs"""
+    canonical = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+class JobQueue:
+    """Durable job queue processed by background worker threads"""
+
+    def __init__(self, db_path: str = "data/jobs.db", workers: int = 2,
+                 lease_timeout: float = 300.0, max_attempts: int = 3,
+                 poll_interval: float = 1.0, retention: float = 86400.0,
+                 timeout: float = 10.0):
+        self.db_path = str(db_path)
+        self.workers = workers
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.timeout = timeout
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._local = threading.local()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        """Create tables if they do not exist"""
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " job_key TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " enqueued_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (kind, job_key, id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " kind TEXT NOT NULL,"
+            " job_key TEXT NOT NULL,"
+            " version TEXT,"
+            " result TEXT NOT NULL,"
+            " computed_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, job_key))"
+        )
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the handler that runs jobs of a kind"""
+        self._handlers[kind] = handler
+
+    # Producing
+
+    def enqueue(self, kind: str, key: str, payload: Dict = None) -> int:
+        """Queue a job, merging it into an already queued job for the same key; returns the job id"""
+        encoded = json.dumps(payload or {})
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND job_key = ? AND status = 'queued' "
+                "ORDER BY id DESC LIMIT 1", (kind, key)
+            ).fetchone()
+            if row:
+                job_id = row[0]
+                conn.execute("UPDATE jobs SET payload = ? WHERE id = ?", (encoded, job_id))
+            else:
+                job_id = conn.execute(
+                    "INSERT INTO jobs (kind, job_key, payload, status, enqueued_at) "
+                    "VALUES (?, ?, ?, 'queued', ?)", (kind, key, encoded, time.time())
+                ).lastrowid
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self.start()
+        with self._condition:
+            self._condition.notify()
+        return job_id
+
+    # Consuming
+
+    def start(self):
+        """Requeue abandoned jobs and start the worker threads (idempotent)"""
+        if self._threads or self.workers <= 0:
+            return
+        with self._condition:
+            if self._threads:
+                return
+            self._stopping = False
+            self.requeue_abandoned()
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker threads after their current job"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout=self.timeout)
+        self._threads = []
+
+    def requeue_abandoned(self) -> int:
+        """Put jobs whose lease expired (their process died) back in the queue"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND started_at < ?",
+            (time.time() - self.lease_timeout,)
+        )
+        return cursor.rowcount
+
+    def _claim(self) -> Optional[Tuple[int, str, str, Dict, int]]:
+        """Atomically mark the oldest runnable job as running"""
+        if not self._handlers:
+            return None
+        kinds = list(self._handlers)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT id, kind, job_key, payload, attempts FROM jobs WHERE status = 'queued' "
+                f"AND kind IN ({','.join('?' * len(kinds))}) ORDER BY id LIMIT 1", kinds
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?", (time.time(), row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not row:
+            return None
+        return row[0], row[1], row[2], json.loads(row[3]), row[4] + 1
+
+    def _run(self, job: Tuple[int, str, str, Dict, int]):
+        job_id, kind, key, payload, attempts = job
+        conn = self._connect()
+        try:
+            version, result = self._handlers[kind](key, payload)
+            encoded = json.dumps(result, default=str)
+        except Exception as e:
+            error_handler.handle_error(e, context={"operation": "background_job", "kind": kind, "key": key})
+            status = 'queued' if attempts < self.max_attempts else 'failed'
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, f"{type(e).__name__}: {e}", time.time(), job_id)
+            )
+            if status == 'queued':
+                self.retried += 1
+            else:
+                self.failed += 1
+            return
+
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO job_results (kind, job_key, version, result, computed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(kind, job_key) DO UPDATE SET version = excluded.version, "
+                "result = excluded.result, computed_at = excluded.computed_at",
+                (kind, key, version, encoded, now)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'done', error = NULL, finished_at = ? WHERE id = ?", (now, job_id)
+            )
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                         (now - self.retention,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.completed += 1
+
+    def run_pending(self, limit: int = None) -> int:
+        """Run queued jobs in the calling thread; returns the number run"""
+        count = 0
+        while limit is None or count < limit:
+            job = self._claim()
+            if job is None:
+                break
+            self._run(job)
+            count += 1
+        return count
+
+    def _work(self):
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+            try:
+                job = self._claim()
+                if job is not None:
+                    self._run(job)
+                    with self._condition:
+                        self._condition.notify_all()
+                    continue
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "job_worker"})
+            with self._condition:
+                if not self._stopping:
+                    # Also wakes up periodically for jobs queued by other processes
+                    self._condition.wait(self.poll_interval)
+
+    def wait(self, job_id: int, timeout: float) -> bool:
+        """Block until a job has finished or timeout seconds pass; returns True if it finished"""
+        deadline = time.monotonic() + timeout
+        while True:
+            row = self._connect().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0] in ('done', 'failed'):
+                return row is not None and row[0] == 'done'
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._condition:
+                self._condition.wait(min(remaining, self.poll_interval))
+
+    # Reading
+
+    def get_result(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Latest result for a key with the version it was computed from, or None"""
+        row = self._connect().execute(
+            "SELECT version, result, computed_at FROM job_results WHERE kind = ? AND job_key = ?",
+            (kind, key)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"version": row[0], "result": json.loads(row[1]), "computed_at": row[2]}
+
+    def job_status(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Status of the most recent job for a key"""
+        row = self._connect().execute(
+            "SELECT id, status, attempts, error, enqueued_at, started_at, finished_at FROM jobs "
+            "WHERE kind = ? AND job_key = ? ORDER BY id DESC LIMIT 1", (kind, key)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "status", "attempts", "error", "enqueued_at", "started_at", "finished_at"), row))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue statistics"""
+        counts = dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "workers": len(self._threads),
+            "queued": counts.get('queued', 0),
+            "running": counts.get('running', 0),
+            "done": counts.get('done', 0),
+            "failed": counts.get('failed', 0),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed_here": self.failed
+        }
+
+class PrecomputeTrigger:
+    """
+    User store listener that queues jobs when a profile's job inputs change
+
+    Each kind has a fingerprint function over the profile; a job is queued
+    only when the fingerprint differs from the last one seen for the user.
+    Store writers only hand the profile over: fingerprints, result lookups
+    and enqueues run on the trigger's own thread, and repeated changes of a
+    user waiting there are coalesced into the latest profile.
+    """
+
+    def __init__(self, queue: JobQueue, fingerprints: Dict[str, Callable[[Dict], str]],
+                 max_seen: int = 10000):
+        self.queue = queue
+        self.fingerprints = fingerprints
+        self.max_seen = max_seen
+        # (kind, email) -> last fingerprint seen, least recently changed first
+        self._seen: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        # email -> latest profile not yet checked
+        self._pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self._busy = False
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def user_changed(self, email: str, profile: Optional[Dict]):
+        if profile is None:
+            return
+        with self._condition:
+            self._pending[email] = profile
+            self._pending.move_to_end(email)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._work, name="precompute-trigger", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def users_reset(self):
+        with self._condition:
+            self._seen.clear()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                email, profile = self._pending.popitem(last=False)
+                self._busy = True
+            try:
+                self._check(email, profile)
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "precompute_trigger", "user": email})
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _check(self, email: str, profile: Dict):
+        """Queue the jobs whose inputs changed since the user's last check"""
+        for kind, fingerprint_of in self.fingerprints.items():
+            version = fingerprint_of(profile)
+            with self._condition:
+                unchanged = self._seen.get((kind, email)) == version
+                self._seen[(kind, email)] = version
+                self._seen.move_to_end((kind, email))
+                while len(self._seen) > self.max_seen:
+                    self._seen.popitem(last=False)
+            if unchanged:
+                continue
+            cached = self.queue.get_result(kind, email)
+            if cached is None or cached["version"] != version:
+                self.queue.enqueue(kind, email, {"version": version})
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every handed-over profile has been checked"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the trigger thread once the pending profiles are checked"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if wait and self._thread:
+            self._thread.join(timeout=self.queue.timeout)
+        self._thread = None
+
+# Global job queue instance
+job_queue = JobQueue()
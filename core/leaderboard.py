@@ -0,0 +1,418 @@
+"""
+Leaderboard Module
+Incrementally maintained rankings:
+- Indexable skip list with O(log n) insert, remove, rank and position lookups
+- Top-K, a member's own rank and "around me" windows without full sorts
+- Boards kept in step with user store writes instead of rescanning every user
+"""
+
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple
+
+from .error_handler import error_handler
+
+# Enough levels for millions of members at p = 1/2
+MAX_LEVEL = 24
+
+# Profiles written this long before a sync are re-read after a reset,
+# covering write transactions that were still open when the sync ran
+SYNC_MARGIN = 5.0
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key: Any, height: int):
+        self.key = key
+        self.next = [None] * height
+        # Positions skipped when following next at each level
+        self.width = [1] * height
+
+class RankedSet:
+    """Sorted set of unique keys backed by an indexable skip list"""
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _predecessors(self, key: Any) -> Tuple[List[_Node], List[int]]:
+        """Last node before key at each level, with its position (head is 0)"""
+        chain = [None] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node = self._head
+        position = 0
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+        return chain, positions
+
+    def add(self, key: Any) -> bool:
+        """Insert key; returns False if it is already present"""
+        chain, positions = self._predecessors(key)
+        following = chain[0].next[0]
+        if following is not None and following.key == key:
+            return False
+
+        height = 1
+        while height < MAX_LEVEL and random.random() < 0.5:
+            height += 1
+
+        node = _Node(key, height)
+        position = positions[0]
+        for level in range(height):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            previous.next[level] = node
+            node.width[level] = previous.width[level] - (position - positions[level])
+            previous.width[level] = position - positions[level] + 1
+        for level in range(height, MAX_LEVEL):
+            chain[level].width[level] += 1
+
+        self._size += 1
+        return True
+
+    def discard(self, key: Any) -> bool:
+        """Remove key; returns False if it was not present"""
+        chain, _ = self._predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            return False
+
+        for level in range(MAX_LEVEL):
+            previous = chain[level]
+            if previous.next[level] is node:
+                previous.width[level] += node.width[level] - 1
+                previous.next[level] = node.next[level]
+            else:
+                previous.width[level] -= 1
+
+        self._size -= 1
+        return True
+
+    def index(self, key: Any) -> Optional[int]:
+        """Zero-based position of key, or None if absent"""
+        chain, positions = self._predecessors(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            return None
+        return positions[0]
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        """Keys at positions start..stop-1"""
+        start = max(start, 0)
+        stop = min(stop, self._size)
+        if start >= stop:
+            return []
+
+        # Walk down to the node just before start, then follow level 0
+        node = self._head
+        position = 0
+        for level in reversed(range(MAX_LEVEL)):
+            while node.next[level] is not None and position + node.width[level] <= start:
+                position += node.width[level]
+                node = node.next[level]
+
+        keys = []
+        node = node.next[0]
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+    def __getitem__(self, position: int) -> Any:
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError("RankedSet index out of range")
+        return self.slice(position, position + 1)[0]
+
+    def iter_after(self, key: Any = None) -> Iterator[Any]:
+        """Keys greater than key in order (every key when key is None)"""
+        if key is None:
+            node = self._head.next[0]
+        else:
+            chain, _ = self._predecessors(key)
+            node = chain[0].next[0]
+            if node is not None and node.key == key:
+                node = node.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+class Leaderboard:
+    """Members ordered by a sort key (smallest first), each with a display row"""
+
+    def __init__(self):
+        self._ranked = RankedSet()
+        self._keys: Dict[str, Tuple] = {}
+        self._rows: Dict[str, Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._keys
+
+    def update(self, member: str, sort_key: Tuple, row: Dict):
+        """Insert or move a member; ties are broken by member id"""
+        key = (sort_key, member)
+        previous = self._keys.get(member)
+        if previous != key:
+            if previous is not None:
+                self._ranked.discard(previous)
+            self._ranked.add(key)
+            self._keys[member] = key
+        self._rows[member] = row
+
+    def remove(self, member: str) -> bool:
+        """Drop a member from the board"""
+        key = self._keys.pop(member, None)
+        if key is None:
+            return False
+        self._ranked.discard(key)
+        del self._rows[member]
+        return True
+
+    def _entries(self, start: int, stop: int) -> List[Dict]:
+        return [dict(self._rows[member], rank=start + offset + 1)
+                for offset, (_, member) in enumerate(self._ranked.slice(start, stop))]
+
+    def top(self, limit: int = 10) -> List[Dict]:
+        """First `limit` rows, each with its 1-based rank"""
+        return self._entries(0, limit)
+
+    def rank(self, member: str) -> Optional[int]:
+        """1-based rank of a member, or None if not on the board"""
+        key = self._keys.get(member)
+        if key is None:
+            return None
+        return self._ranked.index(key) + 1
+
+    def around(self, member: str, radius: int = 2) -> List[Dict]:
+        """Rows within `radius` places of a member"""
+        rank = self.rank(member)
+        if rank is None:
+            return []
+        return self._entries(max(rank - 1 - radius, 0), rank + radius)
+
+    def members(self) -> List[str]:
+        """Member ids in rank order"""
+        return [member for _, member in self._ranked]
+
+# entry(email, profile) -> (sort key, row), or None to leave the user off the board
+EntryFunction = Callable[[str, Dict], Optional[Tuple[Tuple, Dict]]]
+# entries(email, profile) -> {board key: (sort key, row)} for a family of boards
+FamilyFunction = Callable[[str, Dict], Dict[str, Tuple[Tuple, Dict]]]
+
+class LeaderboardIndex:
+    """
+    Named leaderboards kept in step with a user store
+
+    The store calls user_changed() after every profile write and
+    users_reset() when its cache is dropped (bulk writes, writes from
+    another process); after a reset the next query re-ranks only the users
+    written since the boards were last synced, and drops deleted users.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._entries: Dict[str, EntryFunction] = {}
+        self._families: Dict[str, FamilyFunction] = {}
+        self._boards: Dict[str, Leaderboard] = {}
+        self._family_boards: Dict[Tuple[str, str], set] = {}  # (family, email) -> board keys
+        self._lock = threading.RLock()
+        self._stale = True
+        # Set by users_reset: boards are complete but may miss foreign writes
+        self._reset = False
+        self._synced_at = None
+        self._ranked_users: set = set()
+        self._generation = 0
+        self.rebuilds = 0
+        self.resyncs = 0
+        self.updates = 0
+
+        if store is not None and hasattr(store, 'subscribe'):
+            store.subscribe(self)
+
+    def define(self, name: str, entry: EntryFunction):
+        """Define a board; entry maps a profile to its sort key and row"""
+        with self._lock:
+            self._entries[name] = entry
+            self._stale = True
+
+    def define_family(self, name: str, entries: FamilyFunction):
+        """Define a family of boards (e.g. one per challenge) filled from each profile"""
+        with self._lock:
+            self._families[name] = entries
+            self._stale = True
+
+    # User store notifications
+
+    def user_changed(self, email: str, profile: Optional[Dict]):
+        """Re-rank one user after a write; profile is None when the user was deleted"""
+        with self._lock:
+            self._generation += 1
+            if not self._stale:
+                self._apply(email, profile)
+                self.updates += 1
+
+    def users_reset(self):
+        """Re-rank users written behind our back on the next query"""
+        with self._lock:
+            self._generation += 1
+            self._reset = True
+
+    # Maintenance
+
+    def _family_key(self, family: str, board_key: str) -> str:
+        return f"{family}:{board_key}"
+
+    def _apply(self, email: str, profile: Optional[Dict]):
+        if profile is None:
+            self._ranked_users.discard(email)
+        else:
+            self._ranked_users.add(email)
+        for name, entry in self._entries.items():
+            board = self._boards.setdefault(name, Leaderboard())
+            result = entry(email, profile) if profile is not None else None
+            if result is None:
+                board.remove(email)
+            else:
+                board.update(email, *result)
+
+        for family, entries in self._families.items():
+            results = entries(email, profile) if profile is not None else {}
+            previous = self._family_boards.pop((family, email), set())
+            for board_key in previous - set(results):
+                name = self._family_key(family, board_key)
+                board = self._boards.get(name)
+                if board is not None:
+                    board.remove(email)
+                    if not len(board):
+                        del self._boards[name]
+            for board_key, (sort_key, row) in results.items():
+                name = self._family_key(family, board_key)
+                self._boards.setdefault(name, Leaderboard()).update(email, sort_key, row)
+            if results:
+                self._family_boards[(family, email)] = set(results)
+
+    def load(self, users: Dict[str, Dict]):
+        """Rebuild every board from a full set of profiles"""
+        with self._lock:
+            self._boards = {}
+            self._family_boards = {}
+            self._ranked_users = set()
+            self._apply_all(users.items())
+            self._stale = False
+            self._reset = False
+            self.rebuilds += 1
+
+    def _apply_all(self, users):
+        for email, profile in users:
+            try:
+                self._apply(email, profile)
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "rank_user", "email": email})
+
+    def _refresh(self):
+        """Rebuild stale boards from the store, or catch up after a reset"""
+        if self.store is None:
+            return
+        if hasattr(self.store, 'revalidate'):
+            self.store.revalidate()
+
+        # The store is read without holding our lock (its writers call into
+        # us while holding theirs); retry if a write lands during the read
+        for _ in range(3):
+            with self._lock:
+                if not self._stale and not self._reset:
+                    return
+                full = self._stale or self._synced_at is None
+                since = self._synced_at
+                generation = self._generation
+            started = time.time()
+            if full:
+                users = self.store.all_users()
+            else:
+                # Only users written since the last sync can have moved
+                changed = list(self.store.iter_users_since(since - SYNC_MARGIN))
+                emails = set(self.store.iter_emails())
+            with self._lock:
+                if full:
+                    self.load(users)
+                else:
+                    self._apply_all([(email, None) for email in self._ranked_users - emails])
+                    self._apply_all(changed)
+                    self._reset = False
+                    self.resyncs += 1
+                self._synced_at = started
+                if generation == self._generation:
+                    return
+                self._reset = True
+
+    # Queries
+
+    def board(self, name: str, board_key: str = None) -> Leaderboard:
+        """Current board by name (or family and key); empty if nobody is ranked"""
+        self._refresh()
+        if board_key is not None:
+            name = self._family_key(name, board_key)
+        with self._lock:
+            return self._boards.get(name) or Leaderboard()
+
+    def top(self, name: str, limit: int = 10, board_key: str = None) -> List[Dict]:
+        """Top rows of a board"""
+        board = self.board(name, board_key)
+        with self._lock:
+            return board.top(limit)
+
+    def rank(self, name: str, email: str, board_key: str = None) -> Optional[int]:
+        """1-based rank of a user on a board"""
+        board = self.board(name, board_key)
+        with self._lock:
+            return board.rank(email)
+
+    def around(self, name: str, email: str, radius: int = 2, board_key: str = None) -> List[Dict]:
+        """Rows around a user on a board"""
+        board = self.board(name, board_key)
+        with self._lock:
+            return board.around(email, radius)
+
+    def summary(self, name: str, email: str = None, limit: int = 10, radius: int = 2,
+                board_key: str = None) -> Dict[str, Any]:
+        """Top rows plus, for a user, their rank and neighbours, read consistently"""
+        board = self.board(name, board_key)
+        with self._lock:
+            summary = {
+                "leaderboard": board.top(limit),
+                "total_ranked": len(board)
+            }
+            if email:
+                summary["user_rank"] = board.rank(email)
+                summary["around_user"] = board.around(email, radius)
+            return summary
+
+    def stats(self) -> Dict[str, Any]:
+        """Leaderboard statistics"""
+        with self._lock:
+            return {
+                "boards": len(self._boards),
+                "ranked_entries": sum(len(board) for board in self._boards.values()),
+                "updates": self.updates,
+                "rebuilds": self.rebuilds,
+                "resyncs": self.resyncs,
+                "stale": self._stale
+            }
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Operation Log Store
+Append-only persistence for a few in-memory JSON collections:
+- Every mutation is one small JSON line appended to oplog.jsonl
+- Every compact_every operations all collections are written to a snapshot
+  (atomically, with the last sequence number it contains) and the log is
+  truncated
+- Startup loads the snapshot and replays the log entries after it; a torn
+  last line left by a crash is dropped
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from .error_handler import error_handler
+
+def _parent(record: Dict, path: str) -> tuple:
+    """Container and leaf name for a dotted path, creating nested dicts"""
+    *parents, leaf = path.split('.')
+    for name in parents:
+        child = record.get(name)
+        if not isinstance(child, dict):
+            child = record[name] = {}
+        record = child
+    return record, leaf
+
+class OpLogStore:
+    """Named dict collections persisted as a snapshot plus an operation log"""
+
+    def __init__(self, data_dir: str, collections: List[str], compact_every: int = 1000,
+                 fsync: bool = False, legacy_files: Dict[str, str] = None):
+        """
+        Args:
+            data_dir: Directory holding snapshot.json and oplog.jsonl
+            collections: Names of the collections kept in the store
+            compact_every: Operations appended between snapshots
+            fsync: fsync the log on every append (survives power loss,
+                costs a disk flush per mutation)
+            legacy_files: collection -> whole-collection JSON file imported
+                once when the store has no snapshot or log yet
+        """
+        self.data_dir = Path(data_dir)
+        self.snapshot_path = self.data_dir / "snapshot.json"
+        self.log_path = self.data_dir / "oplog.jsonl"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.collections: Dict[str, Dict[str, Any]] = {name: {} for name in collections}
+
+        self._lock = threading.RLock()
+        self._log = None
+        self.seq = 0
+        self._since_snapshot = 0
+
+        self.appends = 0
+        self.compactions = 0
+        self.replayed = 0
+
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._load(legacy_files or {})
+
+    def collection(self, name: str) -> Dict[str, Any]:
+        """Live dict of a collection (mutate it only through the store)"""
+        return self.collections[name]
+
+    # Startup
+
+    def _load(self, legacy_files: Dict[str, str]):
+        snapshot = self._read_snapshot()
+        if snapshot is not None:
+            self.seq = snapshot.get('seq', 0)
+            for name, records in snapshot.get('collections', {}).items():
+                if name in self.collections:
+                    self.collections[name].update(records)
+        elif not self.log_path.exists() and self._import_legacy(legacy_files):
+            self.compact()
+        self._replay()
+
+    def _read_snapshot(self) -> Optional[Dict]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            error_handler.handle_error(e, context={"operation": "read_snapshot", "path": str(self.snapshot_path)})
+            return None
+
+    def _import_legacy(self, legacy_files: Dict[str, str]) -> bool:
+        imported = False
+        for name, path in legacy_files.items():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                error_handler.logger.warning(f"Failed to import {path}: {e}")
+                continue
+            if isinstance(records, dict) and name in self.collections:
+                self.collections[name].update(records)
+                imported = True
+        return imported
+
+    def _replay(self):
+        """Apply log entries newer than the snapshot"""
+        try:
+            with open(self.log_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Torn append from a crash; drop it so the next append starts a clean line
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(complete)
+
+        for line in data[:complete].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                error_handler.handle_error(e, context={"operation": "replay_oplog", "path": str(self.log_path)})
+                continue
+            if entry.get('seq', 0) <= self.seq:
+                continue
+            self._apply(entry)
+            self.seq = entry['seq']
+            self._since_snapshot += 1
+            self.replayed += 1
+
+    # Mutations
+
+    def _apply(self, entry: Dict):
+        records = self.collections.get(entry['c'])
+        if records is None:
+            return
+        op, key = entry['op'], entry['k']
+        if op == 'put':
+            records[key] = entry['v']
+        elif op == 'delete':
+            records.pop(key, None)
+        elif op == 'update' and key in records:
+            for path, value in entry.get('set', {}).items():
+                container, leaf = _parent(records[key], path)
+                container[leaf] = value
+            for path, delta in entry.get('incr', {}).items():
+                container, leaf = _parent(records[key], path)
+                container[leaf] = (container.get(leaf) or 0) + delta
+
+    def _append(self, entry: Dict):
+        with self._lock:
+            entry['seq'] = self.seq + 1
+            line = json.dumps(entry, separators=(',', ':')) + "\n"
+            if self._log is None:
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+            self._log.write(line)
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self.seq = entry['seq']
+            self._apply(entry)
+            self.appends += 1
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.compact_every:
+                try:
+                    self.compact()
+                except OSError as e:
+                    # The log still has everything; try again after the next append
+                    error_handler.handle_error(e, context={"operation": "compact_oplog"})
+
+    def put(self, collection: str, key: str, value: Dict[str, Any]):
+        """Insert or replace a record"""
+        self._append({'op': 'put', 'c': collection, 'k': key, 'v': value})
+
+    def delete(self, collection: str, key: str):
+        """Remove a record"""
+        self._append({'op': 'delete', 'c': collection, 'k': key})
+
+    def update(self, collection: str, key: str, changes: Dict[str, Any] = None,
+               increments: Dict[str, float] = None):
+        """Set and increment fields of a record; dotted paths reach nested dicts"""
+        entry = {'op': 'update', 'c': collection, 'k': key}
+        if changes:
+            entry['set'] = changes
+        if increments:
+            entry['incr'] = increments
+        self._append(entry)
+
+    # Compaction
+
+    def compact(self):
+        """Snapshot every collection and truncate the log"""
+        with self._lock:
+            temp_path = self.snapshot_path.with_suffix('.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'seq': self.seq, 'collections': self.collections}, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+
+            # Entries up to seq are in the snapshot; a crash before the truncate only replays nothing
+            if self._log is not None:
+                self._log.close()
+            self._log = open(self.log_path, 'w', encoding='utf-8')
+            self._since_snapshot = 0
+            self.compactions += 1
+
+    def close(self):
+        """Close the log file"""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Store statistics"""
+        with self._lock:
+            return {
+                "seq": self.seq,
+                "records": {name: len(records) for name, records in self.collections.items()},
+                "pending_ops": self._since_snapshot,
+                "appends": self.appends,
+                "compactions": self.compactions,
+                "replayed": self.replayed
+            }
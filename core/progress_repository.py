@@ -0,0 +1,346 @@
+"""
+Progress Repository Module
+Relational learning history over the models.py schema:
+- Lesson completions, quiz attempts, challenge submissions and achievements
+  per user, linked to content rows by their content catalog id
+- Reads issue a fixed number of queries however long the history is: one
+  aggregate query for summaries, one query per history kind for recent
+  activity, and selectin/joined eager loading for whole histories
+- Bulk importer from JSON user profiles using executemany batches
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+from sqlalchemy import select, insert, func, distinct, case
+from sqlalchemy.orm import selectinload
+
+from models import (db, User, Course, Lesson, Quiz, Challenge, LessonProgress, QuizAttempt,
+                    ChallengeSubmission, Achievement, UserAchievement)
+from .content_catalog import content_catalog as default_catalog
+from .error_handler import error_handler
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+class ProgressRepository:
+    """Learning history stored in SQL, keyed by user email and catalog ids"""
+
+    def __init__(self, database=db, catalog=None, batch_size: int = 500):
+        self.db = database
+        self.catalog = catalog or default_catalog
+        self.batch_size = batch_size
+
+    @property
+    def session(self):
+        return self.db.session
+
+    def create_schema(self):
+        """Create missing tables, and missing indexes on tables created before they existed"""
+        self.db.create_all()
+        engine = self.db.engine
+        for table in self.db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+
+    # Rows for users and catalog content
+
+    def _user_ids(self, emails: Iterable[str]) -> Dict[str, int]:
+        emails = list(emails)
+        if not emails:
+            return {}
+        return dict(self.session.execute(select(User.email, User.id).where(User.email.in_(emails))).all())
+
+    def ensure_user(self, email: str, profile: Dict = None) -> int:
+        """Id of the user with this email, created from the profile if missing"""
+        user_id = self._user_ids([email]).get(email)
+        if user_id is None:
+            self.session.execute(insert(User), [self._user_row(email, profile or {})])
+            user_id = self._user_ids([email])[email]
+        return user_id
+
+    @staticmethod
+    def _user_row(email: str, profile: Dict) -> Dict[str, Any]:
+        return {
+            'username': email,
+            'email': email,
+            'experience_level': profile.get('experience_level') or 'complete_beginner',
+            'created_date': _parse_date(profile.get('created_at')) or datetime.utcnow(),
+            'last_activity': _parse_date(profile.get('last_activity')) or datetime.utcnow(),
+            'points': profile.get('points', 0),
+            'level': profile.get('level', 1),
+            'streak': profile.get('streak', 0),
+            'goals': json.dumps(profile.get('learning_goals') or [])
+        }
+
+    def _course_ids(self, difficulties: Iterable[str]) -> Dict[str, int]:
+        difficulties = set(difficulties)
+        found = dict(self.session.execute(
+            select(Course.difficulty_level, func.min(Course.id))
+            .where(Course.difficulty_level.in_(difficulties))
+            .group_by(Course.difficulty_level)).all())
+        missing = [{'title': f"{level.title()} Python", 'difficulty_level': level}
+                   for level in sorted(difficulties - set(found))]
+        if missing:
+            self.session.execute(insert(Course), missing)
+            return self._course_ids(difficulties)
+        return found
+
+    def _catalog_row(self, model, catalog_id: str) -> Dict[str, Any]:
+        if model is Lesson:
+            lesson = self.catalog.get_lesson(catalog_id) or {}
+            return {'catalog_id': catalog_id, 'title': lesson.get('title', catalog_id),
+                    'description': lesson.get('description'),
+                    'difficulty': lesson.get('difficulty', 'beginner'),
+                    'points_reward': lesson.get('points', 10)}
+        if model is Quiz:
+            quiz = self.catalog.get_quiz(catalog_id) or {}
+            return {'catalog_id': catalog_id, 'title': quiz.get('title', catalog_id),
+                    'description': quiz.get('description'),
+                    'difficulty': quiz.get('difficulty', 'beginner'),
+                    'questions': json.dumps(quiz.get('questions_data', []), default=str)}
+        challenge = self.catalog.get_challenge(catalog_id) or {}
+        content = self.catalog.challenge_content(catalog_id)
+        return {'catalog_id': catalog_id, 'title': challenge.get('title', catalog_id),
+                'description': challenge.get('description') or '',
+                'difficulty': challenge.get('difficulty', 'easy'),
+                'category': challenge.get('category'),
+                'function_name': challenge.get('function_name') or '',
+                'test_cases': json.dumps(content.get('test_cases', []), default=str),
+                'points_reward': challenge.get('points', 25)}
+
+    def _catalog_ids(self, model, catalog_ids: Iterable[str]) -> Dict[str, int]:
+        """Row ids for catalog ids, inserting rows for content not seen before"""
+        catalog_ids = set(catalog_ids)
+        if not catalog_ids:
+            return {}
+        found = dict(self.session.execute(
+            select(model.catalog_id, model.id).where(model.catalog_id.in_(catalog_ids))).all())
+        missing = [self._catalog_row(model, catalog_id) for catalog_id in sorted(catalog_ids - set(found))]
+        if missing:
+            if model is Lesson:
+                courses = self._course_ids(row['difficulty'] for row in missing)
+                for row in missing:
+                    row['course_id'] = courses[row['difficulty']]
+            self.session.execute(insert(model), missing)
+            found.update(self.session.execute(
+                select(model.catalog_id, model.id).where(model.catalog_id.in_(catalog_ids))).all())
+        return found
+
+    def _achievement_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        names = set(names)
+        if not names:
+            return {}
+        found = dict(self.session.execute(
+            select(Achievement.name, Achievement.id).where(Achievement.name.in_(names))).all())
+        missing = [{'name': name, 'description': name.replace('_', ' ').title(),
+                    'condition_type': 'awarded', 'condition_value': 0}
+                   for name in sorted(names - set(found))]
+        if missing:
+            self.session.execute(insert(Achievement), missing)
+            found.update(self.session.execute(
+                select(Achievement.name, Achievement.id).where(Achievement.name.in_(names))).all())
+        return found
+
+    # Writes
+
+    def record_lesson_completion(self, email: str, lesson_id: str, completed_date: datetime = None):
+        """Mark a catalog lesson completed for a user"""
+        user_id = self.ensure_user(email)
+        row_id = self._catalog_ids(Lesson, [lesson_id])[lesson_id]
+        progress = self.session.execute(select(LessonProgress).where(
+            LessonProgress.user_id == user_id, LessonProgress.lesson_id == row_id)).scalar_one_or_none()
+        if progress is None:
+            progress = LessonProgress(user_id=user_id, lesson_id=row_id)
+            self.session.add(progress)
+        if progress.status != 'completed':
+            progress.status = 'completed'
+            progress.progress_percentage = 100.0
+            progress.completed_date = completed_date or datetime.utcnow()
+        self.session.commit()
+
+    def record_quiz_attempt(self, email: str, quiz_id: str, score: int, max_score: int,
+                            answers: Dict = None, time_taken: int = None):
+        """Store one graded quiz attempt"""
+        user_id = self.ensure_user(email)
+        row_id = self._catalog_ids(Quiz, [quiz_id])[quiz_id]
+        self.session.add(QuizAttempt(user_id=user_id, quiz_id=row_id, score=score, max_score=max_score,
+                                     answers=json.dumps(answers or {}), time_taken=time_taken))
+        self.session.commit()
+
+    def record_challenge_submission(self, email: str, challenge_id: str, code: str, passed: bool,
+                                    score: float = 0.0, test_results: List[Dict] = None):
+        """Store one graded challenge submission"""
+        user_id = self.ensure_user(email)
+        row_id = self._catalog_ids(Challenge, [challenge_id])[challenge_id]
+        self.session.add(ChallengeSubmission(user_id=user_id, challenge_id=row_id, code=code,
+                                             status='passed' if passed else 'failed', score=score,
+                                             test_results=json.dumps(test_results or [], default=str)))
+        self.session.commit()
+
+    def record_achievements(self, email: str, names: Iterable[str]):
+        """Award achievements by name (already earned ones are skipped)"""
+        user_id = self.ensure_user(email)
+        achievement_ids = self._achievement_ids(names)
+        earned = set(self.session.execute(select(UserAchievement.achievement_id).where(
+            UserAchievement.user_id == user_id)).scalars())
+        rows = [{'user_id': user_id, 'achievement_id': achievement_id}
+                for achievement_id in achievement_ids.values() if achievement_id not in earned]
+        if rows:
+            self.session.execute(insert(UserAchievement), rows)
+        self.session.commit()
+
+    # Reads
+
+    def load_user(self, email: str) -> Optional[User]:
+        """User with its whole history eagerly loaded: five queries regardless of history size"""
+        return self.session.execute(
+            select(User).where(User.email == email).options(
+                selectinload(User.lesson_progress).joinedload(LessonProgress.lesson),
+                selectinload(User.quiz_attempts).joinedload(QuizAttempt.quiz),
+                selectinload(User.challenge_submissions).joinedload(ChallengeSubmission.challenge),
+                selectinload(User.achievements).joinedload(UserAchievement.achievement))
+        ).scalar_one_or_none()
+
+    def progress_summary(self, email: str) -> Optional[Dict[str, Any]]:
+        """Completion counts and quiz average in a single query, or None for unknown users"""
+        lessons = select(func.count()).where(
+            LessonProgress.user_id == User.id, LessonProgress.status == 'completed').scalar_subquery()
+        quizzes = select(func.count(distinct(QuizAttempt.quiz_id))).where(
+            QuizAttempt.user_id == User.id).scalar_subquery()
+        attempts = select(func.count()).where(QuizAttempt.user_id == User.id).scalar_subquery()
+        average = select(func.avg(case((QuizAttempt.max_score > 0,
+                                        QuizAttempt.score * 100.0 / QuizAttempt.max_score), else_=0.0))
+                         ).where(QuizAttempt.user_id == User.id).scalar_subquery()
+        challenges = select(func.count(distinct(ChallengeSubmission.challenge_id))).where(
+            ChallengeSubmission.user_id == User.id, ChallengeSubmission.status == 'passed').scalar_subquery()
+        achievements = select(func.count()).where(UserAchievement.user_id == User.id).scalar_subquery()
+
+        row = self.session.execute(
+            select(lessons, quizzes, attempts, average, challenges, achievements).where(User.email == email)
+        ).first()
+        if row is None:
+            return None
+        return {
+            'lessons_completed': row[0],
+            'quizzes_completed': row[1],
+            'quiz_attempts': row[2],
+            'average_quiz_score': round(row[3] or 0.0, 1),
+            'challenges_completed': row[4],
+            'achievements': row[5]
+        }
+
+    def recent_activity(self, email: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Latest completions, attempts and submissions, newest first: one indexed query per kind"""
+        queries = (
+            ('lesson', select(LessonProgress.completed_date, Lesson.catalog_id, Lesson.title,
+                              LessonProgress.progress_percentage)
+             .join(Lesson, LessonProgress.lesson_id == Lesson.id).join(User, LessonProgress.user_id == User.id)
+             .where(User.email == email, LessonProgress.completed_date.isnot(None))
+             .order_by(LessonProgress.completed_date.desc())),
+            ('quiz', select(QuizAttempt.completed_date, Quiz.catalog_id, Quiz.title,
+                            case((QuizAttempt.max_score > 0,
+                                  QuizAttempt.score * 100.0 / QuizAttempt.max_score), else_=0.0))
+             .join(Quiz, QuizAttempt.quiz_id == Quiz.id).join(User, QuizAttempt.user_id == User.id)
+             .where(User.email == email).order_by(QuizAttempt.completed_date.desc())),
+            ('challenge', select(ChallengeSubmission.submitted_date, Challenge.catalog_id, Challenge.title,
+                                 ChallengeSubmission.score)
+             .join(Challenge, ChallengeSubmission.challenge_id == Challenge.id)
+             .join(User, ChallengeSubmission.user_id == User.id)
+             .where(User.email == email).order_by(ChallengeSubmission.submitted_date.desc())),
+        )
+        activity = []
+        for kind, query in queries:
+            for date, catalog_id, title, score in self.session.execute(query.limit(limit)):
+                activity.append({'type': kind, 'id': catalog_id, 'title': title,
+                                 'score': round(score or 0.0, 1), 'date': date.isoformat() if date else None})
+        activity.sort(key=lambda item: item['date'] or '', reverse=True)
+        return activity[:limit]
+
+    # Import
+
+    def import_profiles(self, profiles: Iterable[Tuple[str, Dict]]) -> Dict[str, int]:
+        """Import JSON user profiles (email, profile) in executemany batches.
+
+        Users already in the database are skipped, so the import can be re-run.
+        The JSON profiles keep no per-attempt quiz scores: each completed quiz is
+        imported as one attempt at the profile's average score.
+        """
+        counts = {'users': 0, 'lessons': 0, 'quizzes': 0, 'challenges': 0, 'achievements': 0}
+        batch = []
+        for email, profile in profiles:
+            if email:
+                batch.append((email, profile or {}))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, counts)
+                batch = []
+        if batch:
+            self._import_batch(batch, counts)
+        return counts
+
+    def _import_batch(self, batch: List[Tuple[str, Dict]], counts: Dict[str, int]):
+        try:
+            existing = self._user_ids(email for email, _ in batch)
+            new = [(email, profile) for email, profile in dict(batch).items() if email not in existing]
+            if not new:
+                return
+            self.session.execute(insert(User), [self._user_row(email, profile) for email, profile in new])
+            user_ids = self._user_ids(email for email, _ in new)
+
+            def completed(profile, *fields):
+                return list(dict.fromkeys(item for field in fields for item in profile.get(field) or []))
+
+            lesson_ids = self._catalog_ids(Lesson, (item for _, p in new for item in completed(p, 'completed_lesson_ids')))
+            quiz_ids = self._catalog_ids(Quiz, (item for _, p in new
+                                                for item in completed(p, 'completed_quiz_ids', 'completed_quizzes')))
+            challenge_ids = self._catalog_ids(Challenge, (item for _, p in new
+                                                          for item in completed(p, 'completed_challenge_ids')))
+            achievement_ids = self._achievement_ids(item for _, p in new for item in completed(p, 'achievements'))
+
+            lessons, quizzes, challenges, achievements = [], [], [], []
+            for email, profile in new:
+                user_id = user_ids[email]
+                when = _parse_date(profile.get('last_activity'))
+                for item in completed(profile, 'completed_lesson_ids'):
+                    lessons.append({'user_id': user_id, 'lesson_id': lesson_ids[item], 'status': 'completed',
+                                    'progress_percentage': 100.0, 'completed_date': when})
+                for item in completed(profile, 'completed_quiz_ids', 'completed_quizzes'):
+                    quizzes.append({'user_id': user_id, 'quiz_id': quiz_ids[item],
+                                    'score': round(profile.get('average_quiz_score') or 0), 'max_score': 100,
+                                    'completed_date': when or datetime.utcnow()})
+                for item in completed(profile, 'completed_challenge_ids'):
+                    challenges.append({'user_id': user_id, 'challenge_id': challenge_ids[item], 'code': '',
+                                       'status': 'passed', 'score': 100.0,
+                                       'submitted_date': when or datetime.utcnow()})
+                for item in completed(profile, 'achievements'):
+                    achievements.append({'user_id': user_id, 'achievement_id': achievement_ids[item]})
+
+            for model, rows in ((LessonProgress, lessons), (QuizAttempt, quizzes),
+                                (ChallengeSubmission, challenges), (UserAchievement, achievements)):
+                if rows:
+                    self.session.execute(insert(model), rows)
+            self.session.commit()
+
+            counts['users'] += len(new)
+            counts['lessons'] += len(lessons)
+            counts['quizzes'] += len(quizzes)
+            counts['challenges'] += len(challenges)
+            counts['achievements'] += len(achievements)
+        except Exception as e:
+            self.session.rollback()
+            error_handler.handle_error(e, context={"operation": "import_profiles", "batch": len(batch)})
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts"""
+        return {model.__tablename__: self.session.execute(select(func.count()).select_from(model)).scalar()
+                for model in (User, LessonProgress, QuizAttempt, ChallengeSubmission, UserAchievement)}
+
+# Global progress repository instance
+progress_repository = ProgressRepository()
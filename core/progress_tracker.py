@@ -16,6 +16,7 @@ import math
 from .error_handler import (
     error_handler, handle_errors, UserDataError, FileOperationError
 )
+from .leaderboard import Leaderboard
 
 class ProgressTracker:
     """Track user progress, achievements, and learning analytics"""
@@ -24,6 +25,10 @@ class ProgressTracker:
         self.user_data_file = user_data_file
         self.achievements_file = "data/achievements.json"
         self.load_achievements_config()
+
+        # Points leaderboard, re-ranked only for users whose entry changed
+        self._leaderboard = Leaderboard()
+        self._leaderboard_version = None
     
     def load_achievements_config(self):
         """Load achievement configurations"""
@@ -293,24 +298,36 @@ class ProgressTracker:
     
     def get_leaderboard(self, limit: int = 10) -> List[Dict]:
         """Get top users leaderboard"""
-        user_data = self.load_user_data()
-        
-        leaderboard = []
+        if self._leaderboard_version is None or self._leaderboard_version != self._file_version():
+            self._sync_leaderboard(self.load_user_data())
+
+        return self._leaderboard.top(limit)
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.user_data_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _sync_leaderboard(self, user_data: Dict):
+        """Bring the points leaderboard in line with user_data"""
+        for user_name in set(self._leaderboard.members()) - set(user_data):
+            self._leaderboard.remove(user_name)
+
         for user_name, profile in user_data.items():
-            leaderboard.append({
+            points = profile.get("points", 0)
+            self._leaderboard.update(user_name, (-points,), {
                 "name": user_name,
-                "points": profile.get("points", 0),
-                "level": self.calculate_level(profile.get("points", 0)),
+                "points": points,
+                "level": self.calculate_level(points),
                 "streak": profile.get("streak", 0),
                 "lessons_completed": len(profile.get("completed_lessons", [])),
                 "achievements": len(profile.get("achievements", []))
             })
-        
-        # Sort by points (descending)
-        leaderboard.sort(key=lambda x: x["points"], reverse=True)
-        
-        return leaderboard[:limit]
-    
+
+        self._leaderboard_version = self._file_version()
+
     def load_user_data(self) -> Dict:
         """Load user data from file with comprehensive error handling"""
         try:
@@ -351,6 +368,7 @@ class ProgressTracker:
             with open(self.user_data_file, 'w', encoding='utf-8') as f:
                 json.dump(user_data, f, indent=2, ensure_ascii=False)
 
+            self._sync_leaderboard(user_data)
             return True
 
         except PermissionError as e:
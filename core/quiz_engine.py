@@ -15,12 +15,15 @@ from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 import colorama
 from colorama import Fore, Style
+from .content_pack import PackedContent
 
 class QuizEngine:
     """Interactive quiz system with multiple question types"""
     
     def __init__(self, quiz_data_dir: str = "data/quizzes"):
         self.quiz_data_dir = quiz_data_dir
+        # Quiz files are read through the content pack next to the quiz directory, if built
+        self.content = PackedContent(os.path.dirname(os.path.normpath(quiz_data_dir)) or ".")
         self.current_quiz = None
         self.current_score = 0
         self.total_questions = 0
@@ -183,22 +186,20 @@ class QuizEngine:
         """Get list of available quizzes"""
         quizzes = []
         
-        for filename in os.listdir(self.quiz_data_dir):
-            if filename.endswith('.json'):
-                quiz_path = os.path.join(self.quiz_data_dir, filename)
-                try:
-                    with open(quiz_path, 'r') as f:
-                        quiz_data = json.load(f)
-                        quizzes.append({
-                            "id": filename[:-5],  # Remove .json extension
-                            "title": quiz_data.get("title", "Unknown Quiz"),
-                            "description": quiz_data.get("description", ""),
-                            "difficulty": quiz_data.get("difficulty", "unknown"),
-                            "question_count": len(quiz_data.get("questions", [])),
-                            "time_limit": quiz_data.get("time_limit", 0)
-                        })
-                except Exception as e:
-                    print(f"Error loading quiz {filename}: {e}")
+        for quiz_path in self.content.glob(os.path.join(self.quiz_data_dir, "*.json")):
+            filename = os.path.basename(quiz_path)
+            try:
+                quiz_data = self.content.read_json(quiz_path)
+                quizzes.append({
+                    "id": filename[:-5],  # Remove .json extension
+                    "title": quiz_data.get("title", "Unknown Quiz"),
+                    "description": quiz_data.get("description", ""),
+                    "difficulty": quiz_data.get("difficulty", "unknown"),
+                    "question_count": len(quiz_data.get("questions", [])),
+                    "time_limit": quiz_data.get("time_limit", 0)
+                })
+            except Exception as e:
+                print(f"Error loading quiz {filename}: {e}")
         
         return sorted(quizzes, key=lambda x: x["difficulty"])
     
@@ -206,13 +207,12 @@ class QuizEngine:
         """Start a quiz session"""
         quiz_path = os.path.join(self.quiz_data_dir, f"{quiz_id}.json")
         
-        if not os.path.exists(quiz_path):
+        if not self.content.exists(quiz_path):
             print(f"{Fore.RED}Quiz not found: {quiz_id}{Style.RESET_ALL}")
             return False
         
         try:
-            with open(quiz_path, 'r') as f:
-                self.current_quiz = json.load(f)
+            self.current_quiz = self.content.read_json(quiz_path)
         except Exception as e:
             print(f"{Fore.RED}Error loading quiz: {e}{Style.RESET_ALL}")
             return False
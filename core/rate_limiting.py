@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting Backends
+GCRA (generic cell rate algorithm) state stores for the rate limiter:
+- One theoretical arrival time (TAT) per client, O(1) memory and work per request
+- In-process, shared mmap file (across gunicorn workers) and Redis-compatible backends
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Any, Tuple
+
+# Try to import fcntl for Unix systems; without it the mmap backend only locks within a process
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+# Optional Redis client for the redis backend
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+def gcra(tat: Optional[float], now: float, interval: float, window: float) -> Tuple[bool, float]:
+    """
+    One GCRA step
+
+    Args:
+        tat: Stored theoretical arrival time, or None for a new client
+        now: Current time
+        interval: Seconds between requests at the sustained rate (window / limit)
+        window: Burst window; a client may make `limit` requests at once
+
+    Returns:
+        Tuple of (allowed, tat); tat is the value to store when allowed and
+        the unchanged stored value when not
+    """
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    # The epsilon absorbs float drift from summing many intervals
+    if new_tat - window > now + 1e-6:
+        return False, tat
+    return True, new_tat
+
+class RateLimitBackend:
+    """Base interface for GCRA state stores"""
+
+    backend_name = "base"
+
+    def acquire(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        """Atomically apply one GCRA step for key; returns (allowed, tat)"""
+        raise NotImplementedError
+
+    def reset(self, key: str = None):
+        """Forget one client's state, or everyone's"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+        return {"backend": self.backend_name}
+
+class MemoryBackend(RateLimitBackend):
+    """Per-process dict of TATs; expired entries are swept as requests arrive"""
+
+    backend_name = "memory"
+
+    def __init__(self, sweep_every: int = 1024):
+        self.sweep_every = sweep_every
+        self._tats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def acquire(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        with self._lock:
+            allowed, tat = gcra(self._tats.get(key), now, interval, window)
+            if allowed:
+                self._tats[key] = tat
+
+            # A TAT in the past is the same as no entry, so dropping it loses nothing
+            self._calls += 1
+            if self._calls % self.sweep_every == 0:
+                for stale in [k for k, value in self._tats.items() if value <= now]:
+                    del self._tats[stale]
+            return allowed, tat
+
+    def reset(self, key: str = None):
+        with self._lock:
+            if key is None:
+                self._tats.clear()
+            else:
+                self._tats.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.backend_name, "clients": len(self._tats)}
+
+class MmapBackend(RateLimitBackend):
+    """
+    Fixed-size hash table of TATs in a memory-mapped file
+
+    Every worker process maps the same file, so limits are shared. Updates
+    are serialized with flock. Keys are stored as 64-bit hashes with linear
+    probing; when a probe run is full, the slot with the oldest TAT is
+    reused, which at worst gives that client a fresh allowance.
+    """
+
+    backend_name = "mmap"
+
+    MAGIC = b"RLGCRA01"
+    HEADER = struct.Struct("<8sI")
+    SLOT = struct.Struct("<Qd")
+    PROBE_LENGTH = 32
+
+    def __init__(self, path: str = "data/rate_limits.bin", slots: int = 65536):
+        self.path = str(path)
+        self._lock = threading.Lock()
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        size = self.HEADER.size + slots * self.SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "r+b")
+        with self._file_lock():
+            if os.fstat(fd).st_size < self.HEADER.size:
+                os.ftruncate(fd, size)
+                os.pwrite(fd, self.HEADER.pack(self.MAGIC, slots), 0)
+            magic, existing_slots = self.HEADER.unpack(os.pread(fd, self.HEADER.size, 0))
+            if magic != self.MAGIC:
+                raise ValueError(f"{self.path} is not a rate limit table")
+        # The first process to create the file decides the table size
+        self.slots = existing_slots
+        self._map = mmap.mmap(fd, self.HEADER.size + self.slots * self.SLOT.size)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the table shared with other processes"""
+        if HAS_FCNTL:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _hash(self, key: str) -> int:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        # 0 marks an empty slot
+        return int.from_bytes(digest, "little") or 1
+
+    def _offset(self, slot: int) -> int:
+        return self.HEADER.size + slot * self.SLOT.size
+
+    def _find(self, key_hash: int, now: float) -> Tuple[int, Optional[float]]:
+        """Slot holding key_hash (with its TAT), or the best slot to claim (TAT None)"""
+        start = key_hash % self.slots
+        claim = None
+        claim_tat = None
+        for step in range(min(self.PROBE_LENGTH, self.slots)):
+            slot = (start + step) % self.slots
+            stored_hash, tat = self.SLOT.unpack_from(self._map, self._offset(slot))
+            if stored_hash == key_hash:
+                return slot, tat
+            # Prefer an empty or expired slot, then the oldest one
+            age = -1.0 if stored_hash == 0 or tat <= now else tat
+            if claim is None or age < claim_tat:
+                claim, claim_tat = slot, age
+        return claim, None
+
+    def acquire(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        key_hash = self._hash(key)
+        with self._lock, self._file_lock():
+            slot, stored = self._find(key_hash, now)
+            allowed, tat = gcra(stored, now, interval, window)
+            if allowed:
+                self.SLOT.pack_into(self._map, self._offset(slot), key_hash, tat)
+            return allowed, tat
+
+    def reset(self, key: str = None):
+        with self._lock, self._file_lock():
+            if key is None:
+                self._map[self.HEADER.size:] = bytes(len(self._map) - self.HEADER.size)
+                return
+            slot, stored = self._find(self._hash(key), time.time())
+            if stored is not None:
+                self.SLOT.pack_into(self._map, self._offset(slot), 0, 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            active = sum(
+                1 for slot in range(self.slots)
+                if self.SLOT.unpack_from(self._map, self._offset(slot))[1] > now
+            )
+        return {"backend": self.backend_name, "path": self.path, "slots": self.slots, "clients": active}
+
+class RedisBackend(RateLimitBackend):
+    """GCRA in a Lua script on Redis or any server speaking its protocol"""
+
+    backend_name = "redis"
+
+    SCRIPT = """
+local tat = tonumber(redis.call('GET', KEYS[1]))
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+if not tat or tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - window > now + 1e-6 then return {0, tostring(tat)} end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat)}
+"""
+
+    def __init__(self, client=None, url: str = None, prefix: str = "ratelimit:"):
+        if client is None:
+            if not HAS_REDIS:
+                raise ImportError("The redis rate limit backend needs the redis package")
+            client = redis.Redis.from_url(url or "redis://localhost:6379/0")
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def acquire(self, key: str, now: float, interval: float, window: float) -> Tuple[bool, float]:
+        allowed, tat = self._script(keys=[self.prefix + key], args=[repr(now), repr(interval), repr(window)])
+        return bool(int(allowed)), float(tat)
+
+    def reset(self, key: str = None):
+        if key is not None:
+            self.client.delete(self.prefix + key)
+            return
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+def create_rate_limit_backend(backend: str = None, data_dir: str = "data") -> RateLimitBackend:
+    """Create a rate limit backend (RATE_LIMIT_BACKEND: memory, mmap or redis; default memory)"""
+    backend = (backend or os.environ.get("RATE_LIMIT_BACKEND", "memory")).lower()
+
+    if backend == "memory":
+        return MemoryBackend()
+    if backend == "mmap":
+        return MmapBackend(os.path.join(data_dir, "rate_limits.bin"))
+    if backend == "redis":
+        return RedisBackend(url=os.environ.get("RATE_LIMIT_REDIS_URL"))
+
+    raise ValueError(f"Unknown rate limit backend: {backend}")
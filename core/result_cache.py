@@ -0,0 +1,172 @@
+"""
+Execution Result Cache Module
+Content-addressed cache for sandbox results:
+- Keyed by the normalized code AST, challenge id and test-suite version
+- LRU eviction bounded by entry count and total size
+- Per-challenge invalidation when test cases change
+"""
+
+import ast
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Callable
+
+# Imports whose results vary from run to run; submissions using them are never cached
+NONDETERMINISTIC_MODULES = {'random', 'time', 'datetime'}
+
+# Builtins whose results vary between worker processes
+NONDETERMINISTIC_CALLS = {'id', 'hash'}
+
+def suite_version(test_cases: List[Dict[str, Any]]) -> str:
+    """Stable hash of a list of test cases; changes whenever a test changes"""
+    canonical = json.dumps(test_cases, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+def normalize_code(code: str) -> Optional[str]:
+    """AST dump of code, ignoring formatting and comments.
+
+    Returns None when the code does not parse or is not deterministic.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            if any(alias.name.split('.')[0] in NONDETERMINISTIC_MODULES for alias in node.names):
+                return None
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and node.module.split('.')[0] in NONDETERMINISTIC_MODULES:
+                return None
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in NONDETERMINISTIC_CALLS:
+                return None
+
+    return ast.dump(tree, annotate_fields=False, include_attributes=False)
+
+class ExecutionResultCache:
+    """LRU cache of JSON-encoded execution and grading results"""
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (challenge_id, encoded result)
+        self._by_challenge = {}  # challenge_id -> set of keys
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def make_key(self, code: str, challenge_id: str = "", version: str = "",
+                 kind: str = "run") -> Optional[str]:
+        """Content address for a submission, or None if it must not be cached"""
+        normalized = normalize_code(code)
+        if normalized is None:
+            return None
+        digest = hashlib.sha256()
+        for part in (kind, challenge_id or "", version or "", normalized):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached result for a key (a fresh copy), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            encoded = entry[1]
+        return json.loads(encoded)
+
+    def set(self, key: str, result: Any, challenge_id: str = ""):
+        """Store a result, evicting least recently used entries to stay in bounds"""
+        try:
+            encoded = json.dumps(result)
+        except (TypeError, ValueError):
+            return
+        if len(encoded) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (challenge_id or "", encoded)
+            self._bytes += len(encoded)
+            if challenge_id:
+                self._by_challenge.setdefault(challenge_id, set()).add(key)
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        challenge_id, encoded = entry
+        self._bytes -= len(encoded)
+        if challenge_id:
+            keys = self._by_challenge.get(challenge_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_challenge[challenge_id]
+
+    def get_or_run(self, code: str, run: Callable[[], Dict[str, Any]], challenge_id: str = "",
+                   version: str = "", kind: str = "run") -> Dict[str, Any]:
+        """Return the cached result for identical code, or run it and cache the result.
+
+        Results flagged `transient` (timeouts, resource limits, busy pool)
+        depend on load rather than on the code and are not cached.
+        """
+        key = self.make_key(code, challenge_id, version, kind)
+        if key is not None:
+            cached = self.get(key)
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+
+        result = run()
+        if key is not None and not result.get("transient"):
+            self.set(key, result, challenge_id)
+        return result
+
+    def invalidate_challenge(self, challenge_id: str) -> int:
+        """Drop every cached result for a challenge; returns the number removed"""
+        with self._lock:
+            keys = list(self._by_challenge.get(challenge_id, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """Clear all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self._by_challenge.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": self._hits / total if total else 0
+            }
+
+# Global result cache instance
+result_cache = ExecutionResultCache()
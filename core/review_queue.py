@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Review Due-Queue
+Persistent index of spaced repetition reviews ordered by due time:
+- Review state lives in each profile's spaced_repetition section; this
+  index mirrors it in SQLite keyed by (next_review) and (email, next_review)
+- "What is due for this user" reads k rows from an index, O(k log n)
+- A digest of everything due for every user is one range scan
+- Kept in step through user store notifications; when the store changed
+  behind its back it re-reads only the profiles written since its last
+  sync (a full rebuild only when it has never synced)
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+from .error_handler import error_handler
+from .job_queue import fingerprint
+from .user_store import user_store
+
+# Profile section holding concept_id -> review state
+REVIEW_FIELD = "spaced_repetition"
+
+# Profiles written this long before a sync are re-read on the next catch-up,
+# covering write transactions that were still open when the sync ran
+SYNC_MARGIN = 5.0
+
+def _epoch(value: Any, default: float) -> float:
+    """ISO timestamp (or epoch seconds) to epoch seconds"""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return default
+
+def review_priority(last_review: float, last_performance: float, now: float) -> float:
+    """Forgetting-curve priority: grows with time since review, shrinks with performance"""
+    hours_since_review = (now - last_review) / 3600
+    return hours_since_review * (1 - last_performance) * 100
+
+class ReviewQueue:
+    """Per-user review due-queue backed by the user store"""
+
+    def __init__(self, store=None, db_path: str = "data/review_queue.db", timeout: float = 10.0):
+        self.store = store
+        self.db_path = str(db_path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        # email -> fingerprint of the indexed review section, to skip unrelated profile writes
+        self._indexed: Dict[str, str] = {}
+        self._stale = True
+        # Bumped on every store notification, so a rebuild can tell whether
+        # writes landed while it was reading the store
+        self._generation = 0
+
+        self.syncs = 0
+        self.rebuilds = 0
+        self.catchups = 0
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+        if store is not None and hasattr(store, "subscribe"):
+            store.subscribe(self)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        """Create tables if they do not exist"""
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_due ("
+            " email TEXT NOT NULL,"
+            " concept_id TEXT NOT NULL,"
+            " next_review REAL NOT NULL,"
+            " last_review REAL NOT NULL,"
+            " last_performance REAL NOT NULL,"
+            " PRIMARY KEY (email, concept_id))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS review_due_by_time ON review_due (next_review)")
+        conn.execute("CREATE INDEX IF NOT EXISTS review_due_by_user ON review_due (email, next_review)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS queue_meta ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL)"
+        )
+
+    # Index maintenance
+
+    def _rows(self, email: str, profile: Optional[Dict]) -> List[Tuple]:
+        rows = []
+        now = time.time()
+        for concept_id, state in ((profile or {}).get(REVIEW_FIELD) or {}).items():
+            if not isinstance(state, dict):
+                continue
+            rows.append((email, concept_id, _epoch(state.get('next_review'), now),
+                         _epoch(state.get('last_review'), now), float(state.get('last_performance', 0.5))))
+        return rows
+
+    def _replace_user(self, conn: sqlite3.Connection, email: str, profile: Optional[Dict]):
+        conn.execute("DELETE FROM review_due WHERE email = ?", (email,))
+        conn.executemany(
+            "INSERT INTO review_due (email, concept_id, next_review, last_review, last_performance) "
+            "VALUES (?, ?, ?, ?, ?)", self._rows(email, profile)
+        )
+
+    def _record_meta(self, conn: sqlite3.Connection, key: str, value: Any):
+        conn.execute(
+            "INSERT INTO queue_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value))
+        )
+
+    def _record_store_version(self, conn: sqlite3.Connection, version: Any):
+        self._record_meta(conn, 'store_version', version)
+
+    def user_changed(self, email: str, profile: Optional[Dict]):
+        """Re-index one user's reviews after a profile write"""
+        section = (profile or {}).get(REVIEW_FIELD) if profile is not None else None
+        version = fingerprint(section)
+        with self._lock:
+            self._generation += 1
+            if self._indexed.get(email) == version:
+                # Unrelated profile write; the recorded store version only moves
+                # with the rows, so a restart may rebuild once but writes stay cheap
+                return
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._replace_user(conn, email, profile)
+                self._record_store_version(conn, self.store.version())
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._indexed[email] = version
+            self.syncs += 1
+
+    def users_reset(self):
+        """The store changed behind our back; check it before the next read"""
+        with self._lock:
+            self._generation += 1
+            self._stale = True
+
+    def rebuild(self, since: float = None) -> bool:
+        """Re-index every user from the store, or only users written at or after since
+        (epoch seconds); False if writes kept landing during the read"""
+        if self.store is None:
+            return True
+
+        # The store is read without holding our lock (its writers call into
+        # us while holding theirs); retry if a write lands during the read
+        for _ in range(3):
+            with self._lock:
+                generation = self._generation
+            started = time.time()
+            store_version = self.store.version()
+            if since is None:
+                users = list(self.store.iter_users())
+            else:
+                users = list(self.store.iter_users_since(since))
+                emails = set(self.store.iter_emails())
+            with self._lock:
+                if generation != self._generation:
+                    continue
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if since is None:
+                        conn.execute("DELETE FROM review_due")
+                        gone = []
+                    else:
+                        indexed = [row[0] for row in conn.execute("SELECT DISTINCT email FROM review_due")]
+                        gone = [email for email in indexed if email not in emails]
+                        conn.executemany("DELETE FROM review_due WHERE email = ?", [(email,) for email in gone])
+                    for email, profile in users:
+                        self._replace_user(conn, email, profile)
+                    self._record_store_version(conn, store_version)
+                    self._record_meta(conn, 'synced_at', started)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                if since is None:
+                    self._indexed = {}
+                    self.rebuilds += 1
+                else:
+                    self.catchups += 1
+                for email in gone:
+                    self._indexed.pop(email, None)
+                for email, profile in users:
+                    self._indexed[email] = fingerprint(profile.get(REVIEW_FIELD))
+                self._stale = False
+                return True
+        return False
+
+    def _ensure_current(self):
+        """Catch up with store writes the index has not seen"""
+        with self._lock:
+            if not self._stale or self.store is None:
+                return
+            generation = self._generation
+            meta = dict(self._connect().execute("SELECT key, value FROM queue_meta").fetchall())
+        checked_at = time.time()
+        if meta.get('store_version') != str(self.store.version()):
+            # Only profiles written since the last sync can hold unseen review changes
+            synced_at = meta.get('synced_at')
+            since = float(synced_at) - SYNC_MARGIN if synced_at is not None else None
+            try:
+                self.rebuild(since)
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "rebuild_review_queue"})
+            return
+        with self._lock:
+            if generation == self._generation:
+                # Nothing unseen: later catch-ups can start from here
+                self._record_meta(self._connect(), 'synced_at', checked_at)
+                self._stale = False
+
+    # Scheduling
+
+    def schedule(self, email: str, concept_id: str, next_review: datetime,
+                 performance: float = None, reviewed_at: datetime = None) -> bool:
+        """Record a review result and the next due time in the user's profile"""
+        reviewed_at = reviewed_at or datetime.now()
+
+        def updater(profile):
+            state = profile.setdefault(REVIEW_FIELD, {}).setdefault(concept_id, {})
+            state['next_review'] = next_review.isoformat()
+            state['last_review'] = reviewed_at.isoformat()
+            state['reviews'] = state.get('reviews', 0) + 1
+            if performance is not None:
+                state['last_performance'] = performance
+
+        return self.store.update_user(email, updater) is not None
+
+    # Reading
+
+    def _item(self, row: Tuple, now: float) -> Dict[str, Any]:
+        concept_id, next_review, last_review, last_performance = row
+        return {
+            'concept_id': concept_id,
+            'next_review': datetime.fromtimestamp(next_review).isoformat(),
+            'priority': review_priority(last_review, last_performance, now),
+            'last_performance': last_performance
+        }
+
+    def due(self, email: str, now: float = None, limit: int = None) -> List[Dict[str, Any]]:
+        """A user's due reviews (the limit longest overdue), highest priority first"""
+        now = time.time() if now is None else now
+        self._ensure_current()
+        rows = self._connect().execute(
+            "SELECT concept_id, next_review, last_review, last_performance FROM review_due "
+            "WHERE email = ? AND next_review <= ? ORDER BY next_review LIMIT ?",
+            (email, now, -1 if limit is None else limit)
+        ).fetchall()
+        items = [self._item(row, now) for row in rows]
+        items.sort(key=lambda item: item['priority'], reverse=True)
+        return items
+
+    def next_due(self, email: str) -> Optional[datetime]:
+        """When the user's earliest review falls due"""
+        self._ensure_current()
+        row = self._connect().execute(
+            "SELECT MIN(next_review) FROM review_due WHERE email = ?", (email,)
+        ).fetchone()
+        return datetime.fromtimestamp(row[0]) if row and row[0] is not None else None
+
+    def iter_due(self, now: float = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Every due review of every user, earliest first, in one range scan"""
+        now = time.time() if now is None else now
+        self._ensure_current()
+        cursor = self._connect().execute(
+            "SELECT email, concept_id, next_review, last_review, last_performance FROM review_due "
+            "WHERE next_review <= ? ORDER BY next_review", (now,)
+        )
+        for row in cursor:
+            yield row[0], self._item(row[1:], now)
+
+    def digest(self, now: float = None, per_user: int = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Due reviews grouped by user (highest priority first) for a daily digest"""
+        now = time.time() if now is None else now
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for email, item in self.iter_due(now):
+            grouped.setdefault(email, []).append(item)
+        for email, items in grouped.items():
+            items.sort(key=lambda item: item['priority'], reverse=True)
+            if per_user is not None:
+                del items[per_user:]
+        return grouped
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue statistics"""
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM review_due").fetchone()[0]
+        due = conn.execute("SELECT COUNT(*) FROM review_due WHERE next_review <= ?", (time.time(),)).fetchone()[0]
+        return {"reviews": total, "due": due, "syncs": self.syncs, "rebuilds": self.rebuilds,
+                "catchups": self.catchups}
+
+# Global review queue instance over the global user store
+review_queue = ReviewQueue(user_store)
@@ -0,0 +1,761 @@
+"""
+Sandbox Module
+Runs untrusted user code in a pool of warm worker processes:
+- Per-run CPU, memory and wall-clock limits
+- Streamed stdout with an output cap
+- Workers recycled after a fixed number of runs or any limit breach
+- JSON-only messages between the web process and the workers
+- Workers started as root drop to an unprivileged user with a private
+  working directory before running any user code
+
+Results that depend on load rather than on the code (timeouts, limit
+breaches, a busy pool) are flagged `transient`.
+"""
+
+import ast
+import atexit
+import builtins
+import json
+import linecache
+import math
+import os
+import queue
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import types
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Callable
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    # resource is not available on Windows; only the wall-clock limit applies
+    HAS_RESOURCE = False
+
+try:
+    import pwd
+    HAS_PWD = True
+except ImportError:
+    HAS_PWD = False
+
+USER_FILENAME = "<user_code>"
+
+# Modules user code may import inside the sandbox
+ALLOWED_MODULES = {
+    'math', 'random', 'datetime', 'json', 'collections', 'itertools',
+    'functools', 're', 'string', 'time', 'calendar', 'decimal',
+    'fractions', 'statistics', 'heapq', 'bisect', 'copy', 'operator'
+}
+
+# Calls rejected by the static safety check
+BLOCKED_FUNCTIONS = {
+    'exec', 'eval', 'compile', '__import__', 'open',
+    'input', 'raw_input', 'file', 'execfile', 'reload'
+}
+
+# Attribute names rejected by the static safety check; so is any name starting
+# with '_', which is how code walks from a value to its class, the class
+# hierarchy and other modules' globals
+BLOCKED_ATTRIBUTES = {'open', 'read', 'write', 'remove', 'rmdir'}
+
+# Attributes that lead from ordinary values to frames, code objects, module
+# tables or attribute lookups by string, and from there to the worker's own
+# globals; rejected like names starting with '_'
+INTROSPECTION_ATTRIBUTES = {
+    'gi_frame', 'gi_code', 'gi_yieldfrom', 'cr_frame', 'cr_code', 'cr_await',
+    'cr_origin', 'ag_frame', 'ag_code', 'ag_await', 'tb_frame', 'tb_next',
+    'f_back', 'f_globals', 'f_locals', 'f_builtins', 'f_code', 'f_trace',
+    'co_code', 'co_consts', 'mro', 'modules', 'attrgetter', 'methodcaller',
+    'get_field'
+}
+
+# Builtins that take an attribute name as a string
+ATTRIBUTE_FUNCTIONS = {'getattr', 'setattr', 'delattr', 'hasattr'}
+
+# Account workers switch to when the pool runs as root
+SANDBOX_USER = os.environ.get('SANDBOX_USER', 'nobody')
+
+SAFE_BUILTINS = [
+    'print', 'len', 'range', 'str', 'int', 'float', 'bool', 'list', 'dict',
+    'tuple', 'set', 'frozenset', 'bytes', 'abs', 'max', 'min', 'sum',
+    'sorted', 'reversed', 'enumerate', 'zip', 'isinstance',
+    'issubclass', 'hasattr', 'round', 'pow', 'divmod',
+    'chr', 'ord', 'hex', 'oct', 'bin', 'format', 'repr', 'ascii', 'all',
+    'any', 'filter', 'map', 'iter', 'next', 'slice', 'hash', 'callable',
+    'super', 'property', 'staticmethod', 'classmethod',
+    '__build_class__', 'Exception', 'ArithmeticError', 'AssertionError',
+    'AttributeError', 'IndexError', 'KeyError', 'LookupError',
+    'NotImplementedError', 'RecursionError', 'RuntimeError',
+    'StopIteration', 'TypeError', 'ValueError', 'ZeroDivisionError'
+]
+
+def _restricted_attribute(name: str) -> bool:
+    return name.startswith('_') or name in INTROSPECTION_ATTRIBUTES
+
+def check_code_safety(code: str, allowed_modules: Optional[set] = None,
+                      blocked_functions: Optional[set] = None) -> Tuple[bool, str]:
+    """Statically reject code with blocked calls, imports, file operations or introspection"""
+    allowed_modules = ALLOWED_MODULES if allowed_modules is None else allowed_modules
+    blocked_functions = BLOCKED_FUNCTIONS if blocked_functions is None else blocked_functions
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return False, f"Syntax error: {e}"
+    except Exception as e:
+        return False, f"Code analysis error: {e}"
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in blocked_functions:
+                return False, f"Blocked function: {node.func.id}"
+            if node.func.id in ATTRIBUTE_FUNCTIONS and len(node.args) > 1:
+                name = node.args[1]
+                if not isinstance(name, ast.Constant) or not isinstance(name.value, str):
+                    return False, f"{node.func.id} needs a literal attribute name"
+                if _restricted_attribute(name.value):
+                    return False, f"Attribute access not allowed: {name.value}"
+
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name not in allowed_modules:
+                    return False, f"Import not allowed: {alias.name}"
+
+        if isinstance(node, ast.ImportFrom):
+            if node.module and node.module not in allowed_modules:
+                return False, f"Import not allowed: {node.module}"
+            for alias in node.names:
+                if _restricted_attribute(alias.name):
+                    return False, f"Import not allowed: {alias.name}"
+
+        if isinstance(node, ast.Attribute):
+            if _restricted_attribute(node.attr):
+                return False, f"Attribute access not allowed: {node.attr}"
+            if node.attr in BLOCKED_ATTRIBUTES:
+                return False, f"File operation not allowed: {node.attr}"
+
+    return True, "Code is safe"
+
+class CPUTimeExceeded(Exception):
+    """Raised inside a worker when the per-run CPU limit is reached"""
+    pass
+
+def _to_plain(value: Any, depth: int = 0) -> Any:
+    """Convert a user value into something JSON can carry"""
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else repr(value)
+    if depth < 20 and isinstance(value, (list, tuple)):
+        return [_to_plain(item, depth + 1) for item in value]
+    if depth < 20 and isinstance(value, dict):
+        return {str(key): _to_plain(item, depth + 1) for key, item in value.items()}
+    return _safe_repr(value)
+
+def _safe_repr(value: Any, limit: int = 200) -> str:
+    """repr() that never raises and stays short"""
+    try:
+        text = repr(value)
+    except Exception:
+        text = f"<{type(value).__name__} object>"
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _write_frame(stream, message: Dict[str, Any]):
+    """Write one length-prefixed JSON frame"""
+    data = json.dumps(message).encode('utf-8')
+    stream.write(struct.pack('>I', len(data)) + data)
+    stream.flush()
+
+def _read_frame(stream, max_size: int) -> Dict[str, Any]:
+    """Read one length-prefixed JSON frame; EOFError when the pipe closes"""
+    header = stream.read(4)
+    if len(header) < 4:
+        raise EOFError("Sandbox channel closed")
+    size = struct.unpack('>I', header)[0]
+    if size > max_size:
+        raise ValueError(f"Sandbox message too large ({size} bytes)")
+    data = stream.read(size)
+    if len(data) < size:
+        raise EOFError("Sandbox channel closed")
+    return json.loads(data)
+
+class _OutputStream:
+    """stdout replacement that streams capped chunks back to the pool"""
+
+    def __init__(self, channel, max_output: int, chunk_size: int = 4096, flush_interval: float = 0.05):
+        self.channel = channel
+        self.max_output = max_output
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.buffered = 0
+        self.written = 0
+        self.truncated = False
+        self.last_flush = time.monotonic()
+
+    def write(self, text) -> int:
+        text = str(text)
+        remaining = self.max_output - self.written
+        if remaining <= 0:
+            self.truncated = self.truncated or bool(text)
+            return len(text)
+        if len(text) > remaining:
+            self.truncated = True
+            text = text[:remaining]
+
+        self.buffer.append(text)
+        self.buffered += len(text)
+        self.written += len(text)
+        if self.buffered >= self.chunk_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            _write_frame(self.channel, {"type": "stdout", "data": "".join(self.buffer)})
+            self.buffer = []
+            self.buffered = 0
+        self.last_flush = time.monotonic()
+
+    def isatty(self) -> bool:
+        return False
+
+# Module name -> the view of it handed to user code
+_module_views: Dict[str, types.ModuleType] = {}
+
+def _module_view(module: types.ModuleType) -> types.ModuleType:
+    """Copy of a module without private names or other modules it imported
+    (statistics.sys, random's os, ...), only its own submodules"""
+    view = _module_views.get(module.__name__)
+    if view is None:
+        view = _module_views[module.__name__] = types.ModuleType(module.__name__)
+        package = module.__name__.split('.')[0]
+        for name, value in vars(module).items():
+            if _restricted_attribute(name):
+                continue
+            if isinstance(value, types.ModuleType):
+                if not value.__name__.startswith(module.__name__ + '.') or value.__name__.split('.')[0] != package:
+                    continue
+                value = _module_view(value)
+            setattr(view, name, value)
+    return view
+
+def _restricted_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """__import__ replacement limited to ALLOWED_MODULES, returning module views"""
+    if level != 0 or name.split('.')[0] not in ALLOWED_MODULES:
+        raise ImportError(f"Import not allowed: {name}")
+    for item in fromlist or ():
+        if _restricted_attribute(item):
+            raise ImportError(f"Import not allowed: {item}")
+    return _module_view(builtins.__import__(name, globals, locals, fromlist, level))
+
+def _safe_builtins() -> Dict[str, Any]:
+    """Builtins exposed to user code"""
+    safe = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+    safe['__import__'] = _restricted_import
+    return safe
+
+def _user_traceback(error: BaseException) -> str:
+    """Traceback limited to frames from the user's code"""
+    frames = [frame for frame in traceback.extract_tb(error.__traceback__)
+              if frame.filename == USER_FILENAME]
+    lines = ["Traceback (most recent call last):\n"] if frames else []
+    lines += traceback.format_list(frames)
+    lines += traceback.format_exception_only(type(error), error)
+    return "".join(lines)
+
+def _address_space() -> int:
+    """Current virtual memory size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+def _raise_cpu_exceeded(signum, frame):
+    raise CPUTimeExceeded("CPU time limit exceeded")
+
+def _apply_process_limits(limits: Dict[str, Any]):
+    """Limits that hold for the whole life of a worker"""
+    if not HAS_RESOURCE:
+        return
+
+    def set_limit(kind, value):
+        try:
+            soft, hard = resource.getrlimit(kind)
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            resource.setrlimit(kind, (value, hard))
+        except (ValueError, OSError):
+            pass
+
+    # Memory is capped relative to the interpreter's own footprint
+    set_limit(resource.RLIMIT_AS, _address_space() + limits["memory_limit_mb"] * 1024 * 1024)
+    # No file writes and no child processes
+    set_limit(resource.RLIMIT_FSIZE, 0)
+    set_limit(resource.RLIMIT_NPROC, 0)
+    set_limit(resource.RLIMIT_CORE, 0)
+
+    signal.signal(signal.SIGXCPU, _raise_cpu_exceeded)
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+
+def _drop_privileges(limits: Dict[str, Any]):
+    """Switch to the unprivileged uid/gid chosen by the pool, if any"""
+    uid, gid = limits.get("uid"), limits.get("gid")
+    if uid is None:
+        return
+    # The interpreter's own files may not be readable by the sandbox user,
+    # so everything user code can import is loaded first
+    for name in sorted(ALLOWED_MODULES):
+        __import__(name)
+    os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+    if os.getuid() != uid or os.geteuid() != uid:
+        raise SystemExit("Sandbox worker could not drop privileges")
+
+def _set_cpu_limit(seconds: Optional[float]):
+    """Set the soft CPU limit to `seconds` beyond what the worker has used so far"""
+    if not HAS_RESOURCE:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if seconds is None:
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+            return
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        limit = int(math.ceil(usage.ru_utime + usage.ru_stime + seconds))
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+def _run_test_cases(channel, stream: '_OutputStream', function: Callable, job: Dict[str, Any]):
+    """Call an already-defined function once per test case, reporting each case as it finishes"""
+    time_limit = job.get("time_limit")
+
+    for index, case in enumerate(job["tests"]):
+        actual, error = None, None
+        case_start = time.perf_counter()
+        try:
+            actual = _to_plain(function(*case.get("args", [])))
+        except (CPUTimeExceeded, MemoryError):
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - case_start
+
+        stream.flush()
+        _write_frame(channel, {"type": "case", "index": index, "actual": actual,
+                               "error": error, "execution_time": elapsed})
+
+        if job.get("stop_on_failure"):
+            timed_out = time_limit is not None and elapsed > time_limit
+            if error or timed_out or actual != case.get("expected"):
+                break
+
+def _run_job(channel, job: Dict[str, Any], limits: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute one job inside a worker"""
+    stream = _OutputStream(channel, limits["max_output"])
+    namespace = {'__builtins__': _safe_builtins(), '__name__': '__main__'}
+    linecache.cache[USER_FILENAME] = (len(job["code"]), None, job["code"].splitlines(True), USER_FILENAME)
+    result = {"success": False, "error": None, "recycle": False}
+
+    # Checked again here so code reaching the pool directly gets the same rules
+    is_safe, message = check_code_safety(job["code"])
+    if not is_safe:
+        result["error"] = message
+        result["truncated"] = False
+        return result
+
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = stream
+    _set_cpu_limit(job.get("cpu_limit", limits["cpu_limit"]))
+    start_time = time.perf_counter()
+
+    try:
+        exec(compile(job["code"], USER_FILENAME, "exec"), namespace)
+
+        function_name = job.get("function")
+        if function_name:
+            function = namespace.get(function_name)
+            if not callable(function):
+                raise NameError(f"Function '{function_name}' not found in your code")
+            if "tests" in job:
+                _run_test_cases(channel, stream, function, job)
+            else:
+                result["return_value"] = _to_plain(function(*job.get("args", [])))
+
+        result["success"] = True
+    except CPUTimeExceeded:
+        result["error"] = "CPU time limit exceeded"
+        result["recycle"] = result["transient"] = True
+    except MemoryError:
+        result["error"] = "Memory limit exceeded"
+        result["recycle"] = result["transient"] = True
+    except BaseException as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = _user_traceback(e)
+    finally:
+        result["execution_time"] = time.perf_counter() - start_time
+        _set_cpu_limit(None)
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+
+    if result["success"] and "tests" not in job:
+        result["variables"] = {
+            key: _safe_repr(value) for key, value in namespace.items()
+            if not key.startswith('_') and not callable(value)
+            and not isinstance(value, types.ModuleType)
+        }
+    result["truncated"] = stream.truncated
+    stream.flush()
+    return result
+
+def _worker_main(limits: Dict[str, Any]):
+    """Worker process loop: receive a job, run it, reply"""
+    # Keep private copies of the pipes and point fds 0/1 at /dev/null so
+    # stray writes from user code cannot corrupt the frame stream
+    channel_in = os.fdopen(os.dup(0), 'rb')
+    channel_out = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    _drop_privileges(limits)
+    _apply_process_limits(limits)
+
+    while True:
+        try:
+            job = _read_frame(channel_in, limits["max_job_size"])
+        except (EOFError, OSError, ValueError):
+            break
+
+        try:
+            result = _run_job(channel_out, job, limits)
+        except BaseException as e:
+            result = {"success": False, "error": f"Sandbox error: {e}", "recycle": True, "transient": True}
+
+        result["type"] = "result"
+        try:
+            _write_frame(channel_out, result)
+        except (OSError, ValueError, TypeError):
+            break
+
+        if result.get("recycle"):
+            break
+
+def _worker_env() -> Dict[str, str]:
+    """Minimal environment for worker processes"""
+    return {key: os.environ[key] for key in ('PATH', 'SYSTEMROOT') if key in os.environ}
+
+def _sandbox_identity() -> Tuple[Optional[int], Optional[int]]:
+    """(uid, gid) workers should run as; (None, None) unless the pool runs as root"""
+    if not hasattr(os, 'setuid') or os.geteuid() != 0:
+        return None, None
+    if HAS_PWD:
+        try:
+            account = pwd.getpwnam(SANDBOX_USER)
+            return account.pw_uid, account.pw_gid
+        except KeyError:
+            pass
+    return 65534, 65534
+
+class _Worker:
+    """Handle on one sandbox worker process"""
+
+    def __init__(self, limits: Dict[str, Any], max_message: int):
+        # Each worker gets a private, empty working directory owned by the
+        # user it runs as
+        uid, gid = _sandbox_identity()
+        self.workdir = tempfile.mkdtemp(prefix="sandbox-")
+        os.chmod(self.workdir, 0o700)
+        if uid is not None:
+            os.chown(self.workdir, uid, gid)
+
+        # The worker runs this file as an isolated script, so it imports
+        # nothing from the web process and inherits none of its descriptors
+        self.process = subprocess.Popen(
+            [sys.executable, '-I', os.path.abspath(__file__), json.dumps({**limits, "uid": uid, "gid": gid})],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=self.workdir, env=_worker_env(), close_fds=True
+        )
+        self.messages = queue.Queue()
+        self.runs = 0
+        self.reader = threading.Thread(target=self._read_loop, args=(max_message,), daemon=True)
+        self.reader.start()
+
+    def _read_loop(self, max_message: int):
+        try:
+            while True:
+                self.messages.put(_read_frame(self.process.stdout, max_message))
+        except Exception as e:
+            self.messages.put(e)
+
+    def send(self, message: Dict[str, Any]):
+        _write_frame(self.process.stdin, message)
+
+    def receive(self, timeout: float) -> Dict[str, Any]:
+        """Next message from the worker; queue.Empty on timeout"""
+        message = self.messages.get(timeout=timeout)
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=1)
+        except Exception:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+class SandboxPool:
+    """Pool of warm worker processes that execute untrusted code"""
+
+    def __init__(self, size: Optional[int] = None, max_runs_per_worker: int = 50,
+                 cpu_limit: float = 2, memory_limit_mb: int = 128,
+                 wall_timeout: float = 5.0, max_output: int = 64 * 1024,
+                 queue_timeout: float = 10.0):
+        self.size = size or os.cpu_count() or 2
+        self.max_runs_per_worker = max_runs_per_worker
+        self.wall_timeout = wall_timeout
+        self.queue_timeout = queue_timeout
+        self.limits = {
+            "cpu_limit": cpu_limit,
+            "memory_limit_mb": memory_limit_mb,
+            "max_output": max_output,
+            "max_job_size": 1024 * 1024
+        }
+        self.max_message = max_output * 8 + 65536
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._executor = None
+        self._stats = {"runs": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+
+    def start(self):
+        """Start the worker processes ahead of the first run"""
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="sandbox")
+            self._started = True
+            atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Stop all idle workers"""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            self._executor.shutdown(wait=False)
+            while True:
+                try:
+                    self._idle.get_nowait().kill()
+                except queue.Empty:
+                    break
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self.limits, self.max_message)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _acquire(self) -> Optional[_Worker]:
+        """Check out an idle worker"""
+        if not self._started:
+            self.start()
+        try:
+            return self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            return None
+
+    def _release(self, worker: _Worker, healthy: bool):
+        """Return a worker to the pool, replacing it when it is spent"""
+        worker.runs += 1
+        if healthy and worker.runs < self.max_runs_per_worker and self._started:
+            self._idle.put(worker)
+            return
+
+        worker.kill()
+        self._count("recycled")
+        with self._lock:
+            if self._started:
+                self._idle.put(self._spawn())
+
+    def _execute(self, job: Dict[str, Any], timeout: Optional[float] = None,
+                 on_output: Optional[Callable[[str], None]] = None,
+                 on_case: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Send one job to a worker and collect its messages until the result"""
+        timeout = timeout or self.wall_timeout
+        worker = self._acquire()
+        if worker is None:
+            return {"success": False, "output": "", "error": "Sandbox is busy, please try again",
+                    "execution_time": 0, "transient": True}
+
+        output = []
+        result = None
+        healthy = False
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + timeout
+
+        try:
+            worker.send(job)
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise queue.Empty
+                    message = worker.receive(remaining)
+                except queue.Empty:
+                    self._count("timeouts")
+                    result = {"success": False, "error": f"Execution timed out after {timeout:g}s",
+                              "transient": True}
+                    break
+
+                if message.get("type") == "stdout":
+                    chunk = str(message.get("data", ""))
+                    output.append(chunk)
+                    if on_output:
+                        on_output(chunk)
+                elif message.get("type") == "case":
+                    if on_case:
+                        on_case(message)
+                elif message.get("type") == "result":
+                    result = message
+                    healthy = not message.pop("recycle", False)
+                    message.pop("type", None)
+                    break
+        except (EOFError, OSError, ValueError):
+            # The worker died (e.g. killed for exceeding a limit) or sent garbage
+            self._count("crashes")
+            result = {"success": False, "error": "Execution terminated: resource limit exceeded",
+                      "transient": True}
+        finally:
+            self._count("runs")
+            self._release(worker, healthy)
+
+        result["output"] = "".join(output)
+        result.setdefault("execution_time", time.perf_counter() - start_time)
+        return result
+
+    def run(self, code: str, timeout: Optional[float] = None,
+            on_output: Optional[Callable[[str], None]] = None,
+            function: Optional[str] = None, args: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """Execute code in a worker and return its result
+
+        When `function` is given it is called with `args` after the code runs
+        and its return value is reported as `return_value`.
+        """
+        job = {"code": code}
+        if function:
+            job["function"] = function
+            job["args"] = list(args or [])
+        return self._execute(job, timeout=timeout, on_output=on_output)
+
+    def run_tests(self, code: str, function: str, test_cases: List[Dict[str, Any]],
+                  stop_on_failure: bool = False, time_limit: Optional[float] = None,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Grade a submission against all test cases in one sandbox invocation
+
+        Each test case is a dict with `args` (positional arguments) and
+        `expected`. The code is compiled and executed once; the function is
+        then called per case. Verdicts are decided here from the reported
+        values, never trusted from the worker.
+        """
+        reports = {}
+
+        def collect(message):
+            if isinstance(message.get("index"), int):
+                reports[message["index"]] = message
+
+        job = {
+            "code": code,
+            "function": function,
+            "tests": [{"args": list(case.get("args", [])), "expected": case.get("expected")}
+                      for case in test_cases],
+            "stop_on_failure": stop_on_failure,
+            "time_limit": time_limit
+        }
+        result = self._execute(job, timeout=timeout, on_case=collect)
+
+        cases = []
+        stopped = False
+        aborted = False
+        for index, case in enumerate(test_cases):
+            report = reports.get(index)
+            if report is None:
+                if stopped:
+                    error = "Skipped after an earlier failure"
+                elif aborted or not result.get("error"):
+                    error = "Not run"
+                else:
+                    # The case that was running when the submission was stopped
+                    error = result["error"]
+                    aborted = True
+                cases.append({"index": index, "passed": False, "actual": None,
+                              "error": error, "execution_time": 0, "skipped": stopped})
+                continue
+
+            elapsed = float(report.get("execution_time") or 0)
+            error = report.get("error")
+            if error is None and time_limit is not None and elapsed > time_limit:
+                error = f"Time limit exceeded ({elapsed:.2f}s > {time_limit}s)"
+                result["transient"] = True
+            passed = error is None and report.get("actual") == case.get("expected")
+
+            cases.append({"index": index, "passed": passed, "actual": report.get("actual"),
+                          "error": error, "execution_time": elapsed, "skipped": False})
+            if not passed and stop_on_failure:
+                stopped = True
+
+        result["cases"] = cases
+        result["cases_run"] = len(reports)
+        result["passed_tests"] = sum(1 for case in cases if case["passed"])
+        result["total_tests"] = len(test_cases)
+        return result
+
+    def call_function(self, code: str, function: str, args: Optional[List[Any]] = None,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Execute code and call one of its functions with the given arguments"""
+        return self.run(code, timeout=timeout, function=function, args=args)
+
+    def submit(self, code: str, **kwargs) -> Future:
+        """Run code in the background and return a Future for the result"""
+        if not self._started:
+            self.start()
+        return self._executor.submit(self.run, code, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics"""
+        return {
+            "size": self.size,
+            "started": self._started,
+            "idle": self._idle.qsize(),
+            "max_runs_per_worker": self.max_runs_per_worker,
+            **self._stats
+        }
+
+# Global sandbox pool instance; workers start on first use
+sandbox_pool = SandboxPool()
+
+if __name__ == '__main__':
+    _worker_main(json.loads(sys.argv[1]))
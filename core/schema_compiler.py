@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Schema Compiler
+Turns the JSON-schema-style dicts used by DatabaseManager into validator
+closures once, instead of interpreting the schema on every validation:
+- Supports type, required, properties, additionalProperties, items,
+  minLength/maxLength, pattern, format, enum, minimum/maximum and
+  minItems/maxItems, with nested objects and arrays to any depth
+- Reports every error with its location ("achievements[2]", "profile.email")
+- Batch validation of many records against one compiled schema
+"""
+
+import re
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
+
+from .validators import validator
+
+# A compiled check appends (location, message) pairs for every problem it finds
+Check = Callable[[Any, str, List[Tuple[str, str]]], None]
+
+TYPES = {
+    "object": (lambda value: isinstance(value, dict), "an object"),
+    "array": (lambda value: isinstance(value, list), "an array"),
+    "string": (lambda value: isinstance(value, str), "a string"),
+    "integer": (lambda value: isinstance(value, int) and not isinstance(value, bool), "an integer"),
+    "number": (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool), "a number"),
+    "boolean": (lambda value: isinstance(value, bool), "a boolean"),
+    "null": (lambda value: value is None, "null"),
+}
+
+FORMATS = {
+    "email": lambda value: validator.email_pattern.match(value) is not None,
+}
+
+class SchemaError(Exception):
+    """Schema that cannot be compiled"""
+    pass
+
+def _child(location: str, name: str) -> str:
+    return f"{location}.{name}" if location else name
+
+def _run_all(checks: List[Check]) -> Check:
+    if len(checks) == 1:
+        return checks[0]
+    def check_all(value, location, errors):
+        for check in checks:
+            check(value, location, errors)
+    return check_all
+
+def _compile_string(schema: Dict, formats: Dict[str, Callable[[str], bool]]) -> List[Check]:
+    checks = []
+    min_length = schema.get("minLength")
+    max_length = schema.get("maxLength")
+    if min_length is not None:
+        def check_min_length(value, location, errors):
+            if len(value) < min_length:
+                errors.append((location, f"must be at least {min_length} characters"))
+        checks.append(check_min_length)
+    if max_length is not None:
+        def check_max_length(value, location, errors):
+            if len(value) > max_length:
+                errors.append((location, f"must be at most {max_length} characters"))
+        checks.append(check_max_length)
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+        def check_pattern(value, location, errors):
+            if pattern.search(value) is None:
+                errors.append((location, f"does not match pattern {pattern.pattern}"))
+        checks.append(check_pattern)
+    if "format" in schema:
+        name = schema["format"]
+        if name not in formats:
+            raise SchemaError(f"Unsupported format: {name}")
+        matches = formats[name]
+        def check_format(value, location, errors):
+            if not matches(value):
+                errors.append((location, f"is not a valid {name}"))
+        checks.append(check_format)
+    return checks
+
+def _compile_number(schema: Dict) -> List[Check]:
+    checks = []
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+    if minimum is not None:
+        def check_minimum(value, location, errors):
+            if value < minimum:
+                errors.append((location, f"must be at least {minimum}"))
+        checks.append(check_minimum)
+    if maximum is not None:
+        def check_maximum(value, location, errors):
+            if value > maximum:
+                errors.append((location, f"must be at most {maximum}"))
+        checks.append(check_maximum)
+    return checks
+
+def _compile_array(schema: Dict, formats: Dict[str, Callable[[str], bool]]) -> List[Check]:
+    checks = []
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+    if min_items is not None:
+        def check_min_items(value, location, errors):
+            if len(value) < min_items:
+                errors.append((location, f"must have at least {min_items} items"))
+        checks.append(check_min_items)
+    if max_items is not None:
+        def check_max_items(value, location, errors):
+            if len(value) > max_items:
+                errors.append((location, f"must have at most {max_items} items"))
+        checks.append(check_max_items)
+    if "items" in schema:
+        check_item = _compile(schema["items"], formats)
+        def check_items(value, location, errors):
+            for index, item in enumerate(value):
+                check_item(item, f"{location}[{index}]", errors)
+        checks.append(check_items)
+    return checks
+
+def _compile_object(schema: Dict, formats: Dict[str, Callable[[str], bool]]) -> List[Check]:
+    if not any(key in schema for key in ("required", "properties", "additionalProperties")):
+        return []
+    required = list(schema.get("required", []))
+    properties = {name: _compile(subschema, formats) for name, subschema in schema.get("properties", {}).items()}
+    additional = schema.get("additionalProperties", True)
+    check_additional = _compile(additional, formats) if isinstance(additional, dict) else None
+
+    def check_object(value, location, errors):
+        for name in required:
+            if name not in value:
+                errors.append((_child(location, name), "is required"))
+        for name, item in value.items():
+            check_property = properties.get(name)
+            if check_property is not None:
+                check_property(item, _child(location, name), errors)
+            elif additional is False:
+                errors.append((_child(location, str(name)), "is not allowed"))
+            elif check_additional is not None:
+                check_additional(item, _child(location, str(name)), errors)
+    return [check_object]
+
+def _compile(schema: Dict, formats: Dict[str, Callable[[str], bool]]) -> Check:
+    """One closure for a schema node; keywords not present cost nothing"""
+    schema_type = schema.get("type")
+    if schema_type is not None and schema_type not in TYPES:
+        raise SchemaError(f"Unsupported type: {schema_type}")
+
+    checks: List[Check] = []
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+        def check_enum(value, location, errors):
+            if value not in allowed:
+                errors.append((location, f"must be one of {', '.join(map(str, allowed))}"))
+        checks.append(check_enum)
+
+    # Keywords constrain only values of their own kind; with a declared type the
+    # kind is already known, otherwise each group checks it first
+    for kind, group in (("string", _compile_string(schema, formats)),
+                        ("number", _compile_number(schema)),
+                        ("array", _compile_array(schema, formats)),
+                        ("object", _compile_object(schema, formats))):
+        if not group:
+            continue
+        run_group = _run_all(group)
+        if schema_type == kind or (kind == "number" and schema_type == "integer"):
+            checks.append(run_group)
+        elif schema_type is None:
+            is_kind = TYPES[kind][0]
+            def check_kind(value, location, errors, is_kind=is_kind, run_group=run_group):
+                if is_kind(value):
+                    run_group(value, location, errors)
+            checks.append(check_kind)
+
+    check_body = _run_all(checks) if checks else None
+    if schema_type is None:
+        return check_body or (lambda value, location, errors: None)
+
+    is_type, type_name = TYPES[schema_type]
+    def check_value(value, location, errors):
+        if not is_type(value):
+            errors.append((location, f"must be {type_name}"))
+        elif check_body is not None:
+            check_body(value, location, errors)
+    return check_value
+
+class CompiledSchema:
+    """A schema compiled into validator closures"""
+
+    def __init__(self, schema: Dict, formats: Optional[Dict[str, Callable[[str], bool]]] = None):
+        self.schema = schema
+        self._check = _compile(schema, {**FORMATS, **(formats or {})})
+
+    def errors(self, data: Any, location: str = "") -> List[Tuple[str, str]]:
+        """Every (location, message) problem in data; empty when it is valid"""
+        errors: List[Tuple[str, str]] = []
+        self._check(data, location, errors)
+        return errors
+
+    def is_valid(self, data: Any) -> bool:
+        return not self.errors(data)
+
+    def validate_many(self, records: Iterable[Tuple[Any, Any]]) -> Dict[Any, List[Tuple[str, str]]]:
+        """Errors per key for (key, record) pairs; valid records are left out"""
+        invalid = {}
+        for key, record in records:
+            errors: List[Tuple[str, str]] = []
+            self._check(record, "", errors)
+            if errors:
+                invalid[key] = errors
+        return invalid
+
+def compile_schema(schema: Dict, formats: Optional[Dict[str, Callable[[str], bool]]] = None) -> CompiledSchema:
+    """Compile a schema dict (raises SchemaError for unsupported types and formats)"""
+    return CompiledSchema(schema, formats)
+
+def format_errors(errors: List[Tuple[str, str]]) -> str:
+    """Errors as one message, e.g. 'points: must be at least 0; email: is required'"""
+    return "; ".join(f"{location}: {message}" if location else message for location, message in errors)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Search Index
+In-memory full-text index for code snippets and community posts:
+- Tokenizer that understands Python identifiers: read_csv and readCsv are
+  indexed whole and as their parts (read, csv)
+- Inverted index term -> {doc: weighted term frequency}, with per-field
+  weights (a title hit counts more than a code hit)
+- BM25 ranking over the postings of the query terms only; rare terms are
+  scored first and common terms only re-score documents that can still
+  reach the top k (MaxScore pruning)
+- The last query term also matches as a prefix (search as you type) via a
+  sorted vocabulary, merged lazily so bulk indexing stays linear
+- Documents are added, replaced and removed incrementally
+"""
+
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Any, Callable, Tuple
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+\d*|[A-Z]+\d*|\d+")
+
+@lru_cache(maxsize=65536)
+def _identifier_tokens(identifier: str) -> Tuple[str, ...]:
+    parts = [part.lower() for chunk in identifier.split('_') for part in _CAMEL_PART.findall(chunk)]
+    whole = identifier.lower()
+    return (whole, *parts) if len(parts) > 1 else (whole,)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased identifiers and numbers, plus the snake_case / camelCase parts of identifiers"""
+    tokens = []
+    for identifier in _IDENTIFIER.findall(text or ""):
+        tokens.extend(_identifier_tokens(identifier))
+    return tokens
+
+class SearchIndex:
+    """BM25-ranked inverted index over documents with weighted text fields"""
+
+    def __init__(self, field_weights: Dict[str, float], k1: float = 1.2, b: float = 0.75,
+                 max_prefix_terms: int = 50):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_length: Dict[str, float] = {}
+        self._total_length = 0.0
+        # Sorted terms for prefix lookups (may hold removed terms) and terms not merged in yet
+        self._vocabulary: List[str] = []
+        self._new_terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    def add(self, doc_id: str, fields: Dict[str, Any]):
+        """Index a document (replacing an earlier version); list fields are joined"""
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.field_weights.items():
+            value = fields.get(field)
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(item) for item in value)
+            for token in tokenize(value):
+                terms[token] = terms.get(token, 0.0) + weight
+                length += weight
+
+        with self._lock:
+            self.remove(doc_id)
+            for term, frequency in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._new_terms.append(term)
+                postings[doc_id] = frequency
+            self._doc_terms[doc_id] = terms
+            self._doc_length[doc_id] = length
+            self._total_length += length
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop a document from the index"""
+        with self._lock:
+            terms = self._doc_terms.pop(doc_id, None)
+            if terms is None:
+                return False
+            for term in terms:
+                postings = self._postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._doc_length.pop(doc_id)
+            return True
+
+    def _sorted_vocabulary(self) -> List[str]:
+        if len(self._new_terms) > 64:
+            self._vocabulary = sorted(self._postings)
+        else:
+            for term in self._new_terms:
+                position = bisect_left(self._vocabulary, term)
+                if position == len(self._vocabulary) or self._vocabulary[position] != term:
+                    self._vocabulary.insert(position, term)
+        self._new_terms = []
+        return self._vocabulary
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        """Indexed terms starting with prefix (at most max_prefix_terms)"""
+        with self._lock:
+            vocabulary = self._sorted_vocabulary()
+            terms = []
+            position = bisect_left(vocabulary, prefix)
+            while (position < len(vocabulary) and len(terms) < self.max_prefix_terms
+                   and vocabulary[position].startswith(prefix)):
+                if vocabulary[position] in self._postings:
+                    terms.append(vocabulary[position])
+                position += 1
+            return terms
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True,
+               accept: Callable[[str], bool] = None) -> List[Tuple[str, float]]:
+        """Top documents for a query as (doc_id, score), best first.
+
+        With prefix, the last query term also matches longer terms it starts.
+        accept filters candidate documents before ranking.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            count = len(self._doc_terms)
+            if not count:
+                return []
+            average_length = self._total_length / count or 1.0
+
+            # term -> weight in the query; prefix expansions share the last term's weight
+            query_terms: Dict[str, float] = {token: 1.0 for token in tokens}
+            if prefix:
+                for term in self.expand_prefix(tokens[-1]):
+                    query_terms.setdefault(term, 1.0)
+
+            # Rare terms first; each term's contribution is below idf * (k1 + 1)
+            terms = []
+            for term, query_weight in query_terms.items():
+                postings = self._postings.get(term)
+                if postings:
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    terms.append((postings, query_weight * idf))
+            terms.sort(key=lambda entry: len(entry[0]))
+            remaining = [0.0] * (len(terms) + 1)
+            for n in reversed(range(len(terms))):
+                remaining[n] = remaining[n + 1] + terms[n][1] * (self.k1 + 1)
+
+            lengths = self._doc_length
+            k1_plus_1 = self.k1 + 1
+            base = self.k1 * (1 - self.b)
+            per_length = self.k1 * self.b / average_length
+            scores: Dict[str, float] = {}
+            for n, (postings, weight) in enumerate(terms):
+                if (len(scores) >= limit and len(postings) > len(scores)
+                        and self._kth_best(scores, limit, accept) >= remaining[n]):
+                    # No unseen document can reach the top k: only re-score the candidates
+                    for doc_id in scores:
+                        frequency = postings.get(doc_id)
+                        if frequency:
+                            scores[doc_id] += weight * frequency * k1_plus_1 / \
+                                (frequency + base + per_length * lengths[doc_id])
+                    continue
+                for doc_id, frequency in postings.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * frequency * k1_plus_1 / \
+                        (frequency + base + per_length * lengths[doc_id])
+
+        candidates = scores.items()
+        if accept is not None:
+            candidates = [(doc_id, score) for doc_id, score in candidates if accept(doc_id)]
+        return heapq.nlargest(limit, candidates, key=lambda item: (item[1], item[0]))
+
+    @staticmethod
+    def _kth_best(scores: Dict[str, float], limit: int, accept: Callable[[str], bool] = None) -> float:
+        candidates = scores.items()
+        if accept is not None:
+            candidates = ((doc_id, score) for doc_id, score in candidates if accept(doc_id))
+        best = heapq.nlargest(limit, (score for _, score in candidates))
+        return best[-1] if len(best) == limit else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Index statistics"""
+        with self._lock:
+            return {"documents": len(self._doc_terms), "terms": len(self._postings)}
@@ -11,10 +11,10 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from functools import wraps
 from flask import request, session, jsonify, abort
-import json
 import os
 
 from .error_handler import error_handler, ValidationError
+from .rate_limiting import RateLimitBackend, create_rate_limit_backend
 
 class CSRFProtection:
     """CSRF (Cross-Site Request Forgery) protection"""
@@ -98,36 +98,18 @@ class CSRFProtection:
         return self.generate_token()
 
 class RateLimiter:
-    """Rate limiting for API endpoints"""
+    """Rate limiting for API endpoints using GCRA over a pluggable backend"""
     
-    def __init__(self, storage_file: str = "data/rate_limits.json"):
-        self.storage_file = storage_file
-        self.limits = {}
-        self.load_limits()
-    
-    def load_limits(self):
-        """Load rate limit data from file"""
-        try:
-            if os.path.exists(self.storage_file):
-                with open(self.storage_file, 'r') as f:
-                    self.limits = json.load(f)
-        except Exception as e:
-            error_handler.logger.warning(f"Failed to load rate limits: {e}")
-            self.limits = {}
-    
-    def save_limits(self):
-        """Save rate limit data to file"""
-        try:
-            os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
-            with open(self.storage_file, 'w') as f:
-                json.dump(self.limits, f, indent=2)
-        except Exception as e:
-            error_handler.logger.error(f"Failed to save rate limits: {e}")
+    def __init__(self, backend: RateLimitBackend = None):
+        self.backend = backend or create_rate_limit_backend()
     
     def is_allowed(self, identifier: str, limit: int, window: int) -> Tuple[bool, Dict]:
         """
         Check if request is allowed under rate limit
         
+        Up to `limit` requests may arrive at once; after that the allowance
+        refills at limit/window requests per second.
+        
         Args:
             identifier: Unique identifier (IP, user ID, etc.)
             limit: Maximum requests allowed
@@ -137,56 +119,35 @@ class RateLimiter:
             Tuple of (is_allowed, info_dict)
         """
         current_time = time.time()
+        interval = window / limit
         
-        # Clean old entries
-        self.cleanup_old_entries(current_time, window)
-        
-        # Get or create limit data for identifier
-        if identifier not in self.limits:
-            self.limits[identifier] = []
+        allowed, tat = self.backend.acquire(identifier, current_time, interval, window)
         
-        requests = self.limits[identifier]
-        
-        # Remove requests outside the window
-        requests = [req_time for req_time in requests if current_time - req_time < window]
-        
-        # Check if limit exceeded
-        if len(requests) >= limit:
+        if not allowed:
             return False, {
                 "allowed": False,
                 "limit": limit,
                 "window": window,
-                "requests_made": len(requests),
-                "reset_time": min(requests) + window
+                "requests_made": limit,
+                "reset_time": tat + interval - window
             }
         
-        # Add current request
-        requests.append(current_time)
-        self.limits[identifier] = requests
-        
-        # Save periodically (every 10 requests to avoid too much I/O)
-        if len(requests) % 10 == 0:
-            self.save_limits()
-        
+        remaining = max(int((current_time + window - tat) / interval + 1e-9), 0)
         return True, {
             "allowed": True,
             "limit": limit,
             "window": window,
-            "requests_made": len(requests),
-            "remaining": limit - len(requests)
+            "requests_made": limit - remaining,
+            "remaining": remaining
         }
     
-    def cleanup_old_entries(self, current_time: float, max_age: int = 3600):
-        """Clean up old rate limit entries"""
-        for identifier in list(self.limits.keys()):
-            requests = self.limits[identifier]
-            # Keep only requests from the last hour
-            recent_requests = [req_time for req_time in requests if current_time - req_time < max_age]
-            
-            if recent_requests:
-                self.limits[identifier] = recent_requests
-            else:
-                del self.limits[identifier]
+    def reset(self, identifier: str = None):
+        """Clear the limits of one identifier, or all of them"""
+        if identifier is None:
+            self.backend.reset()
+            return
+        for period in ("minute", "hour"):
+            self.backend.reset(f"{identifier}:{period}")
     
     def get_client_identifier(self) -> str:
         """Get unique identifier for the current client"""
@@ -238,11 +199,6 @@ def rate_limit(requests_per_minute: int = 60, requests_per_hour: int = 1000):
                 f"{identifier}:minute", requests_per_minute, 60
             )
             
-            # Check hour limit
-            allowed_hour, info_hour = rate_limiter.is_allowed(
-                f"{identifier}:hour", requests_per_hour, 3600
-            )
-            
             if not allowed_minute:
                 error_handler.logger.warning(f"Rate limit exceeded (minute) for {identifier}")
                 return jsonify({
@@ -251,6 +207,11 @@ def rate_limit(requests_per_minute: int = 60, requests_per_hour: int = 1000):
                     "retry_after": int(info_minute["reset_time"] - time.time())
                 }), 429
             
+            # Check hour limit
+            allowed_hour, info_hour = rate_limiter.is_allowed(
+                f"{identifier}:hour", requests_per_hour, 3600
+            )
+            
             if not allowed_hour:
                 error_handler.logger.warning(f"Rate limit exceeded (hour) for {identifier}")
                 return jsonify({
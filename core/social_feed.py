@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Social Feed Index
+Cursor-paginated community feeds:
+- Each ordering (newest, most voted) is a skip list of sort keys, with one
+  more skip list per tag / language / post type as an inverted index
+- A page walks the smallest matching index from the cursor, so it costs
+  O(log n + page size) instead of filtering and sorting every post
+- Cursors are opaque tokens holding the sort key of the last item returned
+"""
+
+import base64
+import heapq
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
+
+from .leaderboard import RankedSet
+
+def created_timestamp(record: Dict[str, Any]) -> float:
+    """Epoch seconds of a record's created_at (0 when missing or malformed)"""
+    try:
+        return datetime.fromisoformat(str(record.get('created_at'))).timestamp()
+    except ValueError:
+        return 0.0
+
+def recent_order(record: Dict[str, Any]) -> Tuple:
+    """Newest first"""
+    return (-created_timestamp(record),)
+
+def top_order(record: Dict[str, Any]) -> Tuple:
+    """Most votes first, newest first among equal votes"""
+    return (-int(record.get('votes', 0)), -created_timestamp(record))
+
+def encode_cursor(order: str, key: Tuple) -> str:
+    """Opaque cursor resuming an ordering after key"""
+    raw = json.dumps([order, list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, key_length: int = None) -> Tuple[str, Tuple]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor.
+
+    The key must be sort values (numbers) followed by a record id, and
+    key_length values long when given, so it compares cleanly with index keys.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        order, key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid feed cursor") from e
+    if (not isinstance(order, str) or not isinstance(key, list) or not key
+            or not isinstance(key[-1], str)
+            or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in key[:-1])
+            or (key_length is not None and len(key) != key_length)):
+        raise ValueError("Invalid feed cursor")
+    return order, tuple(key)
+
+class FeedIndex:
+    """Ordered views of a record collection with inverted indexes on facets"""
+
+    def __init__(self, orders: Dict[str, Callable[[Dict], Tuple]],
+                 facets: Dict[str, Callable[[Dict], Iterable[str]]],
+                 include: Callable[[Dict], bool] = None):
+        self.orders = orders
+        self.facets = facets
+        self.include = include
+        self._lock = threading.RLock()
+        # record id -> {order: sort key}, {facet: values}
+        self._keys: Dict[str, Dict[str, Tuple]] = {}
+        self._values: Dict[str, Dict[str, set]] = {}
+        self._all: Dict[str, RankedSet] = {order: RankedSet() for order in orders}
+        # (order, facet, value) -> keys of the records having that value
+        self._index: Dict[Tuple[str, str, str], RankedSet] = {}
+        # order -> length of its keys (sort values plus record id)
+        self._key_lengths: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._keys
+
+    def put(self, record_id: str, record: Dict[str, Any]):
+        """Index a new record or re-key a changed one"""
+        with self._lock:
+            self.remove(record_id)
+            if self.include is not None and not self.include(record):
+                return
+            keys = {order: key_fn(record) + (record_id,) for order, key_fn in self.orders.items()}
+            values = {facet: {str(value) for value in (values_fn(record) or ())}
+                      for facet, values_fn in self.facets.items()}
+            for order, key in keys.items():
+                self._key_lengths[order] = len(key)
+                self._all[order].add(key)
+                for facet, facet_values in values.items():
+                    for value in facet_values:
+                        self._index.setdefault((order, facet, value), RankedSet()).add(key)
+            self._keys[record_id] = keys
+            self._values[record_id] = values
+
+    def remove(self, record_id: str) -> bool:
+        """Drop a record from every index"""
+        with self._lock:
+            keys = self._keys.pop(record_id, None)
+            if keys is None:
+                return False
+            values = self._values.pop(record_id)
+            for order, key in keys.items():
+                self._all[order].discard(key)
+                for facet, facet_values in values.items():
+                    for value in facet_values:
+                        ranked = self._index.get((order, facet, value))
+                        if ranked is not None:
+                            ranked.discard(key)
+                            if not len(ranked):
+                                del self._index[(order, facet, value)]
+            return True
+
+    def rebuild(self, records: Dict[str, Dict[str, Any]]):
+        """Index a whole collection from scratch"""
+        with self._lock:
+            self._keys = {}
+            self._values = {}
+            self._all = {order: RankedSet() for order in self.orders}
+            self._index = {}
+            for record_id, record in records.items():
+                self.put(record_id, record)
+
+    def page(self, order: str, limit: int = 20, cursor: str = None,
+             filters: Dict[str, Iterable[str]] = None) -> Tuple[List[str], Optional[str]]:
+        """Record ids of one page and the cursor for the next (None on the last page).
+
+        A record matches filters when, for every facet given, it has any of the values.
+        """
+        if order not in self.orders:
+            raise ValueError(f"Unknown feed order: {order}")
+        after = None
+        if cursor:
+            cursor_order, after = decode_cursor(cursor, self._key_lengths.get(order))
+            if cursor_order != order:
+                raise ValueError("Cursor belongs to a different feed order")
+        if limit <= 0:
+            return [], None
+
+        active = {facet: {str(value) for value in values}
+                  for facet, values in (filters or {}).items() if values}
+        with self._lock:
+            if not active:
+                sources, checks = [self._all[order]], []
+            else:
+                candidates = {facet: [self._index[(order, facet, value)] for value in values
+                                      if (order, facet, value) in self._index]
+                              for facet, values in active.items()}
+                # Walk the most selective facet and test the others per record
+                lead = min(candidates, key=lambda facet: sum(len(ranked) for ranked in candidates[facet]))
+                sources = candidates[lead]
+                checks = [(facet, values) for facet, values in active.items() if facet != lead]
+
+            ids, last, previous = [], None, None
+            for key in heapq.merge(*(ranked.iter_after(after) for ranked in sources)):
+                if key == previous:
+                    # Same record reached through two of the requested values
+                    continue
+                previous = key
+                record_values = self._values[key[-1]]
+                if any(not record_values.get(facet, set()) & values for facet, values in checks):
+                    continue
+                if len(ids) == limit:
+                    return ids, encode_cursor(order, last)
+                ids.append(key[-1])
+                last = key
+            return ids, None
+
+    def stats(self) -> Dict[str, Any]:
+        """Index statistics"""
+        with self._lock:
+            return {"records": len(self._keys), "facet_indexes": len(self._index)}
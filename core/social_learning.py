@@ -4,6 +4,7 @@ Social Learning System
 Implements collaboration features, user profiles, and peer learning
 """
 
+import heapq
 import json
 import os
 from datetime import datetime, timedelta
@@ -12,7 +13,9 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 
 from .error_handler import error_handler
-from .database_manager import db_manager
+from .oplog import OpLogStore
+from .social_feed import FeedIndex, recent_order, top_order
+from .search_index import SearchIndex
 
 class FriendshipStatus(Enum):
     """Friendship status types"""
@@ -84,6 +87,74 @@ class CodeShare:
     created_at: str
     is_public: bool
 
+def _enum_value(value: Any) -> Any:
+    """Plain value of an Enum member (other values unchanged)"""
+    return value.value if isinstance(value, Enum) else value
+
+class FriendGraph:
+    """Adjacency index over friendship records: user -> {other user: status}"""
+
+    def __init__(self):
+        self._adjacency: Dict[str, Dict[str, str]] = {}
+        # Unordered user pair -> friendship id
+        self._ids: Dict[frozenset, str] = {}
+
+    def add(self, friendship: Dict[str, Any]):
+        """Index a friendship record (again after its status changes)"""
+        requester, recipient = friendship['requester_id'], friendship['recipient_id']
+        status = _enum_value(friendship['status'])
+        self._adjacency.setdefault(requester, {})[recipient] = status
+        self._adjacency.setdefault(recipient, {})[requester] = status
+        self._ids[frozenset((requester, recipient))] = friendship['id']
+
+    def remove(self, friendship: Dict[str, Any]):
+        """Drop a friendship record"""
+        requester, recipient = friendship['requester_id'], friendship['recipient_id']
+        for user, other in ((requester, recipient), (recipient, requester)):
+            neighbors = self._adjacency.get(user, {})
+            neighbors.pop(other, None)
+            if not neighbors:
+                self._adjacency.pop(user, None)
+        self._ids.pop(frozenset((requester, recipient)), None)
+
+    def rebuild(self, friendships: Dict[str, Dict[str, Any]]):
+        """Index every friendship record"""
+        self._adjacency = {}
+        self._ids = {}
+        for friendship in friendships.values():
+            self.add(friendship)
+
+    def find(self, user1_id: str, user2_id: str) -> Optional[str]:
+        """Id of the friendship between two users, in either direction"""
+        return self._ids.get(frozenset((user1_id, user2_id)))
+
+    def status(self, user1_id: str, user2_id: str) -> Optional[str]:
+        """Relationship status between two users"""
+        return self._adjacency.get(user1_id, {}).get(user2_id)
+
+    def neighbors(self, user_id: str) -> Dict[str, str]:
+        """Every user related to user_id with the relationship status"""
+        return self._adjacency.get(user_id, {})
+
+    def friends(self, user_id: str) -> List[str]:
+        """Accepted friends of a user"""
+        return [other for other, status in self.neighbors(user_id).items()
+                if status == FriendshipStatus.ACCEPTED.value]
+
+    def suggestions(self, user_id: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Friends of friends with no relationship to the user yet, most mutual friends first"""
+        related = self.neighbors(user_id)
+        mutual: Dict[str, int] = {}
+        for friend in self.friends(user_id):
+            for candidate in self.friends(friend):
+                if candidate != user_id and candidate not in related:
+                    mutual[candidate] = mutual.get(candidate, 0) + 1
+        return heapq.nsmallest(limit, mutual.items(), key=lambda item: (-item[1], item[0]))
+
+    def stats(self) -> Dict[str, Any]:
+        """Graph statistics"""
+        return {"users": len(self._adjacency), "relationships": len(self._ids)}
+
 class SocialLearningManager:
     """Manages social learning features"""
     
@@ -96,26 +167,53 @@ class SocialLearningManager:
         self.discussions_file = os.path.join(data_dir, "discussions.json")
         self.code_shares_file = os.path.join(data_dir, "code_shares.json")
         
-        # Initialize data structures
-        self.user_profiles = self._load_data(self.profiles_file, {})
-        self.friendships = self._load_data(self.friendships_file, {})
-        self.discussions = self._load_data(self.discussions_file, {})
-        self.code_shares = self._load_data(self.code_shares_file, {})
-    
-    def _load_data(self, file_path: str, default: Any) -> Any:
-        """Load data from file with error handling"""
-        try:
-            return db_manager.safe_read(file_path) or default
-        except Exception as e:
-            error_handler.logger.warning(f"Failed to load {file_path}: {e}")
-            return default
+        # Snapshot + operation log; the whole-collection files above are imported once
+        self.store = OpLogStore(data_dir, ['profiles', 'friendships', 'discussions', 'code_shares'],
+                                legacy_files={
+                                    'profiles': self.profiles_file,
+                                    'friendships': self.friendships_file,
+                                    'discussions': self.discussions_file,
+                                    'code_shares': self.code_shares_file
+                                })
+        self.user_profiles = self.store.collection('profiles')
+        self.friendships = self.store.collection('friendships')
+        self.discussions = self.store.collection('discussions')
+        self.code_shares = self.store.collection('code_shares')
+
+        self.friend_graph = FriendGraph()
+        self.friend_graph.rebuild(self.friendships)
+
+        # Feed indexes: discussions by type and tag, public code shares by language and tag
+        self.post_index = FeedIndex(
+            {'recent': recent_order, 'top': top_order},
+            {'tags': lambda post: post.get('tags', []),
+             'post_type': lambda post: [_enum_value(post.get('post_type'))]}
+        )
+        self.post_index.rebuild(self.discussions)
+        self.share_index = FeedIndex(
+            {'top': top_order, 'recent': recent_order},
+            {'tags': lambda share: share.get('tags', []),
+             'language': lambda share: [share.get('language')]},
+            include=lambda share: share.get('is_public', False)
+        )
+        self.share_index.rebuild(self.code_shares)
+
+        # Full-text search over discussions and public code shares
+        self.post_search = SearchIndex({'title': 3.0, 'tags': 2.0, 'content': 1.0})
+        for post_id, post in self.discussions.items():
+            self.post_search.add(post_id, post)
+        self.share_search = SearchIndex({'title': 3.0, 'tags': 2.0, 'description': 2.0, 'code': 1.0})
+        for share_id, share in self.code_shares.items():
+            if share.get('is_public'):
+                self.share_search.add(share_id, share)
     
-    def _save_data(self, file_path: str, data: Any) -> bool:
-        """Save data to file with error handling"""
+    def _record(self, operation: str, collection: str, key: str, *args, **kwargs) -> bool:
+        """Append one mutation to the operation log with error handling"""
         try:
-            return db_manager.safe_write(file_path, data)
+            getattr(self.store, operation)(collection, key, *args, **kwargs)
+            return True
         except Exception as e:
-            error_handler.logger.error(f"Failed to save {file_path}: {e}")
+            error_handler.logger.error(f"Failed to record {operation} on {collection}/{key}: {e}")
             return False
     
     def create_user_profile(self, user_id: str, display_name: str, 
@@ -146,8 +244,7 @@ class SocialLearningManager:
             }
         )
         
-        self.user_profiles[user_id] = asdict(profile)
-        self._save_data(self.profiles_file, self.user_profiles)
+        self._record('put', 'profiles', user_id, asdict(profile))
         
         return profile
     
@@ -167,12 +264,9 @@ class SocialLearningManager:
         allowed_fields = ['display_name', 'bio', 'avatar_url', 'learning_goals', 
                          'skills', 'privacy_settings']
         
-        for field, value in updates.items():
-            if field in allowed_fields:
-                self.user_profiles[user_id][field] = value
-        
-        self.user_profiles[user_id]['last_active'] = datetime.now().isoformat()
-        return self._save_data(self.profiles_file, self.user_profiles)
+        changes = {field: value for field, value in updates.items() if field in allowed_fields}
+        changes['last_active'] = datetime.now().isoformat()
+        return self._record('update', 'profiles', user_id, changes)
     
     def send_friend_request(self, requester_id: str, recipient_id: str) -> bool:
         """Send a friend request"""
@@ -197,8 +291,12 @@ class SocialLearningManager:
             updated_at=datetime.now().isoformat()
         )
         
-        self.friendships[friendship_id] = asdict(friendship)
-        return self._save_data(self.friendships_file, self.friendships)
+        friendship_data = asdict(friendship)
+        friendship_data['status'] = friendship.status.value
+        saved = self._record('put', 'friendships', friendship_id, friendship_data)
+        if saved:
+            self.friend_graph.add(friendship_data)
+        return saved
     
     def respond_to_friend_request(self, friendship_id: str, accept: bool) -> bool:
         """Respond to a friend request"""
@@ -206,33 +304,36 @@ class SocialLearningManager:
             return False
         
         friendship = self.friendships[friendship_id]
+        if friendship['status'] != FriendshipStatus.PENDING.value:
+            return False
         
-        if accept:
-            friendship['status'] = FriendshipStatus.ACCEPTED.value
-            # Update friend counts
-            self._update_friend_count(friendship['requester_id'], 1)
-            self._update_friend_count(friendship['recipient_id'], 1)
-        else:
+        if not accept:
             # Remove the friendship request
-            del self.friendships[friendship_id]
-        
-        friendship['updated_at'] = datetime.now().isoformat()
-        return self._save_data(self.friendships_file, self.friendships)
+            saved = self._record('delete', 'friendships', friendship_id)
+            if saved:
+                self.friend_graph.remove(friendship)
+            return saved
+        
+        saved = self._record('update', 'friendships', friendship_id, {
+            'status': FriendshipStatus.ACCEPTED.value,
+            'updated_at': datetime.now().isoformat()
+        })
+        if not saved:
+            return False
+        self.friend_graph.add(friendship)
+        # Update friend counts
+        self._update_friend_count(friendship['requester_id'], 1)
+        self._update_friend_count(friendship['recipient_id'], 1)
+        return True
     
     def get_friends(self, user_id: str) -> List[UserProfile]:
         """Get list of user's friends"""
         friends = []
         
-        for friendship in self.friendships.values():
-            if (friendship['status'] == FriendshipStatus.ACCEPTED.value and
-                (friendship['requester_id'] == user_id or friendship['recipient_id'] == user_id)):
-                
-                friend_id = (friendship['recipient_id'] if friendship['requester_id'] == user_id 
-                           else friendship['requester_id'])
-                
-                friend_profile = self.get_user_profile(friend_id)
-                if friend_profile:
-                    friends.append(friend_profile)
+        for friend_id in self.friend_graph.friends(user_id):
+            friend_profile = self.get_user_profile(friend_id)
+            if friend_profile:
+                friends.append(friend_profile)
         
         return friends
     
@@ -240,24 +341,42 @@ class SocialLearningManager:
         """Get pending friend requests for user"""
         requests = []
         
-        for friendship in self.friendships.values():
-            if (friendship['recipient_id'] == user_id and 
-                friendship['status'] == FriendshipStatus.PENDING.value):
-                
-                requester_profile = self.get_user_profile(friendship['requester_id'])
-                if requester_profile:
-                    requests.append({
-                        'friendship_id': friendship['id'],
-                        'requester': asdict(requester_profile),
-                        'created_at': friendship['created_at']
-                    })
+        for other_id, status in self.friend_graph.neighbors(user_id).items():
+            if status != FriendshipStatus.PENDING.value:
+                continue
+            
+            friendship = self.friendships[self.friend_graph.find(user_id, other_id)]
+            if friendship['recipient_id'] != user_id:
+                continue
+            
+            requester_profile = self.get_user_profile(other_id)
+            if requester_profile:
+                requests.append({
+                    'friendship_id': friendship['id'],
+                    'requester': asdict(requester_profile),
+                    'created_at': friendship['created_at']
+                })
         
         return requests
     
+    def suggest_friends(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Friends of friends to connect with, ranked by mutual friends"""
+        suggestions = []
+        
+        for candidate_id, mutual_friends in self.friend_graph.suggestions(user_id, limit):
+            profile = self.get_user_profile(candidate_id)
+            if profile:
+                suggestions.append({
+                    'profile': asdict(profile),
+                    'mutual_friends': mutual_friends
+                })
+        
+        return suggestions
+    
     def create_discussion_post(self, author_id: str, title: str, content: str,
                              post_type: PostType, tags: List[str] = None,
-                             parent_id: str = None) -> str:
-        """Create a new discussion post"""
+                             parent_id: str = None) -> Optional[str]:
+        """Create a new discussion post; None if it could not be saved"""
         post_id = f"post_{int(datetime.now().timestamp())}_{author_id}"
         
         post = DiscussionPost(
@@ -274,39 +393,48 @@ class SocialLearningManager:
             is_solved=False
         )
         
-        self.discussions[post_id] = asdict(post)
+        post_data = asdict(post)
+        post_data['post_type'] = _enum_value(post_type)
+        if not self._record('put', 'discussions', post_id, post_data):
+            return None
+        self.post_index.put(post_id, post_data)
+        self.post_search.add(post_id, post_data)
         
         # Update user stats
         self._update_user_stat(author_id, 'posts_count', 1)
         
-        self._save_data(self.discussions_file, self.discussions)
         return post_id
     
+    def _with_authors(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copy records with author profiles attached, building each distinct profile once"""
+        authors = {}
+        for author_id in {record['author_id'] for record in records}:
+            profile = self.get_user_profile(author_id)
+            authors[author_id] = asdict(profile) if profile else None
+        return [dict(record, author=authors[record['author_id']]) for record in records]
+
+    def discussion_feed(self, limit: int = 20, cursor: str = None, tags: List[str] = None,
+                        post_type: PostType = None, order: str = 'recent') -> Dict[str, Any]:
+        """One page of discussion posts ('recent' or 'top') and the cursor for the next"""
+        post_ids, next_cursor = self.post_index.page(order, limit, cursor, {
+            'tags': tags,
+            'post_type': [_enum_value(post_type)] if post_type else None
+        })
+        posts = self._with_authors([self.discussions[post_id] for post_id in post_ids])
+        return {'items': posts, 'next_cursor': next_cursor}
+
     def get_discussion_posts(self, limit: int = 20, tags: List[str] = None,
-                           post_type: PostType = None) -> List[Dict[str, Any]]:
-        """Get discussion posts with filtering"""
-        posts = []
-        
-        for post_data in self.discussions.values():
-            # Filter by type
-            if post_type and post_data['post_type'] != post_type.value:
-                continue
-            
-            # Filter by tags
-            if tags and not any(tag in post_data['tags'] for tag in tags):
-                continue
-            
-            # Add author info
-            author_profile = self.get_user_profile(post_data['author_id'])
-            post_with_author = post_data.copy()
-            post_with_author['author'] = asdict(author_profile) if author_profile else None
-            
-            posts.append(post_with_author)
-        
-        # Sort by creation date (newest first)
-        posts.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        return posts[:limit]
+                           post_type: PostType = None, cursor: str = None) -> List[Dict[str, Any]]:
+        """Get discussion posts with filtering (newest first)"""
+        return self.discussion_feed(limit, cursor, tags, post_type)['items']
+    
+    def search_discussions(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Discussion posts ranked by relevance to query"""
+        ranked = self.post_search.search(query, limit)
+        posts = self._with_authors([self.discussions[post_id] for post_id, _ in ranked])
+        for post, (_, score) in zip(posts, ranked):
+            post['relevance_score'] = score
+        return posts
     
     def vote_on_post(self, post_id: str, user_id: str, vote_up: bool) -> bool:
         """Vote on a discussion post"""
@@ -315,15 +443,17 @@ class SocialLearningManager:
         
         # In a full implementation, track individual votes to prevent duplicate voting
         vote_change = 1 if vote_up else -1
-        self.discussions[post_id]['votes'] += vote_change
-        self.discussions[post_id]['updated_at'] = datetime.now().isoformat()
+        saved = self._record('update', 'discussions', post_id,
+                             {'updated_at': datetime.now().isoformat()}, {'votes': vote_change})
+        if saved:
+            self.post_index.put(post_id, self.discussions[post_id])
         
-        return self._save_data(self.discussions_file, self.discussions)
+        return saved
     
     def share_code(self, author_id: str, title: str, description: str,
                    code: str, language: str, tags: List[str] = None,
-                   is_public: bool = True) -> str:
-        """Share a code snippet"""
+                   is_public: bool = True) -> Optional[str]:
+        """Share a code snippet; None if it could not be saved"""
         share_id = f"code_{int(datetime.now().timestamp())}_{author_id}"
         
         code_share = CodeShare(
@@ -340,66 +470,55 @@ class SocialLearningManager:
             is_public=is_public
         )
         
-        self.code_shares[share_id] = asdict(code_share)
+        share_data = asdict(code_share)
+        if not self._record('put', 'code_shares', share_id, share_data):
+            return None
+        self.share_index.put(share_id, share_data)
+        if is_public:
+            self.share_search.add(share_id, share_data)
         
         # Update user stats
         self._update_user_stat(author_id, 'code_shares', 1)
         
-        self._save_data(self.code_shares_file, self.code_shares)
         return share_id
     
+    def code_share_feed(self, limit: int = 20, cursor: str = None, language: str = None,
+                        tags: List[str] = None, order: str = 'top') -> Dict[str, Any]:
+        """One page of public code shares ('top' or 'recent') and the cursor for the next"""
+        share_ids, next_cursor = self.share_index.page(order, limit, cursor, {
+            'tags': tags,
+            'language': [language] if language else None
+        })
+        shares = self._with_authors([self.code_shares[share_id] for share_id in share_ids])
+        return {'items': shares, 'next_cursor': next_cursor}
+
     def get_code_shares(self, limit: int = 20, language: str = None,
-                       tags: List[str] = None) -> List[Dict[str, Any]]:
-        """Get public code shares"""
-        shares = []
-        
-        for share_data in self.code_shares.values():
-            if not share_data['is_public']:
-                continue
-            
-            # Filter by language
-            if language and share_data['language'] != language:
-                continue
-            
-            # Filter by tags
-            if tags and not any(tag in share_data['tags'] for tag in tags):
-                continue
-            
-            # Add author info
-            author_profile = self.get_user_profile(share_data['author_id'])
-            share_with_author = share_data.copy()
-            share_with_author['author'] = asdict(author_profile) if author_profile else None
-            
-            shares.append(share_with_author)
-        
-        # Sort by votes and creation date
-        shares.sort(key=lambda x: (x['votes'], x['created_at']), reverse=True)
-        
-        return shares[:limit]
+                       tags: List[str] = None, cursor: str = None) -> List[Dict[str, Any]]:
+        """Get public code shares (most voted first)"""
+        return self.code_share_feed(limit, cursor, language, tags)['items']
+    
+    def search_code_shares(self, query: str, language: str = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Public code shares ranked by relevance to query"""
+        accept = (lambda share_id: self.code_shares[share_id]['language'] == language) if language else None
+        ranked = self.share_search.search(query, limit, accept=accept)
+        shares = self._with_authors([self.code_shares[share_id] for share_id, _ in ranked])
+        for share, (_, score) in zip(shares, ranked):
+            share['relevance_score'] = score
+        return shares
     
     def _find_friendship(self, user1_id: str, user2_id: str) -> Optional[Dict[str, Any]]:
         """Find existing friendship between two users"""
-        for friendship in self.friendships.values():
-            if ((friendship['requester_id'] == user1_id and friendship['recipient_id'] == user2_id) or
-                (friendship['requester_id'] == user2_id and friendship['recipient_id'] == user1_id)):
-                return friendship
-        return None
+        friendship_id = self.friend_graph.find(user1_id, user2_id)
+        return self.friendships.get(friendship_id) if friendship_id else None
     
     def _update_friend_count(self, user_id: str, change: int):
         """Update friend count for user"""
-        if user_id in self.user_profiles:
-            self.user_profiles[user_id]['social_stats']['friends_count'] += change
+        self._update_user_stat(user_id, 'friends_count', change)
     
     def _update_user_stat(self, user_id: str, stat_name: str, change: int):
         """Update user social statistics"""
         if user_id in self.user_profiles:
-            if 'social_stats' not in self.user_profiles[user_id]:
-                self.user_profiles[user_id]['social_stats'] = {}
-            
-            current_value = self.user_profiles[user_id]['social_stats'].get(stat_name, 0)
-            self.user_profiles[user_id]['social_stats'][stat_name] = current_value + change
-            
-            self._save_data(self.profiles_file, self.user_profiles)
+            self._record('update', 'profiles', user_id, increments={f'social_stats.{stat_name}': change})
 
 # Global instance
 social_manager = SocialLearningManager()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Timer Wheel
+Hierarchical timing wheel for expiring idle sessions and stale requests:
+- Timers live in per-level slot buckets (64 slots per level by default), so
+  scheduling, cancelling and firing cost O(1) each, independent of how many
+  timers are pending
+- Level 0 slots are one tick wide; a level-n slot covers 64**n ticks and is
+  cascaded down into finer slots when the wheel reaches it
+- touch() pushes a deadline back without moving the timer; when its slot
+  comes round the timer is re-placed instead of fired, so activity on a
+  busy session costs one assignment
+- advance() skips stretches with no timers in the finer levels, so a wheel
+  that was not ticked for a while catches up in a few steps
+"""
+
+import math
+import threading
+import time
+from typing import Dict, List, Hashable, Callable, Optional
+
+class TimerWheel:
+    """Expiry timers keyed by any hashable key; advance() returns the keys that expired"""
+
+    def __init__(self, tick: float = 1.0, slot_bits: int = 6, levels: int = 4,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.slot_bits = slot_bits
+        self.levels = levels
+        self.clock = clock
+        self._mask = (1 << slot_bits) - 1
+        self._lock = threading.RLock()
+        self._slots: List[List[set]] = [[set() for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self._counts = [0] * levels
+        # key -> [deadline, level, slot]
+        self._entries: Dict[Hashable, list] = {}
+        self._current = self._tick_of(clock())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def _tick_of(self, moment: float) -> int:
+        return math.ceil(moment / self.tick)
+
+    def _place(self, key: Hashable, entry: list, earliest: int = None):
+        # The current tick has already fired, except while cascading into it
+        due = max(self._tick_of(entry[0]), self._current + 1 if earliest is None else earliest)
+        level = 0
+        while level < self.levels - 1 and due - self._current >= 1 << (self.slot_bits * (level + 1)):
+            level += 1
+        # Beyond the top level's range: park in the furthest slot, re-placed when it comes round
+        due = min(due, self._current + (1 << (self.slot_bits * self.levels)) - 1)
+        slot = (due >> (self.slot_bits * level)) & self._mask
+        entry[1], entry[2] = level, slot
+        self._slots[level][slot].add(key)
+        self._counts[level] += 1
+
+    def _unplace(self, key: Hashable, entry: list):
+        self._slots[entry[1]][entry[2]].discard(key)
+        self._counts[entry[1]] -= 1
+
+    def schedule(self, key: Hashable, delay: float):
+        """Start (or restart) a timer firing delay seconds from now"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._unplace(key, entry)
+            entry = self._entries[key] = [self.clock() + delay, 0, 0]
+            self._place(key, entry)
+
+    def touch(self, key: Hashable, delay: float) -> bool:
+        """Push a running timer back to delay seconds from now; False if it is not running"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            deadline = self.clock() + delay
+            if deadline < entry[0]:
+                # Earlier than planned: the timer has to move
+                self._unplace(key, entry)
+                entry[0] = deadline
+                self._place(key, entry)
+            else:
+                entry[0] = deadline
+            return True
+
+    def cancel(self, key: Hashable) -> bool:
+        """Stop a timer"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._unplace(key, entry)
+            return True
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """When a timer will fire (clock time), or None"""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def advance(self, now: float = None) -> List[Hashable]:
+        """Move the wheel up to now and return the keys whose timers expired"""
+        expired = []
+        with self._lock:
+            moment = self.clock() if now is None else now
+            target = self._tick_of(moment)
+            while self._current < target:
+                lowest = next((level for level in range(self.levels) if self._counts[level]), None)
+                if lowest is None:
+                    self._current = target
+                    break
+                # Nothing below the lowest occupied level can fire before its next slot boundary
+                shift = self.slot_bits * lowest
+                self._current = min(target, ((self._current >> shift) + 1) << shift)
+
+                for level in reversed(range(1, self.levels)):
+                    if self._current & ((1 << (self.slot_bits * level)) - 1) == 0:
+                        self._cascade(level, (self._current >> (self.slot_bits * level)) & self._mask)
+                bucket = self._slots[0][self._current & self._mask]
+                if bucket:
+                    self._slots[0][self._current & self._mask] = set()
+                    self._counts[0] -= len(bucket)
+                    for key in bucket:
+                        entry = self._entries[key]
+                        if self._tick_of(entry[0]) > self._current:
+                            # Touched since it was placed
+                            self._place(key, entry)
+                        else:
+                            del self._entries[key]
+                            expired.append(key)
+        return expired
+
+    def _cascade(self, level: int, slot: int):
+        bucket = self._slots[level][slot]
+        if not bucket:
+            return
+        self._slots[level][slot] = set()
+        self._counts[level] -= len(bucket)
+        for key in bucket:
+            self._place(key, self._entries[key], earliest=self._current)
+
+    def stats(self) -> Dict[str, int]:
+        """Pending timers per level"""
+        with self._lock:
+            return {"timers": len(self._entries), **{f"level_{n}": count for n, count in enumerate(self._counts)}}
@@ -0,0 +1,805 @@
+#!/usr/bin/env python3
+"""
+User Store
+Provides per-user persistence backends for learner profiles
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple
+
+from .error_handler import error_handler, UserDataError
+
+class UserStore:
+    """Base interface for user profile storage backends"""
+
+    backend_name = "base"
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        """Get a single user profile"""
+        raise NotImplementedError
+
+    def save_user(self, email: str, profile: Dict) -> bool:
+        """Insert or replace a single user profile"""
+        raise NotImplementedError
+
+    def update_user(self, email: str, updater: Callable[[Dict], Any],
+                    create: bool = False) -> Optional[Dict]:
+        """
+        Read-modify-write a user profile in one transaction
+
+        Args:
+            email: User identifier
+            updater: Callable that mutates the profile dict in place; returning
+                False aborts the transaction without writing
+            create: Start from an empty profile if the user does not exist
+
+        Returns:
+            The updated profile, or None if the user does not exist
+        """
+        raise NotImplementedError
+
+    def increment(self, email: str, deltas: Dict[str, float],
+                  set_fields: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically add deltas to numeric profile fields
+
+        Returns:
+            The new values of the incremented fields, or None if the user does not exist
+        """
+        raise NotImplementedError
+
+    def delete_user(self, email: str) -> bool:
+        """Delete a user profile"""
+        raise NotImplementedError
+
+    def user_exists(self, email: str) -> bool:
+        """Check if a user profile exists"""
+        return self.get_user(email) is not None
+
+    def iter_users(self) -> Iterator[Tuple[str, Dict]]:
+        """Iterate over (email, profile) pairs"""
+        raise NotImplementedError
+
+    def all_users(self) -> Dict[str, Dict]:
+        """Get every user profile keyed by email"""
+        return dict(self.iter_users())
+
+    def iter_users_since(self, since: float) -> Iterator[Tuple[str, Dict]]:
+        """Iterate over profiles written at or after since (epoch seconds); backends
+        without write times return every profile"""
+        return self.iter_users()
+
+    def iter_emails(self) -> Iterator[str]:
+        """Iterate over stored user emails"""
+        return (email for email, _ in self.iter_users())
+
+    def count_users(self) -> int:
+        """Get the number of stored users"""
+        return sum(1 for _ in self.iter_users())
+
+    def save_all(self, data: Dict[str, Dict]) -> bool:
+        """Replace the whole user table (legacy whole-file semantics)"""
+        raise NotImplementedError
+
+    def version(self) -> Any:
+        """Get a token that changes whenever stored data changes"""
+        raise NotImplementedError
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """Import users from a legacy JSON file; returns number of imported users"""
+        return 0
+
+    def backup(self, target_path: str):
+        """Write a consistent copy of the whole store to target_path"""
+        raise NotImplementedError
+
+    def invalidate(self, email: str = None):
+        """Drop cached profiles (no-op for uncached backends)"""
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        return {
+            "backend": self.backend_name,
+            "users": self.count_users()
+        }
+
+class SQLiteUserStore(UserStore):
+    """SQLite-backed user store running in WAL mode"""
+
+    backend_name = "sqlite"
+
+    def __init__(self, db_path: str = "data/users.db", timeout: float = 10.0):
+        self.db_path = str(db_path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._write_count = 0
+        self._count_lock = threading.Lock()
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        """Create tables if they do not exist"""
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " email TEXT PRIMARY KEY,"
+            " profile TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS users_by_updated_at ON users (updated_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS store_meta ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO store_meta (key, value) VALUES ('version', '0')")
+
+    def _bump_version(self, conn: sqlite3.Connection):
+        """Advance the shared data version inside the current transaction"""
+        conn.execute(
+            "UPDATE store_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'"
+        )
+
+    def _bump_write_count(self):
+        with self._count_lock:
+            self._write_count += 1
+
+    @staticmethod
+    def _json_path(field: str) -> str:
+        """Build a JSON1 path for a top-level profile field"""
+        return '$."' + field.replace('"', '\\"') + '"'
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT profile FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_user(self, email: str, profile: Dict) -> bool:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO users (email, profile, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(email) DO UPDATE SET profile = excluded.profile, "
+                "updated_at = excluded.updated_at",
+                (email, json.dumps(profile, ensure_ascii=False), time.time())
+            )
+            self._bump_version(conn)
+            conn.execute("COMMIT")
+            self._bump_write_count()
+            return True
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            error_handler.handle_error(
+                UserDataError(f"Failed to save user: {e}"),
+                context={"email": email, "backend": self.backend_name}
+            )
+            return False
+
+    def update_user(self, email: str, updater: Callable[[Dict], Any],
+                    create: bool = False) -> Optional[Dict]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT profile FROM users WHERE email = ?", (email,)
+            ).fetchone()
+            if row is None and not create:
+                conn.execute("ROLLBACK")
+                return None
+
+            profile = json.loads(row[0]) if row else {}
+            if updater(profile) is False:
+                conn.execute("ROLLBACK")
+                return profile
+            conn.execute(
+                "INSERT INTO users (email, profile, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(email) DO UPDATE SET profile = excluded.profile, "
+                "updated_at = excluded.updated_at",
+                (email, json.dumps(profile, ensure_ascii=False), time.time())
+            )
+            self._bump_version(conn)
+            conn.execute("COMMIT")
+            self._bump_write_count()
+            return profile
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def increment(self, email: str, deltas: Dict[str, float],
+                  set_fields: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        if not deltas and not set_fields:
+            return {}
+
+        # Single UPDATE statement so concurrent workers never lose increments
+        expression = "profile"
+        params: List[Any] = []
+        for field, delta in deltas.items():
+            path = self._json_path(field)
+            expression = f"json_set({expression}, ?, COALESCE(json_extract(profile, ?), 0) + ?)"
+            params.extend([path, path, delta])
+        for field, value in (set_fields or {}).items():
+            expression = f"json_set({expression}, ?, json(?))"
+            params.extend([self._json_path(field), json.dumps(value)])
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                f"UPDATE users SET profile = {expression}, updated_at = ? WHERE email = ?",
+                params + [time.time(), email]
+            )
+            if cursor.rowcount == 0:
+                conn.execute("ROLLBACK")
+                return None
+
+            result = {}
+            for field in deltas:
+                path = self._json_path(field)
+                result[field] = conn.execute(
+                    "SELECT json_extract(profile, ?) FROM users WHERE email = ?",
+                    (path, email)
+                ).fetchone()[0]
+            self._bump_version(conn)
+            conn.execute("COMMIT")
+            self._bump_write_count()
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete_user(self, email: str) -> bool:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute("DELETE FROM users WHERE email = ?", (email,))
+            self._bump_version(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._bump_write_count()
+        return cursor.rowcount > 0
+
+    def user_exists(self, email: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        return row is not None
+
+    def iter_users(self) -> Iterator[Tuple[str, Dict]]:
+        rows = self._connect().execute(
+            "SELECT email, profile FROM users ORDER BY email"
+        ).fetchall()
+        for email, profile in rows:
+            yield email, json.loads(profile)
+
+    def iter_users_since(self, since: float) -> Iterator[Tuple[str, Dict]]:
+        rows = self._connect().execute(
+            "SELECT email, profile FROM users WHERE updated_at >= ? ORDER BY email", (since,)
+        ).fetchall()
+        for email, profile in rows:
+            yield email, json.loads(profile)
+
+    def iter_emails(self) -> Iterator[str]:
+        rows = self._connect().execute("SELECT email FROM users").fetchall()
+        return (row[0] for row in rows)
+
+    def count_users(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def save_all(self, data: Dict[str, Dict]) -> bool:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (email, profile, updated_at) VALUES (?, ?, ?)",
+                [(email, json.dumps(profile, ensure_ascii=False), now)
+                 for email, profile in data.items()]
+            )
+            self._bump_version(conn)
+            conn.execute("COMMIT")
+            self._bump_write_count()
+            return True
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            error_handler.handle_error(
+                UserDataError(f"Failed to save users: {e}"),
+                context={"backend": self.backend_name, "users": len(data)}
+            )
+            return False
+
+    def version(self) -> Any:
+        # Bumped inside every write transaction, so it is consistent across
+        # threads and worker processes sharing the database file
+        return self._connect().execute(
+            "SELECT CAST(value AS INTEGER) FROM store_meta WHERE key = 'version'"
+        ).fetchone()[0]
+
+    @property
+    def storage_path(self) -> str:
+        return self.db_path
+
+    def backup(self, target_path: str):
+        # Online backup: a consistent snapshot while other connections keep writing
+        temp_path = f"{target_path}.tmp"
+        target = sqlite3.connect(temp_path)
+        try:
+            self._connect().backup(target)
+        finally:
+            target.close()
+        os.replace(temp_path, target_path)
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT value FROM store_meta WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """One-shot import of the legacy user_progress.json file"""
+        if self._get_meta("migrated_from_json") or not os.path.exists(json_path):
+            return 0
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                legacy_data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            error_handler.logger.warning(f"Skipping user data migration from {json_path}: {e}")
+            return 0
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have finished the migration while we waited
+            if self._get_meta("migrated_from_json"):
+                conn.execute("ROLLBACK")
+                return 0
+
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (email, profile, updated_at) VALUES (?, ?, ?)",
+                [(email, json.dumps(profile, ensure_ascii=False), now)
+                 for email, profile in legacy_data.items() if isinstance(profile, dict)]
+            )
+            conn.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('migrated_from_json', ?)",
+                (json.dumps({"path": str(json_path), "users": len(legacy_data), "at": now}),)
+            )
+            self._bump_version(conn)
+            conn.execute("COMMIT")
+            self._bump_write_count()
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        error_handler.logger.info(f"Migrated {len(legacy_data)} users from {json_path} to {self.db_path}")
+        return len(legacy_data)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({
+            "db_path": self.db_path,
+            "writes": self._write_count
+        })
+        return stats
+
+class JSONUserStore(UserStore):
+    """Legacy adapter storing every user in a single JSON file"""
+
+    backend_name = "json"
+
+    def __init__(self, file_path: str = "data/user_progress.json"):
+        self.file_path = str(file_path)
+        self._lock = threading.RLock()
+
+    def _read(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            error_handler.logger.error(f"Error loading user data: {e}")
+            return {}
+
+    def _write(self, data: Dict[str, Dict]) -> bool:
+        directory = os.path.dirname(self.file_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_path, self.file_path)
+            return True
+        except OSError as e:
+            error_handler.handle_error(
+                UserDataError(f"Failed to save user data: {e}"),
+                context={"file_path": self.file_path}
+            )
+            return False
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        with self._lock:
+            return self._read().get(email)
+
+    def save_user(self, email: str, profile: Dict) -> bool:
+        with self._lock:
+            data = self._read()
+            data[email] = profile
+            return self._write(data)
+
+    def update_user(self, email: str, updater: Callable[[Dict], Any],
+                    create: bool = False) -> Optional[Dict]:
+        with self._lock:
+            data = self._read()
+            if email not in data and not create:
+                return None
+            profile = data.setdefault(email, {})
+            if updater(profile) is not False:
+                self._write(data)
+            return profile
+
+    def increment(self, email: str, deltas: Dict[str, float],
+                  set_fields: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._read()
+            profile = data.get(email)
+            if profile is None:
+                return None
+            for field, delta in deltas.items():
+                profile[field] = profile.get(field, 0) + delta
+            profile.update(set_fields or {})
+            self._write(data)
+            return {field: profile[field] for field in deltas}
+
+    def delete_user(self, email: str) -> bool:
+        with self._lock:
+            data = self._read()
+            if data.pop(email, None) is None:
+                return False
+            return self._write(data)
+
+    def iter_users(self) -> Iterator[Tuple[str, Dict]]:
+        with self._lock:
+            return iter(list(self._read().items()))
+
+    def all_users(self) -> Dict[str, Dict]:
+        with self._lock:
+            return self._read()
+
+    def save_all(self, data: Dict[str, Dict]) -> bool:
+        with self._lock:
+            return self._write(data)
+
+    @property
+    def storage_path(self) -> str:
+        return self.file_path
+
+    def backup(self, target_path: str):
+        with self._lock:
+            data = self._read()
+        temp_path = f"{target_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, target_path)
+
+    def version(self) -> Any:
+        try:
+            stat = os.stat(self.file_path)
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["file_path"] = self.file_path
+        return stats
+
+class CachedUserStore(UserStore):
+    """
+    Process-wide read-through profile cache in front of another store
+
+    Reads are served from memory and the backend version is only checked
+    every revalidate_interval seconds; a version change from another
+    process drops the cache. Writes made through this wrapper go to the
+    backend first and then replace the cached entry.
+    """
+
+    def __init__(self, backend: UserStore, max_entries: int = 10000,
+                 revalidate_interval: float = 1.0):
+        self.backend = backend
+        self.backend_name = backend.backend_name
+        self.max_entries = max_entries
+        self.revalidate_interval = revalidate_interval
+
+        # email -> JSON encoded profile (None caches a missing user); stored
+        # encoded so callers can mutate what they get back
+        self._entries: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._complete = False
+        self._version = None
+        self._validated_at = 0.0
+        self._lock = threading.RLock()
+        self._listeners = []
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __getattr__(self, name):
+        # Backend specific helpers (db_path, file_path, ...) pass straight through
+        return getattr(self.backend, name)
+
+    def _clear(self):
+        self._entries.clear()
+        self._complete = False
+        self.invalidations += 1
+        self._notify('users_reset')
+
+    def subscribe(self, listener):
+        """
+        Register a listener for profile changes
+
+        The listener's user_changed(email, profile) is called after each
+        write made through this store (profile is None for a deleted user),
+        and users_reset() whenever the cache is dropped, e.g. after a bulk
+        write or a write from another process.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _notify(self, event: str, *args):
+        for listener in self._listeners:
+            try:
+                getattr(listener, event)(*args)
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "user_store_listener", "event": event})
+
+    def _notify_changed(self, email: str):
+        if not self._listeners:
+            return
+        if email in self._entries:
+            cached = self._entries[email]
+            profile = None if cached is None else json.loads(cached)
+        else:
+            profile = self.backend.get_user(email)
+            self._remember(email, profile)
+        self._notify('user_changed', email, profile)
+
+    def _validate(self):
+        """Drop cached entries if the backend changed behind our back"""
+        now = time.monotonic()
+        if now - self._validated_at < self.revalidate_interval:
+            return
+
+        version = self.backend.version()
+        if version != self._version:
+            if self._entries:
+                self._clear()
+            self._version = version
+        self._validated_at = now
+
+    def _remember(self, email: str, profile: Optional[Dict]):
+        self._entries[email] = None if profile is None else json.dumps(profile)
+        self._entries.move_to_end(email)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._complete = False
+
+    def _forget(self, email: str):
+        if email in self._entries:
+            del self._entries[email]
+            self._complete = False
+
+    def _write(self, write: Callable[[], Any], email: str = None,
+               on_success: Callable[[Any], None] = None) -> Any:
+        """Run a backend write and keep the cached entry and version in step with it"""
+        with self._lock:
+            self._validate()
+            before = self.backend.version()
+            if before != self._version:
+                self._clear()
+
+            try:
+                result = write()
+            except Exception:
+                if email is not None:
+                    self._forget(email)
+                raise
+
+            after = self.backend.version()
+            if isinstance(before, int) and isinstance(after, int) and after > before + 1:
+                # Another writer committed between our version reads
+                self._clear()
+            self._version = after
+            self._validated_at = time.monotonic()
+
+            # An unchanged version means nothing was written (e.g. aborted update)
+            if after != before and email is not None:
+                if on_success:
+                    on_success(result)
+                else:
+                    self._forget(email)
+                self._notify_changed(email)
+            return result
+
+    def invalidate(self, email: str = None):
+        """Explicitly drop one cached profile, or all of them"""
+        with self._lock:
+            if email is None:
+                self._clear()
+            else:
+                self._forget(email)
+                self._notify_changed(email)
+
+    def revalidate(self):
+        """Check the backend version now (subject to revalidate_interval)"""
+        with self._lock:
+            self._validate()
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        with self._lock:
+            self._validate()
+            if email in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(email)
+                cached = self._entries[email]
+                return None if cached is None else json.loads(cached)
+
+            self.misses += 1
+            profile = self.backend.get_user(email)
+            self._remember(email, profile)
+            return profile
+
+    def user_exists(self, email: str) -> bool:
+        return self.get_user(email) is not None
+
+    def save_user(self, email: str, profile: Dict) -> bool:
+        return self._write(
+            lambda: self.backend.save_user(email, profile), email,
+            lambda saved: self._remember(email, profile) if saved else self._forget(email)
+        )
+
+    def update_user(self, email: str, updater: Callable[[Dict], Any],
+                    create: bool = False) -> Optional[Dict]:
+        return self._write(
+            lambda: self.backend.update_user(email, updater, create), email,
+            lambda profile: self._remember(email, profile)
+        )
+
+    def increment(self, email: str, deltas: Dict[str, float],
+                  set_fields: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        def patch_entry(new_values):
+            cached = self._entries.get(email)
+            if new_values is None or cached is None:
+                self._forget(email)
+                return
+            profile = json.loads(cached)
+            profile.update(new_values)
+            profile.update(set_fields or {})
+            self._remember(email, profile)
+
+        return self._write(
+            lambda: self.backend.increment(email, deltas, set_fields), email, patch_entry
+        )
+
+    def delete_user(self, email: str) -> bool:
+        return self._write(
+            lambda: self.backend.delete_user(email), email,
+            lambda deleted: self._remember(email, None)
+        )
+
+    def iter_users(self) -> Iterator[Tuple[str, Dict]]:
+        return iter(self.all_users().items())
+
+    def all_users(self) -> Dict[str, Dict]:
+        with self._lock:
+            self._validate()
+            if self._complete:
+                self.hits += 1
+                return {email: json.loads(profile)
+                        for email, profile in self._entries.items() if profile is not None}
+
+            self.misses += 1
+            users = self.backend.all_users()
+            if len(users) <= self.max_entries:
+                self._entries.clear()
+                for email, profile in users.items():
+                    self._remember(email, profile)
+                self._complete = True
+            return users
+
+    def iter_users_since(self, since: float) -> Iterator[Tuple[str, Dict]]:
+        # Write times live in the backend; this is for catching up after a reset
+        return self.backend.iter_users_since(since)
+
+    def iter_emails(self) -> Iterator[str]:
+        return self.backend.iter_emails()
+
+    def count_users(self) -> int:
+        with self._lock:
+            self._validate()
+            if self._complete:
+                return sum(1 for profile in self._entries.values() if profile is not None)
+        return self.backend.count_users()
+
+    def save_all(self, data: Dict[str, Dict]) -> bool:
+        with self._lock:
+            saved = self._write(lambda: self.backend.save_all(data))
+            self._clear()
+            return saved
+
+    def version(self) -> Any:
+        return self.backend.version()
+
+    def backup(self, target_path: str):
+        self.backend.backup(target_path)
+
+    def migrate_from_json(self, json_path: str) -> int:
+        migrated = self.backend.migrate_from_json(json_path)
+        if migrated:
+            self.invalidate()
+        return migrated
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters for the profile cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "complete": self._complete
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.backend.stats()
+        stats["cache"] = self.cache_stats()
+        return stats
+
+USER_STORE_BACKENDS = {
+    "sqlite": SQLiteUserStore,
+    "json": JSONUserStore
+}
+
+def create_user_store(backend: str = None, data_dir: str = "data") -> UserStore:
+    """Create a user store for the configured backend (USER_STORE_BACKEND, default sqlite)"""
+    backend = (backend or os.environ.get("USER_STORE_BACKEND", "sqlite")).lower()
+
+    if backend == "sqlite":
+        return SQLiteUserStore(os.path.join(data_dir, "users.db"))
+    if backend == "json":
+        return JSONUserStore(os.path.join(data_dir, "user_progress.json"))
+
+    raise ValueError(f"Unknown user store backend: {backend}")
+
+# Global user store instance with the per-process profile cache in front
+user_store = CachedUserStore(create_user_store())
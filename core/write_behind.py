@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Write-Behind Counters
+Coalesces hot profile counters (usage counts, quiz attempts, activity
+timestamps, streak touches) in memory and writes them to the user store in batches:
+- One store transaction per user per flush instead of one per request
+- Flushed every flush_interval seconds or after flush_threshold updates
+- Every update is appended to a per-process journal first, so a crashed
+  process's updates are replayed by the next one to start
+- Replays are exactly-once: each profile records the last journal batch
+  applied to it
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import atexit
+from datetime import datetime, date
+from pathlib import Path
+from typing import Dict, List, Any, Callable
+
+# Try to import fcntl for Unix systems; without it dead journals are found by pid
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+from .error_handler import error_handler
+
+# Profile field mapping journal id -> last batch applied from that journal
+APPLIED_FIELD = "_counter_batches"
+
+# Batch number used when replaying the unflushed journal of a dead process
+UNFLUSHED_BATCH = 2 ** 62
+
+def advance_streak(profile: Dict, day: str):
+    """Apply one day of activity to a profile's streak (the update_learning_streak rules)"""
+    try:
+        last_day = datetime.fromisoformat(profile.get('last_activity', '').replace('Z', '+00:00')).date()
+        days_diff = (date.fromisoformat(day) - last_day).days
+        if days_diff == 1:
+            profile['streak'] = profile.get('streak', 0) + 1
+        elif days_diff != 0:
+            profile['streak'] = 1
+    except (ValueError, TypeError, AttributeError):
+        profile['streak'] = 1
+
+    if profile.get('last_activity', '') < day:
+        profile['last_activity'] = day
+
+class _Pending:
+    """Coalesced updates for one user"""
+
+    __slots__ = ('deltas', 'latest', 'days')
+
+    def __init__(self):
+        self.deltas: Dict[str, float] = {}
+        self.latest: Dict[str, Any] = {}
+        self.days: set = set()
+
+    def merge(self, deltas: Dict[str, float], latest: Dict[str, Any], days: List[str]):
+        for field, delta in deltas.items():
+            self.deltas[field] = self.deltas.get(field, 0) + delta
+        for field, value in latest.items():
+            if field not in self.latest or value > self.latest[field]:
+                self.latest[field] = value
+        self.days.update(days)
+
+    def apply(self, profile: Dict):
+        for day in sorted(self.days):
+            advance_streak(profile, day)
+        for field, delta in self.deltas.items():
+            profile[field] = profile.get(field, 0) + delta
+        for field, value in self.latest.items():
+            if field not in profile or value > profile[field]:
+                profile[field] = value
+
+class CounterAggregator:
+    """Write-behind buffer for high-frequency profile counters"""
+
+    def __init__(self, apply_update: Callable[[str, Callable[[Dict], Any]], Any],
+                 journal_dir: str = "data/journal", flush_interval: float = 5.0,
+                 flush_threshold: int = 200, fsync: bool = False,
+                 derive: Callable[[Dict], Any] = None):
+        """
+        Args:
+            apply_update: Runs updater on a user's profile in one store
+                transaction (UserStore.update_user semantics)
+            derive: Recomputes fields derived from the counters (e.g. an
+                average from a total and a count) after they are applied
+            journal_dir: Directory for the per-process journals
+            flush_interval: Seconds between background flushes
+            flush_threshold: Pending updates that trigger an early flush
+            fsync: fsync the journal on every update (survives power loss,
+                not just a process crash)
+        """
+        self.apply_update = apply_update
+        self.journal_dir = Path(journal_dir)
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.fsync = fsync
+        self.derive = derive
+
+        self.journal_id = f"{os.getpid()}-{time.time_ns()}"
+        self._pending: Dict[str, _Pending] = {}
+        self._updates = 0
+        self._batch = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._recovered = False
+
+        self.flushes = 0
+        self.flushed_updates = 0
+        self.flush_errors = 0
+        self.recovered_journals = 0
+
+    # Recording
+
+    def add(self, email: str, deltas: Dict[str, float] = None, latest: Dict[str, Any] = None,
+            touch_streak: bool = False):
+        """
+        Record counter updates for a user
+
+        Args:
+            email: User identifier
+            deltas: Amounts to add to numeric fields
+            latest: Fields that keep the largest value seen (e.g. ISO timestamps)
+            touch_streak: Count today as an activity day for the learning streak
+        """
+        deltas = deltas or {}
+        latest = latest or {}
+        days = [date.today().isoformat()] if touch_streak else []
+
+        with self._lock:
+            self._write_journal({"email": email, "deltas": deltas, "latest": latest, "days": days})
+            self._pending.setdefault(email, _Pending()).merge(deltas, latest, days)
+            self._updates += 1
+            due = self._updates >= self.flush_threshold
+
+        self._start()
+        if due:
+            self._wake.set()
+
+    def _apply(self, entry: _Pending, profile: Dict):
+        entry.apply(profile)
+        if self.derive:
+            self.derive(profile)
+
+    def overlay(self, email: str, profile: Dict) -> Dict:
+        """Profile with this process's unflushed updates applied and the
+        replay markers left out (for reads)"""
+        with self._lock:
+            pending = self._pending.get(email)
+            if (pending is None and APPLIED_FIELD not in profile) or not profile:
+                return profile
+            profile = dict(profile)
+            profile.pop(APPLIED_FIELD, None)
+            if pending is not None:
+                self._apply(pending, profile)
+            return profile
+
+    # Journal
+
+    def _journal_path(self, batch: int = None, journal_id: str = None) -> Path:
+        journal_id = journal_id or self.journal_id
+        if batch is None:
+            return self.journal_dir / f"counters-{journal_id}.log"
+        return self.journal_dir / f"counters-{journal_id}.{batch}.flushing"
+
+    def _write_journal(self, entry: Dict):
+        if self._journal is None:
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self._journal_path(), 'a', encoding='utf-8')
+            if HAS_FCNTL:
+                # Held for the life of the process; a free lock marks a dead journal
+                fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _read_journal(self, path: str) -> Dict[str, _Pending]:
+        pending = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                pending.setdefault(entry["email"], _Pending()).merge(
+                    entry.get("deltas", {}), entry.get("latest", {}), entry.get("days", []))
+        return pending
+
+    # Flushing
+
+    def flush(self) -> int:
+        """Write pending updates to the store; returns the number of users written"""
+        self._recover()
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                pending, self._pending = self._pending, {}
+                self._updates = 0
+                self._batch += 1
+                batch = self._batch
+                flushing = self._journal_path(batch)
+                flushing_file = self._journal
+                if flushing_file is not None:
+                    # The open file keeps its lock across the rename, so other
+                    # processes leave the batch alone while it is applied
+                    self._journal = None
+                    try:
+                        os.replace(self._journal_path(), flushing)
+                    except OSError as e:
+                        # The updates are still in memory; apply them anyway
+                        error_handler.handle_error(e, context={"operation": "rotate_counter_journal"})
+                        flushing_file.close()
+                        flushing_file = None
+
+            failed = self._apply_batch(self.journal_id, batch, pending)
+
+            with self._lock:
+                # Keep failed users pending (and journaled) for the next flush
+                for email, entry in failed.items():
+                    self._write_journal({"email": email, "deltas": entry.deltas,
+                                         "latest": entry.latest, "days": sorted(entry.days)})
+                    self._pending.setdefault(email, _Pending()).merge(
+                        entry.deltas, entry.latest, sorted(entry.days))
+
+            if flushing_file is not None:
+                flushing.unlink()
+                flushing_file.close()
+            self.flushes += 1
+            return len(pending) - len(failed)
+
+    def _apply_batch(self, journal_id: str, batch: int, pending: Dict[str, _Pending]) -> Dict[str, _Pending]:
+        """Apply a batch once per user; returns the users that could not be written"""
+        live_journals = self._journal_ids()
+        failed = {}
+
+        for email, entry in pending.items():
+            def updater(profile, entry=entry):
+                applied = profile.get(APPLIED_FIELD, {})
+                if applied.get(journal_id, -1) >= batch:
+                    return False
+                self._apply(entry, profile)
+                # Markers are only needed while their journal is still on disk
+                applied = {key: value for key, value in applied.items() if key in live_journals}
+                applied[journal_id] = batch
+                profile[APPLIED_FIELD] = applied
+
+            try:
+                self.apply_update(email, updater)
+                self.flushed_updates += 1
+            except Exception as e:
+                self.flush_errors += 1
+                failed[email] = entry
+                error_handler.handle_error(e, context={"operation": "flush_counters", "email": email})
+
+        return failed
+
+    def _journal_ids(self) -> set:
+        ids = {self.journal_id}
+        for path in glob.glob(str(self.journal_dir / "counters-*")):
+            ids.add(os.path.basename(path)[len("counters-"):].split('.')[0])
+        return ids
+
+    def _is_dead(self, path: str, journal_id: str) -> bool:
+        if HAS_FCNTL:
+            try:
+                with open(path, 'a') as f:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                return True
+            except OSError:
+                return False
+        try:
+            os.kill(int(journal_id.split('-')[0]), 0)
+            return False
+        except (OSError, ValueError):
+            return True
+
+    def _recover(self):
+        """Replay journals left behind by processes that exited without flushing"""
+        if self._recovered:
+            return
+        self._recovered = True
+
+        dead = {}
+        for path in sorted(glob.glob(str(self.journal_dir / "counters-*"))):
+            journal_id = os.path.basename(path)[len("counters-"):].split('.')[0]
+            if journal_id != self.journal_id and self._is_dead(path, journal_id):
+                dead.setdefault(journal_id, []).append(path)
+
+        for journal_id, paths in dead.items():
+            def batch_of(path):
+                parts = os.path.basename(path).split('.')
+                return int(parts[1]) if parts[-1] == "flushing" else UNFLUSHED_BATCH
+
+            ok = True
+            for path in sorted(paths, key=batch_of):
+                try:
+                    failed = self._apply_batch(journal_id, batch_of(path), self._read_journal(path))
+                except OSError as e:
+                    error_handler.handle_error(e, context={"operation": "recover_counters", "path": path})
+                    failed = True
+                ok = ok and not failed
+            if ok:
+                for path in paths:
+                    os.remove(path)
+                self.recovered_journals += 1
+
+    # Background flushing
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                error_handler.handle_error(e, context={"operation": "flush_counters"})
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregator statistics"""
+        with self._lock:
+            return {
+                "pending_users": len(self._pending),
+                "pending_updates": self._updates,
+                "flushes": self.flushes,
+                "flushed_updates": self.flushed_updates,
+                "flush_errors": self.flush_errors,
+                "recovered_journals": self.recovered_journals
+            }
@@ -214,9 +214,17 @@ class UserDataMigration:
                     print(f"User already standardized: {user_key}")
                     migrated_data[user_key] = profile
             
+            # Check every migrated profile against the user schema in one pass
+            schema_errors = db_manager.validate_batch(migrated_data, "user_progress")
+            for user_key, errors in schema_errors.items():
+                problems = ", ".join(f"{error['location']} {error['message']}" for error in errors)
+                print(f"Schema problems for {user_key}: {problems}")
+            
             # Save migrated data
             if self.save_user_data(migrated_data):
                 print(f"Migration completed successfully! Migrated {migration_count} users.")
+                if schema_errors:
+                    print(f"{len(schema_errors)} profiles still need attention (see above).")
                 return True
             else:
                 print("Failed to save migrated data")
@@ -235,7 +243,8 @@ class UserDataMigration:
             "standardized_users": 0,
             "legacy_users": 0,
             "users_needing_migration": [],
-            "data_inconsistencies": []
+            "data_inconsistencies": [],
+            "schema_errors": db_manager.validate_batch(user_data, "user_progress")
         }
         
         for user_key, profile in user_data.items():
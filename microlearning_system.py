@@ -9,12 +9,16 @@ import math
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 
+from core.review_queue import review_queue
+
 class SpacedRepetitionEngine:
     """
     Advanced spaced repetition system based on research from top platforms
     """
     
-    def __init__(self):
+    def __init__(self, due_queue=None):
+        # Persistent due-queue; without one, due concepts are found by scanning user_data
+        self.due_queue = due_queue
         # Spaced repetition intervals (in hours)
         self.intervals = [1, 4, 24, 72, 168, 336, 720, 1440]  # 1h, 4h, 1d, 3d, 1w, 2w, 1m, 2m
         self.difficulty_multipliers = {
@@ -50,8 +54,26 @@ class SpacedRepetitionEngine:
         
         return datetime.now() + timedelta(hours=adjusted_interval)
     
+    def schedule_review(self, user_id: str, concept_id: str, user_performance: Dict,
+                        difficulty: str = 'medium') -> datetime:
+        """Calculate the next review of a concept and record it in the due-queue"""
+        next_review = self.calculate_next_review(concept_id, user_performance, difficulty)
+        if self.due_queue is not None:
+            recent_attempts = user_performance.get(concept_id, [])[-5:]
+            performance = (sum(attempt['correct'] for attempt in recent_attempts) / len(recent_attempts)
+                           if recent_attempts else None)
+            self.due_queue.schedule(user_id, concept_id, next_review, performance)
+        return next_review
+
     def get_concepts_to_review(self, user_id: str, user_data: Dict) -> List[Dict]:
         """Get concepts that are due for review"""
+        if self.due_queue is not None:
+            return [
+                {'concept_id': item['concept_id'], 'priority': item['priority'],
+                 'last_performance': item['last_performance']}
+                for item in self.due_queue.due(user_id)
+            ]
+
         concepts_to_review = []
         current_time = datetime.now()
         
@@ -383,7 +405,7 @@ class AdaptiveDifficultyEngine:
         return adapted_content
 
 # Global instances
-spaced_repetition = SpacedRepetitionEngine()
+spaced_repetition = SpacedRepetitionEngine(review_queue)
 microlearning_chunker = MicrolearningChunker()
 adaptive_difficulty = AdaptiveDifficultyEngine()
 
@@ -71,6 +71,7 @@ class Lesson(db.Model):
     points_reward = db.Column(db.Integer, default=10)
     is_active = db.Column(db.Boolean, default=True)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    catalog_id = db.Column(db.String(100), unique=True, nullable=True)  # id in the content catalog
     
     # Foreign Keys
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
@@ -142,15 +143,16 @@ class LessonProgress(db.Model):
     """Track user progress through lessons"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'), nullable=False, index=True)
     status = db.Column(db.String(50), default='not_started')  # not_started, in_progress, completed
     progress_percentage = db.Column(db.Float, default=0.0)
     time_spent = db.Column(db.Integer, default=0)  # minutes
-    completed_date = db.Column(db.DateTime, nullable=True)
+    completed_date = db.Column(db.DateTime, nullable=True, index=True)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Unique constraint
-    __table_args__ = (db.UniqueConstraint('user_id', 'lesson_id', name='unique_user_lesson'),)
+    # Unique constraint; (user, date) serves a user's recent history from the index
+    __table_args__ = (db.UniqueConstraint('user_id', 'lesson_id', name='unique_user_lesson'),
+                      db.Index('ix_lesson_progress_user_completed', 'user_id', 'completed_date'))
     
     def __repr__(self):
         return f'<LessonProgress User:{self.user_id} Lesson:{self.lesson_id}>'
@@ -165,6 +167,7 @@ class Quiz(db.Model):
     questions = db.Column(db.Text, nullable=False)  # JSON string with questions
     is_active = db.Column(db.Boolean, default=True)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    catalog_id = db.Column(db.String(100), unique=True, nullable=True)  # id in the content catalog
     
     # Relationships
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy=True)
@@ -182,12 +185,15 @@ class QuizAttempt(db.Model):
     """Track quiz attempts and scores"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     score = db.Column(db.Integer, nullable=False)
     max_score = db.Column(db.Integer, nullable=False)
     time_taken = db.Column(db.Integer, nullable=True)  # seconds
     answers = db.Column(db.Text, nullable=True)  # JSON string with user answers
-    completed_date = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    # Leading user_id column also serves lookups by user alone
+    __table_args__ = (db.Index('ix_quiz_attempt_user_completed', 'user_id', 'completed_date'),)
     
     def __repr__(self):
         return f'<QuizAttempt User:{self.user_id} Quiz:{self.quiz_id}>'
@@ -217,6 +223,7 @@ class Challenge(db.Model):
     points_reward = db.Column(db.Integer, default=25)
     is_active = db.Column(db.Boolean, default=True)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    catalog_id = db.Column(db.String(100), unique=True, nullable=True)  # id in the content catalog
     
     # Relationships
     submissions = db.relationship('ChallengeSubmission', backref='challenge', lazy=True)
@@ -228,13 +235,15 @@ class ChallengeSubmission(db.Model):
     """Track challenge submissions"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False, index=True)
     code = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(50), nullable=False)  # passed, failed, error
     score = db.Column(db.Float, default=0.0)
     execution_time = db.Column(db.Float, nullable=True)
     test_results = db.Column(db.Text, nullable=True)  # JSON string
-    submitted_date = db.Column(db.DateTime, default=datetime.utcnow)
+    submitted_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (db.Index('ix_challenge_submission_user_submitted', 'user_id', 'submitted_date'),)
     
     def __repr__(self):
         return f'<ChallengeSubmission User:{self.user_id} Challenge:{self.challenge_id}>'
@@ -261,7 +270,7 @@ class UserAchievement(db.Model):
     """Track user achievements"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    achievement_id = db.Column(db.Integer, db.ForeignKey('achievement.id'), nullable=False)
+    achievement_id = db.Column(db.Integer, db.ForeignKey('achievement.id'), nullable=False, index=True)
     earned_date = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Unique constraint
@@ -14,12 +14,15 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 import colorama
 from colorama import Fore, Style
+from core.content_pack import PackedContent
 
 class LessonManager:
     """Manage structured learning lessons"""
     
     def __init__(self, lessons_dir: str = "data/lessons"):
         self.lessons_dir = lessons_dir
+        # Lesson files are read through the content pack next to the lessons directory, if built
+        self.content = PackedContent(os.path.dirname(os.path.normpath(lessons_dir)) or ".")
         self.current_lesson = None
         self.lesson_structure = None
         self.ensure_lesson_structure()
@@ -224,9 +227,8 @@ Why Python?
         """Load the lesson structure from file"""
         index_file = os.path.join(self.lessons_dir, "lesson_index.json")
         try:
-            with open(index_file, 'r') as f:
-                self.lesson_structure = json.load(f)
-                return self.lesson_structure
+            self.lesson_structure = self.content.read_json(index_file)
+            return self.lesson_structure
         except Exception as e:
             print(f"Error loading lesson structure: {e}")
             return {}
@@ -263,10 +265,9 @@ Why Python?
         lesson_file = os.path.join(self.lessons_dir, level, f"{lesson_id}.json")
         
         try:
-            with open(lesson_file, 'r') as f:
-                lesson_data = json.load(f)
-                self.current_lesson = lesson_data
-                return lesson_data
+            lesson_data = self.content.read_json(lesson_file)
+            self.current_lesson = lesson_data
+            return lesson_data
         except FileNotFoundError:
             print(f"{Fore.RED}Lesson not found: {lesson_id}{Style.RESET_ALL}")
             return None
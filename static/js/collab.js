@@ -0,0 +1,285 @@
+/**
+ * Live Coding Session Client
+ * Operational-transform sync with the collab_* Socket.IO events:
+ * - Local edits are sent as small operations (retain n / insert str / delete -n),
+ *   one in flight at a time; edits made meanwhile are composed into a buffer
+ * - Server events are processed strictly in revision order
+ * - Cursor moves are throttled before they are sent
+ */
+
+const CollabOps = {
+    push(op, component) {
+        if (typeof component === 'string') {
+            if (!component) return;
+            const last = op[op.length - 1];
+            if (typeof last === 'string') {
+                op[op.length - 1] = last + component;
+            } else if (typeof last === 'number' && last < 0) {
+                if (typeof op[op.length - 2] === 'string') {
+                    op[op.length - 2] += component;
+                } else {
+                    op.splice(op.length - 1, 0, component);
+                }
+            } else {
+                op.push(component);
+            }
+        } else if (component) {
+            const last = op[op.length - 1];
+            if (typeof last === 'number' && (last > 0) === (component > 0)) {
+                op[op.length - 1] = last + component;
+            } else {
+                op.push(component);
+            }
+        }
+    },
+
+    baseLength(op) {
+        return op.reduce((total, c) => typeof c === 'number' ? total + Math.abs(c) : total, 0);
+    },
+
+    targetLength(op) {
+        return op.reduce((total, c) => total + (typeof c === 'string' ? c.length : (c > 0 ? c : 0)), 0);
+    },
+
+    pad(a, b) {
+        // Trailing retains may be omitted; make both cover the same text
+        const gap = this.baseLength(a) - this.baseLength(b);
+        return gap > 0 ? [a, b.concat([gap])] : gap < 0 ? [a.concat([-gap]), b] : [a, b];
+    },
+
+    apply(text, op) {
+        const parts = [];
+        let position = 0;
+        for (const c of op) {
+            if (typeof c === 'string') {
+                parts.push(c);
+            } else if (c > 0) {
+                parts.push(text.slice(position, position + c));
+                position += c;
+            } else {
+                position -= c;
+            }
+        }
+        parts.push(text.slice(position));
+        return parts.join('');
+    },
+
+    // [a', b'] such that apply(apply(s, a), b') == apply(apply(s, b), a'); a's inserts go first
+    transform(a, b) {
+        [a, b] = this.pad(a, b);
+        const aPrime = [], bPrime = [];
+        let i = 0, j = 0, op1 = a[0], op2 = b[0];
+        while (op1 !== undefined || op2 !== undefined) {
+            if (typeof op1 === 'string') {
+                this.push(aPrime, op1); this.push(bPrime, op1.length); op1 = a[++i]; continue;
+            }
+            if (typeof op2 === 'string') {
+                this.push(aPrime, op2.length); this.push(bPrime, op2); op2 = b[++j]; continue;
+            }
+            const length = Math.min(Math.abs(op1), Math.abs(op2));
+            if (op1 > 0 && op2 > 0) { this.push(aPrime, length); this.push(bPrime, length); }
+            else if (op1 < 0 && op2 > 0) { this.push(aPrime, -length); }
+            else if (op1 > 0 && op2 < 0) { this.push(bPrime, -length); }
+            op1 = op1 > 0 ? op1 - length : op1 + length;
+            op2 = op2 > 0 ? op2 - length : op2 + length;
+            if (op1 === 0) op1 = a[++i];
+            if (op2 === 0) op2 = b[++j];
+        }
+        return [aPrime, bPrime];
+    },
+
+    // One operation with the effect of a followed by b
+    compose(a, b) {
+        const gap = this.targetLength(a) - this.baseLength(b);
+        if (gap > 0) b = b.concat([gap]);
+        else if (gap < 0) a = a.concat([-gap]);
+        const result = [];
+        let i = 0, j = 0, op1 = a[0], op2 = b[0];
+        while (op1 !== undefined || op2 !== undefined) {
+            if (typeof op1 === 'number' && op1 < 0) { this.push(result, op1); op1 = a[++i]; continue; }
+            if (typeof op2 === 'string') { this.push(result, op2); op2 = b[++j]; continue; }
+            if (typeof op1 === 'string') {
+                const length = Math.min(op1.length, Math.abs(op2));
+                if (op2 > 0) this.push(result, op1.slice(0, length));
+                op1 = op1.slice(length) || a[++i];
+                op2 = op2 > 0 ? op2 - length : op2 + length;
+                if (op2 === 0) op2 = b[++j];
+                continue;
+            }
+            const length = Math.min(op1, Math.abs(op2));
+            this.push(result, op2 > 0 ? length : -length);
+            op1 -= length;
+            op2 = op2 > 0 ? op2 - length : op2 + length;
+            if (op1 === 0) op1 = a[++i];
+            if (op2 === 0) op2 = b[++j];
+        }
+        return result;
+    },
+
+    transformIndex(op, index) {
+        let newIndex = index;
+        for (const c of op) {
+            if (typeof c === 'string') newIndex += c.length;
+            else if (c > 0) index -= c;
+            else { newIndex -= Math.min(index, -c); index += c; }
+            if (index < 0) break;
+        }
+        return newIndex;
+    },
+
+    // The single edit turning oldText into newText (only the changed span is sent)
+    diff(oldText, newText) {
+        let prefix = 0;
+        const limit = Math.min(oldText.length, newText.length);
+        while (prefix < limit && oldText[prefix] === newText[prefix]) prefix++;
+        let suffix = 0;
+        while (suffix < limit - prefix &&
+               oldText[oldText.length - 1 - suffix] === newText[newText.length - 1 - suffix]) suffix++;
+        const op = [];
+        this.push(op, prefix);
+        this.push(op, newText.slice(prefix, newText.length - suffix));
+        this.push(op, -(oldText.length - prefix - suffix));
+        return op;
+    }
+};
+
+class CollabSession {
+    /**
+     * @param socket   Connected Socket.IO client
+     * @param sessionId Live coding session id
+     * @param editor   {getValue(), setValue(text), onCursors(cursors)} adapter
+     */
+    constructor(socket, sessionId, editor, cursorInterval = 50) {
+        this.socket = socket;
+        this.sessionId = sessionId;
+        this.editor = editor;
+        this.cursorInterval = cursorInterval;
+        this.text = '';
+        this.revision = 0;
+        this.outstanding = null;   // sent, not yet acknowledged
+        this.buffer = null;        // local edits made while waiting
+        this.queued = new Map();   // revision -> server event arriving out of order
+        this.cursors = {};
+        this.pendingCursor = null;
+        this.cursorTimer = null;
+
+        socket.on('collab_op', data => {
+            if (data.session_id === this.sessionId) this.enqueue(data.revision, {remote: data.operation});
+        });
+        socket.on('collab_cursors', data => {
+            if (data.session_id === this.sessionId && data.revision === this.revision) {
+                Object.entries(data.cursors).forEach(([user, cursor]) => {
+                    if (cursor) this.cursors[user] = this.toLocal(cursor);
+                    else delete this.cursors[user];
+                });
+                this.editor.onCursors(this.cursors);
+            }
+        });
+    }
+
+    join(sinceRevision = null) {
+        this.socket.emit('collab_join', {session_id: this.sessionId, since_revision: sinceRevision}, state => {
+            if (!state.success) return console.error('Failed to join session:', state.error);
+            if (state.snapshot !== undefined) {
+                this.text = state.snapshot;
+                this.outstanding = this.buffer = null;
+            }
+            state.ops.forEach(op => { this.text = CollabOps.apply(this.text, op); });
+            this.revision = state.revision;
+            this.queued.clear();
+            this.cursors = state.cursors;
+            this.editor.setValue(this.text);
+            this.editor.onCursors(this.cursors);
+        });
+    }
+
+    leave() {
+        this.socket.emit('collab_leave', {session_id: this.sessionId});
+    }
+
+    // Call after every local edit
+    localChange() {
+        const newText = this.editor.getValue();
+        const op = CollabOps.diff(this.text, newText);
+        this.text = newText;
+        if (op.length === 0 || (op.length === 1 && op[0] > 0)) return;
+        Object.keys(this.cursors).forEach(user => {
+            this.cursors[user] = {position: CollabOps.transformIndex(op, this.cursors[user].position),
+                                  selection_end: CollabOps.transformIndex(op, this.cursors[user].selection_end)};
+        });
+        if (this.outstanding) {
+            this.buffer = this.buffer ? CollabOps.compose(this.buffer, op) : op;
+        } else {
+            this.send(op);
+        }
+    }
+
+    send(op) {
+        this.outstanding = op;
+        this.socket.emit('collab_op', {session_id: this.sessionId, revision: this.revision, operation: op}, ack => {
+            if (ack.success) this.enqueue(ack.revision, {ack: true});
+            else if (ack.resync) this.join();
+            else console.error('Edit rejected:', ack.error);
+        });
+    }
+
+    enqueue(revision, event) {
+        this.queued.set(revision, event);
+        while (this.queued.has(this.revision + 1)) {
+            const next = this.queued.get(this.revision + 1);
+            this.queued.delete(++this.revision);
+            if (next.ack) {
+                this.outstanding = null;
+                if (this.buffer) {
+                    const buffered = this.buffer;
+                    this.buffer = null;
+                    this.send(buffered);
+                }
+            } else {
+                this.applyRemote(next.remote);
+            }
+        }
+    }
+
+    applyRemote(op) {
+        if (this.outstanding) [this.outstanding, op] = CollabOps.transform(this.outstanding, op);
+        if (this.buffer) [this.buffer, op] = CollabOps.transform(this.buffer, op);
+        this.text = CollabOps.apply(this.text, op);
+        Object.keys(this.cursors).forEach(user => {
+            this.cursors[user] = {position: CollabOps.transformIndex(op, this.cursors[user].position),
+                                  selection_end: CollabOps.transformIndex(op, this.cursors[user].selection_end)};
+        });
+        this.editor.setValue(this.text);
+        this.editor.onCursors(this.cursors);
+    }
+
+    // Server cursor (at this.revision) in local coordinates, past our unacknowledged edits
+    toLocal(cursor) {
+        let {position, selection_end} = cursor;
+        [this.outstanding, this.buffer].forEach(op => {
+            if (op) {
+                position = CollabOps.transformIndex(op, position);
+                selection_end = CollabOps.transformIndex(op, selection_end);
+            }
+        });
+        return {position, selection_end};
+    }
+
+    // Throttled: at most one cursor message per interval, carrying the latest position
+    moveCursor(position, selectionEnd = position) {
+        this.pendingCursor = {position, selection_end: selectionEnd};
+        if (this.cursorTimer) return;
+        this.cursorTimer = setTimeout(() => {
+            this.cursorTimer = null;
+            if (this.outstanding) {
+                // Positions are only meaningful to the server once our edits are acknowledged
+                return this.moveCursor(this.pendingCursor.position, this.pendingCursor.selection_end);
+            }
+            this.socket.emit('collab_cursor', Object.assign(
+                {session_id: this.sessionId, revision: this.revision}, this.pendingCursor));
+        }, this.cursorInterval);
+    }
+}
+
+window.CollabOps = CollabOps;
+window.CollabSession = CollabSession;
@@ -19,6 +19,7 @@ from core.error_handler import ErrorHandler
 from core.validators import InputValidator
 from core.database_manager import DatabaseManager
 from core.progress_tracker import ProgressTracker
+from core.user_store import SQLiteUserStore
 
 @pytest.fixture(scope="session")
 def app():
@@ -44,6 +45,20 @@ def temp_dir():
     yield temp_dir
     shutil.rmtree(temp_dir, ignore_errors=True)
 
+class FakeClock:
+    """Callable clock that only moves when a test sets `now`"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture(scope="function")
+def clock():
+    """Manually advanced clock for code taking a `clock` callable"""
+    return FakeClock()
+
 @pytest.fixture(scope="function")
 def test_error_handler(temp_dir):
     """Create error handler for testing"""
@@ -65,6 +80,17 @@ def test_progress_tracker(temp_dir):
     user_data_file = os.path.join(temp_dir, "user_progress.json")
     return ProgressTracker(user_data_file=user_data_file)
 
+@pytest.fixture(scope="function")
+def test_user_store(temp_dir):
+    """Create an isolated user store for testing"""
+    return SQLiteUserStore(db_path=os.path.join(temp_dir, "users.db"))
+
+@pytest.fixture(scope="function")
+def app_user_store(test_user_store):
+    """Point the Flask app at an isolated user store"""
+    with patch('app.user_store', test_user_store):
+        yield test_user_store
+
 @pytest.fixture(scope="function")
 def sample_user_data():
     """Sample user data for testing"""
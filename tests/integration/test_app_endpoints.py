@@ -8,6 +8,8 @@ import tempfile
 import os
 from unittest.mock import patch, Mock
 
+from core.content_catalog import ContentCatalog
+
 class TestAppEndpoints:
     """Test Flask application endpoints"""
     
@@ -29,13 +31,8 @@ class TestAppEndpoints:
         assert response.status_code == 200
         assert b'login' in response.data.lower()
     
-    @patch('app.save_user_data')
-    @patch('app.load_user_data')
-    def test_user_registration_success(self, mock_load, mock_save, client):
+    def test_user_registration_success(self, app_user_store, client):
         """Test successful user registration"""
-        mock_load.return_value = {}  # No existing users
-        mock_save.return_value = True
-        
         registration_data = {
             "name": "Test User",
             "email": "test@example.com",
@@ -52,13 +49,11 @@ class TestAppEndpoints:
         data = json.loads(response.data)
         assert data["success"] is True
         assert "redirect" in data
+        assert app_user_store.get_user("test@example.com")["name"] == "Test User"
     
-    @patch('app.load_user_data')
-    def test_user_registration_duplicate_email(self, mock_load, client):
+    def test_user_registration_duplicate_email(self, app_user_store, client):
         """Test registration with duplicate email"""
-        mock_load.return_value = {
-            "test@example.com": {"name": "Existing User"}
-        }
+        app_user_store.save_user("test@example.com", {"name": "Existing User"})
         
         registration_data = {
             "name": "Test User",
@@ -96,17 +91,12 @@ class TestAppEndpoints:
         assert data["success"] is False
         assert "details" in data
     
-    @patch('app.save_user_data')
-    @patch('app.load_user_data')
-    def test_user_login_success(self, mock_load, mock_save, client):
+    def test_user_login_success(self, app_user_store, client):
         """Test successful user login"""
-        mock_load.return_value = {
-            "test@example.com": {
-                "name": "Test User",
-                "password": "password123"
-            }
-        }
-        mock_save.return_value = True
+        app_user_store.save_user("test@example.com", {
+            "name": "Test User",
+            "password": "password123"
+        })
         
         login_data = {
             "email": "test@example.com",
@@ -122,15 +112,12 @@ class TestAppEndpoints:
         assert data["success"] is True
         assert "redirect" in data
     
-    @patch('app.load_user_data')
-    def test_user_login_invalid_credentials(self, mock_load, client):
+    def test_user_login_invalid_credentials(self, app_user_store, client):
         """Test login with invalid credentials"""
-        mock_load.return_value = {
-            "test@example.com": {
-                "name": "Test User",
-                "password": "password123"
-            }
-        }
+        app_user_store.save_user("test@example.com", {
+            "name": "Test User",
+            "password": "password123"
+        })
         
         login_data = {
             "email": "test@example.com",
@@ -165,20 +152,17 @@ class TestAppEndpoints:
         response = client.get('/quizzes')
         assert response.status_code == 302  # Redirect to login
     
-    def test_authenticated_dashboard_access(self, authenticated_client):
+    def test_authenticated_dashboard_access(self, app_user_store, authenticated_client):
         """Test dashboard access with authentication"""
-        with patch('app.load_user_data') as mock_load:
-            mock_load.return_value = {
-                "test@example.com": {
-                    "name": "Test User",
-                    "points": 100,
-                    "level": 2
-                }
-            }
-            
-            response = authenticated_client.get('/dashboard')
-            assert response.status_code == 200
-            assert b'dashboard' in response.data.lower()
+        app_user_store.save_user("test@example.com", {
+            "name": "Test User",
+            "points": 100,
+            "level": 2
+        })
+        
+        response = authenticated_client.get('/dashboard')
+        assert response.status_code == 200
+        assert b'dashboard' in response.data.lower()
     
     def test_csrf_token_endpoint(self, client):
         """Test CSRF token endpoint"""
@@ -201,21 +185,18 @@ class TestAppEndpoints:
         assert "version" in data
         assert "error_stats" in data
     
-    @patch('app.get_comprehensive_quizzes_data')
-    @patch('app.load_user_data')
-    def test_quiz_submission(self, mock_load, mock_quiz_data, authenticated_client):
+    def test_quiz_submission(self, app_user_store, authenticated_client, temp_dir):
         """Test quiz submission"""
-        mock_load.return_value = {
-            "test@example.com": {
-                "name": "Test User",
-                "points": 100,
-                "quizzes_completed": 0,
-                "quizzes_taken": 0,
-                "total_quiz_score": 0
-            }
-        }
-        
-        mock_quiz_data.return_value = [{
+        app_user_store.save_user("test@example.com", {
+            "name": "Test User",
+            "points": 100,
+            "quizzes_completed": 0,
+            "quizzes_taken": 0,
+            "total_quiz_score": 0
+        })
+        
+        catalog = ContentCatalog(data_dir=temp_dir)
+        catalog.register_builtin(quizzes=lambda: [{
             "id": "quiz_1",
             "title": "Test Quiz",
             "points": 25,
@@ -224,25 +205,51 @@ class TestAppEndpoints:
                 "type": "multiple_choice",
                 "correct_answer": 1
             }]
-        }]
+        }])
         
         quiz_submission = {
             "quiz_id": "quiz_1",
             "answers": {"1": 1}  # Correct answer
         }
         
-        with patch('app.save_user_data') as mock_save:
-            mock_save.return_value = True
-            
+        from core.review_queue import review_queue
+        with patch('app.content_catalog', catalog), patch.object(review_queue, 'store', app_user_store):
             response = authenticated_client.post('/api/submit_quiz',
                                                data=json.dumps(quiz_submission),
                                                content_type='application/json')
-            
-            assert response.status_code == 200
-            data = json.loads(response.data)
-            assert data["success"] is True
-            assert data["score"] == 100.0  # 100% correct
-            assert data["points_earned"] == 25
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data["success"] is True
+        assert data["score"] == 100.0  # 100% correct
+        assert data["points_earned"] == 25
+        user = app_user_store.get_user("test@example.com")
+        assert user["points"] == 125
+        # The attempt goes through the write-behind counters
+        import app as flask_app
+        profile = flask_app.load_user_profile("test@example.com")
+        assert profile["quizzes_taken"] == 1
+        assert profile["average_quiz_score"] == 100.0
+        # The result schedules the quiz's next spaced repetition review
+        assert user["spaced_repetition"]["quiz_1"]["reviews"] == 1
+        assert user["spaced_repetition"]["quiz_1"]["last_performance"] == 1.0
+
+    def test_dashboard_stats_use_catalog(self, app_user_store, authenticated_client, temp_dir):
+        """Test dashboard totals come from the content catalog"""
+        app_user_store.save_user("test@example.com", {"name": "Test User", "completed_quizzes": ["quiz_1"]})
+        catalog = ContentCatalog(data_dir=temp_dir)
+        catalog.register_builtin(
+            lessons=lambda: [{"id": "lesson_1", "category": "basics"}],
+            quizzes=lambda: [{"id": "quiz_1", "category": "basics"}, {"id": "quiz_2"}],
+            challenges=lambda: []
+        )
+
+        with patch('app.content_catalog', catalog):
+            data = json.loads(authenticated_client.get('/api/dashboard_stats').data)
+
+        assert data["totals"]["lessons"] == 1
+        assert data["totals"]["quizzes"] == 2
+        assert data["quiz_categories"]["basics"] == {"total": 1, "completed": 1}
 
 class TestRateLimiting:
     """Test rate limiting functionality"""
@@ -305,26 +312,22 @@ class TestErrorHandling:
         # Should handle gracefully
         assert response.status_code in [400, 415]
     
-    @patch('app.load_user_data')
-    def test_database_error_handling(self, mock_load, client):
+    def test_database_error_handling(self, client):
         """Test handling of database errors"""
-        mock_load.side_effect = Exception("Database error")
+        mock_store = Mock()
+        mock_store.get_user.side_effect = Exception("Database error")
+        
+        with patch('app.user_store', mock_store):
+            response = client.get('/dashboard')
         
-        response = client.get('/dashboard')
         # Should redirect to login or show error page
         assert response.status_code in [302, 500]
 
 class TestDataFlow:
     """Test data flow between components"""
     
-    @patch('app.save_user_data')
-    @patch('app.load_user_data')
-    def test_user_registration_to_login_flow(self, mock_load, mock_save, client):
+    def test_user_registration_to_login_flow(self, app_user_store, client):
         """Test complete user registration to login flow"""
-        # Start with no users
-        mock_load.return_value = {}
-        mock_save.return_value = True
-        
         # Register user
         registration_data = {
             "name": "Test User",
@@ -338,15 +341,7 @@ class TestDataFlow:
                              data=json.dumps(registration_data),
                              content_type='application/json')
         assert response.status_code == 200
-        
-        # Mock that user now exists
-        mock_load.return_value = {
-            "test@example.com": {
-                "name": "Test User",
-                "password": "password123",
-                "email": "test@example.com"
-            }
-        }
+        assert app_user_store.user_exists("test@example.com")
         
         # Login with same credentials
         login_data = {
@@ -361,3 +356,235 @@ class TestDataFlow:
         
         data = json.loads(response.data)
         assert data["success"] is True
+
+class TestCodeExecution:
+    """Test sandboxed code execution endpoints"""
+
+    def test_execute_code(self, app_user_store, authenticated_client):
+        """Test code runs in the sandbox and returns real output"""
+        import app as flask_app
+        app_user_store.save_user("test@example.com", {"name": "Test User"})
+
+        response = authenticated_client.post('/api/execute_code',
+                                           data=json.dumps({"code": "print(sum(range(5)))"}),
+                                           content_type='application/json')
+
+        data = json.loads(response.data)
+        assert data["success"] is True
+        assert data["output"] == "10\n"
+
+        # Usage counters are written behind; pending counts are visible to reads
+        assert flask_app.load_user_profile("test@example.com")["playground_uses"] == 1
+        flask_app.counters.flush()
+        assert app_user_store.get_user("test@example.com")["playground_uses"] == 1
+
+    def test_execute_code_security_violation(self, app_user_store, authenticated_client):
+        """Test unsafe code is rejected before execution"""
+        response = authenticated_client.post('/api/execute_code',
+                                           data=json.dumps({"code": "import os"}),
+                                           content_type='application/json')
+
+        assert response.status_code == 400
+        assert "Security violation" in json.loads(response.data)["error"]
+
+    def test_run_tests(self, authenticated_client):
+        """Test submitted functions are graded against real results"""
+        payload = {
+            "code": "def is_even(n):\n    return n % 2 == 0",
+            "test_cases": [
+                {"input": 4, "expected": True},
+                {"input": 7, "expected": True}
+            ]
+        }
+
+        response = authenticated_client.post('/api/run_tests',
+                                           data=json.dumps(payload),
+                                           content_type='application/json')
+
+        data = json.loads(response.data)
+        assert [result["passed"] for result in data["test_results"]] == [True, False]
+        assert data["grade"]["passed_tests"] == 1
+
+    def test_submit_challenge_graded_in_sandbox(self, app_user_store, authenticated_client):
+        """Test challenge submissions are graded by running the code"""
+        app_user_store.save_user("test@example.com", {"name": "Test User", "points": 0})
+
+        def submit(code):
+            response = authenticated_client.post('/api/submit_challenge',
+                                               data=json.dumps({"challenge_id": "challenge_1", "code": code}),
+                                               content_type='application/json')
+            return json.loads(response.data)
+
+        wrong = submit("def factorial(n):\n    return 120")
+        assert wrong["success"] is False
+        assert wrong["passed_tests"] == 1
+
+        right = submit("def factorial(n):\n    return 1 if n < 2 else n * factorial(n - 1)")
+        assert right["success"] is True
+        assert right["points_earned"] == 10
+
+class TestPrecomputedAnalytics:
+    """Test analytics served from background jobs"""
+
+    def test_analytics_precomputed_and_staleness_reported(self, app_user_store, authenticated_client, temp_dir):
+        """Test analytics come from the job queue and report when they lag the profile"""
+        import app as flask_app
+        from core.job_queue import JobQueue
+
+        queue = JobQueue(db_path=os.path.join(temp_dir, "jobs.db"), workers=0)
+        queue.register('analytics', flask_app.compute_user_analytics)
+        app_user_store.save_user("test@example.com", {"completed_lesson_ids": ["lesson_1"], "points": 10})
+
+        with patch('app.job_queue', queue):
+            response = authenticated_client.get('/api/analytics')
+            assert response.status_code == 202
+            assert json.loads(response.data)["pending"] is True
+
+            queue.run_pending()
+            data = json.loads(authenticated_client.get('/api/analytics').data)
+            assert data["success"] is True
+            assert data["stale"] is False
+            assert data["analytics"]["total_points"] == 10
+
+            app_user_store.update_user("test@example.com",
+                                       lambda user: user["completed_lesson_ids"].append("lesson_2"))
+            data = json.loads(authenticated_client.get('/api/analytics').data)
+            assert data["stale"] is True
+            assert data["job"]["status"] == "queued"
+
+    def test_admin_analytics_cover_every_stored_user(self, app_user_store, client):
+        """Test admin analytics include users this process never analyzed"""
+        import app as flask_app
+        if flask_app.analytics_engine is None:
+            pytest.skip("numpy not installed")
+
+        app_user_store.save_user("a@example.com", {"completed_lesson_ids": ["lesson_1"], "points": 10})
+        app_user_store.save_user("b@example.com", {"completed_lesson_ids": ["lesson_1", "lesson_2"]})
+        with client.session_transaction() as sess:
+            sess['user'] = "admin@example.com"
+
+        data = json.loads(client.get('/api/admin/analytics').data)
+
+        assert data["success"] is True
+        assert sorted(data["profiles"]["users"]) == ["a@example.com", "b@example.com"]
+        assert data["performance"]["users"]["b@example.com"]["items"] == 2
+
+class TestPageCaching:
+    """Test cached page renders and conditional requests"""
+
+    def test_etag_revalidation(self, app_user_store, authenticated_client):
+        """Test repeat views get 304 until the user state shown on the page changes"""
+        app_user_store.save_user("test@example.com", {"name": "Test User", "completed_lessons": []})
+
+        first = authenticated_client.get('/lessons')
+        etag = first.headers['ETag']
+        repeat = authenticated_client.get('/lessons', headers={'If-None-Match': etag})
+        since = authenticated_client.get('/lessons', headers={'If-Modified-Since': first.headers['Last-Modified']})
+
+        assert first.status_code == 200
+        assert first.headers['Last-Modified']
+        assert repeat.status_code == 304
+        assert repeat.data == b''
+        assert since.status_code == 304
+
+        lesson_id = next(lesson['id'] for lesson in __import__('app').content_catalog.lessons())
+        app_user_store.save_user("test@example.com", {"name": "Test User", "completed_lessons": [lesson_id]})
+        changed = authenticated_client.get('/lessons', headers={'If-None-Match': etag})
+        since = authenticated_client.get('/lessons', headers={'If-Modified-Since': first.headers['Last-Modified']})
+
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+        assert since.status_code == 200
+        assert b'1 of' in changed.data
+
+class TestRealtimeCollaboration:
+    """Test live coding over Socket.IO"""
+
+    def test_operations_acknowledged_and_broadcast(self, app):
+        """Test edits are acknowledged to the sender and relayed to the room"""
+        import app as flask_app
+        if not flask_app.HAS_SOCKETIO:
+            pytest.skip("flask-socketio not installed")
+
+        session_id = flask_app.collaboration_hub.create_coding_session("test@example.com")
+        flask_app.collaboration_hub.join_session(session_id, "other@example.com")
+        clients = {}
+        for email in ("test@example.com", "other@example.com"):
+            clients[email] = app.test_client()
+            with clients[email].session_transaction() as sess:
+                sess['user'] = email
+
+        assert not flask_app.socketio.test_client(app).is_connected()
+        author = flask_app.socketio.test_client(app, flask_test_client=clients["test@example.com"])
+        other = flask_app.socketio.test_client(app, flask_test_client=clients["other@example.com"])
+        state = author.emit('collab_join', {"session_id": session_id}, callback=True)
+        other.emit('collab_join', {"session_id": session_id}, callback=True)
+        other.get_received()
+
+        ack = author.emit('collab_op', {"session_id": session_id, "revision": state["revision"],
+                                        "operation": ["# hello\n"]}, callback=True)
+        stale = other.emit('collab_op', {"session_id": session_id, "revision": -5,
+                                         "operation": ["x"]}, callback=True)
+
+        assert ack == {"success": True, "revision": state["revision"] + 1}
+        assert stale["resync"] is True
+        relayed = [event for event in other.get_received() if event["name"] == "collab_op"]
+        assert relayed[0]["args"][0]["operation"] == ["# hello\n"]
+        assert not [event for event in author.get_received() if event["name"] == "collab_op"]
+        assert flask_app.collaboration_hub.get_session_data(session_id)["code"].startswith("# hello\n")
+
+    def test_session_created_joined_and_edited(self, app):
+        """Test a session made over HTTP can be joined from two clients and edited"""
+        import app as flask_app
+        if not flask_app.HAS_SOCKETIO:
+            pytest.skip("flask-socketio not installed")
+
+        clients = {}
+        for email in ("host@example.com", "guest@example.com"):
+            clients[email] = app.test_client()
+            with clients[email].session_transaction() as sess:
+                sess['user'] = email
+
+        created = clients["host@example.com"].post('/api/collab/sessions', json={"skill_level": "expert"}).get_json()
+        matched = clients["guest@example.com"].post('/api/collab/match', json={"skill_level": "expert"}).get_json()
+        page = clients["guest@example.com"].get(matched["url"])
+
+        assert created["success"] and matched["matched"]
+        assert matched["session_id"] == created["session_id"]
+        assert b'js/collab.js' in page.data
+
+        session_id = created["session_id"]
+        host = flask_app.socketio.test_client(app, flask_test_client=clients["host@example.com"])
+        guest = flask_app.socketio.test_client(app, flask_test_client=clients["guest@example.com"])
+        state = host.emit('collab_join', {"session_id": session_id}, callback=True)
+        assert guest.emit('collab_join', {"session_id": session_id}, callback=True)["success"]
+        guest.get_received()
+
+        ack = host.emit('collab_op', {"session_id": session_id, "revision": state["revision"],
+                                      "operation": ["x = 1\n"]}, callback=True)
+
+        assert ack["success"]
+        relayed = [event for event in guest.get_received() if event["name"] == "collab_op"]
+        assert relayed[0]["args"][0]["operation"] == ["x = 1\n"]
+        assert flask_app.collaboration_hub.get_session_data(session_id)["code"].startswith("x = 1\n")
+
+    def test_expired_session_is_closed(self, app):
+        """Test an expired session's page redirects and its room can no longer be joined"""
+        import time
+        import app as flask_app
+        from collaboration_system import SESSION_IDLE_TIMEOUT
+        if not flask_app.HAS_SOCKETIO:
+            pytest.skip("flask-socketio not installed")
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user'] = "host@example.com"
+        created = client.post('/api/collab/sessions', json={}).get_json()
+        flask_app.collaboration_hub.expire_idle(time.monotonic() + SESSION_IDLE_TIMEOUT + 5)
+
+        page = client.get(created["url"])
+        host = flask_app.socketio.test_client(app, flask_test_client=client)
+        joined = host.emit('collab_join', {"session_id": created["session_id"]}, callback=True)
+
+        assert page.status_code == 302
+        assert joined["success"] is False
@@ -0,0 +1,119 @@
+"""
+Unit tests for the columnar analytics engine
+"""
+
+import pytest
+import random
+from datetime import datetime, timedelta
+
+from core.adaptive_learning import LearningAnalytics, UserPerformance
+from core.analytics_engine import HAS_NUMPY, AnalyticsEngine
+
+pytestmark = pytest.mark.skipif(not HAS_NUMPY, reason="the analytics engine needs numpy")
+
+def performances(seed, count):
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [
+        UserPerformance(item_id=f"{rng.choice(['loops', 'lists', 'funcs', 'oop'])}_{n}",
+                        attempts=rng.randint(1, 4), success_rate=rng.random(), average_time=30.0,
+                        last_attempt=now - timedelta(days=rng.randint(0, 60), hours=rng.randint(0, 23)),
+                        mastery_level=rng.random())
+        for n in range(count)
+    ]
+
+@pytest.fixture
+def engine():
+    """Isolated engine"""
+    return AnalyticsEngine()
+
+class TestUserAnalytics:
+    """Per-user analytics"""
+
+    @pytest.mark.parametrize("seed,count", [(1, 1), (2, 2), (3, 4), (4, 12), (5, 40)])
+    def test_matches_pure_python_analytics(self, engine, seed, count):
+        """Test the vectorized path gives the same analytics as the list-based one"""
+        records = performances(seed, count)
+        expected = LearningAnalytics(engine=None).generate_user_analytics("user", records)
+        actual = LearningAnalytics(engine=engine).generate_user_analytics("user", records)
+
+        for key in ("strengths", "weaknesses", "retention", "recommendations"):
+            assert actual[key] == expected[key]
+        assert actual["trends"]["trend"] == expected["trends"]["trend"]
+        for key, value in expected["trends"].items():
+            if key != "trend":
+                assert actual["trends"][key] == pytest.approx(value)
+        assert actual["learning_velocity"] == pytest.approx(expected["learning_velocity"])
+
+    def test_record_replaces_item(self, engine):
+        """Test recording an item again updates its row instead of adding one"""
+        first, second = performances(6, 2)
+        engine.record("user", first)
+        engine.record("user", second)
+        first.mastery_level = 0.1
+        engine.record("user", first)
+
+        assert engine.stats()["records"] == 2
+        assert engine.user_analytics("user")["learning_velocity"]["mastery_rate"] == \
+            pytest.approx((0.1 + second.mastery_level) / 2)
+
+    def test_retention_curve_buckets(self, engine):
+        """Test mastery is averaged by days since the last attempt"""
+        now = datetime.now()
+        engine.load("user", [
+            UserPerformance("a_1", 1, 1.0, 10.0, now, 1.0),
+            UserPerformance("a_2", 1, 1.0, 10.0, now - timedelta(days=3), 0.6),
+            UserPerformance("a_3", 1, 1.0, 10.0, now - timedelta(days=5), 0.4),
+        ])
+
+        curve = engine.user_analytics("user")["retention_curve"]
+
+        assert [bucket["items"] for bucket in curve] == [1, 2, 0, 0, 0]
+        assert curve[1]["mean_mastery"] == pytest.approx(0.5)
+        assert curve[2]["mean_mastery"] is None
+
+class TestBatchAnalytics:
+    """Analytics for all users at once"""
+
+    def test_batch_matches_per_user(self, engine):
+        """Test the one-pass batch agrees with per-user analytics"""
+        for seed in range(20):
+            engine.load(f"user{seed}", performances(seed, 1 + seed * 2))
+
+        batch = engine.batch_analytics()
+
+        assert len(batch["users"]) == 20
+        for seed in range(20):
+            single = engine.user_analytics(f"user{seed}")
+            summary = batch["users"][f"user{seed}"]
+            assert summary["mastery_rate"] == pytest.approx(single["learning_velocity"]["mastery_rate"])
+            assert summary["items_per_day"] == pytest.approx(single["learning_velocity"]["items_per_day"])
+            assert summary["trend"] == single["trends"]["trend"]
+            assert summary["retention_rate"] == pytest.approx(single["retention"]["retention_rate"])
+        assert batch["cohort"]["mastery_rate"]["p25"] <= batch["cohort"]["mastery_rate"]["p75"]
+
+    def test_percentile_ranks(self, engine):
+        """Test users are ranked within the cohort"""
+        now = datetime.now()
+        for n, mastery in enumerate([0.2, 0.4, 0.6, 0.8]):
+            engine.load(f"user{n}", [UserPerformance("a_1", 1, 1.0, 10.0, now - timedelta(days=2), mastery),
+                                     UserPerformance("a_2", 1, 1.0, 10.0, now, mastery)])
+
+        batch = engine.batch_analytics()
+
+        assert [batch["users"][f"user{n}"]["mastery_rate_percentile"] for n in range(4)] == [25.0, 50.0, 75.0, 100.0]
+        assert engine.user_analytics("user3")["cohort"]["mastery_rate_percentile"] == 100.0
+
+    def test_profile_metrics(self, engine):
+        """Test engagement and skill progression computed for many profiles"""
+        metrics = engine.profile_metrics({
+            "a@example.com": {"streak": 3, "lessons_completed": 4, "quizzes_completed": 1,
+                              "completed_lesson_ids": ["lesson_1", "lesson_2", "lesson_6"]},
+            "b@example.com": {"challenges_completed": 100},
+        })
+
+        a = metrics["users"]["a@example.com"]
+        assert a["engagement_score"] == 6.0
+        assert a["skill_progression"]["basics"] == 40.0
+        assert a["skill_progression"]["data_structures"] == 20.0
+        assert metrics["users"]["b@example.com"]["engagement_score"] == 100.0
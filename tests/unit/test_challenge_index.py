@@ -0,0 +1,74 @@
+"""
+Unit tests for the challenge file index
+"""
+
+import json
+import os
+
+from core.challenge_index import ChallengeIndex
+from core.challenge_system import ChallengeSystem
+
+def write_challenge(root, difficulty, category, challenge_id, **fields):
+    folder = os.path.join(root, difficulty, category)
+    os.makedirs(folder, exist_ok=True)
+    challenge = {"id": challenge_id, "title": challenge_id.title(), "difficulty": difficulty,
+                 "category": category, "description": "d", "points": 10, **fields}
+    with open(os.path.join(folder, f"{challenge_id}.json"), 'w') as f:
+        json.dump(challenge, f)
+    return challenge
+
+class TestChallengeIndex:
+    """Lookups, polling and persistence"""
+
+    def test_lookup_and_filtering(self, temp_dir):
+        """Test challenges load by id and list by folder without reading challenge files"""
+        write_challenge(temp_dir, "easy", "math", "sum", points=5)
+        write_challenge(temp_dir, "hard", "strings", "parse", description="x" * 150)
+        index = ChallengeIndex(temp_dir)
+
+        assert index.load("parse")["category"] == "strings"
+        assert index.load("missing") is None
+        assert [item["id"] for item in index.summaries(difficulty="easy")] == ["sum"]
+        assert index.summaries(category="strings")[0]["description"] == "x" * 100 + "..."
+        assert index.stats()["files_parsed"] == 2
+
+    def test_polling_picks_up_changes(self, clock, temp_dir):
+        """Test added, edited and removed files show up after the poll interval"""
+        write_challenge(temp_dir, "easy", "math", "sum")
+        index = ChallengeIndex(temp_dir, poll_interval=5, clock=clock)
+        assert "sum" in index
+
+        write_challenge(temp_dir, "easy", "math", "product")
+        path = os.path.join(temp_dir, "easy", "math", "sum.json")
+        write_challenge(temp_dir, "easy", "math", "sum", title="Renamed", points=99)
+        os.utime(path, ns=(1, 1))
+        assert "product" not in index
+
+        clock.now += 5
+        assert "product" in index
+        assert {item["title"] for item in index.summaries()} == {"Product", "Renamed"}
+
+        os.remove(path)
+        assert index.load("sum") is None
+        assert "sum" not in index
+
+    def test_persisted_index(self, temp_dir):
+        """Test a new index reuses the saved one and re-parses only changed files"""
+        for number in range(5):
+            write_challenge(temp_dir, "medium", "lists", f"c{number}")
+        ChallengeIndex(temp_dir).refresh()
+
+        write_challenge(temp_dir, "medium", "lists", "c5")
+        index = ChallengeIndex(temp_dir)
+
+        assert len(index.summaries()) == 6
+        assert index.stats()["files_parsed"] == 1
+
+    def test_challenge_system_uses_index(self, temp_dir):
+        """Test ChallengeSystem loads and lists sample challenges through the index"""
+        challenges = ChallengeSystem(challenges_dir=temp_dir)
+
+        assert challenges.load_challenge("medium_001")["function_name"] == "is_palindrome"
+        assert challenges.current_challenge["id"] == "medium_001"
+        assert [item["id"] for item in challenges.get_available_challenges(category="basics")] == \
+            ["easy_001", "easy_003"]
@@ -0,0 +1,164 @@
+"""
+Unit tests for collaborative code sync
+"""
+
+import pytest
+import random
+
+from core.collab_sync import (CollabDocument, Rope, OperationError, StaleRevisionError,
+                              transform, transform_index, validate)
+from collaboration_system import CollaborationHub
+
+def apply(text, op):
+    parts, position = [], 0
+    for component in op:
+        if isinstance(component, str):
+            parts.append(component)
+        elif component > 0:
+            parts.append(text[position:position + component])
+            position += component
+        else:
+            position -= component
+    return "".join(parts) + text[position:]
+
+def random_op(rng, text):
+    op, position = [], 0
+    while position < len(text) and rng.random() < 0.7:
+        step = rng.randint(1, max(1, (len(text) - position) // 2))
+        choice = rng.random()
+        if choice < 0.4:
+            op.append(step)
+            position += step
+        elif choice < 0.7:
+            op.append(-step)
+            position += step
+        else:
+            op.append("".join(rng.choice("abc\n") for _ in range(rng.randint(1, 4))))
+    if rng.random() < 0.5:
+        op.append("xyz")
+    return validate(op)
+
+class TestOperations:
+    """Transform and cursor mapping"""
+
+    def test_transform_converges(self):
+        """Test concurrent operations give the same text in either order"""
+        rng = random.Random(7)
+        for _ in range(500):
+            text = "".join(rng.choice("abcdef\n") for _ in range(rng.randint(0, 30)))
+            a, b = random_op(rng, text), random_op(rng, text)
+            a_prime, b_prime = transform(a, b)
+            assert apply(apply(text, a), b_prime) == apply(apply(text, b), a_prime)
+
+    def test_same_position_inserts_ordered(self):
+        """Test the first operation's insert goes first"""
+        a_prime, b_prime = transform([2, "A"], [2, "B"])
+
+        assert apply(apply("xy", [2, "A"]), b_prime) == "xyAB"
+
+    def test_transform_index(self):
+        """Test cursors move with inserts and deletes before them"""
+        assert transform_index([2, "abc"], 5) == 8
+        assert transform_index([2, -2], 5) == 3
+        assert transform_index([6, "abc"], 5) == 5
+
+    def test_invalid_operations(self):
+        """Test malformed components are rejected"""
+        with pytest.raises(OperationError):
+            validate([1, None])
+        with pytest.raises(OperationError):
+            validate("insert")
+
+class TestRope:
+    """Chunked text storage"""
+
+    def test_matches_string_edits(self):
+        """Test random inserts and deletes agree with plain string edits"""
+        rng = random.Random(3)
+        text = "".join(rng.choice("abcdefgh") for _ in range(3000))
+        rope = Rope(text)
+        for _ in range(2000):
+            position = rng.randint(0, len(text))
+            if rng.random() < 0.5 or not text:
+                inserted = "x" * rng.randint(1, 700)
+                rope.insert(position, inserted)
+                text = text[:position] + inserted + text[position:]
+            else:
+                count = rng.randint(0, min(900, len(text) - position))
+                rope.delete(position, count)
+                text = text[:position] + text[position + count:]
+            assert len(rope) == len(text)
+        assert str(rope) == text
+
+class TestCollabDocument:
+    """Revisions, history and joins"""
+
+    def test_late_operation_transformed(self):
+        """Test an edit made against an old revision lands where the author meant"""
+        document = CollabDocument("print(x)")
+        document.receive("a", 0, [6, "y, "])
+        revision, applied = document.receive("b", 0, [7, ", z"])
+
+        assert revision == 2
+        assert applied == [10, ", z"]
+        assert document.text() == "print(y, x, z)"
+
+    def test_cursor_follows_edits(self):
+        """Test stored cursors move with edits, including ones from older revisions"""
+        document = CollabDocument("abcdef")
+        document.receive("a", 0, ["12"])
+        document.set_cursor("b", 0, 4)
+
+        assert document.cursors["b"]["position"] == 6
+        document.receive("a", 1, [-2])
+        assert document.cursors["b"]["position"] == 4
+
+    def test_sync_snapshot_plus_tail(self):
+        """Test joiners get a snapshot and the operations after it, or just what they missed"""
+        document = CollabDocument("", snapshot_every=3)
+        for n in range(5):
+            document.receive("a", n, [n, str(n)])
+
+        state = document.sync()
+        text = state["snapshot"]
+        for op in state["ops"]:
+            text = apply(text, op)
+        assert text == "01234"
+        assert len(state["ops"]) < 3
+
+        missed = document.sync(since_revision=3)
+        assert "snapshot" not in missed
+        assert missed["ops"] == [[3, "3"], [4, "4"]]
+
+    def test_stale_revision(self):
+        """Test operations older than the kept history ask for a resync"""
+        document = CollabDocument("", history_limit=2)
+        for n in range(3):
+            document.receive("a", n, [n, "x"])
+
+        with pytest.raises(StaleRevisionError):
+            document.receive("b", 0, ["y"])
+        assert "snapshot" in document.sync(since_revision=0)
+
+class TestCollaborationHub:
+    """Sessions backed by collaborative documents"""
+
+    def test_operations_and_cursor_batches(self):
+        """Test edits, whole-text updates and batched cursors through the hub"""
+        hub = CollaborationHub()
+        session_id = hub.create_coding_session("a")
+        hub.join_session(session_id, "b")
+        start = hub.get_session_data(session_id)["code"]
+
+        applied = hub.apply_operation(session_id, "b", 0, ["# hi\n"])
+        hub.update_code(session_id, "a", hub.get_session_data(session_id)["code"] + "\n# end", cursor_pos=3)
+        hub.update_cursor(session_id, "b", 2, 1)
+        hub.update_cursor(session_id, "b", 2, 2)
+
+        assert applied["revision"] == 1
+        assert hub.apply_operation(session_id, "stranger", 0, ["x"]) is None
+        assert hub.get_session_data(session_id)["code"] == "# hi\n" + start + "\n# end"
+        batches = hub.pending_cursor_batches()
+        assert batches[session_id]["cursors"]["b"]["position"] == 2
+        assert set(batches[session_id]["cursors"]) == {"a", "b"}
+        assert hub.pending_cursor_batches() == {}
@@ -0,0 +1,114 @@
+"""
+Unit tests for the content catalog
+"""
+
+import pytest
+import json
+import os
+
+from core.content_catalog import ContentCatalog, FrozenDict
+
+@pytest.fixture
+def catalog(temp_dir):
+    """Catalog over a small built-in curriculum and a temp data directory"""
+    catalog = ContentCatalog(data_dir=temp_dir)
+    catalog.register_builtin(
+        lessons=lambda: [{"id": f"lesson_{n}", "title": f"Lesson {n}", "objectives": ["learn"]} for n in range(1, 4)],
+        lesson_content=lambda lesson_id: {"introduction": f"About {lesson_id}", "concepts": []},
+        quizzes=lambda: [{"id": "quiz_1", "title": "Quiz", "questions_data": [{"id": 1}]}],
+        challenges=lambda: [{"id": "challenge_1", "title": "Challenge"}]
+    )
+    return catalog
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+class TestContentCatalog:
+    """Content catalog behaviour"""
+
+    def test_lookup_by_id(self, catalog):
+        """Test O(1) lookups return the registered content"""
+        assert catalog.get_lesson("lesson_2")["title"] == "Lesson 2"
+        assert catalog.get_quiz("quiz_1")["title"] == "Quiz"
+        assert catalog.get_challenge("challenge_1")["title"] == "Challenge"
+        assert catalog.get_lesson("missing") is None
+        assert catalog.lesson_content("lesson_1")["introduction"] == "About lesson_1"
+
+    def test_lesson_links(self, catalog):
+        """Test next/prev links are precomputed in curriculum order"""
+        assert catalog.next_lesson_id("lesson_1") == "lesson_2"
+        assert catalog.prev_lesson_id("lesson_2") == "lesson_1"
+        assert catalog.prev_lesson_id("lesson_1") is None
+        assert catalog.next_lesson_id("lesson_3") is None
+
+    def test_content_is_frozen(self, catalog):
+        """Test shared objects cannot be modified, but copies can"""
+        lesson = catalog.get_lesson("lesson_1")
+
+        assert isinstance(lesson, FrozenDict)
+        with pytest.raises(TypeError):
+            lesson["content"] = {}
+        assert isinstance(lesson["objectives"], tuple)
+
+        copy = dict(lesson, content="x")
+        assert copy["content"] == "x"
+        assert json.loads(json.dumps(lesson))["objectives"] == ["learn"]
+
+    def test_builtin_sources_called_once(self, temp_dir):
+        """Test the curriculum is built once, not per lookup"""
+        calls = []
+
+        def lessons():
+            calls.append(1)
+            return [{"id": "lesson_1"}]
+
+        catalog = ContentCatalog(data_dir=temp_dir)
+        catalog.register_builtin(lessons=lessons)
+        for _ in range(5):
+            catalog.get_lesson("lesson_1")
+
+        assert len(calls) == 1
+
+    def test_data_directory_content(self, catalog, temp_dir):
+        """Test lessons, quizzes and challenges are loaded from the data directories"""
+        write_json(os.path.join(temp_dir, "lessons", "lesson_index.json"), {
+            "beginner": {"lessons": [{"id": "day_01", "title": "Day 1"}, {"id": "day_02", "title": "Day 2"}]}
+        })
+        write_json(os.path.join(temp_dir, "lessons", "beginner", "day_01.json"), {
+            "lesson_id": "day_01", "content": {"introduction": "Hello", "concepts": []}
+        })
+        write_json(os.path.join(temp_dir, "quizzes", "basics.json"), {
+            "title": "Basics", "questions": [{"id": "q1"}, {"id": "q2"}]
+        })
+        write_json(os.path.join(temp_dir, "challenges", "easy", "math", "easy_002.json"), {
+            "id": "easy_002", "title": "Sum", "function_name": "add", "parameters": ["a: int", "b: int"],
+            "test_cases": [{"input": [1, 2], "expected": 3}]
+        })
+
+        catalog.reload()
+
+        assert catalog.lesson_content("day_01")["introduction"] == "Hello"
+        assert catalog.next_lesson_id("day_01") == "day_02"
+        assert catalog.next_lesson_id("lesson_3") is None
+        assert catalog.get_quiz("basics")["questions"] == 2
+        content = catalog.challenge_content("easy_002")
+        assert content["starter_code"].startswith("def add(a, b):")
+        assert content["test_cases"][0]["args"] == (1, 2)
+
+    def test_reload_picks_up_admin_edits(self, catalog, temp_dir):
+        """Test custom lessons saved by admins override and extend the curriculum"""
+        assert catalog.get_lesson("lesson_2")["title"] == "Lesson 2"
+        write_json(os.path.join(temp_dir, "custom_lessons.json"), {
+            "lesson_2": {"title": "Edited", "content": "New text"},
+            "lesson_9": {"title": "Added"}
+        })
+
+        assert catalog.get_lesson("lesson_2")["title"] == "Lesson 2"  # built before the edit
+        catalog.reload()
+
+        assert catalog.get_lesson("lesson_2")["title"] == "Edited"
+        assert catalog.get_lesson("lesson_2")["objectives"] == ("learn",)
+        assert catalog.lesson_content("lesson_2")["introduction"] == "New text"
+        assert catalog.next_lesson_id("lesson_3") == "lesson_9"
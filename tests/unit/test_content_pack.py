@@ -0,0 +1,102 @@
+"""
+Unit tests for the memory-mapped content pack
+"""
+
+import json
+import os
+import pytest
+
+from core.content_pack import ContentPack, ContentPackError, PackedContent, build_pack
+from core.content_catalog import ContentCatalog
+from core.quiz_engine import QuizEngine
+
+def write_json(root, relative, document):
+    path = os.path.join(root, *relative.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f)
+    return path
+
+@pytest.fixture
+def data_dir(temp_dir):
+    """Data directory with a few content files"""
+    write_json(temp_dir, "lessons/lesson_index.json",
+               {"beginner": {"lessons": [{"id": "day_01", "title": "Intro"}]}})
+    write_json(temp_dir, "lessons/beginner/day_01.json", {"title": "Intro", "content": {"introduction": "Hi"}})
+    write_json(temp_dir, "quizzes/basics.json", {"title": "Basics", "questions": [{"id": "q1"}, {"id": "q2"}]})
+    write_json(temp_dir, "challenges/easy/math/sum.json", {"id": "sum", "title": "Sum", "function_name": "add"})
+    write_json(temp_dir, "challenges/.index.json", {"format": 1})
+    write_json(temp_dir, "users.json", {"a@x.com": {}})
+    return temp_dir
+
+class TestContentPack:
+    """Building and reading packs"""
+
+    def test_round_trip(self, data_dir):
+        """Test packed records decode to the file contents, with sorted key and glob lookups"""
+        result = build_pack(data_dir)
+        pack = ContentPack(result["path"])
+
+        assert result["records"] == 4
+        assert pack.get("quizzes/basics.json")["questions"] == [{"id": "q1"}, {"id": "q2"}]
+        assert pack.get("quizzes/missing.json") is None
+        assert "users.json" not in pack
+        assert list(pack.keys("lessons/")) == ["lessons/beginner/day_01.json", "lessons/lesson_index.json"]
+        assert pack.glob("challenges/*/*/*.json") == ["challenges/easy/math/sum.json"]
+        assert pack.glob("*/*.json") == ["lessons/lesson_index.json", "quizzes/basics.json"]
+        assert pack.get("quizzes/basics.json") is not pack.get("quizzes/basics.json")
+
+    def test_corruption_detected(self, data_dir):
+        """Test damaged records and foreign files are rejected"""
+        path = build_pack(data_dir)["path"]
+        with open(path, 'r+b') as f:
+            f.seek(40)
+            byte = f.read(1)
+            f.seek(40)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+        pack = ContentPack(path)
+        with pytest.raises(ContentPackError):
+            [pack.get(key) for key in pack.keys()]
+        with pytest.raises(ContentPackError):
+            ContentPack(os.path.join(data_dir, "users.json"))
+
+class TestPackedContent:
+    """Readers going through the pack"""
+
+    def test_pack_replaces_files(self, data_dir):
+        """Test packed sections are read from the pack once built, other files from disk"""
+        content = PackedContent(data_dir)
+        quiz = os.path.join(data_dir, "quizzes", "basics.json")
+        assert content.pack is None
+        assert content.read_json(quiz)["title"] == "Basics"
+
+        build_pack(data_dir)
+        os.remove(quiz)
+        assert content.refresh()
+
+        assert content.read_json(quiz)["title"] == "Basics"
+        assert content.exists(quiz)
+        assert content.glob(os.path.join(data_dir, "quizzes", "*.json")) == [quiz]
+        assert content.read_json(os.path.join(data_dir, "users.json")) == {"a@x.com": {}}
+        with pytest.raises(FileNotFoundError):
+            content.read_json(os.path.join(data_dir, "quizzes", "missing.json"))
+        assert not content.refresh()
+
+    def test_catalog_and_quiz_engine(self, data_dir):
+        """Test the catalog and quiz engine read content from the pack"""
+        build_pack(data_dir)
+        for relative in ("lessons/beginner/day_01.json", "challenges/easy/math/sum.json"):
+            os.remove(os.path.join(data_dir, *relative.split('/')))
+
+        catalog = ContentCatalog(data_dir)
+        stats = catalog.reload()
+
+        assert stats["content_pack"]["records"] == 4
+        assert catalog.lesson_content("day_01")["introduction"] == "Hi"
+        assert catalog.get_challenge("sum")["function_name"] == "add"
+        assert catalog.get_quiz("basics")["questions"] == 2
+
+        quizzes = QuizEngine(os.path.join(data_dir, "quizzes"))
+        assert any(quiz["id"] == "basics" and quiz["question_count"] == 2
+                   for quiz in quizzes.get_available_quizzes())
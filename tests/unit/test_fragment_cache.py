@@ -0,0 +1,71 @@
+"""
+Unit tests for rendered fragment caching
+"""
+
+import pytest
+from jinja2 import Environment, DictLoader
+
+from core.fragment_cache import FragmentCache, FragmentCacheExtension, PageValidators
+
+@pytest.fixture
+def environment():
+    """Jinja environment with the cache tag and a settable content version"""
+    environment = Environment(loader=DictLoader({
+        'page': '{% for item in items %}{% cache "item", item %}[{{ item }}:{{ calls.append(item) or "" }}'
+                '{{ suffix }}]{% endcache %}{% endfor %}'
+    }), extensions=[FragmentCacheExtension])
+    environment.version = "v1"
+    environment.fragment_cache_version = lambda: environment.version
+    return environment
+
+class TestFragmentCacheExtension:
+    """Cache tag behaviour"""
+
+    def test_fragments_rendered_once_per_key(self, environment):
+        """Test a fragment is reused for the same key parts and content version"""
+        calls = []
+        template = environment.get_template('page')
+
+        first = template.render(items=[1, 2, 1], calls=calls, suffix="!")
+        second = template.render(items=[2], calls=calls, suffix="?")
+
+        assert first == "[1:!][2:!][1:!]"
+        # Key parts decide reuse; anything left out of them is frozen in the fragment
+        assert second == "[2:!]"
+        assert calls == [1, 2]
+
+    def test_content_version_change(self, environment):
+        """Test a new content version renders fragments afresh"""
+        calls = []
+        template = environment.get_template('page')
+        template.render(items=[1], calls=calls, suffix="")
+        environment.version = "v2"
+
+        template.render(items=[1], calls=calls, suffix="")
+
+        assert calls == [1, 1]
+
+class TestFragmentCache:
+    """LRU storage and validators"""
+
+    def test_bounded_by_bytes(self):
+        """Test least recently used entries are evicted past the size limit"""
+        cache = FragmentCache(max_entries=10, max_bytes=10)
+        cache.put("a", "12345")
+        cache.put("b", "12345")
+        cache.get("a")
+        cache.put("c", "12345")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "12345"
+        assert cache.stats()["evictions"] == 1
+
+    def test_last_modified_moves_forward(self):
+        """Test a changed page always gets a later Last-Modified, even within a second"""
+        validators = PageValidators()
+        first = validators.last_modified("/lessons", "a")
+
+        assert validators.last_modified("/lessons", "a") == first
+        second = validators.last_modified("/lessons", "b")
+        assert second > first
+        assert validators.last_modified("/lessons", "c") > second
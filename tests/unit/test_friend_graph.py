@@ -0,0 +1,67 @@
+"""
+Unit tests for the friendship graph index
+"""
+
+import pytest
+import os
+
+from core.social_learning import SocialLearningManager
+
+@pytest.fixture
+def manager(temp_dir):
+    """Manager with profiles a..e; a-b, a-c, b-d, c-d and c-e are friends"""
+    manager = SocialLearningManager(data_dir=os.path.join(temp_dir, "social"))
+    for user in "abcde":
+        manager.create_user_profile(user, user.upper())
+    for requester, recipient in [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("c", "e")]:
+        manager.send_friend_request(requester, recipient)
+        manager.respond_to_friend_request(manager.friend_graph.find(requester, recipient), True)
+    return manager
+
+class TestFriendGraph:
+    """Relationship lookups and suggestions"""
+
+    def test_friends_and_lookup(self, manager):
+        """Test friend lists and relationship checks from the adjacency index"""
+        assert sorted(profile.user_id for profile in manager.get_friends("c")) == ["a", "d", "e"]
+        assert manager.friend_graph.status("d", "b") == "accepted"
+        assert manager._find_friendship("b", "a")["requester_id"] == "a"
+        assert manager.friend_graph.find("a", "e") is None
+
+    def test_duplicate_request_rejected(self, manager):
+        """Test a request between related users fails in either direction"""
+        assert not manager.send_friend_request("b", "a")
+        assert manager.send_friend_request("e", "a")
+        assert not manager.send_friend_request("a", "e")
+
+    def test_pending_requests_for_recipient_only(self, manager):
+        """Test only the recipient sees a pending request"""
+        manager.send_friend_request("e", "b")
+
+        assert [request["requester"]["user_id"] for request in manager.get_friend_requests("b")] == ["e"]
+        assert manager.get_friend_requests("e") == []
+
+    def test_friends_of_friends(self, manager):
+        """Test suggestions rank by mutual friends and skip existing relationships"""
+        suggestions = manager.suggest_friends("a")
+
+        assert [(s["profile"]["user_id"], s["mutual_friends"]) for s in suggestions] == [("d", 2), ("e", 1)]
+
+        manager.send_friend_request("a", "d")
+        assert [s["profile"]["user_id"] for s in manager.suggest_friends("a")] == ["e"]
+
+    def test_declined_request_removed(self, manager):
+        """Test declining drops the edge so a new request can be sent"""
+        manager.send_friend_request("e", "b")
+        manager.respond_to_friend_request(manager.friend_graph.find("e", "b"), False)
+
+        assert manager.friend_graph.status("b", "e") is None
+        assert manager.send_friend_request("b", "e")
+
+    def test_graph_rebuilt_on_restart(self, manager):
+        """Test the index is rebuilt from the persisted friendships"""
+        manager.store.close()
+        restarted = SocialLearningManager(data_dir=manager.data_dir)
+
+        assert sorted(restarted.friend_graph.friends("d")) == ["b", "c"]
+        assert restarted.get_user_profile("c").social_stats["friends_count"] == 3
@@ -0,0 +1,160 @@
+"""
+Unit tests for the background job queue
+"""
+
+import pytest
+import os
+import threading
+
+from core.job_queue import JobQueue, PrecomputeTrigger, fingerprint
+
+@pytest.fixture
+def queue(temp_dir):
+    """Queue without worker threads; jobs run when the test asks"""
+    return JobQueue(db_path=os.path.join(temp_dir, "jobs.db"), workers=0)
+
+def counting_handler(calls):
+    def handler(key, payload):
+        calls.append(key)
+        return payload.get("version", "v1"), {"key": key, "runs": len(calls)}
+    return handler
+
+class TestJobQueue:
+    """Queueing, running and results"""
+
+    def test_job_result_stored(self, queue):
+        """Test a finished job's result is kept with its version"""
+        calls = []
+        queue.register("report", counting_handler(calls))
+        job_id = queue.enqueue("report", "a@example.com", {"version": "v7"})
+
+        assert queue.run_pending() == 1
+
+        cached = queue.get_result("report", "a@example.com")
+        assert cached["version"] == "v7"
+        assert cached["result"] == {"key": "a@example.com", "runs": 1}
+        assert queue.job_status("report", "a@example.com")["id"] == job_id
+        assert queue.job_status("report", "a@example.com")["status"] == "done"
+
+    def test_queued_jobs_coalesce(self, queue):
+        """Test repeated enqueues for one key run once with the latest payload"""
+        calls = []
+        queue.register("report", counting_handler(calls))
+
+        first = queue.enqueue("report", "a@example.com", {"version": "v1"})
+        second = queue.enqueue("report", "a@example.com", {"version": "v2"})
+        queue.enqueue("report", "b@example.com")
+
+        assert first == second
+        assert queue.run_pending() == 2
+        assert calls == ["a@example.com", "b@example.com"]
+        assert queue.get_result("report", "a@example.com")["version"] == "v2"
+
+    def test_failed_job_retried_then_given_up(self, temp_dir):
+        """Test a failing job is retried up to max_attempts"""
+        queue = JobQueue(db_path=os.path.join(temp_dir, "jobs.db"), workers=0, max_attempts=2)
+        attempts = []
+
+        def failing(key, payload):
+            attempts.append(key)
+            raise RuntimeError("boom")
+
+        queue.register("report", failing)
+        queue.enqueue("report", "a@example.com")
+
+        assert queue.run_pending() == 2
+        status = queue.job_status("report", "a@example.com")
+        assert status["status"] == "failed"
+        assert status["attempts"] == 2
+        assert "boom" in status["error"]
+        assert queue.get_result("report", "a@example.com") is None
+
+    def test_abandoned_job_requeued_after_restart(self, temp_dir):
+        """Test a job left running by a dead process runs again"""
+        path = os.path.join(temp_dir, "jobs.db")
+        crashed = JobQueue(db_path=path, workers=0)
+        crashed.register("report", counting_handler([]))
+        crashed.enqueue("report", "a@example.com")
+        assert crashed._claim() is not None
+
+        restarted = JobQueue(db_path=path, workers=0, lease_timeout=0)
+        calls = []
+        restarted.register("report", counting_handler(calls))
+
+        assert restarted.requeue_abandoned() == 1
+        assert restarted.run_pending() == 1
+        assert calls == ["a@example.com"]
+
+    def test_workers_process_in_background(self, temp_dir):
+        """Test worker threads pick up queued jobs"""
+        queue = JobQueue(db_path=os.path.join(temp_dir, "jobs.db"), workers=1, poll_interval=0.05)
+        queue.register("report", counting_handler([]))
+        try:
+            job_id = queue.enqueue("report", "a@example.com")
+
+            assert queue.wait(job_id, 5.0)
+            assert queue.get_result("report", "a@example.com") is not None
+        finally:
+            queue.shutdown()
+
+class TestPrecomputeTrigger:
+    """Queueing jobs from user store changes"""
+
+    def test_enqueues_only_when_inputs_change(self, queue):
+        """Test profile writes that do not touch job inputs queue nothing"""
+        calls = []
+        queue.register("report", counting_handler(calls))
+        trigger = PrecomputeTrigger(queue, {"report": lambda user: fingerprint(user.get("lessons", []))})
+
+        trigger.user_changed("a@example.com", {"lessons": ["one"], "points": 1})
+        trigger.flush()
+        queue.run_pending()
+        trigger.user_changed("a@example.com", {"lessons": ["one"], "points": 2})
+        trigger.flush()
+        assert queue.run_pending() == 0
+
+        trigger.user_changed("a@example.com", {"lessons": ["one", "two"], "points": 2})
+        trigger.flush()
+        assert queue.run_pending() == 1
+        assert len(calls) == 2
+
+    def test_fresh_result_not_recomputed(self, queue):
+        """Test an up-to-date stored result (e.g. from before a restart) is reused"""
+        queue.register("report", counting_handler([]))
+        version = fingerprint(["one"])
+        queue.enqueue("report", "a@example.com", {"version": version})
+        queue.run_pending()
+
+        trigger = PrecomputeTrigger(queue, {"report": lambda user: fingerprint(user["lessons"])})
+        trigger.user_changed("a@example.com", {"lessons": ["one"]})
+        trigger.flush()
+
+        assert queue.run_pending() == 0
+
+    def test_checks_run_off_the_write_path(self, queue):
+        """Test user_changed returns before the trigger thread checks the profile"""
+        queue.register("report", counting_handler([]))
+        release = threading.Event()
+
+        def slow_fingerprint(user):
+            release.wait(5)
+            return fingerprint(user["lessons"])
+
+        trigger = PrecomputeTrigger(queue, {"report": slow_fingerprint})
+        trigger.user_changed("a@example.com", {"lessons": ["one"]})
+        assert not trigger.flush(timeout=0.05)
+
+        release.set()
+        assert trigger.flush(timeout=5)
+        assert queue.run_pending() == 1
+        trigger.shutdown()
+
+    def test_seen_fingerprints_are_bounded(self, queue):
+        """Test the last-seen fingerprints keep only the most recently changed users"""
+        trigger = PrecomputeTrigger(queue, {"report": lambda user: fingerprint(user["lessons"])}, max_seen=3)
+        for n in range(10):
+            trigger.user_changed(f"user{n}@example.com", {"lessons": [n]})
+        trigger.flush()
+
+        assert list(trigger._seen) == [("report", f"user{n}@example.com") for n in (7, 8, 9)]
+        trigger.shutdown()
@@ -0,0 +1,151 @@
+"""
+Unit tests for incrementally maintained leaderboards
+"""
+
+import pytest
+import random
+
+from core.leaderboard import RankedSet, Leaderboard, LeaderboardIndex
+from core.user_store import CachedUserStore, SQLiteUserStore
+
+def xp_entry(email, user):
+    xp = user.get('xp', 0)
+    return ((-xp,), {'name': user.get('name'), 'xp': xp}) if xp > 0 else None
+
+def challenge_entries(email, user):
+    attempts = user.get('challenge_attempts', {})
+    return {challenge_id: ((attempts.get(challenge_id, 1), -user.get('points', 0)), {'name': user.get('name')})
+            for challenge_id in user.get('completed_challenge_ids', [])}
+
+class TestRankedSet:
+    """Indexable skip list behaviour"""
+
+    def test_matches_sorted_list(self):
+        """Test random inserts and removals against a sorted list"""
+        rng = random.Random(7)
+        ranked = RankedSet()
+        expected = set()
+
+        for _ in range(2000):
+            key = rng.randrange(500)
+            if key in expected and rng.random() < 0.5:
+                assert ranked.discard(key)
+                expected.discard(key)
+            else:
+                assert ranked.add(key) == (key not in expected)
+                expected.add(key)
+
+        ordered = sorted(expected)
+        assert len(ranked) == len(ordered)
+        assert list(ranked) == ordered
+        assert ranked.slice(10, 25) == ordered[10:25]
+        for position in range(0, len(ordered), 37):
+            assert ranked[position] == ordered[position]
+            assert ranked.index(ordered[position]) == position
+        assert ranked.index(-1) is None
+
+class TestLeaderboard:
+    """Single board queries"""
+
+    @pytest.fixture
+    def board(self):
+        board = Leaderboard()
+        for number in range(20):
+            board.update(f"user{number:02d}", (-number * 10,), {"score": number * 10})
+        return board
+
+    def test_top(self, board):
+        """Test top-K rows are ranked highest first"""
+        top = board.top(3)
+
+        assert [row["score"] for row in top] == [190, 180, 170]
+        assert [row["rank"] for row in top] == [1, 2, 3]
+
+    def test_rank_and_around(self, board):
+        """Test own rank and the window around it"""
+        assert board.rank("user19") == 1
+        assert board.rank("user00") == 20
+        assert board.rank("missing") is None
+
+        around = board.around("user10", radius=2)
+        assert [row["rank"] for row in around] == [8, 9, 10, 11, 12]
+        assert [row["rank"] for row in board.around("user19", radius=2)] == [1, 2, 3]
+
+    def test_update_moves_member(self, board):
+        """Test a changed score re-ranks only that member"""
+        board.update("user00", (-1000,), {"score": 1000})
+
+        assert board.rank("user00") == 1
+        assert board.rank("user19") == 2
+        assert len(board) == 20
+
+        board.remove("user00")
+        assert board.rank("user19") == 1
+
+class TestLeaderboardIndex:
+    """Boards kept in step with user store writes"""
+
+    @pytest.fixture
+    def store(self, test_user_store):
+        return CachedUserStore(test_user_store, revalidate_interval=0)
+
+    @pytest.fixture
+    def index(self, store):
+        index = LeaderboardIndex(store)
+        index.define('xp', xp_entry)
+        index.define_family('challenge', challenge_entries)
+        return index
+
+    def test_incremental_updates(self, store, index):
+        """Test writes re-rank users without rebuilding"""
+        store.save_user("a@example.com", {"name": "A", "xp": 50})
+        store.save_user("b@example.com", {"name": "B", "xp": 80})
+        assert [row["name"] for row in index.top('xp')] == ["B", "A"]
+        rebuilds = index.stats()["rebuilds"]
+
+        store.increment("a@example.com", {"xp": 100})
+        store.save_user("c@example.com", {"name": "C", "xp": 0})
+
+        assert [row["name"] for row in index.top('xp')] == ["A", "B"]
+        assert index.rank('xp', "c@example.com") is None
+        assert index.stats()["rebuilds"] == rebuilds
+
+    def test_challenge_boards(self, store, index):
+        """Test per-challenge boards order by attempts, then points"""
+        store.save_user("a@example.com", {"name": "A", "points": 10, "completed_challenge_ids": ["c1"],
+                                          "challenge_attempts": {"c1": 3}})
+        store.save_user("b@example.com", {"name": "B", "points": 5, "completed_challenge_ids": ["c1"],
+                                          "challenge_attempts": {"c1": 1}})
+        store.save_user("c@example.com", {"name": "C", "points": 20, "completed_challenge_ids": ["c1"],
+                                          "challenge_attempts": {"c1": 1}})
+
+        assert [row["name"] for row in index.top('challenge', board_key="c1")] == ["C", "B", "A"]
+        summary = index.summary('challenge', "a@example.com", board_key="c1")
+        assert summary["user_rank"] == 3
+        assert index.top('challenge', board_key="c2") == []
+
+    def test_external_write_resyncs_changed_users(self, store, index, test_user_store):
+        """Test writes from another process re-rank only the users they touched"""
+        store.save_user("a@example.com", {"name": "A", "xp": 50, "completed_challenge_ids": ["c1"]})
+        store.save_user("c@example.com", {"name": "C", "xp": 10})
+        index.top('xp')
+        rebuilds = index.stats()["rebuilds"]
+
+        other_process = SQLiteUserStore(test_user_store.db_path)
+        other_process.save_user("b@example.com", {"name": "B", "xp": 90})
+        other_process.delete_user("a@example.com")
+
+        assert [row["name"] for row in index.top('xp')] == ["B", "C"]
+        assert index.top('challenge', board_key="c1") == []
+        assert index.stats()["rebuilds"] == rebuilds
+        assert index.stats()["resyncs"] == 1
+
+    def test_deleted_user_removed(self, store, index):
+        """Test deleting a user drops them from every board"""
+        store.save_user("a@example.com", {"name": "A", "xp": 50, "completed_challenge_ids": ["c1"]})
+        index.top('xp')
+
+        store.delete_user("a@example.com")
+
+        assert index.top('xp') == []
+        assert index.top('challenge', board_key="c1") == []
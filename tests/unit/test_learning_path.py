@@ -0,0 +1,90 @@
+"""
+Unit tests for prerequisite-ordered learning paths
+"""
+
+import pytest
+from datetime import datetime
+
+from core.adaptive_learning import (PersonalizedLearningPath, LearningItem, UserPerformance,
+                                    DifficultyLevel, LearningStyle)
+
+def item(item_id, prerequisites=(), concepts=(), difficulty=DifficultyLevel.EASY,
+         styles=(LearningStyle.VISUAL,)):
+    return LearningItem(id=item_id, title=item_id, type="lesson", difficulty=difficulty,
+                        prerequisites=list(prerequisites), concepts=list(concepts),
+                        estimated_time=10, learning_styles=list(styles))
+
+def completed(*item_ids):
+    return [UserPerformance(item_id=item_id, attempts=1, success_rate=1.0, average_time=10.0,
+                            last_attempt=datetime.now(), mastery_level=0.9) for item_id in item_ids]
+
+@pytest.fixture
+def planner():
+    """Small curriculum registered dependents-first"""
+    planner = PersonalizedLearningPath()
+    planner.add_learning_item(item("functions", ["variables"], ["basics"]))
+    planner.add_learning_item(item("web", ["functions", "loops"], ["web_development"]))
+    planner.add_learning_item(item("loops", ["variables"], ["basics"]))
+    planner.add_learning_item(item("games", ["loops"], ["games"]))
+    planner.add_learning_item(item("variables", [], ["basics"]))
+    return planner
+
+def assert_prerequisite_order(planner, path, done=()):
+    seen = set(done)
+    for item_id in path:
+        assert set(planner.learning_items[item_id].prerequisites) <= seen, item_id
+        seen.add(item_id)
+
+class TestLearningPath:
+    """Path generation"""
+
+    def test_path_respects_prerequisites(self, planner):
+        """Test every item comes after all of its prerequisites"""
+        path = planner.generate_learning_path("user", ["basics"], [], LearningStyle.VISUAL)
+
+        assert sorted(path) == sorted(planner.learning_items)
+        assert_prerequisite_order(planner, path)
+
+    def test_dependents_registered_before_prerequisites(self, planner):
+        """Test dependents added before their prerequisite are kept in the graph"""
+        assert sorted(planner.prerequisite_graph["variables"]["dependents"]) == ["functions", "loops"]
+
+    def test_goal_prerequisites_come_first(self, planner):
+        """Test items leading to a goal are preferred over unrelated ones"""
+        path = planner.generate_learning_path("user", ["web_development"], completed("variables"),
+                                              LearningStyle.VISUAL)
+
+        assert path.index("web") < path.index("games")
+        assert path.index("functions") < path.index("games")
+
+    def test_incremental_completion_matches_fresh_plan(self, planner):
+        """Test completing an item gives the same path as planning from scratch"""
+        planner.generate_learning_path("user", ["games"], completed("variables"), LearningStyle.VISUAL)
+        incremental = planner.generate_learning_path("user", ["games"], completed("variables", "loops"),
+                                                     LearningStyle.VISUAL)
+
+        fresh = PersonalizedLearningPath()
+        for registered in planner.learning_items.values():
+            fresh.add_learning_item(registered)
+
+        assert incremental == fresh.generate_learning_path("user", ["games"], completed("variables", "loops"),
+                                                          LearningStyle.VISUAL)
+        assert "loops" not in incremental
+
+    def test_unsatisfiable_items_excluded(self, planner):
+        """Test cycles and unknown prerequisites never enter the path"""
+        planner.add_learning_item(item("a", ["b"]))
+        planner.add_learning_item(item("b", ["a"]))
+        planner.add_learning_item(item("advanced", ["unregistered"]))
+
+        path = planner.generate_learning_path("user", [], [], LearningStyle.VISUAL)
+
+        assert not {"a", "b", "advanced"} & set(path)
+        assert planner.compiled_graph().cyclic == {"a", "b"}
+
+    def test_missing_prerequisites_closure(self, planner):
+        """Test transitive prerequisites are resolved from the compiled graph"""
+        graph = planner.compiled_graph()
+
+        assert sorted(graph.all_prerequisites("web")) == ["functions", "loops", "variables"]
+        assert sorted(graph.missing_prerequisites("web", {"variables", "loops"})) == ["functions"]
@@ -0,0 +1,125 @@
+"""
+Unit tests for the operation log store
+"""
+
+import json
+import os
+
+from core.oplog import OpLogStore
+from core.social_learning import SocialLearningManager, PostType
+
+def open_store(path, **kwargs):
+    return OpLogStore(path, ["posts", "profiles"], **kwargs)
+
+class TestOpLogStore:
+    """Appends, replay and compaction"""
+
+    def test_replay_after_restart(self, temp_dir):
+        """Test a new store rebuilds every collection from the log"""
+        store = open_store(temp_dir)
+        store.put("posts", "p1", {"title": "Hi", "votes": 0})
+        store.put("posts", "p2", {"title": "Bye", "votes": 0})
+        store.update("posts", "p1", {"title": "Hello"}, {"votes": 2})
+        store.put("profiles", "a", {"name": "Ada"})
+        store.update("profiles", "a", increments={"social_stats.posts_count": 1})
+        store.delete("posts", "p2")
+        store.close()
+
+        restarted = open_store(temp_dir)
+
+        assert restarted.collection("posts") == {"p1": {"title": "Hello", "votes": 2}}
+        assert restarted.collection("profiles")["a"]["social_stats"] == {"posts_count": 1}
+        assert restarted.replayed == 6
+
+    def test_each_mutation_is_one_line(self, temp_dir):
+        """Test a vote appends a small entry instead of rewriting the collection"""
+        store = open_store(temp_dir)
+        for n in range(50):
+            store.put("posts", f"p{n}", {"title": "x" * 200, "votes": 0})
+        size = os.path.getsize(store.log_path)
+
+        store.update("posts", "p7", increments={"votes": 1})
+
+        assert os.path.getsize(store.log_path) - size < 100
+
+    def test_compaction_snapshots_and_truncates(self, temp_dir):
+        """Test compaction writes a snapshot and replay resumes after it"""
+        store = open_store(temp_dir, compact_every=3)
+        for n in range(4):
+            store.put("posts", f"p{n}", {"votes": n})
+        store.close()
+
+        assert store.compactions == 1
+        assert len(open(store.log_path).read().splitlines()) == 1
+
+        restarted = open_store(temp_dir)
+        assert sorted(restarted.collection("posts")) == ["p0", "p1", "p2", "p3"]
+        assert restarted.replayed == 1
+
+    def test_torn_final_line_dropped(self, temp_dir):
+        """Test a partial append from a crash is ignored and later appends still replay"""
+        store = open_store(temp_dir)
+        store.put("posts", "p1", {"votes": 0})
+        store.close()
+        with open(store.log_path, "a") as f:
+            f.write('{"op":"put","c":"posts","k":"p2"')
+
+        restarted = open_store(temp_dir)
+        restarted.put("posts", "p3", {"votes": 0})
+        restarted.close()
+
+        assert sorted(open_store(temp_dir).collection("posts")) == ["p1", "p3"]
+
+    def test_legacy_files_imported_once(self, temp_dir):
+        """Test whole-collection JSON files seed a new store"""
+        legacy = os.path.join(temp_dir, "posts.json")
+        with open(legacy, "w") as f:
+            json.dump({"old": {"votes": 3}}, f)
+
+        store = open_store(os.path.join(temp_dir, "log"), legacy_files={"posts": legacy})
+        store.delete("posts", "old")
+        store.close()
+
+        assert open_store(os.path.join(temp_dir, "log"), legacy_files={"posts": legacy}).collection("posts") == {}
+
+class TestSocialPersistence:
+    """Social manager state through the log"""
+
+    def test_manager_state_survives_restart(self, temp_dir):
+        """Test posts, votes, friendships and stats are replayed on startup"""
+        manager = SocialLearningManager(data_dir=temp_dir)
+        manager.create_user_profile("a@example.com", "Ada")
+        manager.create_user_profile("b@example.com", "Bob")
+        post_id = manager.create_discussion_post("a@example.com", "Q", "...", PostType.QUESTION, ["loops"])
+        manager.vote_on_post(post_id, "b@example.com", True)
+        manager.send_friend_request("a@example.com", "b@example.com")
+        friendship_id = next(iter(manager.friendships))
+        manager.respond_to_friend_request(friendship_id, True)
+        manager.store.close()
+
+        restarted = SocialLearningManager(data_dir=temp_dir)
+
+        assert restarted.discussions[post_id]["votes"] == 1
+        assert restarted.get_discussion_posts(tags=["loops"])[0]["id"] == post_id
+        assert restarted.friendships[friendship_id]["status"] == "accepted"
+        stats = restarted.get_user_profile("a@example.com").social_stats
+        assert stats["friends_count"] == 1
+        assert stats["posts_count"] == 1
+
+    def test_failed_appends_leave_indexes_alone(self, temp_dir):
+        """Test posts, shares and accepted friendships whose append failed are not indexed"""
+        manager = SocialLearningManager(data_dir=temp_dir)
+        manager.create_user_profile("a@example.com", "Ada")
+        manager.create_user_profile("b@example.com", "Bob")
+        manager.send_friend_request("a@example.com", "b@example.com")
+        friendship_id = next(iter(manager.friendships))
+
+        manager._record = lambda *args, **kwargs: False
+
+        assert not manager.respond_to_friend_request(friendship_id, True)
+        assert manager.create_discussion_post("a@example.com", "Q", "...", PostType.QUESTION) is None
+        assert manager.share_code("a@example.com", "T", "", "print(1)", "python") is None
+        assert manager.get_friends("a@example.com") == []
+        assert manager.get_user_profile("a@example.com").social_stats["friends_count"] == 0
+        assert manager.get_discussion_posts() == []
+        assert manager.get_code_shares() == []
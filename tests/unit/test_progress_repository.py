@@ -0,0 +1,103 @@
+"""
+Unit tests for the SQL progress repository
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import event
+
+from models import db
+from core.progress_repository import ProgressRepository
+
+@pytest.fixture
+def repository():
+    """Repository over an in-memory database"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        repository = ProgressRepository(db, batch_size=2)
+        repository.create_schema()
+        yield repository
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def statements(repository):
+    """SQL statements executed while the test runs"""
+    executed = []
+    listener = lambda conn, cursor, statement, *args: executed.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', listener)
+
+def profile(lessons=(), quizzes=(), challenges=(), achievements=()):
+    return {'completed_lesson_ids': list(lessons), 'completed_quiz_ids': list(quizzes),
+            'completed_challenge_ids': list(challenges), 'achievements': list(achievements),
+            'average_quiz_score': 80, 'last_activity': '2024-01-02T10:00:00'}
+
+class TestImport:
+    """Bulk import from JSON profiles"""
+
+    def test_import_profiles(self, repository):
+        """Test profiles are imported in batches and a re-run skips existing users"""
+        profiles = [('a@x.com', profile(['l1', 'l2'], ['q1'], ['c1'], ['first_lesson'])),
+                    ('b@x.com', profile(['l1'])),
+                    ('c@x.com', profile(achievements=['first_lesson']))]
+
+        counts = repository.import_profiles(profiles)
+
+        assert counts == {'users': 3, 'lessons': 3, 'quizzes': 1, 'challenges': 1, 'achievements': 2}
+        assert repository.import_profiles(profiles)['users'] == 0
+        assert repository.stats()['user'] == 3
+        assert repository.progress_summary('a@x.com') == {
+            'lessons_completed': 2, 'quizzes_completed': 1, 'quiz_attempts': 1,
+            'average_quiz_score': 80.0, 'challenges_completed': 1, 'achievements': 1}
+
+class TestReads:
+    """Query counts and results of the read paths"""
+
+    def test_fixed_query_counts(self, repository, statements):
+        """Test summaries and full histories cost the same number of queries for any history size"""
+        repository.import_profiles([('small@x.com', profile(['l1'], ['q1'])),
+                                    ('large@x.com', profile([f'l{n}' for n in range(40)],
+                                                            [f'q{n}' for n in range(20)],
+                                                            [f'c{n}' for n in range(20)],
+                                                            ['a', 'b', 'c']))])
+        counts = {}
+        for email in ('small@x.com', 'large@x.com'):
+            del statements[:]
+            summary = repository.progress_summary(email)
+            summary_queries = len(statements)
+            del statements[:]
+            user = repository.load_user(email)
+            titles = [progress.lesson.title for progress in user.lesson_progress]
+            titles += [attempt.quiz.title for attempt in user.quiz_attempts]
+            titles += [item.achievement.name for item in user.achievements]
+            counts[email] = (summary_queries, len(statements))
+
+        assert summary['lessons_completed'] == 40
+        assert len(titles) == 63
+        assert counts['small@x.com'] == counts['large@x.com'] == (1, 5)
+
+    def test_recorded_history(self, repository):
+        """Test recorded completions, attempts and submissions appear newest first"""
+        start = datetime(2024, 1, 1)
+        repository.record_lesson_completion('u@x.com', 'l1', completed_date=start)
+        repository.record_lesson_completion('u@x.com', 'l1', completed_date=start + timedelta(days=5))
+        repository.record_quiz_attempt('u@x.com', 'q1', 3, 4, {'0': 'a'})
+        repository.record_quiz_attempt('u@x.com', 'q1', 1, 4)
+        repository.record_challenge_submission('u@x.com', 'c1', 'pass', passed=False)
+        repository.record_achievements('u@x.com', ['first_lesson'])
+        repository.record_achievements('u@x.com', ['first_lesson', 'quiz_master'])
+
+        summary = repository.progress_summary('u@x.com')
+        activity = repository.recent_activity('u@x.com', limit=3)
+
+        assert summary == {'lessons_completed': 1, 'quizzes_completed': 1, 'quiz_attempts': 2,
+                           'average_quiz_score': 50.0, 'challenges_completed': 0, 'achievements': 2}
+        assert [item['type'] for item in activity] == ['challenge', 'quiz', 'quiz']
+        assert repository.recent_activity('u@x.com')[-1] == {
+            'type': 'lesson', 'id': 'l1', 'title': 'l1', 'score': 100.0, 'date': start.isoformat()}
+        assert repository.progress_summary('nobody@x.com') is None
@@ -0,0 +1,135 @@
+"""
+Unit tests for GCRA rate limiting and its backends
+"""
+
+import pytest
+import os
+import time
+import multiprocessing
+
+from core.rate_limiting import HAS_FCNTL, gcra, MemoryBackend, MmapBackend, create_rate_limit_backend
+from core.security import RateLimiter
+
+@pytest.fixture(params=["memory", "mmap"])
+def backend(request, temp_dir):
+    """Create each local backend"""
+    if request.param == "mmap":
+        return MmapBackend(os.path.join(temp_dir, "rate_limits.bin"), slots=256)
+    return MemoryBackend()
+
+def burst(backend, key, now, count, limit=5, window=60):
+    return [backend.acquire(key, now, window / limit, window)[0] for _ in range(count)]
+
+def _hammer(path, count, results):
+    backend = MmapBackend(path, slots=256)
+    results.put(sum(burst(backend, "shared", 1000.0, count, limit=50)))
+
+class TestGCRA:
+    """Algorithm behaviour shared by every backend"""
+
+    def test_burst_then_deny(self, backend):
+        """Test `limit` requests pass at once and the next is denied"""
+        assert burst(backend, "client", 1000.0, 6) == [True] * 5 + [False]
+
+    def test_refill_at_sustained_rate(self, backend):
+        """Test one request is allowed again after window / limit seconds"""
+        burst(backend, "client", 1000.0, 5)
+
+        assert burst(backend, "client", 1011.0, 1) == [False]
+        assert burst(backend, "client", 1012.0, 2) == [True, False]
+
+    def test_clients_are_independent(self, backend):
+        """Test separate keys have separate allowances"""
+        burst(backend, "a", 1000.0, 5)
+
+        assert burst(backend, "b", 1000.0, 1) == [True]
+
+    def test_reset(self, backend):
+        """Test resetting a client restores its allowance"""
+        burst(backend, "client", 1000.0, 5)
+
+        backend.reset("client")
+
+        assert burst(backend, "client", 1000.0, 1) == [True]
+
+    def test_denied_requests_do_not_consume(self):
+        """Test a denied request leaves the stored state unchanged"""
+        allowed, tat = gcra(1100.0, 1000.0, 12.0, 60.0)
+
+        assert not allowed
+        assert tat == 1100.0
+
+class TestMemoryBackend:
+    """In-process backend"""
+
+    def test_expired_entries_swept(self):
+        """Test idle clients do not accumulate"""
+        backend = MemoryBackend(sweep_every=10)
+        for number in range(9):
+            backend.acquire(f"client{number}", 1000.0, 1.0, 10.0)
+
+        backend.acquire("late", 2000.0, 1.0, 10.0)
+
+        assert backend.stats()["clients"] == 1
+
+class TestMmapBackend:
+    """Shared-memory backend"""
+
+    def test_state_shared_between_instances(self, temp_dir):
+        """Test two mappings of the same file see each other's requests"""
+        path = os.path.join(temp_dir, "rate_limits.bin")
+        first = MmapBackend(path, slots=256)
+        second = MmapBackend(path, slots=256)
+
+        burst(first, "client", 1000.0, 3)
+
+        assert burst(second, "client", 1000.0, 3) == [True, True, False]
+
+    @pytest.mark.skipif(not HAS_FCNTL, reason="cross-process locking needs fcntl")
+    def test_shared_between_processes(self, temp_dir):
+        """Test concurrent worker processes share one allowance"""
+        path = os.path.join(temp_dir, "rate_limits.bin")
+        MmapBackend(path, slots=256)
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+
+        workers = [context.Process(target=_hammer, args=(path, 40, results)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(10)
+
+        assert sum(results.get(timeout=5) for _ in workers) == 50
+
+    def test_full_probe_run_reuses_oldest_slot(self, temp_dir):
+        """Test a full table still admits new clients"""
+        backend = MmapBackend(os.path.join(temp_dir, "rate_limits.bin"), slots=4)
+        now = time.time()
+        for number in range(10):
+            assert backend.acquire(f"client{number}", now + number, 1.0, 10.0)[0]
+
+        assert backend.stats()["clients"] == 4
+
+class TestRateLimiter:
+    """RateLimiter on top of a backend"""
+
+    def test_info(self):
+        """Test the info dict reports remaining requests and reset time"""
+        limiter = RateLimiter(MemoryBackend())
+
+        allowed, info = limiter.is_allowed("user:test", 3, 60)
+        assert allowed
+        assert info["remaining"] == 2
+
+        limiter.is_allowed("user:test", 3, 60)
+        limiter.is_allowed("user:test", 3, 60)
+        allowed, info = limiter.is_allowed("user:test", 3, 60)
+
+        assert not allowed
+        # One request frees up every window / limit = 20 seconds
+        assert 0 < info["reset_time"] - time.time() <= 20
+
+    def test_unknown_backend(self):
+        """Test unknown backends are rejected"""
+        with pytest.raises(ValueError):
+            create_rate_limit_backend("unknown")
@@ -0,0 +1,120 @@
+"""
+Unit tests for the execution result cache
+"""
+
+import pytest
+
+from core.result_cache import ExecutionResultCache, suite_version, normalize_code
+
+@pytest.fixture
+def cache():
+    return ExecutionResultCache(max_entries=3, max_bytes=10000)
+
+class TestExecutionResultCache:
+    """Content-addressed result cache behaviour"""
+
+    def test_key_ignores_formatting(self, cache):
+        """Test comments and whitespace do not change the key"""
+        first = cache.make_key("def f(x):\n    return x + 1\n")
+        second = cache.make_key("# my solution\ndef f( x ):\n\n    return x+1  # done\n")
+
+        assert first == second
+        assert first != cache.make_key("def f(x):\n    return x + 2\n")
+
+    def test_key_includes_challenge_and_suite(self, cache):
+        """Test the same code under another challenge or suite version gets a new key"""
+        code = "def f(x):\n    return x"
+
+        keys = {
+            cache.make_key(code, "challenge_1", "v1"),
+            cache.make_key(code, "challenge_2", "v1"),
+            cache.make_key(code, "challenge_1", "v2"),
+            cache.make_key(code, "challenge_1", "v1", kind="tests"),
+        }
+        assert len(keys) == 4
+
+    @pytest.mark.parametrize("code", [
+        "import random\nprint(random.random())",
+        "from datetime import datetime\nprint(datetime.now())",
+        "print(id(object()))",
+        "def broken(:",
+    ])
+    def test_uncacheable_code(self, code):
+        """Test nondeterministic or invalid code has no key"""
+        assert normalize_code(code) is None
+
+    def test_get_or_run(self, cache):
+        """Test identical code is only executed once"""
+        calls = []
+
+        def run():
+            calls.append(1)
+            return {"success": True, "output": "1\n"}
+
+        first = cache.get_or_run("print(1)", run)
+        second = cache.get_or_run("print( 1 )", run)
+
+        assert len(calls) == 1
+        assert "cached" not in first
+        assert second == {"success": True, "output": "1\n", "cached": True}
+        assert cache.stats()["hits"] == 1
+
+    def test_cached_results_are_copies(self, cache):
+        """Test callers cannot mutate cached results"""
+        cache.get_or_run("print(1)", lambda: {"output": "1\n"})
+
+        cache.get_or_run("print(1)", lambda: {})["output"] = "changed"
+
+        assert cache.get_or_run("print(1)", lambda: {})["output"] == "1\n"
+
+    def test_transient_results_not_cached(self, cache):
+        """Test timeouts and limit breaches are re-run"""
+        calls = []
+
+        def run():
+            calls.append(1)
+            return {"success": False, "error": "Execution timed out after 5s", "transient": True}
+
+        cache.get_or_run("while True: pass", run)
+        cache.get_or_run("while True: pass", run)
+
+        assert len(calls) == 2
+
+    def test_lru_eviction_by_entries(self, cache):
+        """Test the least recently used entry is evicted first"""
+        for n in range(3):
+            cache.set(f"key{n}", {"n": n})
+        cache.get("key0")
+
+        cache.set("key3", {"n": 3})
+
+        assert cache.get("key1") is None
+        assert cache.get("key0") == {"n": 0}
+        assert cache.stats()["evictions"] == 1
+
+    def test_lru_eviction_by_size(self):
+        """Test total size stays within max_bytes"""
+        cache = ExecutionResultCache(max_entries=100, max_bytes=100)
+
+        cache.set("a", {"output": "x" * 40})
+        cache.set("b", {"output": "y" * 40})
+
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] <= 100
+
+    def test_invalidate_challenge(self, cache):
+        """Test invalidation drops only the given challenge's results"""
+        cache.set("k1", {"n": 1}, challenge_id="challenge_1")
+        cache.set("k2", {"n": 2}, challenge_id="challenge_2")
+
+        assert cache.invalidate_challenge("challenge_1") == 1
+
+        assert cache.get("k1") is None
+        assert cache.get("k2") == {"n": 2}
+
+    def test_suite_version_tracks_test_changes(self):
+        """Test editing a test case changes the suite version"""
+        tests = [{"input": 5, "expected": 120}]
+
+        assert suite_version(tests) == suite_version([{"expected": 120, "input": 5}])
+        assert suite_version(tests) != suite_version([{"input": 5, "expected": 121}])
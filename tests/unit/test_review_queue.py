@@ -0,0 +1,148 @@
+"""
+Unit tests for the spaced repetition due-queue
+"""
+
+import pytest
+import os
+import threading
+from datetime import datetime, timedelta
+
+from core.user_store import CachedUserStore
+from core.review_queue import ReviewQueue
+
+@pytest.fixture
+def store(test_user_store):
+    """Cached store so the queue receives write notifications"""
+    return CachedUserStore(test_user_store)
+
+@pytest.fixture
+def queue(store, temp_dir):
+    """Queue over the isolated store"""
+    return ReviewQueue(store, db_path=os.path.join(temp_dir, "review_queue.db"))
+
+def review_state(next_review, last_review, performance):
+    return {"next_review": next_review.isoformat(), "last_review": last_review.isoformat(),
+            "last_performance": performance}
+
+class TestReviewQueue:
+    """Due reviews per user and for everyone"""
+
+    def test_due_follows_profile_writes(self, store, queue):
+        """Test the index picks up review state written to profiles"""
+        now = datetime.now()
+        store.save_user("a@example.com", {"spaced_repetition": {
+            "loops": review_state(now - timedelta(hours=1), now - timedelta(days=2), 0.2),
+            "lists": review_state(now - timedelta(hours=2), now - timedelta(days=1), 0.9),
+            "classes": review_state(now + timedelta(days=1), now, 0.5),
+        }})
+
+        due = queue.due("a@example.com")
+
+        # Both overdue items, ordered by forgetting-curve priority rather than due time
+        assert [item["concept_id"] for item in due] == ["loops", "lists"]
+        assert queue.next_due("a@example.com") < now
+
+    def test_schedule_moves_item(self, store, queue):
+        """Test scheduling a review pushes the item out of the due set"""
+        now = datetime.now()
+        store.save_user("a@example.com", {"spaced_repetition": {
+            "loops": review_state(now - timedelta(hours=1), now - timedelta(days=2), 0.2)}})
+
+        queue.schedule("a@example.com", "loops", now + timedelta(days=3), performance=1.0)
+
+        assert queue.due("a@example.com") == []
+        assert store.get_user("a@example.com")["spaced_repetition"]["loops"]["last_performance"] == 1.0
+        assert queue.due("a@example.com", now=(now + timedelta(days=4)).timestamp())[0]["concept_id"] == "loops"
+
+    def test_digest_covers_all_users(self, store, queue):
+        """Test the digest groups every user's due reviews"""
+        now = datetime.now()
+        for n in range(3):
+            store.save_user(f"user{n}@example.com", {"spaced_repetition": {
+                f"concept{c}": review_state(now - timedelta(hours=c + 1), now - timedelta(days=1), 0.5)
+                for c in range(n + 1)}})
+        store.save_user("idle@example.com", {"name": "No reviews"})
+
+        digest = queue.digest(per_user=2)
+
+        assert sorted(digest) == ["user0@example.com", "user1@example.com", "user2@example.com"]
+        assert len(digest["user2@example.com"]) == 2
+
+    def test_rebuilt_after_writes_it_missed(self, test_user_store, store, temp_dir):
+        """Test writes made while the index was not listening are picked up"""
+        now = datetime.now()
+        test_user_store.save_user("a@example.com", {"spaced_repetition": {
+            "loops": review_state(now - timedelta(hours=1), now, 0.5)}})
+
+        queue = ReviewQueue(store, db_path=os.path.join(temp_dir, "review_queue.db"))
+
+        assert [item["concept_id"] for item in queue.due("a@example.com")] == ["loops"]
+        assert queue.stats()["rebuilds"] == 1
+
+    def test_reset_catches_up_without_rebuild(self, test_user_store, store, queue):
+        """Test a reset re-reads only profiles written since the last sync"""
+        now = datetime.now()
+        store.save_user("gone@example.com", {"spaced_repetition": {
+            "loops": review_state(now - timedelta(hours=1), now, 0.5)}})
+        assert len(queue.due("gone@example.com")) == 1
+        store.update_user("gone@example.com", lambda profile: profile.update(points=2))
+
+        # Writes from another process: the cache only sees a reset
+        test_user_store.save_user("b@example.com", {"spaced_repetition": {
+            "lists": review_state(now - timedelta(hours=1), now, 0.5)}})
+        test_user_store.delete_user("gone@example.com")
+        queue.users_reset()
+
+        assert [item["concept_id"] for item in queue.due("b@example.com")] == ["lists"]
+        assert queue.due("gone@example.com") == []
+        assert queue.stats()["rebuilds"] == 0
+        assert queue.stats()["catchups"] == 1
+
+    def test_unrelated_writes_do_not_reindex(self, store, queue):
+        """Test profile writes outside the review section skip re-indexing"""
+        store.save_user("a@example.com", {"points": 1})
+        syncs = queue.stats()["syncs"]
+
+        store.update_user("a@example.com", lambda profile: profile.update(points=2))
+
+        assert queue.stats()["syncs"] == syncs
+
+    def test_rebuild_concurrent_with_writes(self, store, queue):
+        """Test rebuilding while profiles are written neither deadlocks nor loses writes"""
+        now = datetime.now()
+        errors = []
+
+        def write():
+            try:
+                for n in range(30):
+                    store.save_user(f"user{n}@example.com", {"spaced_repetition": {
+                        "loops": review_state(now - timedelta(hours=1), now, 0.5)}})
+            except Exception as e:
+                errors.append(e)
+
+        def rebuild():
+            try:
+                for _ in range(30):
+                    queue.rebuild()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, daemon=True), threading.Thread(target=rebuild, daemon=True)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=20)
+
+        assert not any(thread.is_alive() for thread in threads)
+        assert errors == []
+        queue.rebuild()
+        assert len(queue.digest()) == 30
+
+    def test_unrelated_writes_skip_version_record(self, store, queue):
+        """Test unrelated writes leave the recorded store version alone"""
+        store.save_user("a@example.com", {"points": 1})
+        recorded = queue._connect().execute("SELECT value FROM queue_meta").fetchall()
+
+        store.update_user("a@example.com", lambda profile: profile.update(points=2))
+
+        assert queue._connect().execute("SELECT value FROM queue_meta").fetchall() == recorded
@@ -0,0 +1,294 @@
+"""
+Unit tests for the sandboxed code execution pool
+"""
+
+import os
+import pytest
+import threading
+
+from core.sandbox import SandboxPool, check_code_safety, HAS_RESOURCE
+
+ESCAPE_PAYLOAD = ("[c for c in ().__class__.__base__.__subclasses__() if c.__name__=='_wrap_close']"
+                  "[0].__init__.__globals__['unlink'](path)")
+
+# Walks up the interpreter's frames to the worker module's globals
+GENERATOR_FRAME_WALK = """def h():
+    yield gen2.gi_frame.f_back.f_back
+gen2 = h()
+fr = next(gen2)
+while 'os' not in fr.f_globals:
+    fr = fr.f_back
+fr.f_globals['os'].unlink(path)
+"""
+TRACEBACK_FRAME_WALK = """try:
+    1 / 0
+except ZeroDivisionError as e:
+    fr = e.with_traceback(None).tb_frame
+    fr.f_globals['os'].unlink(path)
+"""
+
+@pytest.fixture(scope="module")
+def pool():
+    """Small sandbox pool shared by the tests in this module"""
+    sandbox = SandboxPool(size=2, max_runs_per_worker=5, cpu_limit=1, wall_timeout=3)
+    sandbox.start()
+    yield sandbox
+    sandbox.shutdown()
+
+class TestSandboxPool:
+    """Sandbox execution behaviour"""
+
+    def test_run_captures_output(self, pool):
+        """Test stdout and variables are returned"""
+        result = pool.run("x = 6 * 7\nprint('answer', x)")
+
+        assert result["success"]
+        assert result["output"] == "answer 42\n"
+        assert result["variables"] == {"x": "42"}
+
+    def test_functions_see_globals(self, pool):
+        """Test recursive functions work (single namespace)"""
+        code = "def fact(n):\n    return 1 if n < 2 else n * fact(n - 1)\nprint(fact(5))"
+
+        assert pool.run(code)["output"] == "120\n"
+
+    def test_call_function(self, pool):
+        """Test calling a user function returns a plain value"""
+        result = pool.call_function("def pair(a, b):\n    return (a, {'b': b})", "pair", [1, 2])
+
+        assert result["success"]
+        assert result["return_value"] == [1, {"b": 2}]
+
+    def test_missing_function(self, pool):
+        """Test a missing function is reported as an error"""
+        result = pool.call_function("x = 1", "solve", [])
+
+        assert not result["success"]
+        assert "solve" in result["error"]
+
+    def test_runtime_error_traceback(self, pool):
+        """Test tracebacks only show user frames"""
+        result = pool.run("def f():\n    return 1 / 0\nf()")
+
+        assert result["error"] == "ZeroDivisionError: division by zero"
+        assert "<user_code>" in result["traceback"]
+        assert "sandbox.py" not in result["traceback"]
+
+    def test_disallowed_import_at_runtime(self, pool):
+        """Test the worker refuses imports outside the allow list"""
+        result = pool.run("import os")
+
+        assert not result["success"]
+        assert "Import not allowed" in result["error"]
+
+    def test_wall_clock_timeout(self, pool):
+        """Test blocked code is killed after the wall-clock timeout"""
+        result = pool.run("import time\ntime.sleep(10)", timeout=0.5)
+
+        assert not result["success"]
+        assert "timed out" in result["error"]
+        # The pool replaced the killed worker
+        assert pool.run("print('ok')")["output"] == "ok\n"
+
+    @pytest.mark.skipif(not HAS_RESOURCE, reason="resource limits need the resource module")
+    def test_cpu_limit(self, pool):
+        """Test busy loops hit the CPU limit"""
+        result = pool.run("while True:\n    pass")
+
+        assert not result["success"]
+        assert result["error"] == "CPU time limit exceeded"
+
+    @pytest.mark.skipif(not HAS_RESOURCE, reason="resource limits need the resource module")
+    def test_memory_limit(self, pool):
+        """Test large allocations hit the memory limit"""
+        result = pool.run("data = [0] * (10 ** 9)")
+
+        assert not result["success"]
+        assert result["error"] == "Memory limit exceeded"
+
+    def test_output_truncated(self, pool):
+        """Test output beyond the cap is dropped"""
+        result = pool.run("print('a' * 200000)")
+
+        assert result["truncated"]
+        assert len(result["output"]) == 64 * 1024
+
+    def test_streamed_output(self, pool):
+        """Test output chunks are delivered to the callback"""
+        chunks = []
+        result = pool.run("for i in range(3):\n    print(i)", on_output=chunks.append)
+
+        assert "".join(chunks) == result["output"] == "0\n1\n2\n"
+
+    def test_workers_recycled(self):
+        """Test workers are replaced after max_runs_per_worker runs"""
+        sandbox = SandboxPool(size=1, max_runs_per_worker=2)
+        try:
+            for _ in range(4):
+                assert sandbox.run("print(1)")["success"]
+            assert sandbox.stats()["recycled"] == 2
+        finally:
+            sandbox.shutdown()
+
+    def test_concurrent_runs(self, pool):
+        """Test concurrent callers each get their own result"""
+        results = {}
+
+        def worker(n):
+            results[n] = pool.call_function("def square(x):\n    return x * x", "square", [n])
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert {n: result["return_value"] for n, result in results.items()} == {n: n * n for n in range(6)}
+
+    def test_submit_returns_future(self, pool):
+        """Test background submission"""
+        future = pool.submit("print('async')")
+
+        assert future.result(timeout=5)["output"] == "async\n"
+
+class TestBatchedGrading:
+    """All test cases graded in one sandbox invocation"""
+
+    CODE = "def double(n):\n    if n < 0:\n        raise ValueError('negative')\n    return n * 2"
+
+    def test_run_tests(self, pool):
+        """Test per-case verdicts and timings from a single run"""
+        runs_before = pool.stats()["runs"]
+
+        result = pool.run_tests(self.CODE, "double", [
+            {"args": [1], "expected": 2},
+            {"args": [2], "expected": 5},
+            {"args": [-1], "expected": 0},
+        ])
+
+        assert pool.stats()["runs"] == runs_before + 1
+        assert [case["passed"] for case in result["cases"]] == [True, False, False]
+        assert result["cases"][1]["actual"] == 4
+        assert result["cases"][2]["error"] == "ValueError: negative"
+        assert all(case["execution_time"] >= 0 for case in result["cases"])
+        assert result["passed_tests"] == 1
+
+    def test_stop_on_failure(self, pool):
+        """Test remaining cases are skipped after the first failure"""
+        result = pool.run_tests(self.CODE, "double", [
+            {"args": [1], "expected": 3},
+            {"args": [2], "expected": 4},
+        ], stop_on_failure=True)
+
+        assert result["cases_run"] == 1
+        assert result["cases"][1]["skipped"]
+
+    def test_time_limit(self, pool):
+        """Test slow cases fail the per-case time limit"""
+        code = "import time\ndef slow():\n    time.sleep(0.2)\n    return 1"
+
+        result = pool.run_tests(code, "slow", [{"args": [], "expected": 1}], time_limit=0.05)
+
+        assert not result["cases"][0]["passed"]
+        assert result["cases"][0]["error"].startswith("Time limit exceeded")
+
+    def test_hung_case_keeps_earlier_results(self, pool):
+        """Test cases finished before a timeout are still reported"""
+        code = "def f(n):\n    while n:\n        pass\n    return 0"
+
+        result = pool.run_tests(code, "f", [
+            {"args": [0], "expected": 0},
+            {"args": [1], "expected": 0},
+            {"args": [0], "expected": 0},
+        ], timeout=0.5)
+
+        assert result["cases"][0]["passed"]
+        assert "timed out" in result["cases"][1]["error"]
+        assert result["cases"][2]["error"] == "Not run"
+
+    def test_escape_payload_blocked(self, pool, temp_dir):
+        """Test the subclass-walk escape cannot delete files, even sent straight to a worker"""
+        target = os.path.join(temp_dir, "keep.txt")
+        with open(target, 'w') as f:
+            f.write("x")
+
+        result = pool._execute({"code": f"path = {target!r}\n{ESCAPE_PAYLOAD}"})
+
+        assert not result["success"]
+        assert "Attribute access not allowed" in result["error"]
+        assert os.path.exists(target)
+
+    @pytest.mark.parametrize("payload", [GENERATOR_FRAME_WALK, TRACEBACK_FRAME_WALK])
+    def test_frame_walks_blocked(self, pool, temp_dir, payload):
+        """Test generator and traceback frames cannot be walked to the worker's globals"""
+        target = os.path.join(temp_dir, "keep.txt")
+        with open(target, 'w') as f:
+            f.write("x")
+
+        result = pool._execute({"code": f"path = {target!r}\n{payload}"})
+
+        assert not result["success"]
+        assert "Attribute access not allowed" in result["error"]
+        assert os.path.exists(target)
+
+    def test_module_views_hide_imported_modules(self, pool):
+        """Test allowed modules do not expose the modules they import themselves"""
+        result = pool.run("import statistics\nprint(statistics.mean([1, 2, 3]), hasattr(statistics, 'sys'))")
+
+        assert result["output"] == "2 False\n"
+
+    @pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason="needs to start as root")
+    def test_workers_drop_root(self):
+        """Test workers started by root run as an unprivileged user in a private directory"""
+        sandbox = SandboxPool(size=1)
+        try:
+            assert sandbox.run("x = 1")["success"]
+            worker = sandbox._idle.queue[0]
+            with open(f"/proc/{worker.process.pid}/status") as f:
+                uids = next(line for line in f if line.startswith("Uid:")).split()[1:]
+            assert "0" not in uids
+            assert os.stat(worker.workdir).st_mode & 0o777 == 0o700
+        finally:
+            sandbox.shutdown()
+        assert not os.path.exists(worker.workdir)
+
+    def test_challenge_system_grading(self, pool, temp_dir):
+        """Test ChallengeSystem.test_solution grades through the sandbox"""
+        from core.challenge_system import ChallengeSystem
+
+        challenges = ChallengeSystem(challenges_dir=temp_dir, sandbox=pool)
+        challenge = challenges.load_challenge("easy_002")
+        code = f"def {challenge['function_name']}(a, b):\n    return a + b"
+
+        result = challenges.test_solution(challenge, code, hints_used=0)
+
+        assert result["success"]
+        assert result["passed_tests"] == result["total_tests"]
+
+class TestCodeSafety:
+    """Static safety check"""
+
+    @pytest.mark.parametrize("code", [
+        "eval('1')",
+        "import subprocess",
+        "from os import path",
+        "f.write('x')",
+        ESCAPE_PAYLOAD,
+        "().__class__",
+        "getattr(x, '__class__')",
+        "getattr(x, name)",
+        GENERATOR_FRAME_WALK,
+        TRACEBACK_FRAME_WALK,
+        "hasattr(g, 'gi_frame')",
+        "import operator\noperator.attrgetter('x')",
+        "from operator import methodcaller",
+        "import string\nstring.Formatter().get_field('0.x', [1], {})",
+    ])
+    def test_rejects_unsafe_code(self, code):
+        """Test blocked calls, imports, file operations and private attributes are rejected"""
+        is_safe, _ = check_code_safety(code)
+        assert not is_safe
+
+    def test_accepts_safe_code(self):
+        """Test ordinary code passes"""
+        assert check_code_safety("import math\nprint(math.pi)")[0]
@@ -0,0 +1,95 @@
+"""
+Unit tests for compiled schema validators
+"""
+
+import pytest
+
+from core.schema_compiler import compile_schema, format_errors, SchemaError
+
+PROFILE_SCHEMA = {
+    "type": "object",
+    "required": ["name", "email"],
+    "properties": {
+        "name": {"type": "string", "minLength": 1},
+        "email": {"type": "string", "format": "email"},
+        "level": {"type": "integer", "minimum": 1},
+        "achievements": {"type": "array", "items": {"type": "string", "pattern": "^[a-z_]+$"}},
+        "history": {
+            "type": "array",
+            "maxItems": 3,
+            "items": {
+                "type": "object",
+                "required": ["score"],
+                "properties": {"score": {"type": "number", "minimum": 0, "maximum": 100}},
+                "additionalProperties": False
+            }
+        },
+        "theme": {"enum": ["default", "dark"]},
+        "nickname": {"minLength": 2}
+    }
+}
+
+class TestCompiledSchema:
+    """Validation results of compiled schemas"""
+
+    def test_valid_data(self):
+        """Test valid nested data has no errors"""
+        schema = compile_schema(PROFILE_SCHEMA)
+
+        assert schema.is_valid({"name": "Ann", "email": "ann@example.com", "level": 2,
+                                "achievements": ["first_steps"], "history": [{"score": 99.5}],
+                                "theme": "dark", "nickname": 7})
+
+    def test_every_error_location(self):
+        """Test every problem is reported with its location, including nested ones"""
+        schema = compile_schema(PROFILE_SCHEMA)
+
+        errors = schema.errors({"name": "", "level": True, "achievements": ["ok", "Bad!", 3],
+                                "history": [{"score": 120}, {"extra": 1}, 5, {"score": 1}],
+                                "theme": "light", "nickname": "x"})
+
+        assert errors == [
+            ("email", "is required"),
+            ("name", "must be at least 1 characters"),
+            ("level", "must be an integer"),
+            ("achievements[1]", "does not match pattern ^[a-z_]+$"),
+            ("achievements[2]", "must be a string"),
+            ("history", "must have at most 3 items"),
+            ("history[0].score", "must be at most 100"),
+            ("history[1].score", "is required"),
+            ("history[1].extra", "is not allowed"),
+            ("history[2]", "must be an object"),
+            ("theme", "must be one of default, dark"),
+            ("nickname", "must be at least 2 characters"),
+        ]
+        assert format_errors(schema.errors([])) == "must be an object"
+
+    def test_batch_validation(self):
+        """Test only invalid records are returned from a batch"""
+        schema = compile_schema(PROFILE_SCHEMA)
+        records = {"a": {"name": "A", "email": "a@x.com"}, "b": {"name": "B", "email": "nope"}}
+
+        assert schema.validate_many(records.items()) == {"b": [("email", "is not a valid email")]}
+
+    def test_unsupported_schema(self):
+        """Test unknown types and formats are rejected when compiling"""
+        with pytest.raises(SchemaError):
+            compile_schema({"type": "date"})
+        with pytest.raises(SchemaError):
+            compile_schema({"type": "string", "format": "uri"})
+
+    def test_database_manager_batch(self, test_db_manager):
+        """Test the database manager reports every problem per profile"""
+        profiles = {
+            "ok@example.com": {"name": "Ok", "email": "ok@example.com", "created_at": "2024-01-01",
+                               "points": 5, "level": 1},
+            "bad": {"name": "Bad", "email": "bad", "points": -1, "level": 1}
+        }
+
+        result = test_db_manager.validate_batch(profiles, "user_progress")
+
+        assert list(result) == ["bad"]
+        assert {error["location"] for error in result["bad"]} == {"created_at", "email", "points"}
+        is_valid, message = test_db_manager.validate_data(profiles["bad"], "user_progress")
+        assert not is_valid
+        assert message == "created_at: is required; email: is not a valid email; points: must be at least 0"
@@ -0,0 +1,73 @@
+"""
+Unit tests for the full-text search index
+"""
+
+import pytest
+
+from core.search_index import SearchIndex, tokenize
+from collaboration_system import CodeSharingPlatform
+
+@pytest.fixture
+def index():
+    """Index over three small snippets"""
+    index = SearchIndex({"title": 3.0, "code": 1.0})
+    index.add("csv", {"title": "Load a CSV file", "code": "import pandas as pd\ndf = pd.read_csv('a.csv')"})
+    index.add("user", {"title": "User helpers", "code": "def getUserName(user):\n    return user.name"})
+    index.add("loop", {"title": "Counting loop", "code": "for i in range(10):\n    print(i)"})
+    return index
+
+class TestTokenizer:
+    """Identifier-aware tokens"""
+
+    def test_identifier_parts(self):
+        """Test snake_case and camelCase identifiers are indexed whole and split"""
+        assert tokenize("df = pd.read_csv(path)") == ["df", "pd", "read_csv", "read", "csv", "path"]
+        assert tokenize("getHTTPResponse") == ["gethttpresponse", "get", "http", "response"]
+
+class TestSearchIndex:
+    """Ranking, prefixes and updates"""
+
+    def test_identifier_part_matches(self, index):
+        """Test a search for part of an identifier finds it"""
+        assert [doc for doc, _ in index.search("user name")][0] == "user"
+        assert [doc for doc, _ in index.search("read")] == ["csv"]
+
+    def test_title_outranks_code(self, index):
+        """Test field weights favour title matches"""
+        index.add("print", {"title": "Print a CSV row", "code": "print(row)"})
+
+        ranked = [doc for doc, _ in index.search("print")]
+
+        assert ranked == ["print", "loop"]
+
+    def test_prefix_search(self, index):
+        """Test the last query term matches as a prefix"""
+        assert [doc for doc, _ in index.search("pan")] == ["csv"]
+        assert index.search("pan", prefix=False) == []
+
+    def test_remove_and_replace(self, index):
+        """Test updates drop stale terms"""
+        index.add("loop", {"title": "While loop", "code": "while True:\n    break"})
+        index.remove("csv")
+
+        assert index.search("range") == []
+        assert index.search("pandas") == []
+        assert [doc for doc, _ in index.search("while")] == ["loop"]
+        assert index.expand_prefix("pan") == []
+
+class TestSnippetSearch:
+    """Code sharing platform search"""
+
+    def test_publish_and_fork_indexed(self):
+        """Test published and forked snippets are searchable with filters"""
+        platform = CodeSharingPlatform()
+        original = platform.publish_snippet("a", "def fib(n):\n    return n", "Fibonacci", tags=["recursion"])
+        platform.publish_snippet("b", "x = 1", "Variables")
+        fork = platform.fork_snippet(original, "c")
+
+        results = platform.search_snippets("fib")
+
+        assert sorted(result["id"] for result in results) == sorted([original, fork])
+        assert platform.snippets[original]["forks"] == 1
+        assert platform.search_snippets("fib", difficulty="beginner") == []
+        assert len(platform.search_snippets("", tags=["recursion"])) == 2
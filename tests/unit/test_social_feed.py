@@ -0,0 +1,122 @@
+"""
+Unit tests for the paginated social feed
+"""
+
+import pytest
+import os
+from datetime import datetime, timedelta
+
+from core.social_feed import FeedIndex, encode_cursor, recent_order, top_order
+from core.social_learning import SocialLearningManager, PostType
+
+def post(n, tags=(), votes=0, post_type="discussion"):
+    return {"id": f"post_{n}", "author_id": f"user{n % 3}", "tags": list(tags), "votes": votes,
+            "post_type": post_type,
+            "created_at": (datetime(2024, 1, 1) + timedelta(minutes=n)).isoformat()}
+
+@pytest.fixture
+def index():
+    """Posts 0..29; even posts tagged python, every third tagged loops"""
+    index = FeedIndex({"recent": recent_order, "top": top_order},
+                      {"tags": lambda record: record["tags"], "post_type": lambda record: [record["post_type"]]})
+    records = {}
+    for n in range(30):
+        tags = (["python"] if n % 2 == 0 else []) + (["loops"] if n % 3 == 0 else [])
+        records[f"post_{n}"] = post(n, tags, votes=n % 5, post_type="question" if n % 4 == 0 else "discussion")
+    index.rebuild(records)
+    return index, records
+
+def read_all(index, order, limit, filters=None):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page, cursor = index.page(order, limit, cursor, filters)
+        ids.extend(page)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+class TestFeedIndex:
+    """Ordering, filtering and cursors"""
+
+    def test_pages_match_full_sort(self, index):
+        """Test walking every page gives the fully sorted feed"""
+        index, records = index
+        ids, pages = read_all(index, "recent", 7)
+
+        assert ids == [f"post_{n}" for n in reversed(range(30))]
+        assert pages == 5
+
+    def test_any_tag_filter_dedupes(self, index):
+        """Test posts with several requested tags appear once"""
+        index, records = index
+        ids, _ = read_all(index, "recent", 4, {"tags": ["python", "loops"]})
+
+        expected = [f"post_{n}" for n in reversed(range(30)) if n % 2 == 0 or n % 3 == 0]
+        assert ids == expected
+
+    def test_combined_facets(self, index):
+        """Test a record must match every facet given"""
+        index, records = index
+        ids, _ = read_all(index, "top", 3, {"tags": ["python"], "post_type": ["question"]})
+
+        expected = sorted((n for n in range(30) if n % 4 == 0),
+                          key=lambda n: (-(n % 5), -n))
+        assert ids == [f"post_{n}" for n in expected]
+
+    def test_vote_rekeys_record(self, index):
+        """Test re-putting a record moves it in the vote ordering"""
+        index, records = index
+        records["post_1"]["votes"] = 100
+        index.put("post_1", records["post_1"])
+
+        assert index.page("top", 1)[0] == ["post_1"]
+        assert len(index) == 30
+
+    def test_cursor_survives_new_records(self, index):
+        """Test records added after a page was served do not shift the next page"""
+        index, records = index
+        first, cursor = index.page("recent", 10)
+        index.put("post_99", post(99))
+
+        second, _ = index.page("recent", 10, cursor)
+
+        assert second == [f"post_{n}" for n in range(19, 9, -1)]
+
+    def test_invalid_cursor(self, index):
+        """Test malformed cursors and cursors from another order are rejected"""
+        index, records = index
+        _, cursor = index.page("recent", 5)
+
+        with pytest.raises(ValueError):
+            index.page("recent", 5, "not-a-cursor")
+        with pytest.raises(ValueError):
+            index.page("top", 5, cursor)
+        # Well formed but tampered keys: wrong types or wrong length for the order
+        for key in (["x", "post_1"], [1.0, 2.0, "post_1"], [1.0, 2], [], "post_1"):
+            with pytest.raises(ValueError):
+                index.page("recent", 5, encode_cursor("recent", key))
+
+class TestSocialManagerFeed:
+    """Manager feeds over the index"""
+
+    def test_discussion_feed(self, temp_dir):
+        """Test posts are paged with authors attached and filtered by type"""
+        manager = SocialLearningManager(data_dir=os.path.join(temp_dir, "social"))
+        manager.create_user_profile("a@example.com", "Ada")
+        manager.create_discussion_post("a@example.com", "How?", "...", PostType.QUESTION, ["loops"])
+        manager.create_discussion_post("b@example.com", "Hi", "...", PostType.DISCUSSION, ["intro"])
+
+        page = manager.discussion_feed(limit=10, post_type=PostType.QUESTION)
+
+        assert [item["title"] for item in page["items"]] == ["How?"]
+        assert page["items"][0]["author"]["display_name"] == "Ada"
+        assert page["next_cursor"] is None
+
+    def test_private_shares_hidden(self, temp_dir):
+        """Test only public code shares are listed, most voted first"""
+        manager = SocialLearningManager(data_dir=os.path.join(temp_dir, "social"))
+        manager.share_code("a@example.com", "public", "", "print(1)", "python")
+        manager.share_code("b@example.com", "private", "", "print(2)", "python", is_public=False)
+
+        assert [share["title"] for share in manager.get_code_shares(language="python")] == ["public"]
+        assert manager.get_code_shares(language="javascript") == []
@@ -0,0 +1,153 @@
+"""
+Unit tests for the timer wheel and collaboration session lifecycle
+"""
+
+import math
+import random
+import time
+
+from core.timer_wheel import TimerWheel
+from collaboration_system import (CollaborationHub, MatchmakingIndex,
+                                  SESSION_IDLE_TIMEOUT, MENTOR_REQUEST_TIMEOUT)
+
+class TestTimerWheel:
+    """Scheduling, touching and cascading timers"""
+
+    def test_fires_on_time_across_levels(self, clock):
+        """Test timers at every level fire at their tick, not before"""
+        wheel = TimerWheel(tick=1.0, clock=clock)
+        for delay in (0.5, 5, 64, 100, 4096, 300000):
+            wheel.schedule(delay, delay)
+
+        fired = {}
+        while len(wheel):
+            clock.now += 7
+            for key in wheel.advance():
+                fired[key] = clock.now - 1000.0
+        for delay, at in fired.items():
+            assert delay <= at < delay + 8
+
+    def test_touch_and_cancel(self, clock):
+        """Test touched timers are pushed back and cancelled ones never fire"""
+        wheel = TimerWheel(clock=clock)
+        wheel.schedule("idle", 10)
+        wheel.schedule("gone", 10)
+        wheel.cancel("gone")
+
+        clock.now += 8
+        assert wheel.touch("idle", 10)
+        clock.now += 5
+        assert wheel.advance() == []
+        clock.now += 5
+        assert wheel.advance() == ["idle"]
+        assert not wheel.touch("idle", 10)
+
+    def test_matches_sorted_deadlines(self, clock):
+        """Test random schedules, touches and jumps agree with a plain deadline table"""
+        rng = random.Random(5)
+        wheel = TimerWheel(tick=1.0, slot_bits=3, levels=3, clock=clock)
+        deadlines = {}
+        for _ in range(3000):
+            key = rng.randrange(100)
+            action = rng.random()
+            if action < 0.4:
+                delay = rng.choice([rng.uniform(0, 10), rng.uniform(0, 1000)])
+                wheel.schedule(key, delay)
+                deadlines[key] = clock.now + delay
+            elif action < 0.55 and wheel.touch(key, rng.uniform(0, 300)):
+                deadlines[key] = wheel.deadline(key)
+            else:
+                clock.now += rng.choice([1, 3, rng.uniform(0, 700)])
+                fired = wheel.advance()
+                due = {k for k, d in deadlines.items() if math.ceil(d) <= math.ceil(clock.now)}
+                assert set(fired) <= due
+                assert all(math.ceil(deadlines[k]) == math.ceil(clock.now) for k in due - set(fired))
+                for k in fired:
+                    del deadlines[k]
+
+class TestSessionLifecycle:
+    """Idle expiry and partner matching in the collaboration hub"""
+
+    def test_idle_sessions_and_mentor_requests_expire(self, clock):
+        """Test idle sessions, their study groups and unanswered mentor requests expire"""
+        hub = CollaborationHub()
+        hub.timers = TimerWheel(clock=clock)
+        busy = hub.create_coding_session("a")
+        help_session = hub.request_mentor_help("b", "recursion")
+        group = hub.create_study_group("c", "loops")
+
+        clock.now += MENTOR_REQUEST_TIMEOUT + 5
+        assert hub.expire_idle() == {'sessions': 0, 'mentor_requests': 1}
+        assert hub.active_sessions[help_session]['mentor_request']['status'] == 'expired'
+
+        clock.now += SESSION_IDLE_TIMEOUT - MENTOR_REQUEST_TIMEOUT - 60
+        hub.update_code(busy, "a", "print(1)")
+        clock.now += 120
+        result = hub.expire_idle()
+
+        assert result['sessions'] == 2
+        assert hub.active_sessions[busy]['is_active'] is True
+        assert hub.active_sessions[help_session]['is_active'] is False
+        assert hub.study_groups[group]['is_active'] is False
+
+    def test_expiry_ticker(self, clock):
+        """Test the background ticker expires sessions without anyone calling expire_idle"""
+        hub = CollaborationHub()
+        hub.timers = TimerWheel(clock=clock)
+        session_id = hub.create_coding_session("a")
+        clock.now += SESSION_IDLE_TIMEOUT + 5
+
+        hub.start_expiry(interval=0.01)
+        try:
+            deadline = time.monotonic() + 5
+            while hub.active_sessions[session_id]['is_active'] and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            hub.stop_expiry()
+
+        assert hub.active_sessions[session_id]['is_active'] is False
+        assert hub._expiry_thread is None
+
+    def test_expired_sessions_are_closed(self, clock):
+        """Test expired sessions drop their live state and reject further edits"""
+        hub = CollaborationHub()
+        hub.timers = TimerWheel(clock=clock)
+        session_id = hub.create_coding_session("a")
+        hub.update_code(session_id, "a", "print(1)")
+        hub.update_cursor(session_id, "a", hub.documents[session_id].revision, 3)
+
+        clock.now += SESSION_IDLE_TIMEOUT + 5
+        hub.expire_idle()
+
+        assert session_id not in hub.documents
+        assert hub.pending_cursor_batches() == {}
+        assert hub.get_session_data(session_id)['code'] == "print(1)"
+        assert not hub.join_session(session_id, "b")
+        assert hub.apply_operation(session_id, "a", 1, [8, "x"]) is None
+        assert not hub.update_cursor(session_id, "a", 1, 0)
+        assert not hub.update_code(session_id, "a", "print(2)")
+
+    def test_partner_matching_by_skill_level(self):
+        """Test partners are matched within a skill level, oldest session first"""
+        hub = CollaborationHub()
+        first = hub.find_coding_partner("a", "advanced")
+        second = hub.find_coding_partner("b", "advanced")
+        beginner = hub.find_coding_partner("c", "beginner")
+
+        assert second == first
+        assert beginner != first
+        assert hub.find_coding_partner("c", "beginner") != beginner
+
+        hub.join_session(first, "b")
+        hub.leave_session(first, "b")
+        assert hub.find_coding_partner("d", "advanced") == first
+
+    def test_matchmaking_skips_own_sessions(self):
+        """Test users are never matched with themselves and any-level sessions are a fallback"""
+        index = MatchmakingIndex()
+        index.add("own", "a", "beginner")
+        index.add("open", "b")
+
+        assert index.take("a", "beginner") == "open"
+        assert index.take("a", "beginner") is None
+        assert index.take("z", "beginner") == "own"
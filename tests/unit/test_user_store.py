@@ -0,0 +1,261 @@
+"""
+Unit tests for user store backends
+"""
+
+import pytest
+import json
+import os
+import threading
+import time
+
+from core.user_store import SQLiteUserStore, JSONUserStore, CachedUserStore, create_user_store
+
+@pytest.fixture(params=["sqlite", "json", "cached"])
+def store(request, temp_dir):
+    """Create each user store backend in a temp directory"""
+    if request.param == "cached":
+        return CachedUserStore(create_user_store("sqlite", data_dir=temp_dir), revalidate_interval=0)
+    return create_user_store(request.param, data_dir=temp_dir)
+
+class TestUserStore:
+    """Behaviour shared by every user store backend"""
+
+    def test_save_and_get_user(self, store):
+        """Test per-user save and read"""
+        assert store.get_user("test@example.com") is None
+
+        assert store.save_user("test@example.com", {"name": "Test User", "points": 10})
+
+        assert store.get_user("test@example.com") == {"name": "Test User", "points": 10}
+        assert store.user_exists("test@example.com")
+        assert store.count_users() == 1
+
+    def test_update_user(self, store):
+        """Test transactional read-modify-write"""
+        store.save_user("test@example.com", {"points": 10})
+
+        profile = store.update_user("test@example.com", lambda user: user.update(points=20))
+
+        assert profile["points"] == 20
+        assert store.get_user("test@example.com")["points"] == 20
+
+    def test_update_user_abort(self, store):
+        """Test that returning False from the updater skips the write"""
+        store.save_user("test@example.com", {"points": 10})
+
+        def abort(user):
+            user["points"] = 99
+            return False
+
+        store.update_user("test@example.com", abort)
+        assert store.get_user("test@example.com")["points"] == 10
+
+    def test_update_missing_user(self, store):
+        """Test update of a missing user with and without create"""
+        assert store.update_user("missing@example.com", lambda user: None) is None
+
+        store.update_user("new@example.com", lambda user: user.update(points=5), create=True)
+        assert store.get_user("new@example.com") == {"points": 5}
+
+    def test_increment(self, store):
+        """Test atomic field increments"""
+        store.save_user("test@example.com", {"points": 10})
+
+        result = store.increment("test@example.com", {"points": 5, "playground_uses": 1},
+                                 {"last_activity": "2024-01-01T00:00:00"})
+
+        assert result == {"points": 15, "playground_uses": 1}
+        user = store.get_user("test@example.com")
+        assert user["points"] == 15
+        assert user["last_activity"] == "2024-01-01T00:00:00"
+        assert store.increment("missing@example.com", {"points": 1}) is None
+
+    def test_version_changes_on_write(self, store):
+        """Test that the version token changes after writes"""
+        store.save_user("test@example.com", {"points": 1})
+        before = store.version()
+
+        store.increment("test@example.com", {"points": 1})
+
+        assert store.version() != before
+
+    def test_save_all_and_all_users(self, store, sample_user_data):
+        """Test legacy whole-table semantics"""
+        store.save_user("stale@example.com", {"name": "Stale"})
+
+        assert store.save_all(sample_user_data)
+
+        assert store.all_users() == sample_user_data
+
+    def test_users_since(self, store):
+        """Test modified-since reads cover every profile written after the cut-off"""
+        store.save_user("old@example.com", {"points": 1})
+        since = time.time()
+        store.save_user("new@example.com", {"points": 2})
+
+        assert "new@example.com" in dict(store.iter_users_since(since))
+        assert sorted(store.iter_emails()) == ["new@example.com", "old@example.com"]
+
+    def test_backup(self, store, temp_dir):
+        """Test that a backup holds a snapshot the backend can reopen"""
+        store.save_user("test@example.com", {"points": 10})
+        target = os.path.join(temp_dir, "snapshot" + os.path.splitext(store.storage_path)[1])
+
+        store.backup(target)
+        store.save_user("later@example.com", {"points": 1})
+
+        copy = SQLiteUserStore(target) if target.endswith(".db") else JSONUserStore(target)
+        assert copy.all_users() == {"test@example.com": {"points": 10}}
+
+class TestSQLiteUserStore:
+    """SQLite specific behaviour"""
+
+    def test_wal_mode(self, test_user_store):
+        """Test the database runs in WAL mode"""
+        mode = test_user_store._connect().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_users_since_skips_older_writes(self, test_user_store):
+        """Test modified-since reads use the write time of each row"""
+        test_user_store.save_user("old@example.com", {"points": 1})
+        since = time.time()
+        test_user_store.save_user("new@example.com", {"points": 2})
+
+        assert dict(test_user_store.iter_users_since(since)) == {"new@example.com": {"points": 2}}
+
+    def test_concurrent_increments(self, test_user_store):
+        """Test that concurrent increments are not lost"""
+        test_user_store.save_user("test@example.com", {"points": 0})
+
+        def worker():
+            for _ in range(25):
+                test_user_store.increment("test@example.com", {"points": 1})
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert test_user_store.get_user("test@example.com")["points"] == 100
+
+    def test_migrate_from_json_once(self, test_user_store, temp_dir, sample_user_data):
+        """Test one-shot migration from the legacy JSON file"""
+        json_path = os.path.join(temp_dir, "user_progress.json")
+        with open(json_path, 'w') as f:
+            json.dump(sample_user_data, f)
+
+        assert test_user_store.migrate_from_json(json_path) == 2
+        assert test_user_store.get_user("test@example.com")["points"] == 150
+
+        # Later changes are not overwritten by a second migration attempt
+        test_user_store.increment("test@example.com", {"points": 50})
+        assert test_user_store.migrate_from_json(json_path) == 0
+        assert test_user_store.get_user("test@example.com")["points"] == 200
+
+    def test_migrate_missing_file(self, test_user_store, temp_dir):
+        """Test migration with no legacy file"""
+        assert test_user_store.migrate_from_json(os.path.join(temp_dir, "missing.json")) == 0
+
+class TestJSONUserStore:
+    """Legacy JSON adapter behaviour"""
+
+    def test_reads_existing_file_format(self, temp_dir, sample_user_data):
+        """Test the adapter reads the existing user_progress.json layout"""
+        json_path = os.path.join(temp_dir, "user_progress.json")
+        with open(json_path, 'w') as f:
+            json.dump(sample_user_data, f)
+
+        store = JSONUserStore(json_path)
+
+        assert store.get_user("advanced@example.com")["level"] == 5
+        assert store.count_users() == 2
+
+def test_unknown_backend(temp_dir):
+    """Test unknown backends are rejected"""
+    with pytest.raises(ValueError):
+        create_user_store("unknown", data_dir=temp_dir)
+
+class TestCachedUserStore:
+    """Process-wide profile cache behaviour"""
+
+    @pytest.fixture
+    def cached_store(self, test_user_store):
+        return CachedUserStore(test_user_store, revalidate_interval=0)
+
+    def test_repeated_reads_hit_cache(self, cached_store):
+        """Test repeated reads are served from memory"""
+        cached_store.save_user("test@example.com", {"points": 10})
+
+        for _ in range(3):
+            assert cached_store.get_user("test@example.com") == {"points": 10}
+
+        stats = cached_store.cache_stats()
+        assert stats["hits"] == 3
+        assert stats["misses"] == 0
+
+    def test_returned_profiles_are_copies(self, cached_store):
+        """Test mutating a returned profile does not change the cache"""
+        cached_store.save_user("test@example.com", {"points": 10})
+
+        cached_store.get_user("test@example.com")["points"] = 999
+
+        assert cached_store.get_user("test@example.com")["points"] == 10
+
+    def test_write_through(self, cached_store, test_user_store):
+        """Test writes update both the backend and the cached entry"""
+        cached_store.save_user("test@example.com", {"points": 10})
+        cached_store.get_user("test@example.com")
+
+        cached_store.update_user("test@example.com", lambda user: user.update(points=20))
+        cached_store.increment("test@example.com", {"points": 5})
+
+        assert cached_store.get_user("test@example.com")["points"] == 25
+        assert test_user_store.get_user("test@example.com")["points"] == 25
+        assert cached_store.cache_stats()["invalidations"] == 0
+
+    def test_aborted_update_keeps_cache(self, cached_store):
+        """Test an aborted update does not cache the mutated profile"""
+        cached_store.save_user("test@example.com", {"points": 10})
+
+        def abort(user):
+            user["points"] = 99
+            return False
+
+        cached_store.update_user("test@example.com", abort)
+
+        assert cached_store.get_user("test@example.com")["points"] == 10
+
+    def test_external_write_invalidates(self, cached_store, test_user_store):
+        """Test a write from another connection is detected by version"""
+        cached_store.save_user("test@example.com", {"points": 10})
+        cached_store.get_user("test@example.com")
+
+        other = SQLiteUserStore(test_user_store.db_path)
+        other.increment("test@example.com", {"points": 1})
+
+        assert cached_store.get_user("test@example.com")["points"] == 11
+        assert cached_store.cache_stats()["invalidations"] == 1
+
+    def test_revalidate_interval(self, test_user_store):
+        """Test the backend is not consulted inside the revalidation window"""
+        cached_store = CachedUserStore(test_user_store, revalidate_interval=3600)
+        cached_store.save_user("test@example.com", {"points": 10})
+
+        SQLiteUserStore(test_user_store.db_path).increment("test@example.com", {"points": 1})
+
+        assert cached_store.get_user("test@example.com")["points"] == 10
+        cached_store.invalidate("test@example.com")
+        assert cached_store.get_user("test@example.com")["points"] == 11
+
+    def test_all_users_snapshot(self, cached_store, sample_user_data):
+        """Test full scans are served from the cache once loaded"""
+        cached_store.save_all(sample_user_data)
+
+        assert cached_store.all_users() == sample_user_data
+        cached_store.increment("test@example.com", {"points": 1})
+        users = cached_store.all_users()
+
+        assert users["test@example.com"]["points"] == 151
+        assert cached_store.cache_stats()["complete"]
+        assert cached_store.count_users() == 2
@@ -0,0 +1,174 @@
+"""
+Unit tests for write-behind counter aggregation
+"""
+
+import pytest
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from core.write_behind import CounterAggregator, advance_streak, APPLIED_FIELD
+
+@pytest.fixture
+def aggregator(test_user_store, temp_dir):
+    """Aggregator over an isolated store that only flushes when asked"""
+    aggregator = CounterAggregator(test_user_store.update_user, journal_dir=os.path.join(temp_dir, "journal"),
+                                   flush_interval=3600, flush_threshold=10 ** 6)
+    yield aggregator
+    aggregator.flush()
+
+def journal_files(temp_dir):
+    return sorted(os.listdir(os.path.join(temp_dir, "journal")))
+
+class TestCounterAggregator:
+    """Coalescing and flushing"""
+
+    def test_coalesces_until_flush(self, aggregator, test_user_store):
+        """Test many updates become one write per user"""
+        test_user_store.save_user("test@example.com", {"playground_uses": 2})
+        version = test_user_store.version()
+
+        for minute in range(5):
+            aggregator.add("test@example.com", {"playground_uses": 1},
+                           {"last_activity": f"2024-01-01T10:0{minute}:00"})
+
+        assert test_user_store.version() == version
+        assert aggregator.flush() == 1
+
+        user = test_user_store.get_user("test@example.com")
+        assert user["playground_uses"] == 7
+        assert user["last_activity"] == "2024-01-01T10:04:00"
+
+    def test_overlay_shows_pending(self, aggregator):
+        """Test reads see unflushed counters without changing the input"""
+        profile = {"playground_uses": 1}
+        aggregator.add("test@example.com", {"playground_uses": 2})
+
+        assert aggregator.overlay("test@example.com", profile)["playground_uses"] == 3
+        assert profile["playground_uses"] == 1
+        assert aggregator.overlay("other@example.com", profile) is profile
+
+    def test_markers_hidden_from_reads(self, aggregator, test_user_store):
+        """Test the replay markers written with a flush are left out of read profiles"""
+        test_user_store.save_user("test@example.com", {"playground_uses": 1})
+        aggregator.add("test@example.com", {"playground_uses": 1})
+        aggregator.flush()
+
+        stored = test_user_store.get_user("test@example.com")
+        assert APPLIED_FIELD in stored
+        assert aggregator.overlay("test@example.com", stored) == {"playground_uses": 2}
+
+    def test_derived_fields_follow_counters(self, test_user_store, temp_dir):
+        """Test derived fields are recomputed on flush and in overlays"""
+        def average(profile):
+            profile["average"] = profile["total"] / profile["taken"]
+
+        aggregator = CounterAggregator(test_user_store.update_user, journal_dir=os.path.join(temp_dir, "journal"),
+                                       flush_interval=3600, flush_threshold=10 ** 6, derive=average)
+        test_user_store.save_user("test@example.com", {"taken": 1, "total": 50, "average": 50})
+        aggregator.add("test@example.com", {"taken": 1, "total": 100})
+
+        assert aggregator.overlay("test@example.com", test_user_store.get_user("test@example.com"))["average"] == 75
+        aggregator.flush()
+        assert test_user_store.get_user("test@example.com")["average"] == 75
+
+    def test_latest_never_moves_back(self, aggregator, test_user_store):
+        """Test an older buffered timestamp does not overwrite a newer stored one"""
+        test_user_store.save_user("test@example.com", {"last_activity": "2024-06-01T00:00:00"})
+        aggregator.add("test@example.com", latest={"last_activity": "2024-05-01T00:00:00"})
+
+        aggregator.flush()
+
+        assert test_user_store.get_user("test@example.com")["last_activity"] == "2024-06-01T00:00:00"
+
+    def test_threshold_triggers_background_flush(self, test_user_store, temp_dir):
+        """Test the flush thread wakes up once enough updates are pending"""
+        aggregator = CounterAggregator(test_user_store.update_user, journal_dir=temp_dir,
+                                       flush_interval=3600, flush_threshold=3)
+        test_user_store.save_user("test@example.com", {})
+
+        for _ in range(3):
+            aggregator.add("test@example.com", {"playground_uses": 1})
+
+        for _ in range(100):
+            if test_user_store.get_user("test@example.com").get("playground_uses") == 3:
+                break
+            time.sleep(0.02)
+        assert test_user_store.get_user("test@example.com")["playground_uses"] == 3
+
+    def test_journal_removed_after_flush(self, aggregator, test_user_store, temp_dir):
+        """Test flushed batches leave no journal behind"""
+        test_user_store.save_user("test@example.com", {})
+        aggregator.add("test@example.com", {"playground_uses": 1})
+        assert journal_files(temp_dir) == [f"counters-{aggregator.journal_id}.log"]
+
+        aggregator.flush()
+
+        assert journal_files(temp_dir) == []
+
+class TestJournalRecovery:
+    """Replaying journals of processes that died before flushing"""
+
+    def write_dead_journal(self, temp_dir, name, entries):
+        os.makedirs(os.path.join(temp_dir, "journal"), exist_ok=True)
+        with open(os.path.join(temp_dir, "journal", name), 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.write('{"email": "torn')
+
+    def test_replays_dead_journal(self, aggregator, test_user_store, temp_dir):
+        """Test unflushed updates of a dead process are applied once"""
+        test_user_store.save_user("test@example.com", {"playground_uses": 1})
+        entry = {"email": "test@example.com", "deltas": {"playground_uses": 1}, "latest": {}, "days": []}
+        self.write_dead_journal(temp_dir, "counters-999999-1.log", [entry, entry])
+
+        aggregator.flush()
+
+        assert test_user_store.get_user("test@example.com")["playground_uses"] == 3
+        assert journal_files(temp_dir) == []
+
+    def test_interrupted_flush_not_applied_twice(self, aggregator, test_user_store, temp_dir):
+        """Test a batch already committed for a user is skipped on replay"""
+        test_user_store.save_user("test@example.com", {"playground_uses": 5, APPLIED_FIELD: {"999999-1": 1}})
+        test_user_store.save_user("other@example.com", {"playground_uses": 0})
+        self.write_dead_journal(temp_dir, "counters-999999-1.1.flushing", [
+            {"email": "test@example.com", "deltas": {"playground_uses": 1}},
+            {"email": "other@example.com", "deltas": {"playground_uses": 1}},
+        ])
+
+        aggregator.flush()
+
+        assert test_user_store.get_user("test@example.com")["playground_uses"] == 5
+        assert test_user_store.get_user("other@example.com")["playground_uses"] == 1
+
+class TestStreak:
+    """Streak rules applied at flush time"""
+
+    def test_consecutive_day_extends_streak(self):
+        """Test activity on the next day extends the streak"""
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        profile = {"streak": 4, "last_activity": f"{yesterday}T09:00:00"}
+
+        advance_streak(profile, date.today().isoformat())
+
+        assert profile["streak"] == 5
+
+    def test_gap_resets_streak(self):
+        """Test a missed day resets the streak"""
+        profile = {"streak": 4, "last_activity": "2020-01-01T09:00:00"}
+
+        advance_streak(profile, date.today().isoformat())
+
+        assert profile["streak"] == 1
+
+    def test_touch_streak_through_aggregator(self, aggregator, test_user_store):
+        """Test streak touches are applied before newer timestamps"""
+        yesterday = (datetime.now() - timedelta(days=1)).isoformat()
+        test_user_store.save_user("test@example.com", {"streak": 2, "last_activity": yesterday})
+
+        aggregator.add("test@example.com", latest={"last_activity": datetime.now().isoformat()}, touch_streak=True)
+        aggregator.add("test@example.com", touch_streak=True)
+        aggregator.flush()
+
+        assert test_user_store.get_user("test@example.com")["streak"] == 3